@@ -0,0 +1,27 @@
+"""add_auto_planning_solver_profile
+
+Revision ID: b7c41e2f9a10
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b7c41e2f9a10"
+down_revision: Union[str, Sequence[str], None] = "a1b2c3d4e5f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("director_auto_planning_configs") as batch_op:
+        batch_op.add_column(sa.Column("solver_profile", sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("director_auto_planning_configs") as batch_op:
+        batch_op.drop_column("solver_profile")
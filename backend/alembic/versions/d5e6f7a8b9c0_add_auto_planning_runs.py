@@ -0,0 +1,54 @@
+"""add_auto_planning_runs
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "d5e6f7a8b9c0"
+down_revision: Union[str, Sequence[str], None] = "c4d5e6f7a8b9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "auto_planning_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("director_id", sa.Integer(), nullable=False),
+        sa.Column("target_week_iso", sa.String(length=10), nullable=False),
+        sa.Column("source", sa.String(length=16), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.BigInteger(), nullable=False),
+        sa.Column("claimed_by", sa.String(length=128), nullable=True),
+        sa.Column("heartbeat_at", sa.BigInteger(), nullable=True),
+        sa.Column("options", sa.JSON(), nullable=True),
+        sa.Column("progress", sa.JSON(), nullable=True),
+        sa.Column("generated_sites", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.String(length=32), nullable=True),
+        sa.Column("last_error", sa.String(length=1000), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.Column("started_at", sa.BigInteger(), nullable=True),
+        sa.Column("finished_at", sa.BigInteger(), nullable=True),
+        sa.Column("duration_ms", sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(["director_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_auto_planning_runs_id"), "auto_planning_runs", ["id"], unique=False)
+    op.create_index(op.f("ix_auto_planning_runs_director_id"), "auto_planning_runs", ["director_id"], unique=False)
+    op.create_index(op.f("ix_auto_planning_runs_status"), "auto_planning_runs", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_auto_planning_runs_status"), table_name="auto_planning_runs")
+    op.drop_index(op.f("ix_auto_planning_runs_director_id"), table_name="auto_planning_runs")
+    op.drop_index(op.f("ix_auto_planning_runs_id"), table_name="auto_planning_runs")
+    op.drop_table("auto_planning_runs")
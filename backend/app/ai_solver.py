@@ -1,29 +1,30 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Generator, Iterator, List, Tuple
 import logging
 import os
+import time
 
 from ortools.sat.python import cp_model
 
 from .ai_solver_utils import (
     DayKey,
     ShiftName,
-    _solver_num_search_workers,
     build_capacities_from_config,
+    configure_cp_sat_solver,
     enforce_max_shifts_on_plan,
     finalize_candidate_plan,
     next_day,
     order_days,
     order_shifts,
+    resolve_solver_profile,
     sanitize_plan,
 )
-from .ai_solver_model import (
-    build_cp_sat_schedule_model,
-    is_morning_shift_name,
-    is_night_shift_name,
-    is_noon_shift_name,
-)
+from .solve_corpus import record_solve_case, record_solve_outcome
+from .solve_stats import SolveStatsTracker
+from .ai_solver_model import PullsModelSpec, build_cp_sat_schedule_model_cached, pull_cells_from_solution
+from .scheduling_spec import site_scheduling_spec
+from .shift_catalog import shift_catalog_for_config
 
 # Réexport public (compat imports existants / tests)
 __all__ = [
@@ -38,9 +39,28 @@ __all__ = [
     "sanitize_plan",
     "solve_schedule",
     "solve_schedule_stream",
+    "solve_schedule_weeks",
 ]
 
 
+def _add_assignment_hints(built: Any, hint_assignments: Dict[str, Dict[str, List[List[str]]]]) -> None:
+    for (w, d, s, t), var in built.x.items():
+        per_station = ((hint_assignments.get(built.days[d]) or {}).get(built.shifts[s]) or [])
+        cell = per_station[t] if t < len(per_station) else []
+        built.model.AddHint(var, 1 if built.workers[w].get("name") in (cell or []) else 0)
+
+
+def _base_solve_outcome(solver: cp_model.CpSolver, res: Any) -> Dict[str, Any]:
+    """Statut / objectif / temps du solve de base (corpus), relevés avant les relances d'alternatives."""
+    feasible = res in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    return {
+        "status": solver.StatusName(res),
+        "objective": solver.ObjectiveValue() if feasible else None,
+        "best_bound": solver.BestObjectiveBound() if feasible else None,
+        "solve_seconds": solver.WallTime(),
+    }
+
+
 def solve_schedule(
     config: Dict[str, Any],
     workers: List[Dict[str, Any]],
@@ -49,27 +69,58 @@ def solve_schedule(
     num_alternatives: int = 20,
     fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None = None,
     exclude_days: List[str] | None = None,
+    stats_key: str | None = None,
+    solver_profile: str | None = None,
+    hint_assignments: Dict[str, Dict[str, List[List[str]]]] | None = None,
+    pulls: PullsModelSpec | None = None,
+    alternatives_time_limit_seconds: float | None = None,
 ) -> Dict[str, Any]:
     """Return a schedule dict with assignments per day/shift/station as worker name lists.
 
     workers: [{"id": int, "name": str, "max_shifts": int, "availability": {day: [shift]}}]
+    stats_key: si fourni, enregistre les statistiques de résolution (voir app.solve_stats).
+    solver_profile: profil CP-SAT nommé ("fast-preview" | "balanced" | "thorough").
+    hint_assignments: plan de départ suggéré au solveur (AddHint), ex. la semaine précédente.
+    pulls: משיכות modélisées dans CP-SAT (plafond inclus) ; le résultat porte alors
+    "pull_cells" = cases [day, shift, station_index] que le solveur couvre par משיכה.
+    alternatives_time_limit_seconds: plafond des relances d'alternatives (défaut : time_limit_seconds).
     """
     logger = logging.getLogger("ai_solver")
-    built = build_cp_sat_schedule_model(
+    build_started = time.perf_counter()
+    built = build_cp_sat_schedule_model_cached(
         config or {},
         workers,
         max_nights_per_worker=max_nights_per_worker,
         fixed_assignments=fixed_assignments,
         exclude_days=exclude_days,
         log_label="SOLVER",
+        pulls=pulls,
+    )
+    build_seconds = time.perf_counter() - build_started
+    corpus_path = record_solve_case(
+        "schedule",
+        built,
+        config or {},
+        workers,
+        {
+            "time_limit_seconds": time_limit_seconds,
+            "max_nights_per_worker": max_nights_per_worker,
+            "num_alternatives": num_alternatives,
+            "fixed_assignments": fixed_assignments,
+            "exclude_days": exclude_days,
+            "solver_profile": solver_profile,
+        },
     )
     days, shifts, stations = built.days, built.shifts, built.stations
     model, x = built.model, built.x
     W, D, S, T = built.W, built.D, built.S, built.T
     name_to_w = built.name_to_w
-    _is_night_name = is_night_shift_name
-    _is_morning_name = is_morning_shift_name
-    _is_noon_name = is_noon_shift_name
+    shift_catalog = shift_catalog_for_config(config)
+    _is_night_name = shift_catalog.is_night
+    _is_morning_name = shift_catalog.is_morning
+    _is_noon_name = shift_catalog.is_noon
+    if hint_assignments:
+        _add_assignment_hints(built, hint_assignments)
     logger.info(
         "Start solve: days=%s shifts=%s stations=%s workers=%s",
         days,
@@ -78,11 +129,12 @@ def solve_schedule(
         [w.get("name") for w in workers],
     )
 
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = float(time_limit_seconds)
-    solver.parameters.num_search_workers = _solver_num_search_workers()
+    profile = resolve_solver_profile(solver_profile, len(workers))
+    solver = configure_cp_sat_solver(cp_model.CpSolver(), time_limit_seconds, profile)
 
-    res = solver.Solve(model)
+    stats = SolveStatsTracker(stats_key, model, len(workers), time_limit_seconds)
+    res = stats.solve(solver, model)
+    base_outcome = _base_solve_outcome(solver, res) if corpus_path else None
 
     # Build empty assignments structure: day -> shift -> list per station of worker names
     assignments: Dict[str, Dict[str, List[List[str]]]] = {
@@ -90,6 +142,8 @@ def solve_schedule(
     }
 
     if res not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        stats.finish(0)
+        record_solve_outcome(corpus_path, config or {}, base_outcome, build_seconds=build_seconds, exclude_days=exclude_days)
         return {
             "days": days,
             "shifts": shifts,
@@ -98,6 +152,7 @@ def solve_schedule(
             "status": str(res),
             "objective": 0,
         }
+    base_pull_cells = pull_cells_from_solution(built, solver)
 
     # Fill assignments ensuring:
     # - no duplicate name within the same cell
@@ -144,6 +199,19 @@ def solve_schedule(
                     total += len(lst or [])
         return total
     base_total_assigned = _count_assigned(assignments)
+    def _count_holes(a: Dict[str, Dict[str, List[List[str]]]]) -> int:
+        total = 0
+        for t_idx in range(len(stations)):
+            cap = stations[t_idx].get("capacity", {}) or {}
+            for dk in days:
+                for sn in shifts:
+                    req = int((cap.get(dk, {}) or {}).get(sn, 0))
+                    if req <= 0:
+                        continue
+                    got = len(((a.get(dk, {}) or {}).get(sn, []) or [[] for _ in stations])[t_idx] or [])
+                    if got < req:
+                        total += (req - got)
+        return total
 
     # Greedy post-processing: try to fill remaining holes without violating constraints
     try:
@@ -203,9 +271,7 @@ def solve_schedule(
                 if nm in nxt:
                     return True
             return False
-        def is_night(name: str) -> bool:
-            s = (name or "").strip().lower()
-            return s == "22-06" or ("22" in s and "06" in s) or ("night" in s) or ("\u05dc\u05d9\u05dc\u05d4" in name)
+        is_night = _is_night_name
         # Precompute worker maps
         name_to_max = { (w.get("name") or ""): int(w.get("max_shifts") or 5) for w in workers }
         name_to_roles_norm = { (w.get("name") or ""): { _norm_role_local(r) for r in (w.get("roles") or []) } for w in workers }
@@ -463,15 +529,19 @@ def solve_schedule(
             (dk, tuple((sn, tuple(tuple(lst) for lst in (a.get(dk, {}).get(sn, []) or []))) for sn in shifts)) for dk in days
         )
     seen_signatures.add(sig_from_assign(assignments))
-    while alt_budget_resolve > 0:
+    # Les candidats rejetés (couverture moindre, doublon) ne consomment pas le budget : la boucle
+    # est bornée par le temps, sinon elle relance le solveur jusqu'à épuisement du modèle.
+    resolve_limit = float(time_limit_seconds) if alternatives_time_limit_seconds is None else float(alternatives_time_limit_seconds)
+    resolve_deadline = time.monotonic() + max(0.1, resolve_limit)
+    while alt_budget_resolve > 0 and time.monotonic() < resolve_deadline:
         true_lits = current_true_lits()
         if not true_lits:
             break
         # Exclude current full assignment
         model.Add(sum(true_lits) <= len(true_lits) - 1)
-        solver2 = cp_model.CpSolver()
-        solver2.parameters.max_time_in_seconds = float(max(1, int(time_limit_seconds)))
-        solver2.parameters.num_search_workers = _solver_num_search_workers()
+        solver2 = configure_cp_sat_solver(
+            cp_model.CpSolver(), max(0.1, min(float(time_limit_seconds), resolve_deadline - time.monotonic())), profile,
+        )
         res2 = solver2.Solve(model)
         if res2 not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
             break
@@ -776,9 +846,7 @@ def solve_schedule(
                                 break
 
     # Final pass: try to produce alternatives that reduce morning+night pairs without increasing holes
-    def _is_morning_name_local(n: str) -> bool:
-        s = (n or "").strip().lower()
-        return ("בוקר" in n) or s.startswith("06") or ("06-14" in s)
+    _is_morning_name_local = _is_morning_name
     def _count_mn_pairs(a: Dict[str, Dict[str, List[List[str]]]]) -> int:
         cnt = 0
         for dk in days:
@@ -798,9 +866,7 @@ def solve_schedule(
         return cnt
     baseline_mn = _count_mn_pairs(assignments)
     # Also, try to reduce Noon(d) + Morning(d+1) pairs by moving next morning to noon (same station)
-    def _is_noon_name_local(n: str) -> bool:
-        s = (n or "").strip().lower()
-        return ("צהר" in n) or s.startswith("14") or ("14-22" in s)
+    _is_noon_name_local = _is_noon_name
     def _count_nm_pairs(a: Dict[str, Dict[str, List[List[str]]]]) -> int:
         cnt = 0
         for di in range(len(days) - 1):
@@ -849,7 +915,7 @@ def solve_schedule(
                             if s_to == sname:
                                 continue
                             # prefer noon
-                            to_is_noon = ("צהר" in s_to) or ("14-22" in s_to) or (s_to.strip().startswith("14"))
+                            to_is_noon = _is_noon_name(s_to)
                             if not to_is_noon:
                                 continue
                             cap_to = int(st.get("capacity", {}).get(dkey, {}).get(s_to, 0))
@@ -864,7 +930,7 @@ def solve_schedule(
                             # forbid same-day multi-placement
                             if name_present_same_day(cand, dkey, nm):
                                 continue
-                            if s_to not in _avail_list_stream_of(nm, dkey):
+                            if not is_allowed(nm, dkey, s_to):
                                 continue
                             if has_adjacent_in_candidate(cand, nm, dkey, s_to):
                                 continue
@@ -954,12 +1020,17 @@ def solve_schedule(
                     if alt_budget_resolve <= 0:
                                 break
 
+    stats.finish(len(alternatives) + len(alternatives_from_resolve))
+    record_solve_outcome(
+        corpus_path, config or {}, base_outcome, build_seconds=build_seconds, assignments=assignments, exclude_days=exclude_days,
+    )
     return {
         "days": days,
         "shifts": shifts,
         "stations": [st.get("name") for st in stations],
         "assignments": assignments,
         "alternatives": alternatives + alternatives_from_resolve,
+        "pull_cells": base_pull_cells,
         "status": "FEASIBLE" if res == cp_model.FEASIBLE else "OPTIMAL",
         "objective": solver.ObjectiveValue(),
     }
@@ -974,9 +1045,15 @@ def solve_schedule_stream(
     fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None = None,
     exclude_days: List[str] | None = None,
     random_seed: int | None = None,
+    stats_key: str | None = None,
+    solver_profile: str | None = None,
+    hint_assignments: Dict[str, Dict[str, List[List[str]]]] | None = None,
+    pulls: PullsModelSpec | None = None,
 ):
     """Generator: yields incremental planning results: base then alternatives.
     Each yield is a dict with keys: type ('base'|'alternative'|'done'|'status'), and data.
+    hint_assignments: plan de départ (AddHint), voir solve_schedule.
+    pulls: voir solve_schedule ; "pull_cells" accompagne la base et les alternatives RESOLVE.
     """
     logger = logging.getLogger("ai_solver")
     try:
@@ -989,7 +1066,8 @@ def solve_schedule_stream(
         )
     except Exception:
         pass
-    built = build_cp_sat_schedule_model(
+    build_started = time.perf_counter()
+    built = build_cp_sat_schedule_model_cached(
         config or {},
         workers,
         max_nights_per_worker=max_nights_per_worker,
@@ -997,24 +1075,47 @@ def solve_schedule_stream(
         exclude_days=exclude_days,
         var_prefix="s",
         log_label="STREAM",
+        pulls=pulls,
+    )
+    build_seconds = time.perf_counter() - build_started
+    corpus_path = record_solve_case(
+        "stream",
+        built,
+        config or {},
+        workers,
+        {
+            "time_limit_seconds": time_limit_seconds,
+            "max_nights_per_worker": max_nights_per_worker,
+            "num_alternatives": num_alternatives,
+            "fixed_assignments": fixed_assignments,
+            "exclude_days": exclude_days,
+            "solver_profile": solver_profile,
+            "random_seed": random_seed,
+        },
     )
     days, shifts, stations = built.days, built.shifts, built.stations
     model, x = built.model, built.x
     W, D, S, T = built.W, built.D, built.S, built.T
     name_to_w = built.name_to_w
-    _is_night_name = is_night_shift_name
-    _is_morning_name = is_morning_shift_name
-    _is_noon_name = is_noon_shift_name
+    shift_catalog = shift_catalog_for_config(config)
+    _is_night_name = shift_catalog.is_night
+    _is_morning_name = shift_catalog.is_morning
+    _is_noon_name = shift_catalog.is_noon
+    if hint_assignments:
+        _add_assignment_hints(built, hint_assignments)
 
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = float(time_limit_seconds)
-    solver.parameters.num_search_workers = _solver_num_search_workers()
+    profile = resolve_solver_profile(solver_profile, len(workers))
+    solver = configure_cp_sat_solver(cp_model.CpSolver(), time_limit_seconds, profile)
     if random_seed is not None:
         solver.parameters.random_seed = max(1, int(random_seed))
         solver.parameters.randomize_search = True
-    res = solver.Solve(model)
+    stats = SolveStatsTracker(stats_key, model, len(workers), time_limit_seconds)
+    res = stats.solve(solver, model)
+    base_outcome = _base_solve_outcome(solver, res) if corpus_path else None
     if res not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
         logger.warning("[STREAM] base solve failed status=%s", res)
+        stats.finish(0)
+        record_solve_outcome(corpus_path, config or {}, base_outcome, build_seconds=build_seconds, exclude_days=exclude_days)
         yield {"type": "status", "status": str(res)}
         yield {"type": "done"}
         return
@@ -1087,9 +1188,6 @@ def solve_schedule_stream(
         name_to_max = { (w.get("name") or ""): int(w.get("max_shifts") or 5) for w in workers }
         name_to_avail = { (w.get("name") or ""): (w.get("availability") or {}) for w in workers }
         # night counter
-        def _is_night_name(name: str) -> bool:
-            s = (name or "").strip().lower()
-            return s == "22-06" or ("22" in s and "06" in s) or ("night" in s) or ("\u05dc\u05d9\u05dc\u05d4" in name)
         night_count: Dict[str, int] = {}
         assign_count: Dict[str, int] = {}
         for dk in days:
@@ -1164,7 +1262,10 @@ def solve_schedule_stream(
     # Garantie finale: aucun worker ne dépasse son max_shifts après le greedy
     enforce_max_shifts_on_plan(base, workers, label="solve_schedule_stream")
     sanitize_plan(base, days, shifts, stations)
-    yield {"type": "base", "index": 0, "source": "BASE", "days": days, "shifts": shifts, "stations": [st.get("name") for st in stations], "assignments": base}
+    record_solve_outcome(
+        corpus_path, config or {}, base_outcome, build_seconds=build_seconds, assignments=base, exclude_days=exclude_days,
+    )
+    yield {"type": "base", "index": 0, "source": "BASE", "status": solver.StatusName(res), "objective": solver.ObjectiveValue(), "days": days, "shifts": shifts, "stations": [st.get("name") for st in stations], "assignments": base, "pull_cells": pull_cells_from_solution(built, solver)}
 
     # Now generate alternatives using existing functions on-the-fly
     # Reuse helper functions from above region
@@ -1383,9 +1484,7 @@ def solve_schedule_stream(
         def _avail_list_stream_of(name: str, dkey: str) -> List[str]:
             day_val = (name_to_avail_stream.get(name) or {}).get(dkey)
             return day_val if isinstance(day_val, list) else []
-        def _is_night_name_local(n: str) -> bool:
-            s = (n or "").strip().lower()
-            return s == "22-06" or ("22" in s and "06" in s) or ("night" in s) or ("\u05dc\u05d9\u05dc\u05d4" in n)
+        _is_night_name_local = _is_night_name
         assign_count_fill: Dict[str, int] = {}
         night_count_fill: Dict[str, int] = {}
         for dk in days:
@@ -1475,6 +1574,7 @@ def solve_schedule_stream(
         except Exception:
             pass
     if budget <= 0:
+        stats.finish(produced)
         yield {"type": "done"}
         return
 
@@ -1602,9 +1702,7 @@ def solve_schedule_stream(
                 break
             # exclude current solution
             model.Add(sum(true_lits) <= len(true_lits) - 1)
-            solver2 = cp_model.CpSolver()
-            solver2.parameters.max_time_in_seconds = float(max(1, int(time_limit_seconds)))
-            solver2.parameters.num_search_workers = _solver_num_search_workers()
+            solver2 = configure_cp_sat_solver(cp_model.CpSolver(), max(1, int(time_limit_seconds)), profile)
             if random_seed is not None:
                 solver2.parameters.random_seed = max(1, int(random_seed)) + max(1, tried)
                 solver2.parameters.randomize_search = True
@@ -1649,14 +1747,12 @@ def solve_schedule_stream(
                 continue
             finalize_candidate_plan(cand, workers, days, shifts, stations, label="solve_schedule_stream:resolve")
             produced += 1
-            yield {"type": "alternative", "index": produced, "source": "RESOLVE", "assignments": cand}
+            yield {"type": "alternative", "index": produced, "source": "RESOLVE", "assignments": cand, "pull_cells": pull_cells_from_solution(built, solver)}
             budget -= 1
 
     # Bonus pass: if budget remains, try to yield alternatives reducing morning+night pairs
     if budget > 0:
-        def _is_morning_name_local(n: str) -> bool:
-            s = (n or "").strip().lower()
-            return ("בוקר" in n) or s.startswith("06") or ("06-14" in s)
+        _is_morning_name_local = _is_morning_name
         def _count_mn_pairs(a: Dict[str, Dict[str, List[List[str]]]]) -> int:
             cnt = 0
             for dk in days:
@@ -1695,7 +1791,7 @@ def solve_schedule_stream(
                         for s_to in shifts:
                             if budget <= 0:
                                 break
-                            to_is_noon = ("צהר" in s_to) or ("14-22" in s_to) or (s_to.strip().startswith("14"))
+                            to_is_noon = _is_noon_name(s_to)
                             if not to_is_noon or s_to == sname:
                                 continue
                             cap_to = int(st.get("capacity", {}).get(dkey, {}).get(s_to, 0))
@@ -1747,6 +1843,101 @@ def solve_schedule_stream(
         "[STREAM] alternatives finished: produced=%d tried=%d skipped_duplicate=%d skipped_adjacency=%d skipped_capacity=%d remaining_budget=%d",
         produced, tried, skipped_duplicate, skipped_adjacency, skipped_capacity, budget,
     )
+    stats.finish(produced)
     yield {"type": "done"}
 
 
+def _block_week_boundary(
+    workers: List[Dict[str, Any]],
+    prev_plan: Dict[str, Any] | None,
+    days: List[str],
+    shifts: List[str],
+) -> List[Dict[str, Any]]:
+    """Samedi dernier shift (semaine précédente) → dimanche premier shift : même règle
+    d'adjacence qu'à l'intérieur de la semaine, posée via la disponibilité du dimanche.
+
+    prev_plan : {"assignments", "pulls"?} — plan émis ou sauvegardé de la semaine précédente ;
+    les gardes d'une משיכה sur la case samedi-nuit comptent aussi.
+    """
+    if not prev_plan or not days or not shifts or days[0] != "sun":
+        return workers
+    last_shift = shifts[-1]
+    last_cells = ((prev_plan.get("assignments") or {}).get("sat") or {}).get(last_shift) or []
+    blocked = {str(nm or "").strip() for cell in last_cells if isinstance(cell, list) for nm in cell}
+    for key, entry in (prev_plan.get("pulls") or {}).items():
+        parts = str(key).split("|")
+        if len(parts) < 2 or parts[0] != "sat" or parts[1] != last_shift or not isinstance(entry, dict):
+            continue
+        for side in (entry.get("before"), entry.get("after")):
+            if isinstance(side, dict):
+                blocked.add(str(side.get("name") or "").strip())
+    blocked.discard("")
+    if not blocked:
+        return workers
+    first_shift = shifts[0]
+    out: List[Dict[str, Any]] = []
+    for w in workers:
+        avail = (w.get("availability") or {}).get("sun")
+        if str(w.get("name") or "").strip() in blocked and isinstance(avail, list) and first_shift in avail:
+            w = {**w, "availability": {**w["availability"], "sun": [sh for sh in avail if sh != first_shift]}}
+        out.append(w)
+    return out
+
+
+def solve_schedule_weeks(
+    config: Dict[str, Any],
+    weeks: List[Dict[str, Any]],
+    *,
+    time_limit_seconds: int = 30,
+    max_nights_per_worker: int = 3,
+    num_alternatives: int = 0,
+    stats_key: str | None = None,
+    solver_profile: str | None = None,
+    initial_hint: Dict[str, Dict[str, List[List[str]]]] | None = None,
+    initial_prev: Dict[str, Any] | None = None,
+) -> Generator[Dict[str, Any], Dict[str, Any] | None, None]:
+    """Génère plusieurs semaines à la suite ; un résultat solve_schedule par semaine, dans l'ordre.
+
+    weeks: [{"week_iso": str, "workers": [...], "fixed_assignments": {...} | None}]
+    Les semaines partagent le template de modèle (seules les disponibilités changent), chaque
+    semaine est amorcée (AddHint) avec le plan de la précédente, et la frontière samedi-nuit →
+    dimanche-matin entre deux semaines est respectée. initial_hint amorce la première semaine,
+    initial_prev ({"assignments", "pulls"?}, plan déjà sauvegardé de la semaine d'avant) pose
+    sa frontière.
+
+    Le plan réellement émis peut différer du résultat brut (alternative choisie, משיכות) :
+    l'appelant le renvoie via send({"assignments", "pulls"}) et la semaine suivante s'enchaîne
+    dessus ; sans send, le résultat brut sert de référence.
+    """
+    logger = logging.getLogger("ai_solver")
+    spec = site_scheduling_spec(config)
+    days, shifts = list(spec.days), list(spec.shifts)
+    prev: Dict[str, Any] | None = initial_prev
+    hint = initial_hint
+    for week in weeks:
+        started = time.perf_counter()
+        workers = _block_week_boundary(list(week.get("workers") or []), prev, days, shifts)
+        result = solve_schedule(
+            config,
+            workers,
+            time_limit_seconds=time_limit_seconds,
+            max_nights_per_worker=max_nights_per_worker,
+            num_alternatives=num_alternatives,
+            fixed_assignments=week.get("fixed_assignments") or None,
+            stats_key=stats_key,
+            solver_profile=solver_profile,
+            hint_assignments=hint or None,
+        )
+        logger.info(
+            "[WEEKS] week=%s status=%s elapsed=%.2fs hinted=%s",
+            week.get("week_iso"),
+            result.get("status"),
+            time.perf_counter() - started,
+            bool(hint),
+        )
+        chosen = yield {"week_iso": week.get("week_iso"), **result}
+        if result.get("status") not in ("OPTIMAL", "FEASIBLE"):
+            prev = None
+        else:
+            prev = chosen if isinstance(chosen, dict) and isinstance(chosen.get("assignments"), dict) else result
+        hint = (prev or {}).get("assignments")
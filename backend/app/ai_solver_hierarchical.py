@@ -0,0 +1,813 @@
+"""Résolution hiérarchique d'un très grand groupe de sites liés.
+
+Le modèle combiné met toutes les עמדות de tous les sites dans un seul CP-SAT : au-delà de
+quelques dizaines d'עמדות, construction et résolution explosent. Au-dessus du seuil
+PLANNING_LINKED_HIERARCHICAL_MIN_STATIONS (défaut 40, 0 = jamais), chaque site est résolu
+comme son propre sous-problème, en parallèle (PLANNING_LINKED_HIERARCHICAL_WORKERS, défaut 4).
+
+Coordination des workers partagés (présents sur ≥2 sites) par une affectation maître :
+- chaque jour disponible d'un worker partagé appartient à un seul site (prix = besoin du site
+  ce jour-là / offre locale déjà placée), au plus 6 jours sur une semaine de 7 ; les cases
+  fixées imposent le site du jour. Toutes les règles intra-jour restent donc locales ;
+- la dernière garde d'un jour est retirée au site propriétaire quand le lendemain appartient à
+  un autre site (règle garde de fin de journée → première garde du lendemain) ;
+- max_shifts et le plafond de nuits sont répartis en quotas par site (au prorata des jours,
+  bornés par le max_shifts du site) : leur somme ne dépasse jamais le plafond global.
+
+Mise à jour des prix (PLANNING_LINKED_HIERARCHICAL_ROUNDS tours, défaut 3) : un jour possédé
+mais inutilisé par un site, ou un jour libre, passe avec une unité de quota inutilisée vers
+un site qui a encore des trous ce jour-là. Le plan du site donneur reste valide (il n'utilisait
+ni ce jour ni ce quota) et n'est pas re-résolu ; les sites receveurs le sont, avec leur plan
+précédent en hint, et le nouveau plan n'est gardé que s'il couvre au moins autant. Un site
+encore sans solution est re-résolu à chaque tour.
+
+Budget : comme pour solve_schedule, time_limit_seconds est du temps de résolution CP-SAT ;
+construction des modèles, post-traitement et relances d'alternatives (plafonnées ici à un quart
+de la limite de chaque sous-solve, une limite entière dans solve_schedule) viennent en plus,
+sans dépasser au total deux fois la limite, le pire cas de solve_schedule.
+Le premier tour en reçoit l'essentiel (70 %) ; les sous-problèmes tournent par lots de la
+largeur du pool (bornée par les CPU disponibles), chaque lot avec sa part. Si un site reste sans
+solution, le modèle combiné est résolu avec le temps restant (plans des sites résolus en hint) ;
+en cas d'échec, le statut non faisable est rendu, grille vide, comme solve_schedule.
+
+stop_event est consulté entre deux lots de sous-problèmes et entre deux tours (un sous-solve
+CP-SAT en cours n'est pas interrompu) ; le flux émet un événement de progression après chaque lot.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple
+import logging
+import math
+import os
+import queue
+import threading
+import time
+
+from .ai_solver import solve_schedule
+from .ai_solver_model import _norm_name_local
+from .scheduling_spec import site_scheduling_spec
+from .shift_catalog import shift_catalog_for_config
+
+
+logger = logging.getLogger("ai_solver")
+
+Grid = Dict[str, Dict[str, List[List[str]]]]
+
+
+def _env_int(name: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except Exception:
+        value = default
+    return max(low, min(value, high))
+
+
+def _hierarchical_min_stations() -> int:
+    return _env_int("PLANNING_LINKED_HIERARCHICAL_MIN_STATIONS", 40, 0, 100000)
+
+
+def _hierarchical_rounds() -> int:
+    return _env_int("PLANNING_LINKED_HIERARCHICAL_ROUNDS", 3, 0, 20)
+
+
+def _available_cpus() -> int:
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except Exception:
+        return max(1, os.cpu_count() or 1)
+
+
+def _hierarchical_workers(site_count: int) -> int:
+    """Sous-problèmes résolus en même temps : au-delà des CPU, ils se partagent le temps machine
+    et chacun atteint sa limite sans solution."""
+    configured = _env_int("PLANNING_LINKED_HIERARCHICAL_WORKERS", 4, 1, 32)
+    return min(max(1, site_count), configured, _available_cpus())
+
+
+_FIRST_ROUND_SHARE = 0.7
+# Relances d'alternatives d'un sous-solve, en part de sa limite (solve_schedule : une limite entière).
+_ALTERNATIVES_SHARE = 0.25
+_OK_STATUSES = ("OPTIMAL", "FEASIBLE")
+
+
+def use_hierarchical_solve(config: Dict[str, Any], exclude_days: List[str] | None = None) -> bool:
+    """Vrai si le modèle combiné dépasse le seuil et couvre au moins deux sites."""
+    threshold = _hierarchical_min_stations()
+    if threshold <= 0:
+        return False
+    stations = site_scheduling_spec(config, exclude_days).stations
+    return len(stations) >= threshold and len({st.get("site_id") for st in stations}) >= 2
+
+
+@dataclass
+class _SharedWorker:
+    index: int
+    name: str
+    sites: List[int]
+    max_shifts: int
+    site_max: Dict[int, int]
+    availability: Dict[str, List[str]]
+    owner: Dict[str, int] = field(default_factory=dict)
+    pinned: Dict[str, int] = field(default_factory=dict)
+    quota: Dict[int, int] = field(default_factory=dict)
+    night_quota: Dict[int, int] = field(default_factory=dict)
+
+
+@dataclass
+class _SiteProblem:
+    site_id: int
+    station_indices: List[int]
+    config: Dict[str, Any]
+    fixed: Grid | None
+    worker_indices: List[int]
+    result: Dict[str, Any] | None = None
+    coverage: int = 0
+
+
+def _count_grid(grid: Grid | None) -> int:
+    return sum(len(cell or []) for shifts_map in (grid or {}).values() for per_station in shifts_map.values() for cell in per_station)
+
+
+def _used_days(grid: Grid | None, name: str) -> Dict[str, List[str]]:
+    """{day: [shift, ...]} où name est affecté dans grid."""
+    used: Dict[str, List[str]] = {}
+    for day_key, shifts_map in (grid or {}).items():
+        for sh_name, per_station in shifts_map.items():
+            if any(name in (cell or []) for cell in per_station):
+                used.setdefault(day_key, []).append(sh_name)
+    return used
+
+
+def _split_proportional(total: int, weights: Dict[int, int], floors: Dict[int, int], caps: Dict[int, int]) -> Dict[int, int]:
+    """Répartit total au prorata de weights (reste le plus grand d'abord), entre floors et caps."""
+    out = {k: min(caps[k], max(floors.get(k, 0), 0)) for k in weights}
+    budget = max(0, total - sum(out.values()))
+    weight_sum = sum(weights.values())
+    if weight_sum <= 0 or budget <= 0:
+        return out
+    shares = {k: budget * weights[k] / weight_sum for k in weights}
+    for k in weights:
+        add = min(int(shares[k]), caps[k] - out[k])
+        out[k] += max(0, add)
+    left = max(0, total - sum(out.values()))
+    for k in sorted(weights, key=lambda k: (-(shares[k] - int(shares[k])), -weights[k], k)):
+        if left <= 0:
+            break
+        if out[k] < caps[k]:
+            out[k] += 1
+            left -= 1
+    return out
+
+
+class _HierarchicalSolve:
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        workers: List[Dict[str, Any]],
+        *,
+        max_nights_per_worker: int,
+        fixed_assignments: Grid | None,
+        exclude_days: List[str] | None,
+        solver_profile: str | None,
+        stats_key: str | None,
+        stop_event: threading.Event | None = None,
+        on_progress: Callable[[Dict[str, Any]], None] | None = None,
+    ) -> None:
+        spec = site_scheduling_spec(config, exclude_days)
+        self.spec = spec
+        self.days, self.shifts = list(spec.days), list(spec.shifts)
+        self.stations = list(spec.stations)
+        self.workers = workers
+        self.max_nights = int(max_nights_per_worker)
+        self.exclude_days = exclude_days
+        self.solver_profile = solver_profile
+        self.stats_key = stats_key
+        self.night_shifts = {self.shifts[i] for i in shift_catalog_for_config(config).indices_of_kind(self.shifts, "night")}
+        self.per_day_cap = max(1, (len(self.shifts) + 1) // 2)
+        self.max_owned_days = 6 if len(self.days) >= 7 else len(self.days)
+        # Temps mur hors résolution (constructions, post-traitement, alternatives) : ne consomme
+        # pas le budget de résolution, comme dans solve_schedule.
+        self.untimed_seconds = 0.0
+        self.stop_event = stop_event
+        self.on_progress = on_progress
+        self.round = 0
+
+        station_sites = [int(st.get("site_id") or 0) for st in self.stations]
+        raw_stations = [st for st in (config.get("stations") or []) if isinstance(st, dict)]
+        site_ids = sorted(set(station_sites))
+        name_to_index = {_norm_name_local(w.get("name")): i for i, w in enumerate(workers)}
+
+        worker_sites: List[Set[int]] = [set() for _ in workers]
+        for t, st in enumerate(self.stations):
+            allowed = st.get("allowed_workers") or []
+            if not allowed:
+                for sites in worker_sites:
+                    sites.add(station_sites[t])
+                continue
+            for nm in allowed:
+                idx = name_to_index.get(_norm_name_local(nm))
+                if idx is not None:
+                    worker_sites[idx].add(station_sites[t])
+
+        self.shared: Dict[int, _SharedWorker] = {}
+        for idx, w in enumerate(workers):
+            if len(worker_sites[idx]) < 2:
+                continue
+            site_max: Dict[int, int] = {}
+            for limit in (w.get("site_limits") or []):
+                limit_sites = {station_sites[t] for t in (limit.get("station_indices") or []) if 0 <= t < len(station_sites)}
+                for sid in limit_sites:
+                    site_max[sid] = int(limit.get("max") or 5)
+            max_shifts = int(w.get("max_shifts") or 5)
+            self.shared[idx] = _SharedWorker(
+                index=idx,
+                name=str(w.get("name") or ""),
+                sites=sorted(worker_sites[idx]),
+                max_shifts=max_shifts,
+                site_max={sid: site_max.get(sid, max_shifts) for sid in worker_sites[idx]},
+                availability={k: list(v) for k, v in (w.get("availability") or {}).items() if isinstance(v, list)},
+            )
+
+        self.problems: Dict[int, _SiteProblem] = {}
+        for sid in site_ids:
+            indices = [t for t, s in enumerate(station_sites) if s == sid]
+            self.problems[sid] = _SiteProblem(
+                site_id=sid,
+                station_indices=indices,
+                config={"stations": [raw_stations[t] for t in indices]} if len(raw_stations) == len(self.stations) else {"stations": []},
+                fixed=None,
+                worker_indices=[i for i in range(len(workers)) if sid in worker_sites[i]],
+            )
+        self._split_fixed(fixed_assignments, name_to_index)
+
+    # -- cases fixées ---------------------------------------------------------------------------
+
+    def _split_fixed(self, fixed_assignments: Grid | None, name_to_index: Dict[str, int]) -> None:
+        if not fixed_assignments:
+            return
+        for sid, problem in self.problems.items():
+            site_fixed: Grid = {}
+            for day_key, shifts_map in fixed_assignments.items():
+                if not isinstance(shifts_map, dict):
+                    continue
+                for sh_name, per_station in shifts_map.items():
+                    if not isinstance(per_station, list):
+                        continue
+                    cells: List[List[str]] = []
+                    for t in problem.station_indices:
+                        names = []
+                        for nm in (per_station[t] if t < len(per_station) and isinstance(per_station[t], list) else []):
+                            shared = self.shared.get(name_to_index.get(_norm_name_local(nm), -1))
+                            if shared is not None:
+                                owner = shared.pinned.setdefault(day_key, sid)
+                                if owner != sid:
+                                    logger.warning(
+                                        "[HIERARCHICAL] dropped conflicting fixed cell worker=%s day=%s site=%s pinned_site=%s",
+                                        shared.name, day_key, sid, owner,
+                                    )
+                                    continue
+                            names.append(nm)
+                        cells.append(names)
+                    if any(cells):
+                        site_fixed.setdefault(day_key, {})[sh_name] = cells
+            problem.fixed = site_fixed or None
+
+    def _pinned_counts(self, shared: _SharedWorker) -> Tuple[Dict[int, int], Dict[int, int]]:
+        shifts_by_site: Dict[int, int] = {}
+        nights_by_site: Dict[int, int] = {}
+        for sid in shared.sites:
+            used = _used_days(self.problems[sid].fixed, shared.name)
+            shifts_by_site[sid] = sum(len(v) for v in used.values())
+            nights_by_site[sid] = sum(1 for v in used.values() for sh in v if sh in self.night_shifts)
+        return shifts_by_site, nights_by_site
+
+    # -- affectation maître ----------------------------------------------------------------------
+
+    def assign_days(self) -> None:
+        """Affectation maître initiale : chaque jour d'un worker partagé va au site au prix le plus haut."""
+        demand: Dict[Tuple[int, str], int] = {}
+        for sid, problem in self.problems.items():
+            for d, day_key in enumerate(self.days):
+                demand[(sid, day_key)] = sum(
+                    self.spec.required(t, d, s) for t in problem.station_indices for s in range(len(self.shifts))
+                )
+        supply: Dict[Tuple[int, str], int] = {}
+        for sid, problem in self.problems.items():
+            for idx in problem.worker_indices:
+                if idx in self.shared:
+                    continue
+                avail = self.workers[idx].get("availability") or {}
+                for day_key in self.days:
+                    if avail.get(day_key):
+                        supply[(sid, day_key)] = supply.get((sid, day_key), 0) + 1
+
+        price_of: Dict[Tuple[int, str], float] = {}
+        ordered = sorted(self.shared.values(), key=lambda sw: (len(sw.sites), sw.name))
+        for day_key in self.days:
+            for shared in ordered:
+                if day_key in shared.pinned:
+                    sid = shared.pinned[day_key]
+                elif shared.availability.get(day_key):
+                    sid = max(shared.sites, key=lambda s: (demand[(s, day_key)] / (1 + supply.get((s, day_key), 0)), -s))
+                    if demand[(sid, day_key)] <= 0:
+                        continue
+                else:
+                    continue
+                price_of[(shared.index, day_key)] = demand[(sid, day_key)] / (1 + supply.get((sid, day_key), 0))
+                shared.owner[day_key] = sid
+                supply[(sid, day_key)] = supply.get((sid, day_key), 0) + 1
+
+        for shared in self.shared.values():
+            free_days = sorted(
+                (day_key for day_key in shared.owner if day_key not in shared.pinned),
+                key=lambda day_key: price_of.get((shared.index, day_key), 0.0),
+            )
+            while len(shared.owner) > self.max_owned_days and free_days:
+                shared.owner.pop(free_days.pop(0))
+            self._allocate_quotas(shared)
+
+    def _allocate_quotas(self, shared: _SharedWorker) -> None:
+        owned = {sid: sum(1 for owner in shared.owner.values() if owner == sid) for sid in shared.sites}
+        pinned_shifts, pinned_nights = self._pinned_counts(shared)
+        shared.quota = _split_proportional(
+            shared.max_shifts,
+            owned,
+            pinned_shifts,
+            {sid: max(pinned_shifts[sid], min(shared.site_max[sid], owned[sid] * self.per_day_cap)) for sid in shared.sites},
+        )
+        shared.night_quota = _split_proportional(
+            self.max_nights,
+            owned,
+            pinned_nights,
+            {sid: max(pinned_nights[sid], owned[sid]) for sid in shared.sites},
+        )
+
+    def _blocked_last_shift(self, shared: _SharedWorker, day_pos: int) -> bool:
+        """Dernière garde du jour retirée : le lendemain appartient à un autre site."""
+        if day_pos + 1 >= len(self.days):
+            return False
+        owner = shared.owner.get(self.days[day_pos])
+        next_owner = shared.owner.get(self.days[day_pos + 1])
+        return owner is not None and next_owner is not None and next_owner != owner
+
+    # -- sous-problèmes --------------------------------------------------------------------------
+
+    def _site_workers(self, problem: _SiteProblem) -> List[Dict[str, Any]]:
+        local_index = {t: i for i, t in enumerate(problem.station_indices)}
+        last_shift = self.shifts[-1] if self.shifts else None
+        out: List[Dict[str, Any]] = []
+        for idx in problem.worker_indices:
+            w = dict(self.workers[idx])
+            limits = []
+            for limit in (w.get("site_limits") or []):
+                local = [local_index[t] for t in (limit.get("station_indices") or []) if t in local_index]
+                if local:
+                    limits.append({"station_indices": local, "max": int(limit.get("max") or 5)})
+            w["site_limits"] = limits
+            shared = self.shared.get(idx)
+            if shared is not None:
+                sid = problem.site_id
+                # max_shifts=0 vaut 5 pour le modèle : un quota nul retire le worker du sous-problème.
+                if shared.quota.get(sid, 0) <= 0:
+                    continue
+                availability: Dict[str, List[str]] = {}
+                for d, day_key in enumerate(self.days):
+                    if shared.owner.get(day_key) != sid:
+                        availability[day_key] = []
+                        continue
+                    shifts_today = list(shared.availability.get(day_key) or [])
+                    if self._blocked_last_shift(shared, d):
+                        shifts_today = [sh for sh in shifts_today if sh != last_shift]
+                    availability[day_key] = shifts_today
+                w["availability"] = availability
+                w["max_shifts"] = shared.quota.get(sid, 0)
+                w["max_nights"] = shared.night_quota.get(sid, 0)
+                w["site_limits"] = [{**limit, "max": min(limit["max"], w["max_shifts"])} for limit in limits]
+            out.append(w)
+        return out
+
+    def _solve_site(self, problem: _SiteProblem, time_limit: float, num_alternatives: int) -> Dict[str, Any]:
+        hint = (problem.result or {}).get("assignments") if problem.result else None
+        return solve_schedule(
+            problem.config,
+            self._site_workers(problem),
+            time_limit_seconds=time_limit,
+            alternatives_time_limit_seconds=time_limit * _ALTERNATIVES_SHARE,
+            max_nights_per_worker=self.max_nights,
+            num_alternatives=num_alternatives,
+            fixed_assignments=problem.fixed,
+            exclude_days=self.exclude_days,
+            stats_key=f"{self.stats_key}:site:{problem.site_id}" if self.stats_key else None,
+            solver_profile=self.solver_profile,
+            hint_assignments=hint,
+        )
+
+    def solve_sites(self, site_ids: List[int], budget_seconds: float, num_alternatives: int) -> None:
+        """Résout site_ids dans budget_seconds (temps mur), par lots de la largeur du pool."""
+        problems = [self.problems[sid] for sid in site_ids if self.problems[sid].station_indices]
+        if not problems:
+            return
+        workers = _hierarchical_workers(len(problems))
+        time_limit = max(1.0, budget_seconds / math.ceil(len(problems) / workers))
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hier-site") as pool:
+            for start in range(0, len(problems), workers):
+                if self.stopped:
+                    break
+                batch = problems[start:start + workers]
+                results = list(pool.map(lambda pr: self._solve_site(pr, time_limit, num_alternatives), batch))
+                for problem, result in zip(batch, results):
+                    solved = result.get("status") in _OK_STATUSES
+                    coverage = _count_grid(result.get("assignments")) if solved else -1
+                    if problem.result is None or not self.is_solved(problem) or (solved and coverage >= problem.coverage):
+                        problem.result, problem.coverage = result, max(0, coverage)
+                self._report_progress([problem.site_id for problem in batch])
+        self.untimed_seconds += max(0.0, time.monotonic() - started - budget_seconds)
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _report_progress(self, site_ids: List[int]) -> None:
+        if self.on_progress is None:
+            return
+        total = sum(1 for pr in self.problems.values() if pr.station_indices)
+        self.on_progress({
+            "round": self.round,
+            "batch_sites": site_ids,
+            "solved_sites": total - len(self.unsolved_sites()),
+            "total_sites": total,
+        })
+
+    @staticmethod
+    def is_solved(problem: _SiteProblem) -> bool:
+        return problem.result is not None and problem.result.get("status") in _OK_STATUSES
+
+    def unsolved_sites(self) -> List[int]:
+        return sorted(sid for sid, pr in self.problems.items() if pr.station_indices and not self.is_solved(pr))
+
+    # -- mise à jour des prix --------------------------------------------------------------------
+
+    def _holes(self) -> Dict[Tuple[int, str], int]:
+        holes: Dict[Tuple[int, str], int] = {}
+        for sid, problem in self.problems.items():
+            grid = (problem.result or {}).get("assignments") or {}
+            for d, day_key in enumerate(self.days):
+                required = sum(self.spec.required(t, d, s) for t in problem.station_indices for s in range(len(self.shifts)))
+                assigned = sum(len(cell or []) for per_station in (grid.get(day_key) or {}).values() for cell in per_station)
+                holes[(sid, day_key)] = max(0, required - assigned)
+        return holes
+
+    def rebalance(self) -> Set[int]:
+        """Transfère jours + quota inutilisés vers les sites qui ont des trous ; rend les sites receveurs."""
+        holes = self._holes()
+        receivers: Set[int] = set()
+        last_shift = self.shifts[-1] if self.shifts else None
+        for shared in sorted(self.shared.values(), key=lambda sw: sw.name):
+            used_by_site = {
+                sid: _used_days((self.problems[sid].result or {}).get("assignments"), shared.name)
+                for sid in shared.sites
+            }
+            for d, day_key in enumerate(self.days):
+                if day_key in shared.pinned or not shared.availability.get(day_key):
+                    continue
+                donor = shared.owner.get(day_key)
+                if donor is None and len(shared.owner) >= self.max_owned_days:
+                    continue
+                if donor is not None and used_by_site[donor].get(day_key):
+                    continue
+                candidates = [
+                    sid for sid in shared.sites
+                    if sid != donor and holes.get((sid, day_key), 0) > 0 and shared.quota.get(sid, 0) < shared.site_max[sid]
+                ]
+                if not candidates:
+                    continue
+                quota_source = self._quota_source(shared, used_by_site, donor)
+                if quota_source is None:
+                    continue
+                # Le site de la veille perd sa dernière garde si le jour change de site.
+                prev_owner = shared.owner.get(self.days[d - 1]) if d > 0 else None
+                receiver = max(candidates, key=lambda sid: (holes[(sid, day_key)], -sid))
+                if prev_owner is not None and prev_owner != receiver and last_shift in (used_by_site[prev_owner].get(self.days[d - 1]) or []):
+                    continue
+                shared.owner[day_key] = receiver
+                if quota_source >= 0:
+                    shared.quota[quota_source] -= 1
+                shared.quota[receiver] = shared.quota.get(receiver, 0) + 1
+                night_source = self._night_source(shared, used_by_site, exclude=receiver)
+                if night_source is not None and shared.night_quota.get(receiver, 0) == 0:
+                    shared.night_quota[night_source] -= 1
+                    shared.night_quota[receiver] = 1
+                holes[(receiver, day_key)] -= 1
+                receivers.add(receiver)
+        return receivers
+
+    def _quota_source(self, shared: _SharedWorker, used_by_site: Dict[int, Dict[str, List[str]]], donor: int | None) -> int | None:
+        """Site dont une unité de quota est inutilisée (donneur d'abord) ; -1 = marge globale ; None = aucune."""
+        def unused(sid: int) -> int:
+            return shared.quota.get(sid, 0) - sum(len(v) for v in used_by_site[sid].values())
+
+        if donor is not None and unused(donor) > 0:
+            return donor
+        if sum(shared.quota.values()) < shared.max_shifts:
+            return -1
+        spare = [sid for sid in shared.sites if unused(sid) > 0]
+        return max(spare, key=lambda sid: (unused(sid), -sid)) if spare else None
+
+    def _night_source(self, shared: _SharedWorker, used_by_site: Dict[int, Dict[str, List[str]]], exclude: int) -> int | None:
+        for sid in shared.sites:
+            if sid == exclude:
+                continue
+            used_nights = sum(1 for v in used_by_site[sid].values() for sh in v if sh in self.night_shifts)
+            if shared.night_quota.get(sid, 0) > used_nights:
+                return sid
+        return None
+
+    # -- assemblage ------------------------------------------------------------------------------
+
+    def _respects_shared_inputs(self, sid: int, grid: Grid) -> bool:
+        """Une alternative d'un site résolu à un tour précédent reste-t-elle valide après les transferts ?"""
+        last_shift = self.shifts[-1] if self.shifts else None
+        for shared in self.shared.values():
+            if sid not in shared.sites:
+                continue
+            used = _used_days(grid, shared.name)
+            if sum(len(v) for v in used.values()) > shared.quota.get(sid, 0):
+                return False
+            if sum(1 for v in used.values() for sh in v if sh in self.night_shifts) > shared.night_quota.get(sid, 0):
+                return False
+            for d, day_key in enumerate(self.days):
+                if not used.get(day_key):
+                    continue
+                if shared.owner.get(day_key) != sid:
+                    return False
+                if self._blocked_last_shift(shared, d) and last_shift in used[day_key]:
+                    return False
+        return True
+
+    def _merge(self, grids_by_site: Dict[int, Grid]) -> Grid:
+        combined: Grid = {day: {sh: [[] for _ in self.stations] for sh in self.shifts} for day in self.days}
+        for sid, grid in grids_by_site.items():
+            indices = self.problems[sid].station_indices
+            for day_key, shifts_map in (grid or {}).items():
+                if day_key not in combined:
+                    continue
+                for sh_name, per_station in (shifts_map or {}).items():
+                    if sh_name not in combined[day_key]:
+                        continue
+                    for local_idx, cell in enumerate(per_station or []):
+                        if local_idx < len(indices):
+                            combined[day_key][sh_name][indices[local_idx]] = list(cell or [])
+        return combined
+
+    def merged_plan(self) -> Grid:
+        """Plans des sites résolus, fusionnés dans la grille combinée (hint du repli monolithique)."""
+        return self._merge({
+            sid: pr.result.get("assignments") or {} for sid, pr in self.problems.items() if self.is_solved(pr)
+        })
+
+    def result(self, num_alternatives: int, rounds: int, transfers: int, started: float) -> Dict[str, Any]:
+        """Résultat fusionné ; appelé seulement quand chaque site a une solution."""
+        ok = {sid: pr for sid, pr in self.problems.items() if self.is_solved(pr)}
+        base = self._merge({sid: pr.result.get("assignments") or {} for sid, pr in ok.items()})
+        alternatives_by_site = {
+            sid: [alt for alt in (pr.result.get("alternatives") or []) if self._respects_shared_inputs(sid, alt)]
+            for sid, pr in ok.items()
+        }
+        alt_count = min(int(num_alternatives or 0), max((len(v) for v in alternatives_by_site.values()), default=0))
+        alternatives = [
+            self._merge({
+                sid: (alts[k] if k < len(alts) else ok[sid].result.get("assignments") or {})
+                for sid, alts in alternatives_by_site.items()
+            })
+            for k in range(alt_count)
+        ]
+        logger.info(
+            "[HIERARCHICAL] sites=%d shared_workers=%d rounds=%d transfers=%d assigned=%d required=%d elapsed=%.2fs",
+            len(self.problems), len(self.shared), rounds, transfers, _count_grid(base), self.spec.required_total,
+            time.perf_counter() - started,
+        )
+        return {
+            "days": self.days,
+            "shifts": self.shifts,
+            "stations": [st.get("name") for st in self.stations],
+            "assignments": base,
+            "alternatives": alternatives,
+            "pull_cells": [],
+            "status": "FEASIBLE",
+            "objective": sum(float(pr.result.get("objective") or 0) for pr in ok.values()),
+            "hierarchical": {"sites": len(self.problems), "shared_workers": len(self.shared), "rounds": rounds, "transfers": transfers},
+        }
+
+
+def solve_schedule_hierarchical(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    time_limit_seconds: int = 30,
+    max_nights_per_worker: int = 3,
+    num_alternatives: int = 20,
+    fixed_assignments: Grid | None = None,
+    exclude_days: List[str] | None = None,
+    stats_key: str | None = None,
+    solver_profile: str | None = None,
+    stop_event: threading.Event | None = None,
+    on_progress: Callable[[Dict[str, Any]], None] | None = None,
+) -> Dict[str, Any]:
+    """Même contrat que solve_schedule sur une config combinée multi-sites (stations avec siteId).
+
+    stop_event : arrêt entre deux lots / tours (pas de repli monolithique une fois posé).
+    on_progress : appelé après chaque lot avec {round, batch_sites, solved_sites, total_sites}.
+    """
+    started = time.perf_counter()
+    budget_end = time.monotonic() + max(1, int(time_limit_seconds))
+    # Plafond mur : celui de solve_schedule (résolution + relances d'alternatives, une limite chacune).
+    wall_end = budget_end + max(1, int(time_limit_seconds))
+    solve = _HierarchicalSolve(
+        config or {},
+        workers,
+        max_nights_per_worker=max_nights_per_worker,
+        fixed_assignments=fixed_assignments,
+        exclude_days=exclude_days,
+        solver_profile=solver_profile,
+        stats_key=stats_key,
+        stop_event=stop_event,
+        on_progress=on_progress,
+    )
+    solve.assign_days()
+
+    def remaining_budget() -> float:
+        return min(budget_end + solve.untimed_seconds, wall_end) - time.monotonic()
+
+    max_rounds = _hierarchical_rounds()
+    # Premier tour : l'essentiel du budget ; les tours suivants ne touchent que les receveurs et
+    # les sites sans solution, et laissent une réserve au repli monolithique.
+    solve.solve_sites(sorted(solve.problems), remaining_budget() * _FIRST_ROUND_SHARE, num_alternatives)
+    rounds, transfers = 0, 0
+    while rounds < max_rounds:
+        remaining = remaining_budget()
+        if remaining < 1 or solve.stopped:
+            break
+        before = {sid: dict(sw.owner) for sid, sw in solve.shared.items()}
+        receivers = solve.rebalance()
+        unsolved = solve.unsolved_sites()
+        # Un site sans solution passe seul, avec la moitié du reste (l'autre moitié pour le repli) ;
+        # les receveurs déjà résolus gardent un plan valide (ils n'ont gagné que jours et quota).
+        targets = set(unsolved) or set(receivers)
+        if not targets:
+            break
+        transfers += sum(
+            1 for idx, sw in solve.shared.items() for day_key, sid in sw.owner.items() if before[idx].get(day_key) != sid
+        )
+        rounds += 1
+        solve.round = rounds
+        share = remaining / 2 if unsolved else remaining / (2 * max(1, max_rounds - rounds + 1))
+        solve.solve_sites(sorted(targets), share, num_alternatives)
+
+    unsolved = solve.unsolved_sites()
+    if not unsolved:
+        return solve.result(num_alternatives, rounds, transfers, started)
+    return _monolithic_fallback(
+        solve,
+        unsolved,
+        config or {},
+        workers,
+        remaining=0.0 if solve.stopped else remaining_budget(),
+        rounds=rounds,
+        transfers=transfers,
+        max_nights_per_worker=max_nights_per_worker,
+        num_alternatives=num_alternatives,
+        fixed_assignments=fixed_assignments,
+        exclude_days=exclude_days,
+        stats_key=stats_key,
+        solver_profile=solver_profile,
+    )
+
+
+def _monolithic_fallback(
+    solve: _HierarchicalSolve,
+    unsolved: List[int],
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    *,
+    remaining: float,
+    rounds: int,
+    transfers: int,
+    **solve_kwargs: Any,
+) -> Dict[str, Any]:
+    """Site(s) sans solution : modèle combiné sur le temps restant, plans des sites résolus en hint.
+
+    Sans solution non plus, le statut du premier site en échec est rendu avec une grille vide :
+    jamais de "FEASIBLE" sur un plan où des sites entiers manquent.
+    """
+    info = {
+        "sites": len(solve.problems),
+        "shared_workers": len(solve.shared),
+        "rounds": rounds,
+        "transfers": transfers,
+        "unsolved_sites": unsolved,
+    }
+    statuses = [str(solve.problems[sid].result.get("status")) for sid in unsolved if solve.problems[sid].result]
+    logger.warning(
+        "[HIERARCHICAL] unsolved sites=%s statuses=%s fallback=monolithic remaining=%.1fs",
+        unsolved, statuses, remaining,
+    )
+    if remaining >= 1:
+        result = solve_schedule(
+            config,
+            workers,
+            time_limit_seconds=remaining,
+            alternatives_time_limit_seconds=remaining * _ALTERNATIVES_SHARE,
+            hint_assignments=solve.merged_plan(),
+            **solve_kwargs,
+        )
+        if result.get("status") in _OK_STATUSES:
+            return {**result, "hierarchical": {**info, "fallback": "monolithic"}}
+        statuses.insert(0, str(result.get("status")))
+    return {
+        "days": solve.days,
+        "shifts": solve.shifts,
+        "stations": [st.get("name") for st in solve.stations],
+        "assignments": {day: {sh: [[] for _ in solve.stations] for sh in solve.shifts} for day in solve.days},
+        "alternatives": [],
+        "pull_cells": [],
+        "status": statuses[0] if statuses else "UNKNOWN",
+        "objective": 0,
+        "hierarchical": {**info, "fallback": "failed"},
+    }
+
+
+def solve_schedule_hierarchical_stream(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    time_limit_seconds: int = 30,
+    max_nights_per_worker: int = 3,
+    num_alternatives: int = 20,
+    fixed_assignments: Grid | None = None,
+    exclude_days: List[str] | None = None,
+    stats_key: str | None = None,
+    solver_profile: str | None = None,
+    stop_event: threading.Event | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """Événements de solve_schedule_stream (base, alternatives, done) pour le résultat hiérarchique.
+
+    La résolution tourne sur un thread : pendant ce temps, un événement status INFO ("progress")
+    part après chaque lot de sites, et stop_event (ou la fermeture du flux) l'arrête au lot suivant.
+    """
+    cancel = threading.Event()
+    progress: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hier-stream")
+    try:
+        future = pool.submit(
+            solve_schedule_hierarchical,
+            config,
+            workers,
+            time_limit_seconds=time_limit_seconds,
+            max_nights_per_worker=max_nights_per_worker,
+            num_alternatives=num_alternatives,
+            fixed_assignments=fixed_assignments,
+            exclude_days=exclude_days,
+            stats_key=stats_key,
+            solver_profile=solver_profile,
+            stop_event=cancel,
+            on_progress=progress.put,
+        )
+        while not future.done() or not progress.empty():
+            if stop_event is not None and stop_event.is_set():
+                cancel.set()
+            try:
+                info = progress.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            yield {
+                "type": "status",
+                "status": "INFO",
+                "detail": f"Résolution par site : {info['solved_sites']}/{info['total_sites']} sites résolus (tour {info['round']}).",
+                "progress": info,
+            }
+        result = future.result()
+    finally:
+        # Flux fermé en cours de route : le thread s'arrête au lot suivant, sans bloquer l'appelant.
+        cancel.set()
+        pool.shutdown(wait=False)
+    if stop_event is not None and stop_event.is_set():
+        yield {"type": "done"}
+        return
+    if result["status"] not in ("OPTIMAL", "FEASIBLE"):
+        yield {"type": "status", "status": str(result["status"])}
+        yield {"type": "done"}
+        return
+    yield {
+        "type": "base",
+        "index": 0,
+        "source": "HIERARCHICAL",
+        "days": result["days"],
+        "shifts": result["shifts"],
+        "stations": result["stations"],
+        "assignments": result["assignments"],
+        "pull_cells": [],
+    }
+    for k, alt in enumerate(result["alternatives"], start=1):
+        yield {"type": "alternative", "index": k, "source": "HIERARCHICAL", "assignments": alt}
+    yield {"type": "done"}
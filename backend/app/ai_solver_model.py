@@ -1,32 +1,35 @@
 """Construction partagée du modèle CP-SAT de planning (sync + stream)."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Tuple
+import hashlib
+import json
 import logging
+import os
+import threading
 
 from ortools.sat.python import cp_model
 
 from .ai_solver_utils import (
     _shift_kind_pref_penalty,
     _shift_slot_pref_hits,
-    build_capacities_from_config,
 )
+from .scheduling_spec import site_scheduling_spec
+from .shift_catalog import shift_catalog_for_config, shift_kind_from_name
 
 
 def is_night_shift_name(name: str) -> bool:
-    s = (name or "").strip().lower()
-    return s == "22-06" or ("22" in s and "06" in s) or ("night" in s) or ("לילה" in (name or ""))
+    return shift_kind_from_name(name) == "night"
 
 
 def is_morning_shift_name(name: str) -> bool:
-    s = (name or "").strip().lower()
-    return ("בוקר" in (name or "")) or s.startswith("06") or ("06-14" in s)
+    return shift_kind_from_name(name) == "morning"
 
 
 def is_noon_shift_name(name: str) -> bool:
-    s = (name or "").strip().lower()
-    return ("צהר" in (name or "")) or s.startswith("14") or ("14-22" in s)
+    return shift_kind_from_name(name) == "noon"
 
 
 def _norm_role_local(name: Any) -> str:
@@ -59,43 +62,145 @@ class CpSatScheduleModel:
     morning_indices: List[int]
     noon_indices: List[int]
     night_indices: List[int]
+    # (d, s, t) -> משיכה optionnelle sur la case (voir PullsModelSpec)
+    pulls: Dict[Tuple[int, int, int], cp_model.IntVar] = field(default_factory=dict)
 
 
-def build_cp_sat_schedule_model(
-    config: Dict[str, Any],
-    workers: List[Dict[str, Any]],
-    *,
-    max_nights_per_worker: int = 3,
-    fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None = None,
-    exclude_days: List[str] | None = None,
-    var_prefix: str = "",
-    log_label: str = "SOLVER",
-) -> CpSatScheduleModel:
-    """Construit le modèle CP-SAT commun (contraintes hard + objectif soft).
+# Une משיכה comble une place comme une affectation, mais une vraie affectation reste préférée.
+PULL_COVERAGE_WEIGHT = 900000
 
-    Basé sur l'ancienne construction sync (inclut la contrainte ≤6 jours / fenêtre de 7).
-    `var_prefix` évite les collisions de noms de variables si besoin (ex. stream).
+
+@dataclass(frozen=True)
+class PullsModelSpec:
+    """משיכות modélisées dans CP-SAT (None côté appelant = pas de משיכות dans le modèle).
+
+    Une משיכה couvre une place manquante de la case (d, s, t) par le worker de la garde
+    précédente et celui de la garde suivante sur la même station (deux personnes distinctes,
+    avec le rôle requis s'il y en a un). limit : plafond global (None = illimité) ;
+    station_limits : ((indices de stations, plafond), ...) pour les plafonds par site en
+    multi-sites — une station hors de tout groupe n'a alors pas de משיכות.
     """
-    logger = logging.getLogger("ai_solver")
-    p = f"{var_prefix}_" if var_prefix else ""
 
-    days, shifts, stations = build_capacities_from_config(config or {}, exclude_days)
-    model = cp_model.CpModel()
+    limit: int | None = None
+    station_limits: Tuple[Tuple[Tuple[int, ...], int | None], ...] = ()
+
+    def station_limit(self, t: int) -> int | None:
+        """Plafond du groupe de la station t (None = illimité) ; 0 = aucune משיכה possible."""
+        if not self.station_limits:
+            return self.limit
+        for indices, group_limit in self.station_limits:
+            if t in indices:
+                return group_limit
+        return 0
+
+
+def _add_pull_variables(
+    model: cp_model.CpModel,
+    x: Dict[Tuple[int, int, int, int], cp_model.IntVar],
+    days: List[str],
+    shifts: List[str],
+    stations: List[Dict[str, Any]],
+    W: List[int],
+    worker_roles_norm: List[set[str]],
+    spec: PullsModelSpec,
+    p: str,
+    zero_x: set[Tuple[int, int, int, int]] | None = None,
+) -> Dict[Tuple[int, int, int], cp_model.IntVar]:
+    """Variables de משיכה par case + contraintes ; même voisinage que _apply_auto_pulls_to_payload.
+
+    zero_x : x déjà fixés à 0 (זמינות, station interdite, capacité nulle) — exclus des
+    sources avant/après, sinon le modèle grossit en O(W²) par case pour rien.
+    """
+    zero_x = zero_x or set()
+    n_days, n_shifts = len(days), len(shifts)
 
-    W = list(range(len(workers)))
-    D = list(range(len(days)))
-    S = list(range(len(shifts)))
-    T = list(range(len(stations)))
+    def _prev(d: int, s: int) -> Tuple[int, int] | None:
+        if s > 0:
+            return d, s - 1
+        return (d - 1, n_shifts - 1) if d > 0 else None
 
-    role_shortfalls_total: List[cp_model.IntVar] = []
+    def _next(d: int, s: int) -> Tuple[int, int] | None:
+        if s < n_shifts - 1:
+            return d, s + 1
+        return (d + 1, 0) if d < n_days - 1 else None
 
-    worker_roles_norm: List[set[str]] = [
-        {_norm_role_local(r) for r in (workers[w].get("roles") or [])}
-        for w in W
+    pulls: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+    for t, st in enumerate(stations):
+        if spec.station_limit(t) == 0:
+            continue
+        for d, day_key in enumerate(days):
+            for s, sh_name in enumerate(shifts):
+                required = int(((st.get("capacity") or {}).get(day_key) or {}).get(sh_name, 0) or 0)
+                prev_c, next_c = _prev(d, s), _next(d, s)
+                if required <= 0 or prev_c is None or next_c is None:
+                    continue
+                roles = {
+                    _norm_role_local(r)
+                    for r in (((st.get("capacity_roles") or {}).get(day_key) or {}).get(sh_name) or {})
+                }
+                sources = [w for w in W if not roles or (worker_roles_norm[w] & roles)]
+                if not sources:
+                    continue
+                before = {w: x[(w, *prev_c, t)] for w in sources if (w, *prev_c, t) not in zero_x}
+                after = {w: x[(w, *next_c, t)] for w in sources if (w, *next_c, t) not in zero_x}
+                if not before or not after or len(set(before) | set(after)) < 2:
+                    continue
+                var = model.NewBoolVar(f"{p}pull_d{d}_s{s}_t{t}")
+                model.Add(sum(x[(w, d, s, t)] for w in W) + var <= required)
+                model.Add(var <= sum(before.values()))
+                model.Add(var <= sum(after.values()))
+                both = sorted(before.keys() & after.keys())
+                if both:
+                    # Avant et après distincts : exclut le cas « même unique worker des deux
+                    # côtés ». Compteurs agrégés → O(W) termes par case au lieu de O(W²).
+                    n_before = model.NewIntVar(0, len(before), f"{p}pull_nb_d{d}_s{s}_t{t}")
+                    n_after = model.NewIntVar(0, len(after), f"{p}pull_na_d{d}_s{s}_t{t}")
+                    model.Add(n_before == sum(before.values()))
+                    model.Add(n_after == sum(after.values()))
+                    for w in both:
+                        model.Add(var + 2 * before[w] + 2 * after[w] - n_before - n_after <= 2)
+                pulls[(d, s, t)] = var
+
+    # Une garde ne prête qu'une fois : vers la case suivante (avant) ou la précédente (après).
+    for d in range(n_days):
+        for s in range(n_shifts):
+            prev_c, next_c = _prev(d, s), _next(d, s)
+            if prev_c is None or next_c is None:
+                continue
+            for t in range(len(stations)):
+                lenders = [pulls.get((*next_c, t)), pulls.get((*prev_c, t))]
+                lenders = [v for v in lenders if v is not None]
+                if len(lenders) > 1:
+                    model.Add(sum(lenders) <= sum(x[(w, d, s, t)] for w in W))
+
+    if spec.limit is not None and not spec.station_limits:
+        model.Add(sum(pulls.values()) <= max(0, int(spec.limit)))
+    for indices, group_limit in spec.station_limits:
+        group = [v for (d, s, t), v in pulls.items() if t in set(indices)]
+        if group_limit is not None and group:
+            model.Add(sum(group) <= max(0, int(group_limit)))
+    return pulls
+
+
+def pull_cells_from_solution(built: "CpSatScheduleModel", solver: cp_model.CpSolver) -> List[List[Any]]:
+    """Cases où le solveur a retenu une משיכה : [[day, shift, station_index], ...]."""
+    return [
+        [built.days[d], built.shifts[s], t]
+        for (d, s, t), var in sorted(built.pulls.items())
+        if solver.BooleanValue(var)
     ]
 
-    name_to_w: Dict[str, int] = {_norm_name_local(workers[i].get("name")): i for i in range(len(workers))}
 
+def _resolve_fixed_assignments(
+    days: List[str],
+    shifts: List[str],
+    stations: List[Dict[str, Any]],
+    name_to_w: Dict[str, int],
+    fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None,
+    log_label: str,
+) -> Dict[Tuple[int, int, int], set[int]]:
+    """(d, s, t) -> indices des workers fixés ; les fixations contradictoires sont ignorées."""
+    logger = logging.getLogger("ai_solver")
     pre_assign: Dict[Tuple[int, int, int], set[int]] = {}
     fixed_assignments = fixed_assignments or {}
     worker_fixed_slots: Dict[Tuple[int, int], int] = {}
@@ -136,8 +241,78 @@ def build_cp_sat_schedule_model(
             log_label,
             len(fixed_conflicts),
         )
+    return pre_assign
+
+
+def build_cp_sat_schedule_model(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    *,
+    max_nights_per_worker: int = 3,
+    fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None = None,
+    exclude_days: List[str] | None = None,
+    var_prefix: str = "",
+    log_label: str = "SOLVER",
+    pulls: PullsModelSpec | None = None,
+) -> CpSatScheduleModel:
+    """Construit le modèle CP-SAT commun (contraintes hard + objectif soft).
+
+    Basé sur l'ancienne construction sync (inclut la contrainte ≤6 jours / fenêtre de 7).
+    `var_prefix` évite les collisions de noms de variables si besoin (ex. stream).
+    """
+    return _build_cp_sat_schedule_model_impl(
+        config,
+        workers,
+        max_nights_per_worker=max_nights_per_worker,
+        fixed_assignments=fixed_assignments,
+        exclude_days=exclude_days,
+        var_prefix=var_prefix,
+        log_label=log_label,
+        pulls=pulls,
+    )
+
+
+def _build_cp_sat_schedule_model_impl(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    *,
+    max_nights_per_worker: int,
+    fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None,
+    exclude_days: List[str] | None,
+    var_prefix: str,
+    log_label: str,
+    template_mode: bool = False,
+    role_short_by_day: Dict[int, List[cp_model.IntVar]] | None = None,
+    blocked_x: set[Tuple[int, int, int, int]] | None = None,
+    pulls: PullsModelSpec | None = None,
+) -> CpSatScheduleModel:
+    """template_mode : disponibilité et interdictions par station ne sont pas posées en
+    contraintes mais collectées dans blocked_x / appliquées ensuite via les domaines des
+    variables (voir _instantiate_model_template)."""
+    logger = logging.getLogger("ai_solver")
+    p = f"{var_prefix}_" if var_prefix else ""
+
+    days, shifts, stations = site_scheduling_spec(config, exclude_days).capacities()
+    model = cp_model.CpModel()
+
+    W = list(range(len(workers)))
+    D = list(range(len(days)))
+    S = list(range(len(shifts)))
+    T = list(range(len(stations)))
+
+    role_shortfalls_total: List[cp_model.IntVar] = []
+
+    worker_roles_norm: List[set[str]] = [
+        {_norm_role_local(r) for r in (workers[w].get("roles") or [])}
+        for w in W
+    ]
+
+    name_to_w: Dict[str, int] = {_norm_name_local(workers[i].get("name")): i for i in range(len(workers))}
+
+    pre_assign = _resolve_fixed_assignments(days, shifts, stations, name_to_w, fixed_assignments, log_label)
 
     x: Dict[Tuple[int, int, int, int], cp_model.IntVar] = {}
+    zero_x: set[Tuple[int, int, int, int]] = set()
     for w in W:
         for d in D:
             for s in S:
@@ -159,11 +334,19 @@ def build_cp_sat_schedule_model(
                     ]
                     allowed_for_worker_station = (not worker_station_allow) or (t in worker_station_allow)
                     var = model.NewBoolVar(f"{p}x_w{w}_d{d}_s{s}_t{t}")
+                    if template_mode:
+                        if not (allowed_for_station and allowed_for_worker_station):
+                            zero_x.add((w, d, s, t))
+                            if blocked_x is not None:
+                                blocked_x.add((w, d, s, t))
+                        x[(w, d, s, t)] = var
+                        continue
                     if (d, s, t) in pre_assign and w in pre_assign[(d, s, t)]:
                         model.Add(var == 1)
                     else:
                         if not allowed or not allowed_for_station or not allowed_for_worker_station:
                             model.Add(var == 0)
+                            zero_x.add((w, d, s, t))
                     x[(w, d, s, t)] = var
 
     for t, st in enumerate(stations):
@@ -176,6 +359,7 @@ def build_cp_sat_schedule_model(
                 if required <= 0:
                     for w in W:
                         model.Add(x[(w, d, s, t)] == 0)
+                        zero_x.add((w, d, s, t))
                     continue
                 role_map_raw: Dict[str, int] = (cap_roles.get(day_key, {}) or {}).get(sh_name, {}) or {}
                 role_map_norm: Dict[str, int] = {_norm_role_local(k): int(v) for k, v in role_map_raw.items()}
@@ -184,6 +368,7 @@ def build_cp_sat_schedule_model(
                     for w in W:
                         if not (worker_roles_norm[w] & all_required_roles):
                             model.Add(x[(w, d, s, t)] == 0)
+                            zero_x.add((w, d, s, t))
                     shortfalls: List[cp_model.IntVar] = []
                     for idx_r, (r_name, r_cap) in enumerate(role_map_norm.items()):
                         cap_int = max(0, int(r_cap))
@@ -199,6 +384,8 @@ def build_cp_sat_schedule_model(
                     if len(shortfalls) > 1:
                         model.Add(short_total == sum(shortfalls))
                     role_shortfalls_total.append(short_total)
+                    if role_short_by_day is not None:
+                        role_short_by_day.setdefault(d, []).append(short_total)
                     model.Add(sum(x[(w, d, s, t)] for w in W) <= required)
                 else:
                     model.Add(sum(x[(w, d, s, t)] for w in W) <= required)
@@ -215,16 +402,20 @@ def build_cp_sat_schedule_model(
         for d in range(len(D) - 1):
             model.Add(sum(x[(w, d, len(S) - 1, t)] for t in T) + sum(x[(w, d + 1, 0, t)] for t in T) <= 1)
 
-    night_indices = [i for i, nm in enumerate(shifts) if is_night_shift_name(nm)]
+    catalog = shift_catalog_for_config(config)
+    night_indices = catalog.indices_of_kind(shifts, "night")
     if night_indices:
         for w in W:
+            # "max_nights" (optionnel) : part du plafond de nuits d'un worker partagé (résolution hiérarchique).
+            worker_nights = workers[w].get("max_nights")
+            night_cap = max_nights_per_worker if worker_nights is None else min(max_nights_per_worker, int(worker_nights))
             model.Add(
                 sum(x[(w, d, s, t)] for d in D for s in night_indices for t in T)
-                <= max_nights_per_worker
+                <= night_cap
             )
 
-    morning_indices = [i for i, nm in enumerate(shifts) if is_morning_shift_name(nm)]
-    noon_indices = [i for i, nm in enumerate(shifts) if is_noon_shift_name(nm)]
+    morning_indices = catalog.indices_of_kind(shifts, "morning")
+    noon_indices = catalog.indices_of_kind(shifts, "noon")
     morning_night_pairs: List[cp_model.IntVar] = []
     noon_next_morning_pairs: List[cp_model.IntVar] = []
     if morning_indices and night_indices:
@@ -319,6 +510,13 @@ def build_cp_sat_schedule_model(
     for dev in fairness_terms:
         model.Add(dev <= max_dev)
 
+    pull_vars: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+    if pulls is not None:
+        pull_vars = _add_pull_variables(
+            model, x, days, shifts, stations, W, worker_roles_norm, pulls, p, zero_x=zero_x
+        )
+        logger.info("[%s][PULLS] %d optional pull cells, limit=%s", log_label, len(pull_vars), pulls.limit)
+
     total_role_shortfall = sum(role_shortfalls_total) if role_shortfalls_total else 0
     mn_penalty = sum(morning_night_pairs) if morning_night_pairs else 0
     nm_penalty = sum(noon_next_morning_pairs) if noon_next_morning_pairs else 0
@@ -347,6 +545,7 @@ def build_cp_sat_schedule_model(
 
     model.Maximize(
         1000000 * coverage
+        + PULL_COVERAGE_WEIGHT * (sum(pull_vars.values()) if pull_vars else 0)
         - 10000 * max_dev
         - 100 * sum(fairness_terms)
         - 10 * total_role_shortfall
@@ -372,4 +571,240 @@ def build_cp_sat_schedule_model(
         morning_indices=morning_indices,
         noon_indices=noon_indices,
         night_indices=night_indices,
+        pulls=pull_vars,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cache de templates : un director régénère souvent le même site dans la semaine avec
+# de petits changements (זמינות d'un worker, une case fixée, jours passés exclus).
+# La partie structurelle (config, roster sans disponibilités, règles) est construite une
+# fois ; chaque requête clone le proto et applique ses deltas via les domaines des x.
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _CpSatModelTemplate:
+    model: cp_model.CpModel
+    x_index: Dict[Tuple[int, int, int, int], int]
+    blocked_x: set[Tuple[int, int, int, int]]
+    role_short_index_by_day: Dict[int, List[int]]
+    days: List[str]
+    shifts: List[str]
+    W: List[int]
+    D: List[int]
+    S: List[int]
+    T: List[int]
+    name_to_w: Dict[str, int]
+    morning_indices: List[int]
+    noon_indices: List[int]
+    night_indices: List[int]
+    pull_index: Dict[Tuple[int, int, int], int] = field(default_factory=dict)
+
+
+_MODEL_TEMPLATE_LOCK = threading.Lock()
+_MODEL_TEMPLATES: "OrderedDict[str, _CpSatModelTemplate]" = OrderedDict()
+
+
+def _model_template_cache_size() -> int:
+    try:
+        value = int(os.getenv("PLANNING_MODEL_TEMPLATE_CACHE_SIZE", "8") or "8")
+    except Exception:
+        value = 8
+    return max(0, min(value, 64))
+
+
+def _model_template_key(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    max_nights_per_worker: int,
+    var_prefix: str,
+    pulls: PullsModelSpec | None = None,
+) -> str:
+    roster = [{k: v for k, v in w.items() if k != "availability"} for w in workers]
+    raw = json.dumps(
+        {
+            "config": config,
+            "roster": roster,
+            "max_nights": int(max_nights_per_worker),
+            "prefix": var_prefix,
+            "pulls": [pulls.limit, pulls.station_limits] if pulls is not None else None,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def clear_model_template_cache() -> None:
+    with _MODEL_TEMPLATE_LOCK:
+        _MODEL_TEMPLATES.clear()
+
+
+def _build_model_template(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    *,
+    max_nights_per_worker: int,
+    var_prefix: str,
+    log_label: str,
+    pulls: PullsModelSpec | None = None,
+) -> _CpSatModelTemplate:
+    role_short_by_day: Dict[int, List[cp_model.IntVar]] = {}
+    blocked_x: set[Tuple[int, int, int, int]] = set()
+    built = _build_cp_sat_schedule_model_impl(
+        config,
+        workers,
+        max_nights_per_worker=max_nights_per_worker,
+        fixed_assignments=None,
+        exclude_days=None,
+        var_prefix=var_prefix,
+        log_label=log_label,
+        template_mode=True,
+        role_short_by_day=role_short_by_day,
+        blocked_x=blocked_x,
+        pulls=pulls,
+    )
+    return _CpSatModelTemplate(
+        model=built.model,
+        x_index={key: var.Index() for key, var in built.x.items()},
+        blocked_x=blocked_x,
+        role_short_index_by_day={d: [v.Index() for v in vs] for d, vs in role_short_by_day.items()},
+        days=built.days,
+        shifts=built.shifts,
+        W=built.W,
+        D=built.D,
+        S=built.S,
+        T=built.T,
+        name_to_w=built.name_to_w,
+        morning_indices=built.morning_indices,
+        noon_indices=built.noon_indices,
+        night_indices=built.night_indices,
+        pull_index={key: var.Index() for key, var in built.pulls.items()},
+    )
+
+
+def _instantiate_model_template(
+    template: _CpSatModelTemplate,
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    *,
+    fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None,
+    exclude_days: List[str] | None,
+    log_label: str,
+) -> CpSatScheduleModel:
+    # Clone : les solveurs ajoutent des nogoods au modèle, le template doit rester intact.
+    model = template.model.clone()
+    proto = model.Proto()
+    days, shifts = template.days, template.shifts
+    stations = list(site_scheduling_spec(config, exclude_days).stations)
+    pre_assign = _resolve_fixed_assignments(days, shifts, stations, template.name_to_w, fixed_assignments, log_label)
+    excluded = {d for d, day_key in enumerate(days) if day_key in set(exclude_days or [])}
+    availability = [
+        {day_key: set(v) if isinstance(v, list) else set() for day_key, v in (w.get("availability") or {}).items()}
+        for w in workers
+    ]
+    x: Dict[Tuple[int, int, int, int], cp_model.IntVar] = {}
+    for key, idx in template.x_index.items():
+        w, d, s, t = key
+        var = model.get_bool_var_from_proto_index(idx)
+        if (d, s, t) in pre_assign and w in pre_assign[(d, s, t)]:
+            proto.variables[idx].domain[:] = [1, 1]
+            if d in excluded:
+                # Même comportement que le build complet (capacité nulle ∧ case fixée).
+                model.Add(var == 0)
+        elif d in excluded or key in template.blocked_x or shifts[s] not in availability[w].get(days[d], ()):
+            proto.variables[idx].domain[:] = [0, 0]
+        x[key] = var
+    pulls: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+    for key, idx in template.pull_index.items():
+        if key[0] in excluded:
+            proto.variables[idx].domain[:] = [0, 0]
+        pulls[key] = model.get_bool_var_from_proto_index(idx)
+    if excluded:
+        # Jours exclus : pas de besoin de rôle → neutraliser la pénalité de manque de rôle.
+        neutral = {i for d in excluded for i in template.role_short_index_by_day.get(d, [])}
+        if neutral:
+            for pos, var_idx in enumerate(proto.objective.vars):
+                if var_idx in neutral:
+                    proto.objective.coeffs[pos] = 0
+    return CpSatScheduleModel(
+        model=model,
+        x=x,
+        days=days,
+        shifts=shifts,
+        stations=stations,
+        workers=workers,
+        W=template.W,
+        D=template.D,
+        S=template.S,
+        T=template.T,
+        name_to_w=template.name_to_w,
+        pre_assign=pre_assign,
+        morning_indices=template.morning_indices,
+        noon_indices=template.noon_indices,
+        night_indices=template.night_indices,
+        pulls=pulls,
+    )
+
+
+def build_cp_sat_schedule_model_cached(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    *,
+    max_nights_per_worker: int = 3,
+    fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None = None,
+    exclude_days: List[str] | None = None,
+    var_prefix: str = "",
+    log_label: str = "SOLVER",
+    pulls: PullsModelSpec | None = None,
+) -> CpSatScheduleModel:
+    """Comme build_cp_sat_schedule_model, via le cache de templates (PLANNING_MODEL_TEMPLATE_CACHE_SIZE, 0 = off).
+
+    Seuls disponibilités, cases fixées et exclude_days varient entre deux requêtes sur le même
+    template ; toute autre différence (config, roster, max_shifts, prefs, règles) change la clé.
+    """
+    cache_size = _model_template_cache_size()
+    if cache_size <= 0:
+        return build_cp_sat_schedule_model(
+            config,
+            workers,
+            max_nights_per_worker=max_nights_per_worker,
+            fixed_assignments=fixed_assignments,
+            exclude_days=exclude_days,
+            var_prefix=var_prefix,
+            log_label=log_label,
+            pulls=pulls,
+        )
+    logger = logging.getLogger("ai_solver")
+    key = _model_template_key(config or {}, workers, max_nights_per_worker, var_prefix, pulls)
+    with _MODEL_TEMPLATE_LOCK:
+        template = _MODEL_TEMPLATES.get(key)
+        if template is not None:
+            _MODEL_TEMPLATES.move_to_end(key)
+    if template is None:
+        template = _build_model_template(
+            config or {},
+            workers,
+            max_nights_per_worker=max_nights_per_worker,
+            var_prefix=var_prefix,
+            log_label=log_label,
+            pulls=pulls,
+        )
+        with _MODEL_TEMPLATE_LOCK:
+            _MODEL_TEMPLATES[key] = template
+            _MODEL_TEMPLATES.move_to_end(key)
+            while len(_MODEL_TEMPLATES) > cache_size:
+                _MODEL_TEMPLATES.popitem(last=False)
+        logger.info("[%s][TEMPLATE] built model template key=%s vars=%d", log_label, key[:12], len(template.x_index))
+    else:
+        logger.info("[%s][TEMPLATE] reuse model template key=%s", log_label, key[:12])
+    return _instantiate_model_template(
+        template,
+        config or {},
+        workers,
+        fixed_assignments=fixed_assignments,
+        exclude_days=exclude_days,
+        log_label=log_label,
     )
@@ -0,0 +1,242 @@
+"""Réparation incrémentale d'un plan existant (voisinage seulement).
+
+Quand un director déplace un garde ou qu'un worker annule un jour, on ne régénère pas toute la
+semaine : les affectations hors du voisinage touché (jours affectés ± rayon × stations affectées)
+sont fixées, seules les cases du voisinage sont re-résolues, avec un bonus pour chaque
+affectation conservée (plan minimalement modifié). Les plafonds hebdo (max_shifts, nuits, ≤6 jours)
+restent posés sur toute la semaine puisque les cases fixées comptent dans le modèle.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Set, Tuple
+import logging
+import time
+
+from ortools.sat.python import cp_model
+
+from .ai_solver_model import _norm_name_local, build_cp_sat_schedule_model_cached
+from .ai_solver_utils import (
+    configure_cp_sat_solver,
+    resolve_solver_profile,
+    sanitize_plan,
+)
+from .scheduling_spec import site_scheduling_spec
+
+
+logger = logging.getLogger("ai_solver")
+
+# Sous la couverture (1 000 000) mais au-dessus de l'équité (10 000 × max_dev) :
+# garder une affectation existante prime sur un rééquilibrage.
+REPAIR_KEEP_WEIGHT = 20000
+
+
+def _cell_names(assignments: Dict[str, Any], day_key: str, sh_name: str, t: int) -> List[str]:
+    per_station = ((assignments or {}).get(day_key) or {}).get(sh_name) or []
+    cell = per_station[t] if t < len(per_station) else []
+    return [str(nm or "").strip() for nm in (cell or []) if str(nm or "").strip()]
+
+
+def _invalid_cells(
+    assignments: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    days: List[str],
+    shifts: List[str],
+    stations: List[Dict[str, Any]],
+    skip_days: Set[int] | None = None,
+) -> Set[Tuple[int, int, int]]:
+    """Cases dont une affectation n'est plus valide (worker retiré / plus disponible / station interdite).
+
+    skip_days : indices de jours hors périmètre (exclude_days), jamais signalés.
+    """
+    by_name = {_norm_name_local(w.get("name")): w for w in workers}
+    invalid: Set[Tuple[int, int, int]] = set()
+    for d, day_key in enumerate(days):
+        if d in (skip_days or ()):
+            continue
+        for s, sh_name in enumerate(shifts):
+            for t, st in enumerate(stations):
+                names = _cell_names(assignments, day_key, sh_name, t)
+                required = int(((st.get("capacity") or {}).get(day_key) or {}).get(sh_name, 0) or 0)
+                if len(names) > max(0, required):
+                    invalid.add((d, s, t))
+                    continue
+                allowed_names = set(st.get("allowed_workers") or [])
+                for nm in names:
+                    w = by_name.get(nm)
+                    avail = ((w or {}).get("availability") or {}).get(day_key) or []
+                    station_allow = [i for i in ((w or {}).get("allowed_station_indices") or []) if isinstance(i, int)]
+                    if (
+                        w is None
+                        or sh_name not in avail
+                        or (allowed_names and nm not in allowed_names)
+                        or (station_allow and t not in station_allow)
+                    ):
+                        invalid.add((d, s, t))
+                        break
+    return invalid
+
+
+def _add_objective_bonus(model: cp_model.CpModel, bonus_by_index: Dict[int, int]) -> None:
+    """Ajoute +poids·var à l'objectif (maximisé) déjà posé dans le proto."""
+    if not bonus_by_index:
+        return
+    objective = model.Proto().objective
+    sign = -1 if objective.scaling_factor < 0 else 1
+    position = {var_idx: pos for pos, var_idx in enumerate(objective.vars)}
+    for var_idx, weight in bonus_by_index.items():
+        pos = position.get(var_idx)
+        if pos is None:
+            objective.vars.append(var_idx)
+            objective.coeffs.append(sign * weight)
+        else:
+            objective.coeffs[pos] += sign * weight
+
+
+def repair_schedule(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    current_assignments: Dict[str, Dict[str, List[List[str]]]],
+    *,
+    unlocked_cells: Iterable[Tuple[str, str, int]] | None = None,
+    radius_days: int = 1,
+    time_limit_seconds: float = 2.0,
+    max_nights_per_worker: int = 3,
+    exclude_days: List[str] | None = None,
+    solver_profile: str | None = None,
+) -> Dict[str, Any]:
+    """Re-planifie le voisinage touché et renvoie un plan minimalement modifié.
+
+    current_assignments : plan courant assignments[day][shift][station_index] -> noms.
+    unlocked_cells : (day, shift, station_index) libérées par le director.
+    workers : roster à jour (workers retirés absents, זמינות modifiée déjà appliquée) ; les cases
+    devenues invalides sont détectées et ajoutées au voisinage.
+    exclude_days : jours hors périmètre, conservés tels quels (figés, ils comptent dans les plafonds hebdo).
+    Si le voisinage figé est infaisable, repli sur toute la semaine (toujours avec le bonus de conservation).
+    """
+    started = time.perf_counter()
+    # Modèle sur toute la semaine : un jour exclu aurait une capacité nulle et ses cases figées le
+    # rendraient infaisable ; on le fige plutôt sur le plan courant, hors voisinage.
+    days, shifts, stations = site_scheduling_spec(config).capacities()
+    D, T = range(len(days)), range(len(stations))
+    day_index = {dk: i for i, dk in enumerate(days)}
+    shift_index = {sh: i for i, sh in enumerate(shifts)}
+    excluded = {day_index[dk] for dk in (exclude_days or []) if dk in day_index}
+
+    affected: Set[Tuple[int, int, int]] = set(
+        _invalid_cells(current_assignments, workers, days, shifts, stations, skip_days=excluded)
+    )
+    for day_key, sh_name, t in (unlocked_cells or []):
+        d, s = day_index.get(day_key), shift_index.get(sh_name)
+        if d is not None and d not in excluded and s is not None and 0 <= int(t) < len(stations):
+            affected.add((d, s, int(t)))
+
+    radius = max(0, int(radius_days))
+    result_status = "NOOP"
+    for full_week in (False, True):
+        if not affected:
+            break
+        if full_week:
+            free_days, free_stations = set(D) - excluded, set(T)
+        else:
+            free_days = {
+                dd for (d, _, _) in affected for dd in range(d - radius, d + radius + 1)
+                if 0 <= dd < len(days) and dd not in excluded
+            }
+            free_stations = {t for (_, _, t) in affected}
+        fixed: Dict[str, Dict[str, List[List[str]]]] = {}
+        for d, day_key in enumerate(days):
+            for s, sh_name in enumerate(shifts):
+                row = [[] for _ in stations]
+                for t in T:
+                    if d not in free_days or t not in free_stations:
+                        row[t] = _cell_names(current_assignments, day_key, sh_name, t)
+                fixed.setdefault(day_key, {})[sh_name] = row
+
+        trial = build_cp_sat_schedule_model_cached(
+            config or {},
+            workers,
+            max_nights_per_worker=max_nights_per_worker,
+            fixed_assignments=fixed,
+            log_label="REPAIR",
+        )
+        model, x = trial.model, trial.x
+        proto = model.Proto()
+        bonus: Dict[int, int] = {}
+        for (w, d, s, t), var in x.items():
+            in_scope = d in free_days and t in free_stations
+            if not in_scope:
+                if not ((d, s, t) in trial.pre_assign and w in trial.pre_assign[(d, s, t)]):
+                    proto.variables[var.Index()].domain[:] = [0, 0]
+                continue
+            kept = workers[w].get("name") in _cell_names(current_assignments, days[d], shifts[s], t)
+            model.AddHint(var, 1 if kept else 0)
+            if kept and (d, s, t) not in affected:
+                bonus[var.Index()] = REPAIR_KEEP_WEIGHT
+            elif kept:
+                # Case libérée : garder reste possible (ex. disponibilité inchangée) mais moins favorisé.
+                bonus[var.Index()] = REPAIR_KEEP_WEIGHT // 4
+        _add_objective_bonus(model, bonus)
+
+        profile = resolve_solver_profile(solver_profile, len(workers))
+        solver = configure_cp_sat_solver(cp_model.CpSolver(), time_limit_seconds, profile)
+        res = solver.Solve(model)
+        result_status = "FEASIBLE" if res == cp_model.FEASIBLE else ("OPTIMAL" if res == cp_model.OPTIMAL else str(res))
+        logger.info(
+            "[REPAIR] full_week=%s affected=%d free_days=%s free_stations=%s status=%s elapsed=%.3fs",
+            full_week,
+            len(affected),
+            sorted(free_days),
+            sorted(free_stations),
+            solver.StatusName(res),
+            time.perf_counter() - started,
+        )
+        if res not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            continue
+        assignments: Dict[str, Dict[str, List[List[str]]]] = {
+            day_key: {sh: [[] for _ in stations] for sh in shifts} for day_key in days
+        }
+        for (w, d, s, t), var in x.items():
+            if solver.BooleanValue(var):
+                assignments[days[d]][shifts[s]][t].append(workers[w]["name"])
+        sanitize_plan(assignments, days, shifts, stations)
+        return {
+            "days": days,
+            "shifts": shifts,
+            "stations": [st.get("name") for st in stations],
+            "assignments": assignments,
+            "status": result_status,
+            "objective": float(solver.ObjectiveValue()),
+            "changed_cells": _changed_cells(current_assignments, assignments, days, shifts, len(stations)),
+            "full_week": full_week,
+        }
+
+    # Rien à réparer, ou infaisable même sur toute la semaine : plan courant inchangé.
+    return {
+        "days": days,
+        "shifts": shifts,
+        "stations": [st.get("name") for st in stations],
+        "assignments": {
+            day_key: {sh: [_cell_names(current_assignments, day_key, sh, t) for t in T] for sh in shifts}
+            for day_key in days
+        },
+        "status": result_status,
+        "objective": 0.0,
+        "changed_cells": [],
+        "full_week": False,
+    }
+
+
+def _changed_cells(
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+    days: List[str],
+    shifts: List[str],
+    num_stations: int,
+) -> List[Tuple[str, str, int]]:
+    changed: List[Tuple[str, str, int]] = []
+    for day_key in days:
+        for sh_name in shifts:
+            for t in range(num_stations):
+                if sorted(_cell_names(before, day_key, sh_name, t)) != sorted(_cell_names(after, day_key, sh_name, t)):
+                    changed.append((day_key, sh_name, t))
+    return changed
@@ -4,24 +4,163 @@ Extraits de ai_solver pour alléger le module principal sans changer le comporte
 """
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+import json
 import logging
 import os
 
 from ortools.sat.python import cp_model
 
+from .shift_catalog import order_shift_names, shift_catalog_for_config
+
 
 DayKey = str  # "sun".."sat"
 ShiftName = str  # e.g. "06-14", "14-22", "22-06"
 
 
 def _solver_num_search_workers() -> int:
-    """Cap solver parallelism to avoid saturating the host."""
+    """Parallélisme CP-SAT : PLANNING_SOLVER_NUM_WORKERS (défaut 4), borné par les CPU de l'hôte."""
     try:
         env_value = int(os.getenv("PLANNING_SOLVER_NUM_WORKERS", "4"))
     except Exception:
         env_value = 4
-    return max(1, min(env_value, 4))
+    return max(1, min(env_value, os.cpu_count() or 1))
+
+
+@dataclass(frozen=True)
+class SolverProfile:
+    """Paramètres CP-SAT nommés (sélectionnables par requête / config תכנון אוטומטי)."""
+
+    name: str
+    linearization_level: int
+    relative_gap_limit: float
+    absolute_gap_limit: float
+    cp_model_presolve: bool
+    symmetry_level: int
+    solution_pool_size: int
+    # Multiplicateur appliqué à _solver_num_search_workers() (borné par les CPU).
+    workers_factor: float = 1.0
+
+
+# L'objectif pondère la couverture à 1e6 par créneau : un gap absolu < 1e6 garantit
+# qu'on ne s'arrête pas avec un créneau couvrable laissé vide par manque de temps. CP-SAT
+# s'arrête dès que l'UN des deux gaps est atteint : un gap relatif non nul (ex. 0.05 sur un
+# objectif ~1e6 × créneaux) laisserait des créneaux vides, d'où relative_gap_limit=0 partout ;
+# les profils rapides ne se distinguent que par le gap absolu (termes d'équité / préférences).
+SOLVER_PROFILES: Dict[str, SolverProfile] = {
+    "fast-preview": SolverProfile(
+        name="fast-preview",
+        linearization_level=0,
+        relative_gap_limit=0.0,
+        absolute_gap_limit=1e4,
+        cp_model_presolve=True,
+        symmetry_level=1,
+        solution_pool_size=1,
+        workers_factor=0.5,
+    ),
+    "balanced": SolverProfile(
+        name="balanced",
+        linearization_level=1,
+        relative_gap_limit=0.0,
+        absolute_gap_limit=100.0,
+        cp_model_presolve=True,
+        symmetry_level=2,
+        solution_pool_size=3,
+    ),
+    "thorough": SolverProfile(
+        name="thorough",
+        linearization_level=2,
+        relative_gap_limit=0.0,
+        absolute_gap_limit=0.0,
+        cp_model_presolve=True,
+        symmetry_level=4,
+        solution_pool_size=10,
+        workers_factor=2.0,
+    ),
+}
+
+
+# Tranches de taille (nombre de travailleurs) utilisées par le harnais de tuning.
+SOLVER_SIZE_BUCKETS: Tuple[Tuple[str, int], ...] = (
+    ("xs", 20),
+    ("s", 60),
+    ("m", 150),
+    ("l", 400),
+    ("xl", 10**9),
+)
+
+
+def solver_size_bucket(num_workers: int) -> str:
+    for bucket, upper in SOLVER_SIZE_BUCKETS:
+        if int(num_workers) <= upper:
+            return bucket
+    return SOLVER_SIZE_BUCKETS[-1][0]
+
+
+# (chemin, mtime_ns) -> buckets du fichier de tuning : relu seulement quand il change.
+_TUNING_CACHE: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+
+def _tuning_buckets(path: str) -> Dict[str, Any]:
+    key = (path, os.stat(path).st_mtime_ns)
+    buckets = _TUNING_CACHE.get(key)
+    if buckets is None:
+        with open(path, "r", encoding="utf-8") as fh:
+            buckets = (json.load(fh) or {}).get("buckets") or {}
+        _TUNING_CACHE.clear()
+        _TUNING_CACHE[key] = buckets
+    return buckets
+
+
+def _tuned_profile_for_size(num_workers: int | None) -> str | None:
+    """Profil choisi par scripts/tune_solver_profiles.py (PLANNING_SOLVER_PROFILE_TUNING = fichier JSON)."""
+    path = str(os.getenv("PLANNING_SOLVER_PROFILE_TUNING", "") or "").strip()
+    if not path or num_workers is None:
+        return None
+    try:
+        entry = _tuning_buckets(path).get(solver_size_bucket(num_workers))
+    except Exception:
+        return None
+    if isinstance(entry, dict):
+        entry = entry.get("profile")
+    return str(entry) if entry else None
+
+
+def resolve_solver_profile(name: str | None, num_workers: int | None = None) -> SolverProfile | None:
+    """Profil demandé, sinon profil tuné pour la taille, sinon PLANNING_SOLVER_PROFILE.
+
+    None = paramètres CP-SAT par défaut (comportement historique).
+    """
+    key = str(
+        name or _tuned_profile_for_size(num_workers) or os.getenv("PLANNING_SOLVER_PROFILE", "") or ""
+    ).strip().lower()
+    if not key:
+        return None
+    profile = SOLVER_PROFILES.get(key)
+    if profile is None:
+        logging.getLogger("ai_solver").warning("[SOLVER] unknown solver profile=%s (CP-SAT defaults)", key)
+    return profile
+
+
+def configure_cp_sat_solver(
+    solver: cp_model.CpSolver,
+    time_limit_seconds: float,
+    profile: SolverProfile | None = None,
+) -> cp_model.CpSolver:
+    params = solver.parameters
+    params.max_time_in_seconds = float(time_limit_seconds)
+    workers = _solver_num_search_workers()
+    if profile is not None:
+        workers = max(1, min(int(round(workers * profile.workers_factor)), os.cpu_count() or 1))
+        params.linearization_level = int(profile.linearization_level)
+        params.relative_gap_limit = float(profile.relative_gap_limit)
+        params.absolute_gap_limit = float(profile.absolute_gap_limit)
+        params.cp_model_presolve = bool(profile.cp_model_presolve)
+        params.symmetry_level = int(profile.symmetry_level)
+        params.solution_pool_size = int(profile.solution_pool_size)
+    params.num_search_workers = workers
+    return solver
 
 
 def _shift_kind_pref_penalty(
@@ -119,36 +258,24 @@ def order_days(days: List[DayKey]) -> List[DayKey]:
     return [d for d in ref if d in set(days)]
 
 
-def order_shifts(shift_names: List[ShiftName]) -> List[ShiftName]:
+def order_shifts(shift_names: Iterable[ShiftName], config: Dict[str, Any] | None = None) -> List[ShiftName]:
     """Order shifts as morning → noon → night when possible, else keep input order.
 
     Heuristics align with frontend detectShiftKind:
       - morning: contains "בוקר" or starts with 06 or exactly "06-14"
       - noon: contains "צהריים/צהרים" or starts with 14 or exactly "14-22"
       - night: contains "לילה" or starts with 22 or exactly "22-06" or contains "night"
+
+    With ``config``, the order is the one of shift_catalog_for_config(config).names (kinds
+    also inferred from configured start hours), so solver grids and the catalog agree.
     """
-    def is_morning(name: str) -> bool:
-        n = (name or "").strip()
-        low = n.lower()
-        return ("בוקר" in n) or low.startswith("06") or ("06-14" in low)
-
-    def is_noon(name: str) -> bool:
-        n = (name or "").strip()
-        low = n.lower()
-        return ("צהר" in n) or low.startswith("14") or ("14-22" in low)
-
-    def is_night(name: str) -> bool:
-        n = (name or "").strip()
-        low = n.lower()
-        return ("לילה" in n) or ("night" in low) or low.startswith("22") or ("22-06" in low)
-
-    morning = [s for s in shift_names if is_morning(s)]
-    noon = [s for s in shift_names if is_noon(s)]
-    night = [s for s in shift_names if is_night(s)]
-    used = set(morning + noon + night)
-    others = [s for s in shift_names if s not in used]
-    # Preserve within-class original order
-    return morning + noon + night + others
+    if config is None:
+        # Tri stable : ordre d'origine conservé dans chaque classe (voir app.shift_catalog).
+        return order_shift_names(shift_names)
+    names = set(shift_names)
+    ordered = [nm for nm in shift_catalog_for_config(config).names if nm in names]
+    # Noms hors catalogue (cas dégénérés) : triés pour ne pas dépendre de l'ordre d'un set.
+    return ordered + order_shift_names(sorted(names - set(ordered)))
 
 
 def next_day(day: DayKey) -> DayKey | None:
@@ -318,7 +445,7 @@ def build_capacities_from_config(config: Dict[str, Any], exclude_days: List[DayK
         })
 
     days = order_days(list(all_days)) or ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
-    shifts = order_shifts(list(all_shifts)) or ["06-14", "14-22", "22-06"]
+    shifts = order_shifts(all_shifts, config) or ["06-14", "14-22", "22-06"]
     return days, shifts, stations
 
 
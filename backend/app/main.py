@@ -13,6 +13,7 @@ from .sites import (
     router as sites_router,
     compute_auto_planning_scheduler_sleep_seconds,
     process_auto_planning_tick,
+    SchedulerLeaseKeeper,
 )
 from .public_workers import router as public_workers_router
 from .deps import get_current_user, require_role
@@ -154,24 +155,37 @@ def create_app() -> FastAPI:
         stop_event = Event()
         app.state.auto_planning_stop_event = stop_event
 
+        # Une boucle par instance ; seule celle qui tient le bail en base exécute les ticks.
+        lease = SchedulerLeaseKeeper(SessionLocal)
+
         def loop():
             idle_recheck = max(60, int(settings.auto_planning_scheduler_idle_recheck_seconds or 3600))
             while not stop_event.is_set():
                 sleep_seconds = idle_recheck
                 db = SessionLocal()
                 try:
-                    sleep_seconds = compute_auto_planning_scheduler_sleep_seconds(
-                        db,
-                        idle_recheck_seconds=idle_recheck,
-                    )
-                    if sleep_seconds <= 0:
-                        process_auto_planning_tick(db)
+                    if lease.try_acquire(db):
+                        sleep_seconds = compute_auto_planning_scheduler_sleep_seconds(
+                            db,
+                            idle_recheck_seconds=idle_recheck,
+                        )
+                        if sleep_seconds <= 0:
+                            with lease.renewing() as fence:
+                                process_auto_planning_tick(db, lease_fence=fence)
                 except Exception:
+                    db.rollback()
                     logger.exception("Auto-planning scheduler tick failed")
                 finally:
                     db.close()
-                if stop_event.wait(sleep_seconds):
+                if lease.sleep(stop_event, sleep_seconds):
                     break
+            db = SessionLocal()
+            try:
+                lease.release(db)
+            except Exception:
+                logger.exception("Auto-planning scheduler lease release failed")
+            finally:
+                db.close()
 
         thread = Thread(target=loop, name="auto-planning-scheduler", daemon=True)
         thread.start()
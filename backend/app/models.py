@@ -33,6 +33,9 @@ class Site(Base):
     config: Mapped[dict] = mapped_column(JSON, nullable=True)
     # Soft-delete : pas de ligne supprimée → שיבוצים / site_workers / historiques conservés ; listes masquent deleted_at IS NOT NULL
     deleted_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True, index=True)
+    # Version des données du site (site, workers, זמינות, plans, אירועים) : incrémentée dans la
+    # transaction de chaque écriture ORM, clé des caches multi-sites partagée entre processus.
+    data_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
 
 class DirectorAutoPlanningConfig(Base):
@@ -53,12 +56,57 @@ class DirectorAutoPlanningConfig(Base):
     # Limite de משיכות pour le תכנון אוטומטי : globale et/ou par site (JSON { "siteId": n, ... })
     pulls_limit: Mapped[int | None] = mapped_column(Integer, nullable=True)
     pulls_limits_by_site: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Profil CP-SAT nommé (fast-preview / balanced / thorough), None = défaut serveur
+    solver_profile: Mapped[str | None] = mapped_column(String(16), nullable=True)
     updated_at: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
     last_run_week_iso: Mapped[str | None] = mapped_column(String(10), nullable=True, index=True)
     last_run_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True, default=0)
     last_error: Mapped[str | None] = mapped_column(String(1000), nullable=True)
 
 
+# Bail du scheduler : un seul leader parmi les workers uvicorn / hôtes (voir sites/scheduler_lease.py).
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(128), nullable=False)
+    # ms epoch ; bail libre quand expires_at < maintenant
+    expires_at: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    acquired_at: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # Réveil demandé (put config) : le leader relance son calcul quand wake_at change.
+    wake_at: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+# File durable des ריצות תכנון אוטומטי : une ligne par (directeur, semaine cible, déclenchement).
+class AutoPlanningRun(Base):
+    __tablename__ = "auto_planning_runs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    director_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    target_week_iso: Mapped[str] = mapped_column(String(10), nullable=False)
+    # scheduled (tick) / manual-test (bouton "tester maintenant")
+    source: Mapped[str] = mapped_column(String(16), nullable=False, default="scheduled")
+    # queued / running / succeeded / failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    # ms epoch ; une ligne queued n'est réclamée qu'à partir de next_attempt_at (backoff)
+    next_attempt_at: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    claimed_by: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    heartbeat_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # Options figées à la mise en file (pulls, profil, mode de sauvegarde)
+    options: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # { "done_sites": n, "total_sites": n, "sites": { "siteId": {status, assigned, required, duration_ms, error} } }
+    progress: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    generated_sites: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    job_id: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(String(1000), nullable=True)
+    created_at: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    started_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    finished_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    duration_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
+
 class SiteWeeklyAvailability(Base):
     __tablename__ = "site_weekly_availability"
     __table_args__ = (
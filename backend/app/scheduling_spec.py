@@ -0,0 +1,120 @@
+"""Spécification de planification compilée d'un site (jours, משמרות, stations, capacités, rôles).
+
+build_capacities_from_config re-parse le JSON brut des stations (dayOverrides, perDayCustom,
+normalisation des rôles) à chaque appel ; le solveur, les משיכות, les résumés d'auto-planning et
+list_sites l'appellent en boucle. SiteSchedulingSpec fige ce résultat une fois par contenu de
+config (hash) et jours exclus ; update_site oublie les entrées de l'ancienne config.
+
+La spec est immuable : les stations sont des vues en lecture seule (MappingProxyType / tuples),
+utilisables partout où le dict de build_capacities_from_config était lu via .get().
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Tuple
+import threading
+
+from .ai_solver_utils import build_capacities_from_config
+from .shift_catalog import config_content_hash
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+_EMPTY_ROLES: Mapping[str, int] = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class SiteSchedulingSpec:
+    config_hash: str
+    exclude_days: Tuple[str, ...]
+    days: Tuple[str, ...]
+    shifts: Tuple[str, ...]
+    stations: Tuple[Mapping[str, Any], ...]
+    station_names: Tuple[str, ...]
+    # capacity[t][d][s] : places requises ; role_caps[t][(d, s)] : {rôle: nombre}
+    capacity: Tuple[Tuple[Tuple[int, ...], ...], ...]
+    role_caps: Tuple[Mapping[Tuple[int, int], Mapping[str, int]], ...]
+    required_total: int
+
+    def capacities(self) -> Tuple[List[str], List[str], List[Mapping[str, Any]]]:
+        """Même forme que build_capacities_from_config (stations en lecture seule)."""
+        return list(self.days), list(self.shifts), list(self.stations)
+
+    def required(self, t: int, d: int, s: int) -> int:
+        return self.capacity[t][d][s]
+
+    def required_roles(self, t: int, d: int, s: int) -> Mapping[str, int]:
+        return self.role_caps[t].get((d, s), _EMPTY_ROLES)
+
+
+def build_site_scheduling_spec(
+    config: Dict[str, Any] | None,
+    exclude_days: List[str] | None = None,
+    *,
+    config_hash: str | None = None,
+) -> SiteSchedulingSpec:
+    days, shifts, stations = build_capacities_from_config(config or {}, exclude_days)
+    capacity = tuple(
+        tuple(
+            tuple(int(((st.get("capacity") or {}).get(day_key) or {}).get(sh, 0) or 0) for sh in shifts)
+            for day_key in days
+        )
+        for st in stations
+    )
+    role_caps = tuple(
+        MappingProxyType({
+            (d, s): MappingProxyType({str(r): int(c or 0) for r, c in roles.items()})
+            for d, day_key in enumerate(days)
+            for s, sh in enumerate(shifts)
+            if (roles := ((st.get("capacity_roles") or {}).get(day_key) or {}).get(sh))
+        })
+        for st in stations
+    )
+    return SiteSchedulingSpec(
+        config_hash=config_hash or config_content_hash(config),
+        exclude_days=tuple(sorted(set(exclude_days or []))),
+        days=tuple(days),
+        shifts=tuple(shifts),
+        stations=tuple(_freeze(st) for st in stations),
+        station_names=tuple(str(st.get("name") or "") for st in stations),
+        capacity=capacity,
+        role_caps=role_caps,
+        required_total=sum(c for per_station in capacity for per_day in per_station for c in per_day),
+    )
+
+
+_SPEC_LOCK = threading.Lock()
+_SPECS: "OrderedDict[Tuple[str, Tuple[str, ...]], SiteSchedulingSpec]" = OrderedDict()
+_SPEC_CACHE_SIZE = 256
+
+
+def site_scheduling_spec(config: Dict[str, Any] | None, exclude_days: List[str] | None = None) -> SiteSchedulingSpec:
+    config_hash = config_content_hash(config)
+    key = (config_hash, tuple(sorted(set(exclude_days or []))))
+    with _SPEC_LOCK:
+        spec = _SPECS.get(key)
+        if spec is not None:
+            _SPECS.move_to_end(key)
+            return spec
+    spec = build_site_scheduling_spec(config, exclude_days, config_hash=config_hash)
+    with _SPEC_LOCK:
+        _SPECS[key] = spec
+        while len(_SPECS) > _SPEC_CACHE_SIZE:
+            _SPECS.popitem(last=False)
+    return spec
+
+
+def forget_site_scheduling_spec(config: Dict[str, Any] | None) -> None:
+    """Oublie les specs compilées d'une config (appelé par update_site avant de la remplacer)."""
+    config_hash = config_content_hash(config)
+    with _SPEC_LOCK:
+        for key in [k for k in _SPECS if k[0] == config_hash]:
+            del _SPECS[key]
@@ -212,6 +212,9 @@ class WeeklyAvailabilityPayload(BaseModel):
     availability: dict[str, dict[str, list[str]]] = {}
 
 
+SolverProfileName = Literal["fast-preview", "balanced", "thorough"]
+
+
 class AutoPlanningConfigPayload(BaseModel):
     enabled: bool = False
     day_of_week: int = Field(default=0, ge=0, le=6)
@@ -222,6 +225,8 @@ class AutoPlanningConfigPayload(BaseModel):
     # Même limite pour tous les sites, ou dict par id de site (clés string). Max 30 משיכות.
     pulls_limit: int | None = Field(default=None, ge=1, le=30)
     pulls_limits_by_site: dict[str, int | None] | None = None
+    # Profil CP-SAT nommé (None = paramètres par défaut du serveur)
+    solver_profile: SolverProfileName | None = None
 
     @field_validator("pulls_limits_by_site", mode="before")
     @classmethod
@@ -248,6 +253,42 @@ class AutoPlanningConfigOut(AutoPlanningConfigPayload):
     target_week_iso: str | None = None
 
 
+class AutoPlanningRunOut(BaseModel):
+    id: int
+    target_week_iso: str
+    source: str
+    # queued / running / succeeded / failed
+    status: str
+    attempts: int
+    max_attempts: int
+    next_attempt_at: int
+    generated_sites: int
+    # { "done_sites", "total_sites", "sites": { "siteId": {status, assigned, required, duration_ms, error} } }
+    progress: dict | None = None
+    job_id: str | None = None
+    last_error: str | None = None
+    created_at: int
+    started_at: int | None = None
+    finished_at: int | None = None
+    duration_ms: int | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class AutoPlanningQueueOut(BaseModel):
+    queued: int
+    running: int
+    # queued dont le backoff est écoulé : en attente d'un worker
+    ready: int
+    oldest_ready_wait_ms: int | None = None
+
+
+class AutoPlanningRunsOut(BaseModel):
+    queue: AutoPlanningQueueOut
+    runs: list[AutoPlanningRunOut]
+
+
 class WeekPlanPayload(BaseModel):
     # YYYY-MM-DD (week start)
     week_iso: str = Field(min_length=10, max_length=10, description="YYYY-MM-DD (week start)")
@@ -267,6 +308,12 @@ class AIPlanningRequest(BaseModel):
     pulls_limits_by_site: dict[str, int | None] | None = None
     # Préférence de משיכות seulement (pas le שיבוץ): morning / noon / night. Vide = mix.
     pulls_prefer: list[Literal["morning", "noon", "night"]] | None = None
+    # Profil CP-SAT nommé : fast-preview (aperçu rapide) / balanced / thorough
+    solver_profile: SolverProfileName | None = None
+    # Amorcer le solveur avec le brouillon de la semaine ou le plan publié de la semaine précédente
+    warm_start: bool = True
+    # Flux SSE : "delta" = חלופות envoyées en diff de cases contre la dernière keyframe (voir sites/sse_delta)
+    stream_encoding: Literal["full", "delta"] = "full"
 
     @field_validator("pulls_prefer", mode="before")
     @classmethod
@@ -300,6 +347,67 @@ class AIPlanningResponse(BaseModel):
     objective: float
 
 
+class AIGenerationJobOut(BaseModel):
+    job_id: str
+    kind: str
+    site_id: int | None = None
+    status: Literal["queued", "running", "done", "error", "cancelled"]
+    created_at_ms: int
+    started_at_ms: int | None = None
+    finished_at_ms: int | None = None
+    # {"phase": "waiting-slot" | "solving" | "post-processing" | ..., "updated_at_ms": ..., ...}
+    progress: dict = Field(default_factory=dict)
+    result: dict | None = None
+    error: Any = None
+    error_status_code: int | None = None
+
+
+class AIMultiWeekRequest(BaseModel):
+    # Première semaine (YYYY-MM-DD, début de semaine) puis semaines consécutives
+    start_week_iso: str = Field(min_length=10, max_length=10)
+    num_weeks: int = Field(default=2, ge=1, le=8)
+    auto_pulls_enabled: bool = False
+    pulls_limit: int | None = Field(default=None, ge=1)
+    solver_profile: SolverProfileName | None = None
+    warm_start: bool = True
+
+
+class AIRepairCell(BaseModel):
+    day: str
+    shift: str
+    station: int = Field(ge=0)
+
+
+class AIRepairRequest(BaseModel):
+    week_iso: str | None = None
+    # Plan courant : assignments[day][shift][station_index] -> list[str]
+    assignments: dict[str, dict[str, list[list[str]]]]
+    # Cases libérées par le director (à re-planifier)
+    unlocked_cells: list[AIRepairCell] = []
+    # Workers retirés de la semaine (annulation) : leurs cases sont re-planifiées
+    removed_workers: list[str] = []
+    # זמינות hebdo à jour (même format que AIPlanningRequest.weekly_availability)
+    weekly_availability: dict[str, dict[str, list[str]]] | None = None
+    exclude_days: list[str] | None = None
+    # Jours voisins re-planifiés autour de chaque case touchée (adjacence / plafonds)
+    radius_days: int = Field(default=1, ge=0, le=6)
+    time_limit_seconds: int = Field(default=2, ge=1, le=30)
+    max_nights_per_worker: int | None = None
+    solver_profile: SolverProfileName | None = None
+
+
+class AIRepairResponse(BaseModel):
+    days: list[str]
+    shifts: list[str]
+    stations: list[str]
+    assignments: dict[str, dict[str, list[list[str]]]]
+    changed_cells: list[AIRepairCell] = []
+    # True si le voisinage figé était infaisable et que toute la semaine a été re-planifiée
+    full_week: bool = False
+    status: str
+    objective: float
+
+
 class SiteMessageBase(BaseModel):
     text: str
     scope: Literal["global", "week"]
@@ -0,0 +1,237 @@
+"""Catalogue des משמרות d'un site : type (בוקר / צהריים / לילה), horaires, ordre et adjacence.
+
+Une seule règle de classification pour tout le backend (solveur, משיכות, אירועים, résumés),
+alignée sur detectShiftKind du frontend :
+  - morning : contient "בוקר", commence par 06 ou contient "06-14"
+  - noon    : contient "צהר", commence par 14 ou contient "14-22"
+  - night   : contient "לילה" / "night", commence par 22 ou contient "22-06"
+À défaut, le type est déduit de l'heure de début configurée (04–12 matin, 12–20 midi, sinon nuit).
+
+Le catalogue est compilé une fois par contenu de config (hash) et mis en cache.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+import hashlib
+import json
+import re
+import threading
+
+
+SHIFT_KINDS: Tuple[str, ...] = ("morning", "noon", "night")
+_KIND_ORDER = {kind: i for i, kind in enumerate(SHIFT_KINDS)}
+
+
+@lru_cache(maxsize=512)
+def shift_kind_from_name(name: str) -> str | None:
+    raw = str(name or "").strip()
+    low = raw.lower()
+    if ("בוקר" in raw) or low.startswith("06") or ("06-14" in low):
+        return "morning"
+    if ("צהר" in raw) or low.startswith("14") or ("14-22" in low):
+        return "noon"
+    if ("לילה" in raw) or ("night" in low) or low.startswith("22") or ("22-06" in low):
+        return "night"
+    return None
+
+
+def _shift_kind_from_start(start_minutes: int | None) -> str | None:
+    if start_minutes is None:
+        return None
+    if 4 * 60 <= start_minutes < 12 * 60:
+        return "morning"
+    if 12 * 60 <= start_minutes < 20 * 60:
+        return "noon"
+    return "night"
+
+
+def _hours_of(shift_name: str) -> str | None:
+    s = str(shift_name or "")
+    m = re.search(r"(\d{1,2})\s*[-:–]\s*(\d{1,2})", s)
+    if m:
+        return f"{m.group(1).zfill(2)}-{m.group(2).zfill(2)}"
+    if re.search(r"בוקר", s, re.I):
+        return "06-14"
+    if re.search(r"צהר(יים|י)ם?", s, re.I):
+        return "14-22"
+    if re.search(r"לילה|night", s, re.I):
+        return "22-06"
+    return None
+
+
+def _hours_from_config(station_cfg: dict | None, shift_name: str, day_key: str) -> str | None:
+    station_cfg = station_cfg or {}
+
+    def fmt(start: str | None, end: str | None) -> str | None:
+        if not start or not end:
+            return None
+        return f"{start}-{end}"
+
+    if station_cfg.get("perDayCustom") and isinstance(station_cfg.get("dayOverrides"), dict):
+        day_cfg = (station_cfg.get("dayOverrides") or {}).get(day_key) or {}
+        if day_cfg and day_cfg.get("active") is not False:
+            shift_cfg = next((x for x in (day_cfg.get("shifts") or []) if isinstance(x, dict) and x.get("name") == shift_name), None)
+            out = fmt(shift_cfg.get("start") if isinstance(shift_cfg, dict) else None, shift_cfg.get("end") if isinstance(shift_cfg, dict) else None)
+            if out:
+                return out
+
+    shift_cfg = next((x for x in (station_cfg.get("shifts") or []) if isinstance(x, dict) and x.get("name") == shift_name), None)
+    return fmt(shift_cfg.get("start") if isinstance(shift_cfg, dict) else None, shift_cfg.get("end") if isinstance(shift_cfg, dict) else None)
+
+
+def _parse_hours_range(range_text: str | None) -> tuple[str, str] | None:
+    text = str(range_text or "").strip()
+    m = re.match(r"^\s*(\d{1,2}):?(\d{2})?\s*[-–]\s*(\d{1,2}):?(\d{2})?\s*$", text)
+    if not m:
+        return None
+    return (f"{int(m.group(1)):02d}:{int(m.group(2) or '0'):02d}", f"{int(m.group(3)):02d}:{int(m.group(4) or '0'):02d}")
+
+
+def _to_minutes(hhmm: str) -> int | None:
+    m = re.match(r"^(\d{1,2}):(\d{2})$", str(hhmm or "").strip())
+    if not m:
+        return None
+    hh = int(m.group(1))
+    mm = int(m.group(2))
+    if hh < 0 or hh > 23 or mm < 0 or mm > 59:
+        return None
+    return hh * 60 + mm
+
+
+@dataclass(frozen=True)
+class ShiftInfo:
+    name: str
+    kind: str | None
+    start_minutes: int | None
+    end_minutes: int | None
+    order_index: int
+
+
+@dataclass(frozen=True)
+class ShiftCatalog:
+    # Noms ordonnés matin → midi → nuit → autres (ordre de config conservé dans chaque groupe)
+    names: Tuple[str, ...]
+    by_name: Dict[str, ShiftInfo] = field(default_factory=dict)
+
+    def info(self, name: str) -> ShiftInfo:
+        found = self.by_name.get(str(name or "").strip())
+        if found is not None:
+            return found
+        return _shift_info(str(name or "").strip(), None, len(self.names))
+
+    def kind(self, name: str) -> str | None:
+        return self.info(name).kind
+
+    def is_morning(self, name: str) -> bool:
+        return self.kind(name) == "morning"
+
+    def is_noon(self, name: str) -> bool:
+        return self.kind(name) == "noon"
+
+    def is_night(self, name: str) -> bool:
+        return self.kind(name) == "night"
+
+    def start_minutes(self, name: str) -> int | None:
+        return self.info(name).start_minutes
+
+    def indices_of_kind(self, shifts: Iterable[str], kind: str) -> List[int]:
+        return [i for i, nm in enumerate(shifts) if self.kind(nm) == kind]
+
+    def next_shift(self, name: str) -> Tuple[str | None, bool]:
+        """(shift suivant, passe au jour suivant ?) dans l'ordre du catalogue."""
+        try:
+            idx = self.names.index(str(name or "").strip())
+        except ValueError:
+            return None, False
+        if idx + 1 < len(self.names):
+            return self.names[idx + 1], False
+        return (self.names[0], True) if self.names else (None, False)
+
+
+@lru_cache(maxsize=1024)
+def _shift_info(name: str, hours: str | None, fallback_index: int) -> ShiftInfo:
+    parsed = _parse_hours_range(hours) or _parse_hours_range(_hours_of(name))
+    start = _to_minutes(parsed[0]) if parsed else None
+    end = _to_minutes(parsed[1]) if parsed else None
+    kind = shift_kind_from_name(name) or _shift_kind_from_start(start)
+    return ShiftInfo(name=name, kind=kind, start_minutes=start, end_minutes=end, order_index=fallback_index)
+
+
+def order_shift_names(names: Iterable[str], kind_of=shift_kind_from_name) -> List[str]:
+    ordered = list(dict.fromkeys(names))
+    return sorted(ordered, key=lambda nm: _KIND_ORDER.get(kind_of(nm), len(SHIFT_KINDS)))
+
+
+def build_shift_catalog(config: Dict[str, Any] | None) -> ShiftCatalog:
+    stations = [st for st in ((config or {}).get("stations") or []) if isinstance(st, dict)]
+    raw_names: List[str] = []
+    for st in stations:
+        for sh in (st.get("shifts") or []):
+            if isinstance(sh, dict) and str(sh.get("name") or "").strip():
+                raw_names.append(str(sh.get("name")).strip())
+        for day_cfg in (st.get("dayOverrides") or {}).values():
+            if not isinstance(day_cfg, dict):
+                continue
+            for sh in (day_cfg.get("shifts") or []):
+                if isinstance(sh, dict) and str(sh.get("name") or "").strip():
+                    raw_names.append(str(sh.get("name")).strip())
+    raw_names = list(dict.fromkeys(raw_names))
+
+    infos: Dict[str, ShiftInfo] = {}
+    for nm in raw_names:
+        # Horaires : première station qui en donne (config "sun" puis nom, comme l'ancien
+        # _shift_start_minutes), puis les jours personnalisés pour les gardes propres à un jour.
+        hours = None
+        for st in stations:
+            hours = _hours_from_config(st, nm, "sun") or _hours_of(nm)
+            if _parse_hours_range(hours):
+                break
+        if not _parse_hours_range(hours):
+            for st in stations:
+                for day_key in (st.get("dayOverrides") or {}):
+                    hours = _hours_from_config(st, nm, str(day_key))
+                    if _parse_hours_range(hours):
+                        break
+                if _parse_hours_range(hours):
+                    break
+        infos[nm] = _shift_info(nm, hours, 0)
+    ordered = order_shift_names(raw_names, kind_of=lambda nm: infos[nm].kind)
+    by_name = {
+        nm: ShiftInfo(
+            name=nm,
+            kind=infos[nm].kind,
+            start_minutes=infos[nm].start_minutes,
+            end_minutes=infos[nm].end_minutes,
+            order_index=i,
+        )
+        for i, nm in enumerate(ordered)
+    }
+    return ShiftCatalog(names=tuple(ordered), by_name=by_name)
+
+
+_SHIFT_CATALOG_LOCK = threading.Lock()
+_SHIFT_CATALOGS: "OrderedDict[str, ShiftCatalog]" = OrderedDict()
+_SHIFT_CATALOG_CACHE_SIZE = 128
+
+
+def config_content_hash(config: Dict[str, Any] | None) -> str:
+    raw = json.dumps(config or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def shift_catalog_for_config(config: Dict[str, Any] | None) -> ShiftCatalog:
+    key = config_content_hash(config)
+    with _SHIFT_CATALOG_LOCK:
+        catalog = _SHIFT_CATALOGS.get(key)
+        if catalog is not None:
+            _SHIFT_CATALOGS.move_to_end(key)
+            return catalog
+    catalog = build_shift_catalog(config)
+    with _SHIFT_CATALOG_LOCK:
+        _SHIFT_CATALOGS[key] = catalog
+        while len(_SHIFT_CATALOGS) > _SHIFT_CATALOG_CACHE_SIZE:
+            _SHIFT_CATALOGS.popitem(last=False)
+    return catalog
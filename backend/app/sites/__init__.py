@@ -5,6 +5,7 @@ from .auto_planning import (
     compute_auto_planning_scheduler_sleep_seconds,
     process_auto_planning_tick,
 )
+from .scheduler_lease import SchedulerLeaseKeeper
 from .linked_sites import _enforce_linked_global_caps_on_site_plans
 from .week_utils import _now_ms, _week_start_date, _next_week_iso
 
@@ -12,6 +13,7 @@ __all__ = [
     "router",
     "compute_auto_planning_scheduler_sleep_seconds",
     "process_auto_planning_tick",
+    "SchedulerLeaseKeeper",
     "_now_ms",
     "_week_start_date",
     "_next_week_iso",
@@ -13,10 +13,10 @@ import os
 import threading
 import time
 from datetime import datetime, timedelta
-from copy import deepcopy
 from contextlib import contextmanager
 import logging
 import secrets
+from typing import Callable
 
 from ..deps import require_role, get_db
 from ..models import (
@@ -26,12 +26,17 @@ from ..models import (
 from ..schemas import (
     SiteCreate, SiteOut, NextWeekSavedPlanStatus, SiteUpdate,
     WorkerCreate, WorkerUpdate, WorkerOut, AIPlanningRequest, AIPlanningResponse,
+    AIRepairCell, AIRepairRequest, AIRepairResponse, AIMultiWeekRequest,
     UserOut, CreateWorkerUserRequest, WeeklyAvailabilityPayload, WeekPlanPayload,
     AutoPlanningConfigPayload, AutoPlanningConfigOut, SiteMessageCreate,
     SiteMessageUpdate, SiteMessageOut, SiteEventCreate, SiteEventUpdate,
-    SiteEventOut, WorkerInviteLinkOut,
+    SiteEventOut, WorkerInviteLinkOut, AIGenerationJobOut,
 )
 from ..ai_solver import solve_schedule
+from ..ai_solver_repair import repair_schedule
+from ..ai_solver_utils import SOLVER_PROFILES
+from ..scheduling_spec import site_scheduling_spec
+from ..solve_stats import solve_stats_key
 from ..auth import create_worker_invite_token, ensure_director_code
 
 from .ownership import _director_site_or_404, _director_site_ownership_or_404
@@ -57,35 +62,48 @@ from .solver_bridge import (
     _site_max_nights_per_worker,
 )
 from .pulls import (
-    _apply_auto_pulls_to_payload, _enforce_role_requirements_on_assignments,
+    _enforce_role_requirements_on_assignments,
     _apply_auto_pulls_to_site_plans, _enforce_role_requirements_on_site_plans,
     _normalize_pulls_limits_by_site, _planning_limit_error_detail_for_request,
     _site_pulls_limit_matches, _matches_pulls_limit, _pulls_count,
-    _sanitize_pulls_map, _planning_limit_error_detail,
+    _sanitize_pulls_map, _planning_limit_error_detail, _pulls_model_spec,
+    _apply_auto_pulls_to_alternatives,
 )
 from .linked_sites import (
     _build_multi_site_generation_context, _enforce_linked_global_caps_on_site_plans,
     _generate_multi_site_memory_plans,
     _connected_site_ids_for_root, _linked_site_cluster_map_for_director,
 )
+from .linked_caps import _compile_linked_cap_roster
 from .auto_planning import (
     _boost_generation_budget_for_pulls, _clamp_generation_budget,
     _single_site_candidate_sort_key, _summarize_auto_planning_result,
 )
 from .events import _apply_site_event_locks_to_solver_workers
-from .week_plans import _save_site_week_plan
+from .week_plans import _save_site_week_plan, _warm_start_hint_assignments
 from .ai_generate_sse import (
     AI_GENERATE_SSE_HEADERS,
     LinkedGenerationStreamParams,
+    MultiWeekGenerationStreamParams,
     SingleGenerationStreamParams,
     apply_linked_stream_body_overrides,
     linked_generation_sse_stream,
+    multi_week_generation_sse_stream,
     parse_single_stream_payload,
     single_generation_sse_stream,
 )
+from .generation_streams import _parse_last_event_id, _resumable_generation_log, stream_generation_log
+from .generation_jobs import GenerationJob, find_generation_job, submit_generation_job
 
 router = APIRouter()
 
+
+def _solver_profile_from_query(raw: str | None) -> str | None:
+    # EventSource (GET) ne peut pas envoyer de body : profil CP-SAT via query string.
+    key = str(raw or "").strip().lower()
+    return key if key in SOLVER_PROFILES else None
+
+
 @router.post("/{site_id}/ai-generate-linked")
 def ai_generate_linked_planning(
     site_id: int,
@@ -122,6 +140,7 @@ def ai_generate_linked_planning(
             fixed_assignments=payload.fixed_assignments if payload else None,
             time_limit_seconds=eff_time,
             num_alternatives=eff_num_alts,
+            solver_profile=payload.solver_profile if payload else None,
         )
     pulls_limits_by_site = _normalize_pulls_limits_by_site(payload.pulls_limits_by_site if payload else None)
     if payload and payload.auto_pulls_enabled:
@@ -135,12 +154,14 @@ def ai_generate_linked_planning(
             fixed_assignments=payload.fixed_assignments if payload else None,
         )
         workers_by_site = context.get("workers_by_site")
+        cap_roster = _compile_linked_cap_roster(context["connected_site_ids"], week_iso, workers_by_site or {})
         result["site_plans"] = _enforce_linked_global_caps_on_site_plans(
             db,
             context["connected_site_ids"],
             week_iso,
             result.get("site_plans") or {},
             workers_by_site=workers_by_site,
+            cap_roster=cap_roster,
         )
         result["site_plans"] = _apply_auto_pulls_to_site_plans(
             db,
@@ -157,6 +178,7 @@ def ai_generate_linked_planning(
             week_iso,
             result.get("site_plans") or {},
             workers_by_site=workers_by_site,
+            cap_roster=cap_roster,
         )
         pulls_limit = int(payload.pulls_limit) if payload and payload.pulls_limit is not None else None
         if payload.auto_pulls_enabled:
@@ -231,6 +253,11 @@ async def ai_generate_linked_planning_stream(
         q_num_alternatives = request.query_params.get("num_alternatives")
         q_time_limit_seconds = request.query_params.get("time_limit_seconds")
         q_max_nights_per_worker = request.query_params.get("max_nights_per_worker")
+        q_solver_profile = _solver_profile_from_query(request.query_params.get("solver_profile"))
+        if q_solver_profile:
+            payload.solver_profile = q_solver_profile
+        if request.query_params.get("stream_encoding") in ("full", "delta"):
+            payload.stream_encoding = request.query_params.get("stream_encoding")
     else:
         q_num_alternatives, q_time_limit_seconds, q_max_nights_per_worker = await apply_linked_stream_body_overrides(
             request, payload
@@ -239,6 +266,14 @@ async def ai_generate_linked_planning_stream(
     site = db.get(Site, site_id)
     if not site or site.director_id != user.id:
         raise HTTPException(status_code=404, detail="Site introuvable")
+    resumed = _resumable_generation_log(request, int(user.id), int(site_id))
+    if resumed is not None:
+        # Reconnexion : on se rattache à la génération en cours, sans relancer le solveur.
+        return StreamingResponse(
+            stream_generation_log(*resumed),
+            media_type="text/event-stream; charset=utf-8",
+            headers=AI_GENERATE_SSE_HEADERS,
+        )
 
     eff_time = int(q_time_limit_seconds if q_time_limit_seconds is not None else (payload.time_limit_seconds or 20))
     try:
@@ -327,6 +362,7 @@ async def ai_generate_linked_planning_stream(
         context=context,
         linked_sites=linked_sites,
         week_iso=week_iso,
+        director_id=int(user.id),
     )
     return StreamingResponse(
         linked_generation_sse_stream(stream_params),
@@ -335,15 +371,15 @@ async def ai_generate_linked_planning_stream(
     )
 
 
-@router.post("/{site_id}/ai-generate", response_model=AIPlanningResponse)
-def ai_generate_planning(
+def _single_site_generation_job_target(
+    db: Session,
+    director_id: int,
     site_id: int,
-    payload: AIPlanningRequest = Body(default=AIPlanningRequest()),
-    user: User = Depends(require_role("director")),
-    db: Session = Depends(get_db),
-):
+    payload: AIPlanningRequest,
+) -> Callable[[GenerationJob], dict]:
+    """Lit la base (dans la requête) et retourne le corps du job : solve + post-traitement, sans accès DB."""
     site = db.get(Site, site_id)
-    if not site or site.director_id != user.id:
+    if not site or site.director_id != director_id:
         raise HTTPException(status_code=404, detail="Site introuvable")
     week_for_rows = _week_start_date(datetime.now()).date().isoformat()
     if payload and getattr(payload, "week_iso", None):
@@ -366,112 +402,300 @@ def ai_generate_planning(
     for w in workers:
         avail_count = sum(len(shifts) for shifts in w['availability'].values())
         logger.info(f"[AI-GEN] Worker {w['name']}: availability keys={len(w['availability'])}, total shifts={avail_count}, max_shifts={w['max_shifts']}, roles={w['roles']}, shift_kind_prefs={w.get('shift_kind_prefs')}")
-    if not workers:
-        # Return empty structure with days/shifts from config mapping
-        from ..ai_solver import build_capacities_from_config
+    site_config = site.config or {}
+    hint_assignments = (
+        _warm_start_hint_assignments(db, int(site_id), week_for_rows) if (workers and payload.warm_start) else None
+    )
+    eff_time, eff_num_alts = _clamp_generation_budget(
+        int(payload.time_limit_seconds or 12), int(payload.num_alternatives or 20), linked=False,
+    )
+    max_nights = _resolve_max_nights_per_worker(site.config, payload_value=payload.max_nights_per_worker)
 
-        days, shifts, stations = build_capacities_from_config(site.config or {})
-        return AIPlanningResponse(
-            days=days,
-            shifts=shifts,
-            stations=[st.get("name") for st in stations],
-            assignments={day: {sh: [[] for _ in stations] for sh in shifts} for day in days},
-            status="NO_WORKERS",
-            objective=0.0,
+    def _run(job: GenerationJob) -> dict:
+        if not workers:
+            # Return empty structure with days/shifts from config mapping
+            spec = site_scheduling_spec(site_config)
+            days, shifts, stations = spec.capacities()
+            return AIPlanningResponse(
+                days=days,
+                shifts=shifts,
+                stations=list(spec.station_names),
+                assignments={day: {sh: [[] for _ in stations] for sh in shifts} for day in days},
+                status="NO_WORKERS",
+                objective=0.0,
+            ).model_dump()
+        job.report("waiting-slot")
+        with _generation_slot_or_wait(
+            kind="single-sync",
+            director_id=int(director_id),
+            site_id=int(site_id),
+            linked=False,
+            generation_id=job.job_id,
+            wait_timeout_seconds=_generation_request_wait_timeout_seconds(),
+        ):
+            job.check_cancelled()
+            job.report("solving", time_limit_seconds=eff_time, num_alternatives=eff_num_alts)
+            result = solve_schedule(
+                site_config,
+                workers,
+                time_limit_seconds=eff_time,
+                max_nights_per_worker=max_nights,
+                num_alternatives=eff_num_alts,
+                fixed_assignments=payload.fixed_assignments or None,
+                exclude_days=(payload.exclude_days or None),
+                stats_key=solve_stats_key(int(site_id)),
+                solver_profile=payload.solver_profile,
+                hint_assignments=hint_assignments,
+                pulls=_pulls_model_spec(payload.pulls_limit) if payload.auto_pulls_enabled else None,
+            )
+        job.check_cancelled()
+        job.report("post-processing", status=result.get("status"))
+        base_pulls: dict = {}
+        alt_pulls: list[dict] = []
+        assignments_out = _enforce_role_requirements_on_assignments(
+            site_config,
+            result.get("assignments") if isinstance(result.get("assignments"), dict) else {},
+            rows,
         )
+        alternatives_out = [
+            _enforce_role_requirements_on_assignments(site_config, alt, rows)
+            for alt in (result.get("alternatives") or [])
+            if isinstance(alt, dict)
+        ]
+        if payload.auto_pulls_enabled:
+            # Les plans nettoyés ne sont pas modifiés (copie sur écriture) : pas de deepcopy.
+            job.check_cancelled()
+            pulled = _apply_auto_pulls_to_alternatives(
+                site,
+                rows,
+                [assignments_out, *alternatives_out],
+                pulls_limit=payload.pulls_limit,
+                pulls_prefer=payload.pulls_prefer,
+                pull_cells_by_candidate=[result.get("pull_cells")],
+            )
+            candidate_pairs: list[tuple[dict, dict]] = [
+                (candidate_assignments, candidate_pulls)
+                for candidate_assignments, candidate_pulls in pulled
+                if _matches_pulls_limit(candidate_pulls, payload.pulls_limit)
+            ]
+            if not candidate_pairs:
+                raise HTTPException(status_code=422, detail=_planning_limit_error_detail_for_request(pulls_limit=payload.pulls_limit))
+            if candidate_pairs:
+                candidate_pairs.sort(
+                    key=lambda pair: _single_site_candidate_sort_key(
+                        site, pair[0], week_for_rows, pair[1], payload.pulls_prefer,
+                    ),
+                )
+                assignments_out = candidate_pairs[0][0]
+                base_pulls = candidate_pairs[0][1]
+                alternatives_out = [assignments for assignments, _ in candidate_pairs[1:]]
+                alt_pulls = [pulls for _, pulls in candidate_pairs[1:]]
+        else:
+            ordered_candidates = [(assignments_out, {})] + [(alt, {}) for alt in alternatives_out]
+            ordered_candidates.sort(
+                key=lambda pair: _single_site_candidate_sort_key(
+                    site, pair[0], week_for_rows, pair[1], payload.pulls_prefer,
+                ),
+            )
+            assignments_out = ordered_candidates[0][0]
+            alternatives_out = [assignments for assignments, _ in ordered_candidates[1:]]
+        return AIPlanningResponse(
+            days=result["days"],
+            shifts=result["shifts"],
+            stations=result["stations"],
+            assignments=assignments_out,
+            alternatives=alternatives_out,
+            pulls=base_pulls,
+            alternative_pulls=alt_pulls,
+            status=result["status"],
+            objective=float(result.get("objective", 0.0)),
+        ).model_dump()
+
+    return _run
+
+
+@router.post("/{site_id}/ai-generate", response_model=AIPlanningResponse)
+async def ai_generate_planning(
+    site_id: int,
+    payload: AIPlanningRequest = Body(default=AIPlanningRequest()),
+    user: User = Depends(require_role("director")),
+    db: Session = Depends(get_db),
+):
+    # Même job que POST /ai-jobs, attendu ici : l'attente du solve n'occupe aucun thread du pool.
+    target = await asyncio.to_thread(_single_site_generation_job_target, db, int(user.id), int(site_id), payload)
+    job = submit_generation_job("single", int(user.id), int(site_id), target)
+    await job.wait_async()
+    return job.raise_for_status()
+
+
+@router.post("/{site_id}/ai-jobs", response_model=AIGenerationJobOut, status_code=202)
+async def create_ai_generation_job(
+    site_id: int,
+    payload: AIPlanningRequest = Body(default=AIPlanningRequest()),
+    user: User = Depends(require_role("director")),
+    db: Session = Depends(get_db),
+):
+    target = await asyncio.to_thread(_single_site_generation_job_target, db, int(user.id), int(site_id), payload)
+    return submit_generation_job("single", int(user.id), int(site_id), target).snapshot()
+
+
+def _director_generation_job_or_404(job_id: str, user: User) -> GenerationJob:
+    job = find_generation_job(job_id, int(user.id))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return job
+
+
+@router.get("/ai-jobs/{job_id}", response_model=AIGenerationJobOut)
+def get_ai_generation_job(
+    job_id: str,
+    user: User = Depends(require_role("director")),
+):
+    return _director_generation_job_or_404(job_id, user).snapshot()
+
+
+@router.get("/ai-jobs/{job_id}/stream")
+async def stream_ai_generation_job(
+    job_id: str,
+    request: Request,
+    user: User = Depends(require_role("director")),
+):
+    job = _director_generation_job_or_404(job_id, user)
+    _, last_seq = _parse_last_event_id(
+        request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    )
+    return StreamingResponse(
+        stream_generation_log(job.log, last_seq),
+        media_type="text/event-stream; charset=utf-8",
+        headers=AI_GENERATE_SSE_HEADERS,
+    )
+
+
+@router.delete("/ai-jobs/{job_id}", response_model=AIGenerationJobOut)
+def cancel_ai_generation_job(
+    job_id: str,
+    user: User = Depends(require_role("director")),
+):
+    job = _director_generation_job_or_404(job_id, user)
+    if job.cancel():
+        logger.info("[GENERATION][JOB] cancel requested job=%s director=%s", job.job_id, user.id)
+    return job.snapshot(include_result=False)
+
+
+@router.post("/{site_id}/ai-generate-weeks")
+async def ai_generate_multi_week_stream(
+    site_id: int,
+    payload: AIMultiWeekRequest,
+    user: User = Depends(require_role("director")),
+    db: Session = Depends(get_db),
+):
+    """Génère plusieurs semaines consécutives (SSE : un événement « week » par semaine, puis « done »)."""
+    site = db.get(Site, site_id)
+    if not site or site.director_id != user.id:
+        raise HTTPException(status_code=404, detail="Site introuvable")
+    start_week = _validate_week_iso(payload.start_week_iso)
+    week_isos = [start_week]
+    while len(week_isos) < int(payload.num_weeks):
+        week_isos.append(_next_week_iso(datetime.fromisoformat(week_isos[-1])))
+    generation_id = _new_generation_id()
+    slot_token = await asyncio.to_thread(
+        _acquire_generation_slot,
+        kind="multi-week",
+        director_id=int(user.id),
+        site_id=int(site_id),
+        linked=False,
+        generation_id=generation_id,
+        wait_timeout_seconds=_generation_request_wait_timeout_seconds(),
+    )
+    if slot_token is None:
+        raise HTTPException(status_code=429, detail=_generation_busy_detail(int(user.id)))
+    logger.info("[SSE][WEEKS] start generation=%s site=%s weeks=%s", generation_id, site_id, week_isos)
+    return StreamingResponse(
+        multi_week_generation_sse_stream(
+            MultiWeekGenerationStreamParams(
+                db=db,
+                site=site,
+                generation_id=generation_id,
+                slot_token=slot_token,
+                week_isos=week_isos,
+                auto_pulls_enabled=bool(payload.auto_pulls_enabled),
+                pulls_limit=payload.pulls_limit,
+                solver_profile=payload.solver_profile,
+                warm_start=bool(payload.warm_start),
+                director_id=int(user.id),
+            )
+        ),
+        media_type="text/event-stream; charset=utf-8",
+        headers=AI_GENERATE_SSE_HEADERS,
+    )
+
+
+@router.post("/{site_id}/ai-repair", response_model=AIRepairResponse)
+def ai_repair_planning(
+    site_id: int,
+    payload: AIRepairRequest,
+    user: User = Depends(require_role("director")),
+    db: Session = Depends(get_db),
+):
+    """Réparation incrémentale : seules les cases touchées (± rayon) sont re-planifiées."""
+    site = db.get(Site, site_id)
+    if not site or site.director_id != user.id:
+        raise HTTPException(status_code=404, detail="Site introuvable")
+    week_for_rows = _week_start_date(datetime.now()).date().isoformat()
+    if payload.week_iso:
+        try:
+            week_for_rows = _validate_week_iso(payload.week_iso)
+        except HTTPException:
+            pass
+    removed = {str(nm or "").strip() for nm in (payload.removed_workers or [])}
+    rows = [
+        row
+        for row in db.query(SiteWorker).filter(SiteWorker.site_id == site_id).all()
+        if not bool(getattr(row, "pending_approval", False))
+        and _site_worker_visible_for_week(row, week_for_rows)
+        and str(row.name or "").strip() not in removed
+    ]
+    workers = _build_solver_workers(rows, payload.weekly_availability or {}, week_iso=week_for_rows)
+    workers = _apply_site_event_locks_to_solver_workers(
+        db, site_id, week_for_rows, site.config or {}, workers
+    )
+    logger.info(
+        "[AI-REPAIR] site=%s week=%s unlocked=%d removed=%s workers=%d radius=%d",
+        site_id,
+        week_for_rows,
+        len(payload.unlocked_cells or []),
+        sorted(removed),
+        len(workers),
+        payload.radius_days,
+    )
     with _generation_slot_or_wait(
-        kind="single-sync",
+        kind="single-repair",
         director_id=int(user.id),
         site_id=int(site_id),
         linked=False,
         wait_timeout_seconds=_generation_request_wait_timeout_seconds(),
     ):
-        result = solve_schedule(
+        result = repair_schedule(
             site.config or {},
             workers,
-            time_limit_seconds=_clamp_generation_budget(int(payload.time_limit_seconds or 12), int(payload.num_alternatives or 20), linked=False)[0],
+            payload.assignments or {},
+            unlocked_cells=[(c.day, c.shift, c.station) for c in (payload.unlocked_cells or [])],
+            radius_days=payload.radius_days,
+            time_limit_seconds=payload.time_limit_seconds,
             max_nights_per_worker=_resolve_max_nights_per_worker(
                 site.config,
                 payload_value=payload.max_nights_per_worker,
             ),
-            num_alternatives=_clamp_generation_budget(int(payload.time_limit_seconds or 12), int(payload.num_alternatives or 20), linked=False)[1],
-            fixed_assignments=payload.fixed_assignments or None,
             exclude_days=(payload.exclude_days or None),
+            solver_profile=payload.solver_profile,
         )
-    base_pulls: dict = {}
-    alt_pulls: list[dict] = []
-    assignments_out = _enforce_role_requirements_on_assignments(
-        site.config or {},
-        result.get("assignments") if isinstance(result.get("assignments"), dict) else {},
-        rows,
-    )
-    alternatives_out = [
-        _enforce_role_requirements_on_assignments(site.config or {}, alt, rows)
-        for alt in (result.get("alternatives") or [])
-        if isinstance(alt, dict)
-    ]
-    if payload.auto_pulls_enabled:
-        base_candidate_assignments = _enforce_role_requirements_on_assignments(
-            site.config or {},
-            result.get("assignments") if isinstance(result.get("assignments"), dict) else {},
-            rows,
-        )
-        base_payload = _apply_auto_pulls_to_payload(
-            site,
-            rows,
-            {"assignments": deepcopy(base_candidate_assignments), "pulls": {}},
-            pulls_limit=payload.pulls_limit,
-            pulls_prefer=payload.pulls_prefer,
-        )
-        candidate_pairs: list[tuple[dict, dict]] = []
-        base_assignments = base_payload.get("assignments") or {}
-        base_pulls = base_payload.get("pulls") or {}
-        if _matches_pulls_limit(base_pulls, payload.pulls_limit):
-            candidate_pairs.append((base_assignments, base_pulls))
-        for alt in (result.get("alternatives") or []):
-            if not isinstance(alt, dict):
-                continue
-            alt_cleaned = _enforce_role_requirements_on_assignments(site.config or {}, alt, rows)
-            alt_payload = _apply_auto_pulls_to_payload(
-                site,
-                rows,
-                {"assignments": deepcopy(alt_cleaned), "pulls": {}},
-                pulls_limit=payload.pulls_limit,
-                pulls_prefer=payload.pulls_prefer,
-            )
-            current_alt_assignments = alt_payload.get("assignments") or {}
-            current_alt_pulls = alt_payload.get("pulls") or {}
-            if _matches_pulls_limit(current_alt_pulls, payload.pulls_limit):
-                candidate_pairs.append((current_alt_assignments, current_alt_pulls))
-        if not candidate_pairs:
-            raise HTTPException(status_code=422, detail=_planning_limit_error_detail_for_request(pulls_limit=payload.pulls_limit))
-        if candidate_pairs:
-            candidate_pairs.sort(
-                key=lambda pair: _single_site_candidate_sort_key(
-                    site, pair[0], week_for_rows, pair[1], payload.pulls_prefer,
-                ),
-            )
-            assignments_out = candidate_pairs[0][0]
-            base_pulls = candidate_pairs[0][1]
-            alternatives_out = [assignments for assignments, _ in candidate_pairs[1:]]
-            alt_pulls = [pulls for _, pulls in candidate_pairs[1:]]
-    else:
-        ordered_candidates = [(assignments_out, {})] + [(alt, {}) for alt in alternatives_out]
-        ordered_candidates.sort(
-            key=lambda pair: _single_site_candidate_sort_key(
-                site, pair[0], week_for_rows, pair[1], payload.pulls_prefer,
-            ),
-        )
-        assignments_out = ordered_candidates[0][0]
-        alternatives_out = [assignments for assignments, _ in ordered_candidates[1:]]
-    return AIPlanningResponse(
+    return AIRepairResponse(
         days=result["days"],
         shifts=result["shifts"],
         stations=result["stations"],
-        assignments=assignments_out,
-        alternatives=alternatives_out,
-        pulls=base_pulls,
-        alternative_pulls=alt_pulls,
+        assignments=result["assignments"],
+        changed_cells=[AIRepairCell(day=d, shift=sh, station=t) for d, sh, t in result["changed_cells"]],
+        full_week=bool(result.get("full_week")),
         status=result["status"],
         objective=float(result.get("objective", 0.0)),
     )
@@ -485,13 +709,27 @@ async def ai_generate_stream(
     q_time_limit_seconds: int | None = Query(default=None, alias="time_limit_seconds"),
     q_max_nights_per_worker: int | None = Query(default=None, alias="max_nights_per_worker"),
     q_num_alternatives: int | None = Query(default=None, alias="num_alternatives"),
+    q_solver_profile: str | None = Query(default=None, alias="solver_profile"),
+    q_stream_encoding: str | None = Query(default=None, alias="stream_encoding"),
     user: User = Depends(require_role("director")),
     db: Session = Depends(get_db),
 ):
     payload = await parse_single_stream_payload(request, AIPlanningRequest())
+    if _solver_profile_from_query(q_solver_profile):
+        payload.solver_profile = _solver_profile_from_query(q_solver_profile)
+    if q_stream_encoding in ("full", "delta"):
+        payload.stream_encoding = q_stream_encoding
     site = db.get(Site, site_id)
     if not site or site.director_id != user.id:
         raise HTTPException(status_code=404, detail="Site introuvable")
+    resumed = _resumable_generation_log(request, int(user.id), int(site_id))
+    if resumed is not None:
+        # Reconnexion : on se rattache à la génération en cours, sans relancer le solveur.
+        return StreamingResponse(
+            stream_generation_log(*resumed),
+            media_type="text/event-stream; charset=utf-8",
+            headers=AI_GENERATE_SSE_HEADERS,
+        )
     week_for_rows = _week_start_date(datetime.now()).date().isoformat()
     if payload and getattr(payload, "week_iso", None):
         try:
@@ -565,6 +803,10 @@ async def ai_generate_stream(
         payload=payload,
         workers=workers,
         rows=rows,
+        hint_assignments=(
+            _warm_start_hint_assignments(db, int(site_id), week_for_rows) if payload.warm_start else None
+        ),
+        director_id=int(user.id),
     )
     return StreamingResponse(
         single_generation_sse_stream(stream_params),
@@ -8,23 +8,33 @@ import logging
 import queue
 import threading
 import time
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import Any, AsyncIterator, Callable
 
 from sqlalchemy.orm import Session
 
 from ..ai_solver import solve_schedule_stream
+from ..ai_solver_hierarchical import solve_schedule_hierarchical_stream, use_hierarchical_solve
 from ..models import Site
 from ..schemas import AIPlanningRequest
 from .week_utils import _now_ms
 from .generation_slots import _release_generation_slot
+from .generation_streams import (
+    GenerationEventLog,
+    _register_generation_log,
+    stream_generation_log,
+)
+from .sse_delta import SseDeltaEncoder
+from .postprocess_pipeline import OrderedPostprocessStage
 from .solver_bridge import (
     _log_single_site_generation_worker_totals,
     _log_linked_generation_worker_totals,
 )
 from .pulls import (
-    _apply_auto_pulls_to_payload,
+    _apply_pulls_with_context,
+    _compile_pull_context,
+    _linked_pulls_model_spec,
+    _pulls_model_spec,
     _enforce_role_requirements_on_assignments,
     _apply_auto_pulls_to_site_plans,
     _enforce_role_requirements_on_site_plans,
@@ -37,8 +47,10 @@ from .linked_sites import (
     _enforce_linked_global_caps_on_site_plans,
     _split_multi_site_assignments,
 )
+from .linked_caps import _compile_linked_cap_roster
 from .auto_planning import (
     _clamp_generation_budget,
+    _generate_director_multi_week_plan_payloads,
     _single_site_candidate_sort_key,
     _should_hold_plan_until_pull_target,
 )
@@ -132,6 +144,7 @@ class LinkedGenerationStreamParams:
     context: dict
     linked_sites: list
     week_iso: str
+    director_id: int | None = None
 
 
 @dataclass
@@ -147,6 +160,8 @@ class SingleGenerationStreamParams:
     payload: AIPlanningRequest
     workers: list
     rows: list
+    hint_assignments: dict | None = None
+    director_id: int | None = None
 
 
 def _make_release_slot(slot_token) -> tuple[Callable[[], None], Callable[[], bool]]:
@@ -164,34 +179,7 @@ def _make_release_slot(slot_token) -> tuple[Callable[[], None], Callable[[], boo
     return _release_slot_once, _is_released
 
 
-async def _iter_sse_from_queue(
-    q: "queue.Queue[dict | None]",
-    *,
-    stop_event: threading.Event | None = None,
-    release_slot: Callable[[], None] | None = None,
-    on_item: Callable[[dict], None] | None = None,
-) -> AsyncIterator[str]:
-    try:
-        while True:
-            item = await asyncio.to_thread(q.get)
-            if item is None:
-                break
-            try:
-                if on_item is not None:
-                    on_item(item)
-                chunk = f"data: {json.dumps(item, ensure_ascii=False)}\n\n"
-                yield chunk
-            finally:
-                await asyncio.sleep(0)
-    finally:
-        if stop_event is not None:
-            stop_event.set()
-        if release_slot is not None:
-            release_slot()
-
-
-
-def _run_linked_stream_producer(params: LinkedGenerationStreamParams, q: "queue.Queue[dict | None]", stop_event: threading.Event, release_slot: Callable[[], None]) -> None:
+def _run_linked_stream_producer(params: LinkedGenerationStreamParams, q: GenerationEventLog, stop_event: threading.Event, release_slot: Callable[[], None]) -> None:
     db = params.db
     site_id = params.site_id
     generation_id = params.generation_id
@@ -205,6 +193,7 @@ def _run_linked_stream_producer(params: LinkedGenerationStreamParams, q: "queue.
     linked_sites = params.linked_sites
     week_iso = params.week_iso
     workers_by_site = context.get("workers_by_site")
+    cap_roster = _compile_linked_cap_roster(context["connected_site_ids"], week_iso, workers_by_site or {})
 
     matched_candidates = 0
     dropped_alternatives = 0
@@ -218,6 +207,8 @@ def _run_linked_stream_producer(params: LinkedGenerationStreamParams, q: "queue.
         linked=True,
     )[1]
 
+    delta_encoder = SseDeltaEncoder() if getattr(payload, "stream_encoding", "full") == "delta" else None
+
     def _enqueue(item: dict | None, *, drop_if_full: bool = False) -> None:
         nonlocal dropped_alternatives
         if item is None:
@@ -226,6 +217,8 @@ def _run_linked_stream_producer(params: LinkedGenerationStreamParams, q: "queue.
         payload = dict(item)
         payload.setdefault("generation_id", generation_id)
         payload.setdefault("generated_at_ms", _now_ms())
+        if delta_encoder is not None:
+            payload = delta_encoder.encode(payload)
         if drop_if_full:
             try:
                 q.put(payload, timeout=0.05)
@@ -253,10 +246,207 @@ def _run_linked_stream_producer(params: LinkedGenerationStreamParams, q: "queue.
             }
         return summary
 
+    def _postprocess_candidate(item: dict) -> dict | None:
+        """Étage parallèle : split par site, rôles, plafonds globaux, משיכות, signature (sans état partagé)."""
+        item_type = item.get("type")
+        if item_type not in {"base", "alternative"}:
+            return None
+        split_site_plans = _split_multi_site_assignments(
+            context,
+            item.get("assignments") if isinstance(item.get("assignments"), dict) else {},
+            status="STREAMING" if item_type == "base" else None,
+            objective=0,
+        )
+        split_site_plans = _enforce_role_requirements_on_site_plans(
+            db,
+            context["sites_by_id"],
+            split_site_plans,
+            workers_by_site=workers_by_site,
+        )
+        split_site_plans = _enforce_linked_global_caps_on_site_plans(
+            db,
+            context["connected_site_ids"],
+            week_iso,
+            split_site_plans,
+            workers_by_site=workers_by_site,
+            cap_roster=cap_roster,
+        )
+        if payload and payload.auto_pulls_enabled:
+            split_site_plans = _apply_auto_pulls_to_site_plans(
+                db,
+                context["sites_by_id"],
+                split_site_plans,
+                pulls_limit=eff_pulls_limit,
+                pulls_limits_by_site=eff_pulls_limits_by_site or None,
+                pulls_prefer=payload.pulls_prefer if payload else None,
+                workers_by_site=workers_by_site,
+            )
+            split_site_plans = _enforce_linked_global_caps_on_site_plans(
+                db,
+                context["connected_site_ids"],
+                week_iso,
+                split_site_plans,
+                workers_by_site=workers_by_site,
+                cap_roster=cap_roster,
+            )
+        try:
+            sig = json.dumps(split_site_plans, ensure_ascii=False, sort_keys=True)
+        except Exception:
+            sig = ""
+        return {
+            "site_plans": split_site_plans,
+            "pulls_summary": _pulls_debug_summary(split_site_plans),
+            "signature": sig,
+        }
+
+    def _consume_candidate(item: dict, processed: dict | None) -> bool:
+        """Sur le thread producteur, dans l'ordre du solveur : filtre, dédoublonne, émet. True = objectif atteint."""
+        nonlocal matched_candidates, rejected_candidates, kept_alternatives_count, base_sent
+        item_type = item.get("type")
+        if processed is None:
+            if item_type != "done":
+                enriched = dict(item)
+                enriched["linked_sites"] = linked_sites
+                _enqueue(enriched, drop_if_full=False)
+            return False
+        split_site_plans = processed["site_plans"]
+        pulls_summary = processed["pulls_summary"]
+        if payload and payload.auto_pulls_enabled:
+            if not split_site_plans:
+                rejected_candidates += 1
+                _enqueue({
+                    "type": "pulls_debug",
+                    "item_type": item_type,
+                    "item_index": item.get("index"),
+                    "accepted": False,
+                    "reason": "empty_site_plans",
+                    "linked": True,
+                    "requested_pulls": eff_pulls_limit,
+                    "pulls_limits_by_site": eff_pulls_limits_by_site or None,
+                    "pulls_summary": {},
+                }, drop_if_full=True)
+                logger.warning(
+                    "[PULLS][LINKED_STREAM][REJECT_EMPTY] generation=%s attempt=%s type=%s item_index=%s",
+                    generation_id,
+                    attempts,
+                    item_type,
+                    item.get("index"),
+                )
+                return False
+            plans = list(split_site_plans.items())
+            pulls_limit_matches = bool(plans) and all(
+                _site_pulls_limit_matches(
+                    int(site_key),
+                    site_plan.get("pulls") if isinstance(site_plan.get("pulls"), dict) else {},
+                    default_pulls_limit=eff_pulls_limit,
+                    pulls_limits_by_site=eff_pulls_limits_by_site or None,
+                )
+                for site_key, site_plan in plans
+            )
+            if not pulls_limit_matches:
+                rejected_candidates += 1
+                _enqueue({
+                    "type": "pulls_debug",
+                    "item_type": item_type,
+                    "item_index": item.get("index"),
+                    "accepted": False,
+                    "reason": "pulls_count_mismatch",
+                    "linked": True,
+                    "requested_pulls": eff_pulls_limit,
+                    "pulls_limits_by_site": eff_pulls_limits_by_site or None,
+                    "pulls_summary": pulls_summary,
+                }, drop_if_full=True)
+                logger.warning(
+                    "[PULLS][LINKED_STREAM][REJECT_PULL_COUNT] generation=%s attempt=%s type=%s item_index=%s "
+                    "requested=%s by_site=%s summary=%s",
+                    generation_id,
+                    attempts,
+                    item_type,
+                    item.get("index"),
+                    eff_pulls_limit,
+                    eff_pulls_limits_by_site or None,
+                    pulls_summary,
+                )
+                return False
+            matched_candidates += 1
+            logger.warning(
+                "[PULLS][LINKED_STREAM][ACCEPT_PULL_COUNT] generation=%s attempt=%s type=%s item_index=%s "
+                "matched=%s kept=%s summary=%s",
+                generation_id,
+                attempts,
+                item_type,
+                item.get("index"),
+                matched_candidates,
+                kept_alternatives_count,
+                pulls_summary,
+            )
+        elif payload and payload.auto_pulls_enabled:
+            logger.warning(
+                "[PULLS][LINKED_STREAM][CANDIDATE_UNLIMITED] generation=%s attempt=%s type=%s item_index=%s summary=%s",
+                generation_id,
+                attempts,
+                item_type,
+                item.get("index"),
+                pulls_summary,
+            )
+
+        if item_type == "base":
+            _log_linked_generation_worker_totals(
+                generation_id=generation_id,
+                site_id=int(site_id),
+                item_type="base",
+                item_index=None,
+                site_plans=split_site_plans,
+                context=context,
+            )
+            if not base_sent:
+                _enqueue({
+                    "type": "base",
+                    "source": item.get("source"),
+                    "linked_sites": linked_sites,
+                    "site_plans": split_site_plans,
+                })
+                base_sent = True
+                return False
+            item_type = "alternative"
+
+        sig = processed["signature"]
+        if sig and sig in kept_alternative_signatures:
+            return False
+        if sig:
+            kept_alternative_signatures.add(sig)
+        kept_alternatives_count += 1
+        _log_linked_generation_worker_totals(
+            generation_id=generation_id,
+            site_id=int(site_id),
+            item_type="alternative",
+            item_index=kept_alternatives_count,
+            site_plans=split_site_plans,
+            context=context,
+        )
+        _enqueue({
+            "type": "alternative",
+            "index": kept_alternatives_count,
+            "source": item.get("source"),
+            "linked_sites": linked_sites,
+            "site_plans": split_site_plans,
+        }, drop_if_full=False)
+        return kept_alternatives_count >= target_kept_alternatives
+
+    attempts = 0
+    base_sent = False
+    linked_pulls_spec = (
+        _linked_pulls_model_spec(context["station_map"], eff_pulls_limit, eff_pulls_limits_by_site or None)
+        if payload and payload.auto_pulls_enabled
+        else None
+    )
+    stage: OrderedPostprocessStage[dict, dict | None] = OrderedPostprocessStage(
+        _postprocess_candidate, name="linked-postprocess",
+    )
+    # Très grand groupe : résolution par site (une seule tentative, les משיכות restent en post-traitement).
+    hierarchical = use_hierarchical_solve(context["combined_config"], payload.exclude_days or None)
     try:
         deadline_monotonic = time.monotonic() + max(1, int(eff_time))
-        attempts = 0
-        base_sent = False
         logger.warning(
             "[PULLS][LINKED_STREAM][PRODUCER_START] generation=%s target_alternatives=%s search_num_alts=%s",
             generation_id,
@@ -282,197 +472,54 @@ def _run_linked_stream_producer(params: LinkedGenerationStreamParams, q: "queue.
                 linked=True,
             )[1]
 
-            gen = solve_schedule_stream(
-                context["combined_config"],
-                context["combined_workers"],
-                time_limit_seconds=attempt_time,
-                max_nights_per_worker=eff_max_nights,
-                num_alternatives=attempt_search_num_alts,
-                fixed_assignments=context["combined_fixed"],
-                exclude_days=(payload.exclude_days or None),
-                random_seed=attempt_random_seed,
-            )
+            if hierarchical:
+                gen = solve_schedule_hierarchical_stream(
+                    context["combined_config"],
+                    context["combined_workers"],
+                    time_limit_seconds=attempt_time,
+                    max_nights_per_worker=eff_max_nights,
+                    num_alternatives=attempt_search_num_alts,
+                    fixed_assignments=context["combined_fixed"],
+                    exclude_days=(payload.exclude_days or None),
+                    solver_profile=payload.solver_profile,
+                    stop_event=stop_event,
+                )
+            else:
+                gen = solve_schedule_stream(
+                    context["combined_config"],
+                    context["combined_workers"],
+                    time_limit_seconds=attempt_time,
+                    max_nights_per_worker=eff_max_nights,
+                    num_alternatives=attempt_search_num_alts,
+                    fixed_assignments=context["combined_fixed"],
+                    exclude_days=(payload.exclude_days or None),
+                    random_seed=attempt_random_seed,
+                    solver_profile=payload.solver_profile,
+                    pulls=linked_pulls_spec,
+                )
+            reached_target = False
             for item in gen:
                 if stop_event.is_set():
                     logger.warning("[PULLS][LINKED_STREAM][CLIENT_STOP] generation=%s attempt=%s", generation_id, attempts)
                     break
-                item_type = item.get("type")
-                if item_type in {"base", "alternative"}:
-                    split_site_plans = _split_multi_site_assignments(
-                        context,
-                        item.get("assignments") if isinstance(item.get("assignments"), dict) else {},
-                        status="STREAMING" if item_type == "base" else None,
-                        objective=0,
-                    )
-                    split_site_plans = _enforce_role_requirements_on_site_plans(
-                        db,
-                        context["sites_by_id"],
-                        split_site_plans,
-                        workers_by_site=workers_by_site,
-                    )
-                    split_site_plans = _enforce_linked_global_caps_on_site_plans(
-                        db,
-                        context["connected_site_ids"],
-                        week_iso,
-                        split_site_plans,
-                        workers_by_site=workers_by_site,
-                    )
-                    if payload and payload.auto_pulls_enabled:
-                        split_site_plans = _apply_auto_pulls_to_site_plans(
-                            db,
-                            context["sites_by_id"],
-                            split_site_plans,
-                            pulls_limit=eff_pulls_limit,
-                            pulls_limits_by_site=eff_pulls_limits_by_site or None,
-                            pulls_prefer=payload.pulls_prefer if payload else None,
-                            workers_by_site=workers_by_site,
-                        )
-                        split_site_plans = _enforce_linked_global_caps_on_site_plans(
-                            db,
-                            context["connected_site_ids"],
-                            week_iso,
-                            split_site_plans,
-                            workers_by_site=workers_by_site,
-                        )
-                    pulls_summary = _pulls_debug_summary(split_site_plans)
-                    if payload and payload.auto_pulls_enabled:
-                        if not split_site_plans:
-                            rejected_candidates += 1
-                            _enqueue({
-                                "type": "pulls_debug",
-                                "item_type": item_type,
-                                "item_index": item.get("index"),
-                                "accepted": False,
-                                "reason": "empty_site_plans",
-                                "linked": True,
-                                "requested_pulls": eff_pulls_limit,
-                                "pulls_limits_by_site": eff_pulls_limits_by_site or None,
-                                "pulls_summary": {},
-                            }, drop_if_full=True)
-                            logger.warning(
-                                "[PULLS][LINKED_STREAM][REJECT_EMPTY] generation=%s attempt=%s type=%s item_index=%s",
-                                generation_id,
-                                attempts,
-                                item_type,
-                                item.get("index"),
-                            )
-                            continue
-                        plans = list(split_site_plans.items())
-                        pulls_limit_matches = bool(plans) and all(
-                            _site_pulls_limit_matches(
-                                int(site_key),
-                                site_plan.get("pulls") if isinstance(site_plan.get("pulls"), dict) else {},
-                                default_pulls_limit=eff_pulls_limit,
-                                pulls_limits_by_site=eff_pulls_limits_by_site or None,
-                            )
-                            for site_key, site_plan in plans
-                        )
-                        if not pulls_limit_matches:
-                            rejected_candidates += 1
-                            _enqueue({
-                                "type": "pulls_debug",
-                                "item_type": item_type,
-                                "item_index": item.get("index"),
-                                "accepted": False,
-                                "reason": "pulls_count_mismatch",
-                                "linked": True,
-                                "requested_pulls": eff_pulls_limit,
-                                "pulls_limits_by_site": eff_pulls_limits_by_site or None,
-                                "pulls_summary": pulls_summary,
-                            }, drop_if_full=True)
-                            logger.warning(
-                                "[PULLS][LINKED_STREAM][REJECT_PULL_COUNT] generation=%s attempt=%s type=%s item_index=%s "
-                                "requested=%s by_site=%s summary=%s",
-                                generation_id,
-                                attempts,
-                                item_type,
-                                item.get("index"),
-                                eff_pulls_limit,
-                                eff_pulls_limits_by_site or None,
-                                pulls_summary,
-                            )
-                            continue
-                        matched_candidates += 1
-                        logger.warning(
-                            "[PULLS][LINKED_STREAM][ACCEPT_PULL_COUNT] generation=%s attempt=%s type=%s item_index=%s "
-                            "matched=%s kept=%s summary=%s",
-                            generation_id,
-                            attempts,
-                            item_type,
-                            item.get("index"),
-                            matched_candidates,
-                            kept_alternatives_count,
-                            pulls_summary,
-                        )
-                    elif payload and payload.auto_pulls_enabled:
-                        logger.warning(
-                            "[PULLS][LINKED_STREAM][CANDIDATE_UNLIMITED] generation=%s attempt=%s type=%s item_index=%s summary=%s",
-                            generation_id,
-                            attempts,
-                            item_type,
-                            item.get("index"),
-                            pulls_summary,
-                        )
-
-                    if item_type == "base":
-                        _log_linked_generation_worker_totals(
-                            generation_id=generation_id,
-                            site_id=int(site_id),
-                            item_type="base",
-                            item_index=None,
-                            site_plans=split_site_plans,
-                            context=context,
-                        )
-                        if not base_sent:
-                            _enqueue({
-                                "type": "base",
-                                "source": item.get("source"),
-                                "linked_sites": linked_sites,
-                                "site_plans": split_site_plans,
-                            })
-                            base_sent = True
-                            continue
-                        item_type = "alternative"
-
-                    try:
-                        sig = json.dumps(split_site_plans, ensure_ascii=False, sort_keys=True)
-                    except Exception:
-                        sig = ""
-                    if sig and sig in kept_alternative_signatures:
-                        continue
-                    if sig:
-                        kept_alternative_signatures.add(sig)
-                    kept_alternatives_count += 1
-                    _log_linked_generation_worker_totals(
-                        generation_id=generation_id,
-                        site_id=int(site_id),
-                        item_type="alternative",
-                        item_index=kept_alternatives_count,
-                        site_plans=split_site_plans,
-                        context=context,
-                    )
-                    _enqueue({
-                        "type": "alternative",
-                        "index": kept_alternatives_count,
-                        "source": item.get("source"),
-                        "linked_sites": linked_sites,
-                        "site_plans": split_site_plans,
-                    }, drop_if_full=False)
-                    if kept_alternatives_count >= target_kept_alternatives:
+                for ready_item, processed in stage.push(item):
+                    if _consume_candidate(ready_item, processed):
+                        reached_target = True
                         break
-                    continue
-
-                if item_type == "done":
-                    continue
-
-                enriched = dict(item)
-                enriched["linked_sites"] = linked_sites
-                _enqueue(enriched, drop_if_full=False)
+                if reached_target:
+                    break
+            if not reached_target and not stop_event.is_set():
+                for ready_item, processed in stage.drain():
+                    if _consume_candidate(ready_item, processed):
+                        break
+            stage.discard()
 
             if stop_event.is_set():
                 break
             if kept_alternatives_count >= target_kept_alternatives:
                 break
+            if hierarchical:
+                break
 
         if not stop_event.is_set() and payload and payload.auto_pulls_enabled and matched_candidates == 0:
             logger.warning(
@@ -513,10 +560,86 @@ def _run_linked_stream_producer(params: LinkedGenerationStreamParams, q: "queue.
                 "detail": f"{dropped_alternatives} alternatives SSE skipped because the client was too slow.",
                 "linked_sites": linked_sites,
             })
+        stage.close()
         _enqueue(None)
         release_slot()
 
-def _run_single_stream_producer(params: SingleGenerationStreamParams, q: "queue.Queue[dict | None]", release_slot: Callable[[], None]) -> None:
+@dataclass
+class MultiWeekGenerationStreamParams:
+    db: Session
+    site: Site
+    generation_id: str
+    slot_token: Any
+    week_isos: list[str]
+    auto_pulls_enabled: bool
+    pulls_limit: int | None
+    solver_profile: str | None
+    warm_start: bool = True
+    director_id: int | None = None
+
+
+def _run_multi_week_stream_producer(
+    params: MultiWeekGenerationStreamParams,
+    q: GenerationEventLog,
+    stop_event: threading.Event,
+    release_slot: Callable[[], None],
+) -> None:
+    def _enqueue(item: dict | None) -> None:
+        if item is not None:
+            item = {**item, "generation_id": params.generation_id, "generated_at_ms": _now_ms()}
+        q.put(item)
+
+    sent = 0
+    try:
+        for week_iso, plan in _generate_director_multi_week_plan_payloads(
+            params.db,
+            params.site,
+            params.week_isos,
+            auto_pulls_enabled=params.auto_pulls_enabled,
+            pulls_limit=params.pulls_limit,
+            solver_profile=params.solver_profile,
+            warm_start=params.warm_start,
+        ):
+            if stop_event.is_set():
+                break
+            _enqueue({"type": "week", "index": sent, "week_iso": week_iso, "plan": plan})
+            sent += 1
+        _enqueue({"type": "done", "weeks": sent})
+    except Exception as e:  # met l'erreur dans le flux
+        logger.exception("[SSE][WEEKS] generation=%s failed", params.generation_id)
+        _enqueue({"type": "status", "status": "ERROR", "detail": str(e)})
+    finally:
+        _enqueue(None)
+        release_slot()
+
+
+async def multi_week_generation_sse_stream(params: MultiWeekGenerationStreamParams) -> AsyncIterator[str]:
+    release_slot, _ = _make_release_slot(params.slot_token)
+    log = GenerationEventLog(
+        params.generation_id,
+        director_id=params.director_id,
+        site_id=int(params.site.id),
+        maxsize=64,
+        release_slot=release_slot,
+    )
+    _register_generation_log(log)
+
+    threading.Thread(
+        target=_run_multi_week_stream_producer,
+        args=(params, log, log.stop_event, release_slot),
+        daemon=True,
+    ).start()
+
+    async for chunk in stream_generation_log(log):
+        yield chunk
+
+
+def _run_single_stream_producer(
+    params: SingleGenerationStreamParams,
+    q: GenerationEventLog,
+    stop_event: threading.Event,
+    release_slot: Callable[[], None],
+) -> None:
     site = params.site
     site_id = params.site_id
     generation_id = params.generation_id
@@ -540,6 +663,8 @@ def _run_single_stream_producer(params: SingleGenerationStreamParams, q: "queue.
         linked=False,
     )[1]
 
+    delta_encoder = SseDeltaEncoder() if getattr(payload, "stream_encoding", "full") == "delta" else None
+
     def _enqueue(item: dict | None, *, drop_if_full: bool = False) -> None:
         nonlocal dropped_alternatives
         if item is None:
@@ -548,6 +673,8 @@ def _run_single_stream_producer(params: SingleGenerationStreamParams, q: "queue.
         payload = dict(item)
         payload.setdefault("generation_id", generation_id)
         payload.setdefault("generated_at_ms", _now_ms())
+        if delta_encoder is not None:
+            payload = delta_encoder.encode(payload)
         if drop_if_full:
             try:
                 q.put(payload, timeout=0.05)
@@ -630,8 +757,13 @@ def _run_single_stream_producer(params: SingleGenerationStreamParams, q: "queue.
             eff_pulls_limit,
             bool(payload.auto_pulls_enabled),
         )
+        # Contexte de משיכות compilé une fois pour toutes les tentatives / alternatives du flux.
+        pull_context = _compile_pull_context(site, rows, payload.pulls_prefer) if payload.auto_pulls_enabled else None
 
         while kept_alternatives_count < target_kept_alternatives:
+            if stop_event.is_set():
+                logger.warning("[SSE][SINGLE_STREAM][CLIENT_STOP] generation=%s attempt=%s", generation_id, attempts)
+                break
             remaining_seconds = deadline_monotonic - time.monotonic()
             if remaining_seconds <= 0:
                 break
@@ -654,22 +786,25 @@ def _run_single_stream_producer(params: SingleGenerationStreamParams, q: "queue.
                 fixed_assignments=payload.fixed_assignments or None,
                 exclude_days=(payload.exclude_days or None),
                 random_seed=attempt_random_seed,
+                solver_profile=payload.solver_profile,
+                hint_assignments=params.hint_assignments,
+                pulls=_pulls_model_spec(eff_pulls_limit) if payload.auto_pulls_enabled else None,
             )
             for item in gen:
+                if stop_event.is_set():
+                    break
                 if item.get("type") in {"base", "alternative"} and payload.auto_pulls_enabled:
                     cleaned_assignments = _enforce_role_requirements_on_assignments(
                         site.config or {},
                         item.get("assignments") if isinstance(item.get("assignments"), dict) else {},
                         rows,
                     )
-                    transformed = _apply_auto_pulls_to_payload(
-                        site,
-                        rows,
-                        {"assignments": deepcopy(cleaned_assignments), "pulls": {}},
+                    transformed_assignments, transformed_pulls = _apply_pulls_with_context(
+                        pull_context,
+                        cleaned_assignments,
                         pulls_limit=eff_pulls_limit,
-                        pulls_prefer=payload.pulls_prefer,
+                        pull_cells=item.get("pull_cells"),
                     )
-                    transformed_pulls = transformed.get("pulls") if isinstance(transformed.get("pulls"), dict) else {}
                     transformed_pulls_count = _pulls_count(transformed_pulls)
                     if not _matches_pulls_limit(
                         transformed_pulls,
@@ -702,7 +837,7 @@ def _run_single_stream_producer(params: SingleGenerationStreamParams, q: "queue.
                         )
                         continue
                     enriched = dict(item)
-                    enriched["assignments"] = transformed.get("assignments") or {}
+                    enriched["assignments"] = transformed_assignments
                     enriched["pulls"] = transformed_pulls
                     matched_candidates += 1
                     logger.warning(
@@ -806,17 +941,23 @@ def _run_single_stream_producer(params: SingleGenerationStreamParams, q: "queue.
 
 
 async def linked_generation_sse_stream(params: LinkedGenerationStreamParams) -> AsyncIterator[str]:
-    q: "queue.Queue[dict | None]" = queue.Queue(maxsize=1024)
-    stop_event = threading.Event()
     release_slot, _ = _make_release_slot(params.slot_token)
+    log = GenerationEventLog(
+        params.generation_id,
+        director_id=params.director_id,
+        site_id=params.site_id,
+        maxsize=1024,
+        release_slot=release_slot,
+    )
+    _register_generation_log(log)
 
     threading.Thread(
         target=_run_linked_stream_producer,
-        args=(params, q, stop_event, release_slot),
+        args=(params, log, log.stop_event, release_slot),
         daemon=True,
     ).start()
 
-    async for chunk in _iter_sse_from_queue(q, stop_event=stop_event, release_slot=release_slot):
+    async for chunk in stream_generation_log(log):
         yield chunk
 
 
@@ -837,14 +978,21 @@ def _log_single_sse_item(item: dict) -> None:
 
 
 async def single_generation_sse_stream(params: SingleGenerationStreamParams) -> AsyncIterator[str]:
-    q: "queue.Queue[dict | None]" = queue.Queue(maxsize=256)
     release_slot, _ = _make_release_slot(params.slot_token)
+    log = GenerationEventLog(
+        params.generation_id,
+        director_id=params.director_id,
+        site_id=params.site_id,
+        maxsize=256,
+        release_slot=release_slot,
+    )
+    _register_generation_log(log)
 
     threading.Thread(
         target=_run_single_stream_producer,
-        args=(params, q, release_slot),
+        args=(params, log, log.stop_event, release_slot),
         daemon=True,
     ).start()
 
-    async for chunk in _iter_sse_from_queue(q, release_slot=release_slot, on_item=_log_single_sse_item):
+    async for chunk in stream_generation_log(log, on_item=_log_single_sse_item):
         yield chunk
@@ -5,7 +5,7 @@ from starlette.requests import Request
 from fastapi.responses import StreamingResponse
 import asyncio
 from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.orm.attributes import flag_modified
 import re
 import os
@@ -14,23 +14,32 @@ import time
 from datetime import datetime, timedelta
 from copy import deepcopy
 from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable
 import logging
+import math
 import secrets
 
 from ..deps import require_role, get_db
 from ..models import (
     Site, SiteAssignment, SiteWorker, SiteMessage, SiteEvent,
     SiteWeeklyAvailability, SiteWeekPlan, User, UserRole, DirectorAutoPlanningConfig,
+    AutoPlanningRun,
 )
 from ..schemas import (
     SiteCreate, SiteOut, NextWeekSavedPlanStatus, SiteUpdate,
     WorkerCreate, WorkerUpdate, WorkerOut, AIPlanningRequest, AIPlanningResponse,
     UserOut, CreateWorkerUserRequest, WeeklyAvailabilityPayload, WeekPlanPayload,
-    AutoPlanningConfigPayload, AutoPlanningConfigOut, SiteMessageCreate,
+    AutoPlanningConfigPayload, AutoPlanningConfigOut, AutoPlanningRunOut,
+    AutoPlanningQueueOut, AutoPlanningRunsOut, SiteMessageCreate,
     SiteMessageUpdate, SiteMessageOut, SiteEventCreate, SiteEventUpdate,
     SiteEventOut, WorkerInviteLinkOut,
 )
-from ..ai_solver import solve_schedule, solve_schedule_stream
+from ..ai_solver import solve_schedule, solve_schedule_stream, solve_schedule_weeks
+from ..ai_solver_utils import SOLVER_PROFILES
+from ..scheduling_spec import site_scheduling_spec
+from ..solve_stats import predict_time_budget, solve_stats_key
 from ..auth import create_worker_invite_token, ensure_director_code
 
 from .ownership import _director_site_or_404, _director_site_ownership_or_404
@@ -47,6 +56,7 @@ from .generation_slots import (
     _generation_busy_detail, _is_generation_busy_error,
     _acquire_generation_slot, _release_generation_slot,
     _preempt_director_generation_slots, _generation_slot_or_wait,
+    _GENERATION_CONCURRENCY_LIMIT,
 )
 
 logger = logging.getLogger("ai_solver")
@@ -58,7 +68,7 @@ from .solver_bridge import (
 from .pulls import (
     _apply_auto_pulls_to_payload, _enforce_role_requirements_on_assignments,
     _normalize_pulls_limits_by_site, _apply_auto_pulls_to_site_plans,
-    _load_workers_by_site,
+    _load_workers_by_site, _pulls_model_spec, _apply_auto_pulls_to_alternatives,
     _effective_auto_pulls_limit_for_site, _count_split_day_same_worker_patterns,
     _pulls_count, _preferred_pulls_count, _matches_pulls_limit, _sanitize_pulls_map,
 )
@@ -68,8 +78,22 @@ from .linked_sites import (
     _active_director_site_ids, _build_multi_site_generation_context,
     _split_multi_site_assignments, _enforce_linked_global_caps_on_site_payloads,
 )
+from .linked_caps import _compile_linked_cap_roster
 from .events import _apply_site_event_locks_to_solver_workers
-from .week_plans import _save_site_week_plan, _preferred_week_plan
+from .week_plans import (
+    _preferred_week_plan,
+    _previous_week_saved_plan,
+    _save_site_week_plan,
+    _warm_start_hint_assignments,
+)
+from .generation_jobs import JOB_CANCELLED, JOB_DONE, JOB_ERROR, GenerationJob, submit_generation_job
+from .scheduler_lease import LeaseFence, SchedulerLeaseLost, wake_auto_planning_scheduler
+from .auto_planning_queue import (
+    RUN_QUEUED, _auto_planning_run_stale_ms, auto_planning_queue_stats, auto_planning_run_history,
+    claim_auto_planning_runs, enqueue_auto_planning_run, finish_auto_planning_run,
+    open_auto_planning_runs, requeue_stale_auto_planning_runs, site_progress_reporter,
+    start_auto_planning_run,
+)
 
 router = APIRouter()
 
@@ -132,6 +156,11 @@ def _pull_limits_from_config_row(row: DirectorAutoPlanningConfig | None) -> tupl
     return gpl, (norm if norm else None)
 
 
+def _auto_planning_solver_profile(row: DirectorAutoPlanningConfig | None) -> str | None:
+    raw = str(getattr(row, "solver_profile", None) or "").strip() if row else ""
+    return raw if raw in SOLVER_PROFILES else None
+
+
 def _serialize_auto_planning_config(row: DirectorAutoPlanningConfig | None) -> AutoPlanningConfigOut:
     auto_save_mode = str(getattr(row, "auto_save_mode", "manual") or "manual")
     if auto_save_mode not in ("manual", "director", "shared"):
@@ -177,6 +206,7 @@ def _serialize_auto_planning_config(row: DirectorAutoPlanningConfig | None) -> A
         auto_save_mode=auto_save_mode,
         pulls_limit=pulls_limit_out,
         pulls_limits_by_site=pulls_limits_by_site_out,
+        solver_profile=_auto_planning_solver_profile(row),
         last_run_week_iso=getattr(row, "last_run_week_iso", None),
         last_run_at=getattr(row, "last_run_at", None),
         last_error=getattr(row, "last_error", None),
@@ -244,8 +274,10 @@ def _boost_generation_budget_for_pulls(
     time_limit_seconds: int,
     num_alternatives: int,
 ) -> tuple[int, int]:
-    # Les plannings avec משיכות ont plus de combinaisons valides à explorer.
-    return max(int(time_limit_seconds), 20), max(int(num_alternatives), 80)
+    # Les plannings avec משיכות ont plus de combinaisons valides à explorer. Le plafond de
+    # משיכות est une contrainte du modèle CP-SAT (PullsModelSpec) : inutile de sur-générer
+    # des alternatives pour en filtrer la plupart ensuite, seul le temps minimal est relevé.
+    return max(int(time_limit_seconds), 20), int(num_alternatives)
 
 
 def _clamp_generation_budget(
@@ -253,17 +285,36 @@ def _clamp_generation_budget(
     num_alternatives: int,
     *,
     linked: bool,
+    stats_key: str | None = None,
+    num_workers: int | None = None,
 ) -> tuple[int, int]:
-    """Temporary high caps while the app is single-user: keep searching so 500 alternatives survive UI filters."""
-    if linked:
-        return (
-            max(10, min(int(time_limit_seconds), 120)),
-            max(1, min(int(num_alternatives), 20000)),
+    """Temporary high caps while the app is single-user: keep searching so 500 alternatives survive UI filters.
+
+    Avec stats_key, le temps demandé est remplacé par le budget prédit depuis l'historique
+    de résolution du site (app.solve_stats) quand il y a assez d'échantillons.
+    """
+    min_time = 10 if linked else 6
+    eff_alts = max(1, min(int(num_alternatives), 20000))
+    eff_time = max(min_time, min(int(time_limit_seconds), 120))
+    if stats_key:
+        predicted = predict_time_budget(
+            stats_key,
+            num_alternatives=eff_alts,
+            min_seconds=min_time,
+            max_seconds=120,
+            num_workers=num_workers,
         )
-    return (
-        max(6, min(int(time_limit_seconds), 120)),
-        max(1, min(int(num_alternatives), 20000)),
-    )
+        if predicted is not None:
+            if predicted != eff_time:
+                logger.info(
+                    "[SOLVE-STATS] adaptive budget key=%s requested=%s predicted=%s alternatives=%s",
+                    stats_key,
+                    eff_time,
+                    predicted,
+                    eff_alts,
+                )
+            eff_time = predicted
+    return eff_time, eff_alts
 
 
 def _summarize_auto_planning_result(
@@ -274,15 +325,9 @@ def _summarize_auto_planning_result(
     error: str | None = None,
     pulls: dict | None = None,
 ) -> dict:
-    from ..ai_solver import build_capacities_from_config
-
-    days, shifts, stations = build_capacities_from_config(site.config or {})
-    total_required = 0
-    for t_idx, st in enumerate(stations):
-        cap_map = (st.get("capacity") or {})
-        for day_key in days:
-            for shift_name in shifts:
-                total_required += int((cap_map.get(day_key, {}) or {}).get(shift_name, 0) or 0)
+    spec = site_scheduling_spec(site.config)
+    days, shifts, stations = spec.days, spec.shifts, spec.stations
+    total_required = spec.required_total
 
     total_assigned = 0
     assignments_map = assignments or {}
@@ -389,115 +434,80 @@ def _clear_auto_planning_cache_for_director(
         flag_modified(site, "config")
 
 
-def _generate_director_week_plan_payload(
+def _count_plan_assignments(assignments_value: dict | None) -> int:
+    total = 0
+    if not isinstance(assignments_value, dict):
+        return total
+    for shifts_map in assignments_value.values():
+        if not isinstance(shifts_map, dict):
+            continue
+        for per_station in shifts_map.values():
+            if not isinstance(per_station, list):
+                continue
+            for cell in per_station:
+                if isinstance(cell, list):
+                    total += len([nm for nm in cell if str(nm or "").strip()])
+    return total
+
+
+def _director_week_plan_payload(site: Site, rows: list[SiteWorker], week_iso: str, assignments_value: dict) -> dict:
+    end_dt = datetime.fromisoformat(week_iso) + timedelta(days=6)
+    return {
+        "siteId": int(site.id),
+        "week": {
+            "startISO": week_iso,
+            "endISO": end_dt.date().isoformat(),
+            "label": f"{week_iso} — {end_dt.date().isoformat()}",
+        },
+        "isManual": False,
+        "assignments": assignments_value,
+        "pulls": {},
+        "workers": _build_worker_snapshots(rows),
+    }
+
+
+def _director_week_solver_inputs(
     db: Session,
     site: Site,
     week_iso: str,
-    auto_pulls_enabled: bool = False,
-    pulls_limit: int | None = None,
-) -> dict:
+    *,
+    site_rows: list[SiteWorker] | None = None,
+    weekly_overrides: dict | None = None,
+) -> tuple[list[SiteWorker], list[dict], dict]:
+    """(rows visibles, workers solveur, overrides hebdo) ; site_rows / weekly_overrides évitent
+    de recharger quand plusieurs semaines sont générées d'un coup."""
+    if site_rows is None:
+        site_rows = db.query(SiteWorker).filter(SiteWorker.site_id == site.id).all()
     rows = [
         row
-        for row in db.query(SiteWorker).filter(SiteWorker.site_id == site.id).all()
+        for row in site_rows
         if not bool(getattr(row, "pending_approval", False)) and _site_worker_visible_for_week(row, week_iso)
     ]
-    weekly_row = (
-        db.query(SiteWeeklyAvailability)
-        .filter(SiteWeeklyAvailability.site_id == site.id)
-        .filter(SiteWeeklyAvailability.week_iso == week_iso)
-        .first()
-    )
-    weekly_overrides = (weekly_row.availability or {}) if weekly_row else {}
+    if weekly_overrides is None:
+        weekly_row = (
+            db.query(SiteWeeklyAvailability)
+            .filter(SiteWeeklyAvailability.site_id == site.id)
+            .filter(SiteWeeklyAvailability.week_iso == week_iso)
+            .first()
+        )
+        weekly_overrides = (weekly_row.availability or {}) if weekly_row else {}
     workers = _build_solver_workers(rows, weekly_overrides, week_iso=week_iso)
     workers = _apply_site_event_locks_to_solver_workers(
         db, int(site.id), week_iso, site.config or {}, workers
     )
-    start_dt = datetime.fromisoformat(week_iso)
-    end_dt = start_dt + timedelta(days=6)
-
-    def _count_assignments(assignments_value: dict | None) -> int:
-        total = 0
-        if not isinstance(assignments_value, dict):
-            return total
-        for shifts_map in assignments_value.values():
-            if not isinstance(shifts_map, dict):
-                continue
-            for per_station in shifts_map.values():
-                if not isinstance(per_station, list):
-                    continue
-                for cell in per_station:
-                    if isinstance(cell, list):
-                        total += len([nm for nm in cell if str(nm or "").strip()])
-        return total
-
-    def make_payload(assignments_value: dict) -> dict:
-        return {
-            "siteId": int(site.id),
-            "week": {
-                "startISO": week_iso,
-                "endISO": end_dt.date().isoformat(),
-                "label": f"{week_iso} — {end_dt.date().isoformat()}",
-            },
-            "isManual": False,
-            "assignments": assignments_value,
-            "pulls": {},
-            "workers": _build_worker_snapshots(rows),
-        }
-
-    from ..ai_solver import build_capacities_from_config
-
-    days, shifts, stations = build_capacities_from_config(site.config or {})
-    required_total = sum(
-        int(((st.get("capacity") or {}).get(day_key, {}) or {}).get(shift_name, 0) or 0)
-        for st in stations
-        for day_key in days
-        for shift_name in shifts
-    )
-    available_pairs = sum(
-        len(shifts_list or [])
-        for worker in workers
-        for shifts_list in ((worker.get("availability") or {}).values())
-        if isinstance(shifts_list, list)
-    )
-    workers_with_availability = sum(
-        1
-        for worker in workers
-        if any(isinstance(v, list) and len(v) > 0 for v in (worker.get("availability") or {}).values())
-    )
-    logger.info(
-        "[AUTO-PLANNING] build solver input site_id=%s site_name=%s week=%s visible_workers=%s solver_workers=%s weekly_override_workers=%s workers_with_availability=%s available_pairs=%s required=%s days=%s shifts=%s stations=%s",
-        site.id,
-        site.name,
-        week_iso,
-        len(rows),
-        len(workers),
-        len(weekly_overrides) if isinstance(weekly_overrides, dict) else 0,
-        workers_with_availability,
-        available_pairs,
-        required_total,
-        len(days),
-        len(shifts),
-        len(stations),
-    )
-
-    if not workers:
-        assignments = {day: {sh: [[] for _ in stations] for sh in shifts} for day in days}
-        payload = make_payload(assignments)
-        if auto_pulls_enabled:
-            payload = _apply_auto_pulls_to_payload(site, rows, payload, pulls_limit=pulls_limit)
-        return payload
+    return rows, workers, weekly_overrides
 
-    auto_pulls_time_limit, auto_pulls_num_alts = _boost_generation_budget_for_pulls(25, 20)
 
-    result = solve_schedule(
-        site.config or {},
-        workers,
-        time_limit_seconds=auto_pulls_time_limit if auto_pulls_enabled else 25,
-        max_nights_per_worker=_site_max_nights_per_worker(site.config),
-        num_alternatives=auto_pulls_num_alts if auto_pulls_enabled else 1,
-        fixed_assignments=None,
-        exclude_days=None,
-    )
+def _director_week_payload_from_result(
+    site: Site,
+    rows: list[SiteWorker],
+    week_iso: str,
+    result: dict,
+    *,
+    auto_pulls_enabled: bool = False,
+    pulls_limit: int | None = None,
+    required_total: int | None = None,
+) -> dict:
     raw_assignments = result.get("assignments") if isinstance(result.get("assignments"), dict) else {}
     logger.info(
         "[AUTO-PLANNING] solver result site_id=%s site_name=%s week=%s status=%s raw_assigned=%s required=%s alternatives=%s",
@@ -505,7 +515,7 @@ def _generate_director_week_plan_payload(
         site.name,
         week_iso,
         result.get("status"),
-        _count_assignments(raw_assignments),
+        _count_plan_assignments(raw_assignments),
         required_total,
         len(result.get("alternatives") or []),
     )
@@ -521,10 +531,10 @@ def _generate_director_week_plan_payload(
             site.id,
             site.name,
             week_iso,
-            _count_assignments(cleaned_base_assignments),
+            _count_plan_assignments(cleaned_base_assignments),
             required_total,
         )
-        return make_payload(cleaned_base_assignments)
+        return _director_week_plan_payload(site, rows, week_iso, cleaned_base_assignments)
 
     candidate_assignments: list[dict] = [
         _enforce_role_requirements_on_assignments(
@@ -543,9 +553,13 @@ def _generate_director_week_plan_payload(
     best_key: tuple[int, ...] | None = None
     best_idx = 0
 
-    for idx, candidate in enumerate(candidate_assignments):
-        candidate_payload = make_payload(candidate)
-        candidate_payload = _apply_auto_pulls_to_payload(site, rows, candidate_payload, pulls_limit=pulls_limit)
+    pulled_candidates = _apply_auto_pulls_to_alternatives(
+        site, rows, candidate_assignments, pulls_limit=pulls_limit,
+        pull_cells_by_candidate=[result.get("pull_cells")],
+    )
+    for idx, (candidate, candidate_pulls) in enumerate(pulled_candidates):
+        candidate_payload = _director_week_plan_payload(site, rows, week_iso, candidate)
+        candidate_payload["pulls"] = candidate_pulls
         candidate_key = _single_site_candidate_sort_key(
             site,
             candidate_payload.get("assignments") if isinstance(candidate_payload.get("assignments"), dict) else {},
@@ -570,13 +584,171 @@ def _generate_director_week_plan_payload(
         )
         return best_payload
 
-    assignments = result["assignments"]
-    payload = make_payload(assignments)
+    payload = _director_week_plan_payload(site, rows, week_iso, result["assignments"])
     if auto_pulls_enabled:
         payload = _apply_auto_pulls_to_payload(site, rows, payload, pulls_limit=pulls_limit)
     return payload
 
 
+def _director_generation_budget(site: Site, num_workers: int, auto_pulls_enabled: bool) -> tuple[int, int]:
+    auto_pulls_time_limit, auto_pulls_num_alts = _boost_generation_budget_for_pulls(25, 20)
+    return _clamp_generation_budget(
+        auto_pulls_time_limit if auto_pulls_enabled else 25,
+        auto_pulls_num_alts if auto_pulls_enabled else 1,
+        linked=False,
+        stats_key=solve_stats_key(int(site.id)),
+        num_workers=num_workers,
+    )
+
+
+def _generate_director_week_plan_payload(
+    db: Session,
+    site: Site,
+    week_iso: str,
+    auto_pulls_enabled: bool = False,
+    pulls_limit: int | None = None,
+    solver_profile: str | None = None,
+) -> dict:
+    rows, workers, weekly_overrides = _director_week_solver_inputs(db, site, week_iso)
+
+    spec = site_scheduling_spec(site.config)
+    days, shifts, stations = spec.days, spec.shifts, spec.stations
+    required_total = spec.required_total
+    available_pairs = sum(
+        len(shifts_list or [])
+        for worker in workers
+        for shifts_list in ((worker.get("availability") or {}).values())
+        if isinstance(shifts_list, list)
+    )
+    workers_with_availability = sum(
+        1
+        for worker in workers
+        if any(isinstance(v, list) and len(v) > 0 for v in (worker.get("availability") or {}).values())
+    )
+    logger.info(
+        "[AUTO-PLANNING] build solver input site_id=%s site_name=%s week=%s visible_workers=%s solver_workers=%s weekly_override_workers=%s workers_with_availability=%s available_pairs=%s required=%s days=%s shifts=%s stations=%s",
+        site.id,
+        site.name,
+        week_iso,
+        len(rows),
+        len(workers),
+        len(weekly_overrides) if isinstance(weekly_overrides, dict) else 0,
+        workers_with_availability,
+        available_pairs,
+        required_total,
+        len(days),
+        len(shifts),
+        len(stations),
+    )
+
+    if not workers:
+        assignments = {day: {sh: [[] for _ in stations] for sh in shifts} for day in days}
+        payload = _director_week_plan_payload(site, rows, week_iso, assignments)
+        if auto_pulls_enabled:
+            payload = _apply_auto_pulls_to_payload(site, rows, payload, pulls_limit=pulls_limit)
+        return payload
+
+    eff_time, eff_num_alts = _director_generation_budget(site, len(workers), auto_pulls_enabled)
+    result = solve_schedule(
+        site.config or {},
+        workers,
+        time_limit_seconds=eff_time,
+        max_nights_per_worker=_site_max_nights_per_worker(site.config),
+        num_alternatives=eff_num_alts,
+        fixed_assignments=None,
+        exclude_days=None,
+        stats_key=solve_stats_key(int(site.id)),
+        solver_profile=solver_profile,
+        hint_assignments=_warm_start_hint_assignments(db, int(site.id), week_iso),
+        pulls=_pulls_model_spec(pulls_limit) if auto_pulls_enabled else None,
+    )
+    return _director_week_payload_from_result(
+        site,
+        rows,
+        week_iso,
+        result,
+        auto_pulls_enabled=auto_pulls_enabled,
+        pulls_limit=pulls_limit,
+        required_total=required_total,
+    )
+
+
+def _generate_director_multi_week_plan_payloads(
+    db: Session,
+    site: Site,
+    week_isos: list[str],
+    auto_pulls_enabled: bool = False,
+    pulls_limit: int | None = None,
+    solver_profile: str | None = None,
+    warm_start: bool = True,
+):
+    """Génère plusieurs semaines consécutives d'un site ; yield (week_iso, payload) au fil de l'eau.
+
+    Contexte chargé une fois (workers du site, זמינות hebdo de toutes les semaines en une requête),
+    puis solve_schedule_weeks : template de modèle partagé, semaine amorcée par la précédente et
+    frontière samedi → dimanche respectée.
+    """
+    site_rows = db.query(SiteWorker).filter(SiteWorker.site_id == site.id).all()
+    overrides_by_week = {
+        str(row.week_iso): (row.availability or {})
+        for row in (
+            db.query(SiteWeeklyAvailability)
+            .filter(SiteWeeklyAvailability.site_id == site.id)
+            .filter(SiteWeeklyAvailability.week_iso.in_(list(week_isos)))
+            .all()
+        )
+    }
+    inputs: dict[str, tuple[list[SiteWorker], list[dict]]] = {}
+    for week_iso in week_isos:
+        rows, workers, _ = _director_week_solver_inputs(
+            db,
+            site,
+            week_iso,
+            site_rows=site_rows,
+            weekly_overrides=overrides_by_week.get(week_iso) or {},
+        )
+        inputs[week_iso] = (rows, workers)
+    num_workers = max((len(workers) for _, workers in inputs.values()), default=0)
+    eff_time, eff_num_alts = _director_generation_budget(site, num_workers, auto_pulls_enabled)
+    logger.info(
+        "[AUTO-PLANNING] multi-week start site_id=%s weeks=%s workers=%s time_limit=%s",
+        site.id,
+        list(week_isos),
+        num_workers,
+        eff_time,
+    )
+    results = solve_schedule_weeks(
+        site.config or {},
+        [{"week_iso": week_iso, "workers": inputs[week_iso][1]} for week_iso in week_isos],
+        time_limit_seconds=eff_time,
+        max_nights_per_worker=_site_max_nights_per_worker(site.config),
+        num_alternatives=eff_num_alts,
+        stats_key=solve_stats_key(int(site.id)),
+        solver_profile=solver_profile,
+        initial_hint=_warm_start_hint_assignments(db, int(site.id), week_isos[0]) if warm_start and week_isos else None,
+        initial_prev=_previous_week_saved_plan(db, int(site.id), week_isos[0]) if week_isos else None,
+    )
+    # Le payload émis (alternative retenue, משיכות) est renvoyé au générateur : la semaine
+    # suivante s'enchaîne sur ce qui est réellement sauvegardé, pas sur le résultat brut.
+    payload: dict | None = None
+    while True:
+        try:
+            result = results.send(payload)
+        except StopIteration:
+            break
+        week_iso = str(result.get("week_iso"))
+        rows = inputs[week_iso][0]
+        payload = _director_week_payload_from_result(
+            site,
+            rows,
+            week_iso,
+            result,
+            auto_pulls_enabled=auto_pulls_enabled,
+            pulls_limit=pulls_limit,
+        )
+        yield week_iso, payload
+
+
 def _run_auto_planning_for_director(
     db: Session,
     director_id: int,
@@ -586,7 +758,18 @@ def _run_auto_planning_for_director(
     auto_save_mode: str = "manual",
     pulls_limit: int | None = None,
     pulls_limits_by_site: dict[int, int | None] | None = None,
+    solver_profile: str | None = None,
+    job: GenerationJob | None = None,
+    site_progress: Callable[[dict], None] | None = None,
+    lease_fence: LeaseFence | None = None,
 ) -> tuple[int, list[str]]:
+    """site_progress (optionnel) reçoit l'issue de chaque site après son commit : statut,
+    affectations, durée (celle du groupe pour des sites liés), erreur.
+
+    lease_fence (tick du scheduler) : vérifié avant chaque site et chaque commit ; bail perdu
+    → SchedulerLeaseLost, sans rien écrire (le nouveau leader reprend la ligne en file)."""
+    if job is not None:
+        job.report("waiting-slot")
     slot_token = _acquire_generation_slot(
         kind="auto-planning",
         director_id=int(director_id),
@@ -606,6 +789,8 @@ def _run_auto_planning_for_director(
     sites_by_id: dict[int, Site] = {int(site.id): site for site in sites}
     cluster_map = _linked_site_cluster_map_for_director(db, director_id)
     processed_site_ids: set[int] = set()
+    # Issues en attente du commit du site / groupe courant, remontées ensuite à site_progress.
+    pending_outcomes: list[dict] = []
     logger.info(
         "[AUTO-PLANNING] run start director_id=%s source=%s target_week=%s sites=%s",
         director_id,
@@ -614,6 +799,32 @@ def _run_auto_planning_for_director(
         len(sites),
     )
 
+    def _site_outcome(site: Site, status: str, assigned: int = 0, required: int = 0, error: str | None = None) -> None:
+        pending_outcomes.append({
+            "site_id": int(site.id),
+            "site_name": site.name,
+            "status": status,
+            "assigned": int(assigned),
+            "required": int(required),
+            "error": str(error)[:300] if error else None,
+            "total_sites": len(sites),
+        })
+
+    def _commit() -> None:
+        if lease_fence is not None and lease_fence.lost:
+            db.rollback()
+            raise SchedulerLeaseLost("scheduler lease lost before site commit")
+        db.commit()
+
+    def _flush_site_outcomes(started: float) -> None:
+        outcomes = list(pending_outcomes)
+        pending_outcomes.clear()
+        if site_progress is None:
+            return
+        duration_ms = int((time.monotonic() - started) * 1000)
+        for outcome in outcomes:
+            site_progress({**outcome, "duration_ms": duration_ms})
+
     def _persist_generated_payload(site: Site, payload: dict) -> None:
         nonlocal success_count
         summary = _summarize_auto_planning_result(
@@ -658,6 +869,7 @@ def _run_auto_planning_for_director(
                 ),
             )
             errors.append(f"{site.name}: {detail}")
+            _site_outcome(site, "empty", assigned_count, required_count, detail)
             return
         logger.info(
             "[AUTO-PLANNING] persist generated plan director_id=%s site_id=%s site_name=%s target_week=%s source=%s assigned=%s required=%s pulls=%s complete=%s",
@@ -679,12 +891,20 @@ def _run_auto_planning_for_director(
         _save_site_week_plan(db, int(site.id), target_week_iso, target_scope, payload)
         _store_site_auto_planning_status(site, summary)
         success_count += 1
+        _site_outcome(site, "generated", assigned_count, required_count)
 
     try:
         for site in sites:
             site_id_int = int(site.id)
             if site_id_int in processed_site_ids:
                 continue
+            if job is not None:
+                # Annulation coopérative : entre deux sites / groupes liés, jamais au milieu d'un solve.
+                job.check_cancelled()
+                job.report("site", site_id=site_id_int, done_sites=len(processed_site_ids), total_sites=len(sites))
+            if lease_fence is not None:
+                lease_fence.check()
+            site_started = time.monotonic()
             linked_ids = [int(x) for x in (cluster_map.get(site_id_int) or []) if int(x) in sites_by_id]
             # Multi-sites: une seule ריצה solver par groupe lié, puis split des plans par site.
             if len(linked_ids) > 1:
@@ -698,23 +918,35 @@ def _run_auto_planning_for_director(
                         target_week_iso,
                         source,
                     )
+                    group_stats_key = solve_stats_key(root_site_id, linked=True)
+                    group_time, group_num_alts = _clamp_generation_budget(
+                        20,
+                        20 if auto_pulls_enabled else 1,
+                        linked=True,
+                        stats_key=group_stats_key,
+                    )
                     generated = _generate_multi_site_memory_plans(
                         db,
                         director_id,
                         root_site_id,
                         target_week_iso,
-                        num_alternatives=20 if auto_pulls_enabled else 1,
+                        time_limit_seconds=group_time,
+                        num_alternatives=group_num_alts,
+                        stats_key=group_stats_key,
+                        solver_profile=solver_profile,
                     )
                     site_plans = generated.get("site_plans") if isinstance(generated, dict) else {}
                     if not isinstance(site_plans, dict):
                         site_plans = {}
                     workers_by_site = _load_workers_by_site(db, linked_ids)
+                    cap_roster = _compile_linked_cap_roster(linked_ids, target_week_iso, workers_by_site)
                     site_plans = _enforce_linked_global_caps_on_site_plans(
                         db,
                         linked_ids,
                         target_week_iso,
                         site_plans,
                         workers_by_site=workers_by_site,
+                        cap_roster=cap_roster,
                     )
                     if auto_pulls_enabled:
                         site_plans = _apply_auto_pulls_to_site_plans(
@@ -731,6 +963,7 @@ def _run_auto_planning_for_director(
                             target_week_iso,
                             site_plans,
                             workers_by_site=workers_by_site,
+                            cap_roster=cap_roster,
                         )
                     for linked_sid in linked_ids:
                         linked_site = sites_by_id.get(linked_sid)
@@ -741,7 +974,8 @@ def _run_auto_planning_for_director(
                             raise RuntimeError(f"missing generated plan for linked site {linked_sid}")
                         _persist_generated_payload(linked_site, site_payload)
                         processed_site_ids.add(linked_sid)
-                    db.commit()
+                    _commit()
+                    _flush_site_outcomes(site_started)
                     logger.info(
                         "[AUTO-PLANNING] multi-site group success director_id=%s root_site_id=%s group_size=%s target_week=%s source=%s",
                         director_id,
@@ -750,12 +984,15 @@ def _run_auto_planning_for_director(
                         target_week_iso,
                         source,
                     )
+                except SchedulerLeaseLost:
+                    raise
                 except Exception as exc:
                     logger.exception(
                         "[AUTO-PLANNING] multi-site group failed director_id=%s root_site_id=%s",
                         director_id,
                         root_site_id,
                     )
+                    pending_outcomes.clear()
                     for linked_sid in linked_ids:
                         linked_site = sites_by_id.get(linked_sid)
                         if not linked_site:
@@ -765,7 +1002,9 @@ def _run_auto_planning_for_director(
                             _summarize_auto_planning_result(linked_site, None, target_week_iso, source, str(exc)),
                         )
                         processed_site_ids.add(linked_sid)
-                    db.commit()
+                        _site_outcome(linked_site, "failed", error=str(exc))
+                    _commit()
+                    _flush_site_outcomes(site_started)
                     errors.append(f"multi-site group {root_site_id}: {exc}")
                 continue
 
@@ -785,9 +1024,11 @@ def _run_auto_planning_for_director(
                     target_week_iso,
                     auto_pulls_enabled=auto_pulls_enabled,
                     pulls_limit=site_pulls_limit,
+                    solver_profile=solver_profile,
                 )
                 _persist_generated_payload(site, payload)
-                db.commit()
+                _commit()
+                _flush_site_outcomes(site_started)
                 logger.info(
                     "[AUTO-PLANNING] site success director_id=%s site_id=%s site_name=%s target_week=%s source=%s",
                     director_id,
@@ -797,14 +1038,19 @@ def _run_auto_planning_for_director(
                     source,
                 )
                 processed_site_ids.add(site_id_int)
+            except SchedulerLeaseLost:
+                raise
             except Exception as exc:
                 logger.exception("[AUTO-PLANNING] Failed for director=%s site=%s", director_id, site.id)
+                pending_outcomes.clear()
                 _store_site_auto_planning_status(
                     site,
                     _summarize_auto_planning_result(site, None, target_week_iso, source, str(exc)),
                 )
                 processed_site_ids.add(site_id_int)
-                db.commit()
+                _site_outcome(site, "failed", error=str(exc))
+                _commit()
+                _flush_site_outcomes(site_started)
                 errors.append(f"{site.name}: {exc}")
         logger.info(
             "[AUTO-PLANNING] run end director_id=%s source=%s target_week=%s success_sites=%s errors=%s",
@@ -825,40 +1071,128 @@ def compute_auto_planning_scheduler_sleep_seconds(
     idle_recheck_seconds: int,
     now: datetime | None = None,
 ) -> int:
-    """Délai avant le prochain réveil du scheduler (0 = exécuter le tick maintenant)."""
+    """Délai avant le prochain réveil du scheduler (0 = exécuter le tick maintenant).
+
+    Une semaine déjà en file n'est plus "due" : on attend le next_attempt_at de sa ligne
+    (backoff) ou l'expiration du heartbeat d'une ligne running (reprise après arrêt), au moins 1 s
+    tant qu'elle n'est pas réclamable. Seul un créneau de config à moins de 60 s déclenche le tick
+    en avance : une ligne de file non réclamable ferait tourner la boucle à vide.
+    """
     idle = max(60, int(idle_recheck_seconds or 3600))
     now = now or datetime.now()
+    now_ms = int(now.timestamp() * 1000)
     configs = (
         db.query(DirectorAutoPlanningConfig)
         .filter(DirectorAutoPlanningConfig.enabled == True)
         .all()
     )
-    if not configs:
+    queue_wake: float | None = None
+    queued_weeks: set[tuple[int, str]] = set()
+    for run in open_auto_planning_runs(db):
+        queued_weeks.add((int(run.director_id), str(run.target_week_iso)))
+        if run.status == RUN_QUEUED:
+            wake_ms = int(run.next_attempt_at or 0)
+        else:
+            wake_ms = int(run.heartbeat_at or 0) + _auto_planning_run_stale_ms()
+        delta = max(0.0, (wake_ms - now_ms) / 1000.0)
+        if queue_wake is None or delta < queue_wake:
+            queue_wake = delta
+    if queue_wake is not None and queue_wake <= 0:
+        return 0
+    if not configs and queue_wake is None:
         return idle
 
-    earliest_wake: float | None = None
+    config_wake: float | None = None
     for config in configs:
         next_run_at = _next_effective_run_time(now, config)
         if now >= next_run_at:
             target_week_iso = _next_week_iso(next_run_at)
-            if (config.last_run_week_iso or "").strip() != target_week_iso:
+            if (config.last_run_week_iso or "").strip() != target_week_iso and (
+                int(config.director_id), target_week_iso
+            ) not in queued_weeks:
                 return 0
             continue
         delta = (next_run_at - now).total_seconds()
-        if earliest_wake is None or delta < earliest_wake:
-            earliest_wake = delta
+        if config_wake is None or delta < config_wake:
+            config_wake = delta
 
-    if earliest_wake is None:
-        return idle
-    if earliest_wake <= 60:
+    if config_wake is not None and config_wake <= 60:
         return 0
-    return min(int(earliest_wake), idle)
+    waits = [wake for wake in (config_wake, queue_wake) if wake is not None]
+    if not waits:
+        return idle
+    # Arrondi au-dessus : se réveiller avant le next_attempt_at ne réclamerait rien.
+    return min(max(1, math.ceil(min(waits))), idle)
 
 
-def process_auto_planning_tick(db: Session) -> None:
-    now = datetime.now()
-    configs = db.query(DirectorAutoPlanningConfig).filter(DirectorAutoPlanningConfig.enabled == True).all()
-    logger.info("[AUTO-PLANNING] tick start now=%s enabled_configs=%s", now.isoformat(), len(configs))
+_AUTO_PLANNING_HEARTBEAT_SECONDS = 30.0
+
+
+def _run_auto_planning_job(
+    db: Session,
+    director_id: int,
+    target_week_iso: str,
+    source: str,
+    site_progress: Callable[[dict | None], None] | None = None,
+    lease_fence: LeaseFence | None = None,
+    **options,
+) -> tuple[int, list[str], str, str]:
+    """Lance l'auto-planning comme job "auto-planning" (visible / annulable via /ai-jobs) et attend sa fin.
+
+    Retourne (sites générés, erreurs, job_id, statut du job) ; l'appelant garde la session db,
+    inutilisée pendant l'attente. site_progress reçoit l'issue de chaque site, et None toutes
+    les _AUTO_PLANNING_HEARTBEAT_SECONDS pendant l'attente (heartbeat de la ligne en file).
+    Bail perdu (lease_fence) : job annulé et plus de heartbeat, la ligne redevient reprenable.
+    """
+
+    def _run(job: GenerationJob) -> dict:
+        success_count, errors = _run_auto_planning_for_director(
+            db, director_id, target_week_iso, source, job=job, site_progress=site_progress,
+            lease_fence=lease_fence, **options,
+        )
+        return {"target_week_iso": target_week_iso, "generated_sites": success_count, "errors": errors}
+
+    job = submit_generation_job("auto-planning", int(director_id), None, _run)
+    # Avec un bail à surveiller, on se réveille plus souvent que le heartbeat.
+    poll = min(_AUTO_PLANNING_HEARTBEAT_SECONDS, 5.0) if lease_fence is not None else _AUTO_PLANNING_HEARTBEAT_SECONDS
+    last_heartbeat = time.monotonic()
+    while not job.wait(timeout=poll):
+        if lease_fence is not None and lease_fence.lost:
+            job.cancel()
+            continue
+        if site_progress is not None and time.monotonic() - last_heartbeat >= _AUTO_PLANNING_HEARTBEAT_SECONDS:
+            site_progress(None)
+            last_heartbeat = time.monotonic()
+    if job.status == JOB_DONE:
+        return int(job.result["generated_sites"]), list(job.result["errors"]), job.job_id, job.status
+    if job.status == JOB_CANCELLED:
+        return 0, ["Génération annulée"], job.job_id, job.status
+    return 0, [str(job.error or "auto planning failed")], job.job_id, job.status
+
+
+def _auto_planning_tick_parallelism() -> int:
+    """Directeurs traités en parallèle par tick : PLANNING_AUTO_PLANNING_PARALLELISM.
+
+    Défaut : limite globale de générations moins un, pour qu'une génération interactive trouve
+    toujours un slot pendant le créneau commun ; jamais au-delà de la limite globale.
+    """
+    default = max(1, _GENERATION_CONCURRENCY_LIMIT - 1)
+    try:
+        value = int(os.getenv("PLANNING_AUTO_PLANNING_PARALLELISM", str(default)))
+    except Exception:
+        value = default
+    return max(1, min(value, _GENERATION_CONCURRENCY_LIMIT))
+
+
+@dataclass(frozen=True)
+class _DueAutoPlanningRun:
+    director_id: int
+    target_week_iso: str
+    options: dict
+
+
+def _due_auto_planning_runs(configs: list[DirectorAutoPlanningConfig], now: datetime) -> list[_DueAutoPlanningRun]:
+    runs: list[_DueAutoPlanningRun] = []
     for config in configs:
         next_run_at = _next_effective_run_time(now, config)
         logger.info(
@@ -897,36 +1231,187 @@ def process_auto_planning_tick(db: Session) -> None:
             next_run_at.isoformat(),
         )
         gpl, by_site = _pull_limits_from_config_row(config)
-        _, errors = _run_auto_planning_for_director(
+        # Options figées ici et stockées sur la ligne en file : un retry rejoue la même demande.
+        runs.append(_DueAutoPlanningRun(
+            director_id=int(config.director_id),
+            target_week_iso=target_week_iso,
+            options={
+                "auto_pulls_enabled": bool(getattr(config, "auto_pulls_enabled", False)),
+                "auto_save_mode": str(getattr(config, "auto_save_mode", "manual") or "manual"),
+                "pulls_limit": gpl,
+                "pulls_limits_by_site": by_site,
+                "solver_profile": _auto_planning_solver_profile(config),
+            },
+        ))
+    return runs
+
+
+@dataclass(frozen=True)
+class _AutoPlanningAttempt:
+    run_id: int
+    director_id: int
+    target_week_iso: str
+    success_count: int
+    errors: list[str]
+    job_id: str | None
+    retryable: bool
+
+
+def _run_claimed_auto_planning(
+    session_factory: sessionmaker,
+    run: AutoPlanningRun,
+    lease_fence: LeaseFence | None = None,
+) -> _AutoPlanningAttempt:
+    """Une ligne réclamée, sa propre session : une erreur ou un rollback ne touche pas les autres.
+
+    Transitoire (retry avec backoff) : slot occupé ou job en erreur ; les échecs par site
+    (infaisable, plan vide) sont définitifs pour la tentative, comme une annulation.
+    """
+    options = dict(run.options or {})
+    if options.get("pulls_limits_by_site") is not None:
+        # Clés JSON en texte : on revient aux site_id entiers attendus par les pulls.
+        options["pulls_limits_by_site"] = _normalize_pulls_limits_by_site(options["pulls_limits_by_site"])
+    db = session_factory()
+    try:
+        success_count, errors, job_id, job_status = _run_auto_planning_job(
             db,
-            config.director_id,
-            target_week_iso,
+            int(run.director_id),
+            str(run.target_week_iso),
             "scheduled",
-            auto_pulls_enabled=bool(getattr(config, "auto_pulls_enabled", False)),
-            auto_save_mode=str(getattr(config, "auto_save_mode", "manual") or "manual"),
-            pulls_limit=gpl,
-            pulls_limits_by_site=by_site,
+            site_progress=site_progress_reporter(session_factory, int(run.id)),
+            lease_fence=lease_fence,
+            **options,
         )
-        if _is_generation_busy_error(errors):
+        retryable = job_status == JOB_ERROR or _is_generation_busy_error(errors)
+    except Exception as exc:
+        logger.exception("[AUTO-PLANNING] tick run failed director_id=%s target_week=%s", run.director_id, run.target_week_iso)
+        success_count, errors, job_id, retryable = 0, [str(exc) or "auto planning failed"], None, True
+    finally:
+        db.close()
+    return _AutoPlanningAttempt(
+        run_id=int(run.id),
+        director_id=int(run.director_id),
+        target_week_iso=str(run.target_week_iso),
+        success_count=int(success_count),
+        errors=list(errors),
+        job_id=job_id,
+        retryable=bool(retryable),
+    )
+
+
+def _record_auto_planning_run(db: Session, attempt: _AutoPlanningAttempt) -> None:
+    """Clôt la tentative en file et reporte son issue sur la config du directeur (même commit)."""
+    run = finish_auto_planning_run(
+        db,
+        attempt.run_id,
+        success_count=attempt.success_count,
+        errors=attempt.errors,
+        job_id=attempt.job_id,
+        retryable=attempt.retryable,
+    )
+    if run is None:
+        db.rollback()
+        return
+    config = (
+        db.query(DirectorAutoPlanningConfig)
+        .filter(DirectorAutoPlanningConfig.director_id == attempt.director_id)
+        .first()
+    )
+    if config is not None:
+        config.last_error = run.last_error
+        if run.status == RUN_QUEUED:
             logger.warning(
-                "[AUTO-PLANNING] tick postpone director_id=%s target_week=%s reason=busy",
-                config.director_id,
-                target_week_iso,
+                "[AUTO-PLANNING] tick postpone director_id=%s target_week=%s attempts=%s/%s",
+                attempt.director_id,
+                attempt.target_week_iso,
+                run.attempts,
+                run.max_attempts,
             )
-            config.last_error = "\n".join(errors)[:1000] if errors else None
-            db.commit()
-            continue
-        config.last_run_week_iso = target_week_iso
-        config.last_run_at = _now_ms()
-        config.last_error = "\n".join(errors)[:1000] if errors else None
-        db.commit()
-        logger.info(
-            "[AUTO-PLANNING] tick commit director_id=%s target_week=%s last_error=%s",
-            config.director_id,
-            target_week_iso,
-            config.last_error,
-        )
-    logger.info("[AUTO-PLANNING] tick end now=%s", now.isoformat())
+        else:
+            config.last_run_week_iso = attempt.target_week_iso
+            config.last_run_at = _now_ms()
+    db.commit()
+    logger.info(
+        "[AUTO-PLANNING] tick commit director_id=%s target_week=%s run_status=%s last_error=%s",
+        attempt.director_id,
+        attempt.target_week_iso,
+        run.status,
+        run.last_error,
+    )
+
+
+def process_auto_planning_tick(db: Session, lease_fence: LeaseFence | None = None) -> None:
+    """Met en file les directeurs dus, puis exécute les lignes prêtes en parallèle (pool borné).
+
+    La file (auto_planning_runs) survit aux redémarrages : lignes en backoff et lignes running
+    abandonnées (heartbeat périmé) sont reprises ici. Le pool est réalimenté au fil des fins :
+    un job "auto-planning" et une session par ligne. Le budget reste celui des générations
+    interactives : chaque directeur prend un slot _acquire_generation_slot pour toute sa ריצה ;
+    ses sites / groupes liés restent traités dans l'ordre sous ce slot.
+
+    lease_fence (bail du scheduler) : bail perdu → plus de mise en file, de réclamation ni
+    d'enregistrement ; les lignes en cours sont annulées et laissées au nouveau leader.
+    """
+
+    def _lease_lost() -> bool:
+        return lease_fence is not None and lease_fence.lost
+
+    now = datetime.now()
+    if _lease_lost():
+        logger.warning("[AUTO-PLANNING] tick aborted reason=lease_lost stage=start")
+        return
+    configs = db.query(DirectorAutoPlanningConfig).filter(DirectorAutoPlanningConfig.enabled == True).all()
+    logger.info("[AUTO-PLANNING] tick start now=%s enabled_configs=%s", now.isoformat(), len(configs))
+    requeue_stale_auto_planning_runs(db)
+    for due in _due_auto_planning_runs(configs, now):
+        enqueue_auto_planning_run(db, due.director_id, due.target_week_iso, due.options)
+
+    session_factory = sessionmaker(bind=db.get_bind(), autoflush=False, autocommit=False)
+    parallelism = _auto_planning_tick_parallelism()
+    done = 0
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="auto-planning-run") as pool:
+        in_flight: set = set()
+        while True:
+            if len(in_flight) < parallelism and not _lease_lost():
+                for run in claim_auto_planning_runs(db, parallelism - len(in_flight)):
+                    logger.info(
+                        "[AUTO-PLANNING] tick claim run_id=%s director_id=%s target_week=%s attempt=%s/%s",
+                        run.id,
+                        run.director_id,
+                        run.target_week_iso,
+                        run.attempts,
+                        run.max_attempts,
+                    )
+                    in_flight.add(pool.submit(_run_claimed_auto_planning, session_factory, run, lease_fence))
+            if not in_flight:
+                break
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                attempt = future.result()
+                done += 1
+                logger.info(
+                    "[AUTO-PLANNING] tick progress done=%s in_flight=%s director_id=%s job=%s generated_sites=%s errors=%s",
+                    done,
+                    len(in_flight),
+                    attempt.director_id,
+                    attempt.job_id,
+                    attempt.success_count,
+                    len(attempt.errors),
+                )
+                if _lease_lost():
+                    # Ligne laissée running : heartbeat arrêté, le nouveau leader la reprendra.
+                    logger.warning(
+                        "[AUTO-PLANNING] tick skip record reason=lease_lost run_id=%s director_id=%s",
+                        attempt.run_id,
+                        attempt.director_id,
+                    )
+                    continue
+                try:
+                    _record_auto_planning_run(db, attempt)
+                except Exception:
+                    db.rollback()
+                    logger.exception("[AUTO-PLANNING] tick record failed director_id=%s", attempt.director_id)
+    logger.info("[AUTO-PLANNING] tick end now=%s runs=%s lease_lost=%s", now.isoformat(), done, _lease_lost())
 
 
 @router.get("/settings/auto-planning", response_model=AutoPlanningConfigOut)
@@ -966,6 +1451,7 @@ def put_auto_planning_config(
             auto_save_mode=payload.auto_save_mode,
             pulls_limit=payload.pulls_limit,
             pulls_limits_by_site=_coerce_pulls_limits_for_storage(payload.pulls_limits_by_site),
+            solver_profile=payload.solver_profile,
             updated_at=now,
         )
         db.add(row)
@@ -979,6 +1465,7 @@ def put_auto_planning_config(
         row.auto_save_mode = payload.auto_save_mode
         row.pulls_limit = payload.pulls_limit
         row.pulls_limits_by_site = _coerce_pulls_limits_for_storage(payload.pulls_limits_by_site)
+        row.solver_profile = payload.solver_profile
         row.updated_at = now
     # Toute modification de créneau redéfinit le prochain déclenchement planifié.
     row.last_run_week_iso = None
@@ -987,6 +1474,8 @@ def put_auto_planning_config(
         target_week_iso = _next_week_iso(datetime.now())
         _clear_auto_planning_cache_for_director(db, int(user.id), target_week_iso)
     db.commit()
+    # Nouveau créneau : le scheduler recalcule son réveil sans attendre l'idle recheck.
+    wake_auto_planning_scheduler(db)
     db.refresh(row)
     return _serialize_auto_planning_config(row)
 
@@ -1020,15 +1509,26 @@ def test_auto_planning_now(
         )
         db.add(row)
     gpl, by_site = _pull_limits_from_config_row(row)
-    success_count, errors = _run_auto_planning_for_director(
+    options = {
+        "auto_pulls_enabled": bool(getattr(row, "auto_pulls_enabled", False)),
+        "auto_save_mode": str(getattr(row, "auto_save_mode", "manual") or "manual"),
+        "pulls_limit": gpl,
+        "pulls_limits_by_site": by_site,
+        "solver_profile": _auto_planning_solver_profile(row),
+    }
+    # Historisé dans la file (source manual-test) mais exécuté ici, sans retry.
+    run = start_auto_planning_run(db, int(user.id), target_week_iso, options, source="manual-test")
+    session_factory = sessionmaker(bind=db.get_bind(), autoflush=False, autocommit=False)
+    success_count, errors, job_id, _job_status = _run_auto_planning_job(
         db,
         user.id,
         target_week_iso,
         "manual-test",
-        auto_pulls_enabled=bool(getattr(row, "auto_pulls_enabled", False)),
-        auto_save_mode=str(getattr(row, "auto_save_mode", "manual") or "manual"),
-        pulls_limit=gpl,
-        pulls_limits_by_site=by_site,
+        site_progress=site_progress_reporter(session_factory, int(run.id)),
+        **options,
+    )
+    finish_auto_planning_run(
+        db, int(run.id), success_count=success_count, errors=errors, job_id=job_id, retryable=False,
     )
     # Si le créneau hebdo est déjà passé pour cette semaine, la ריצה ידני devient
     # le dernier résultat à garder et ne doit pas être écrasée par un tick en retard.
@@ -1038,6 +1538,7 @@ def test_auto_planning_now(
     db.refresh(row)
     return {
         "ok": len(errors) == 0,
+        "job_id": job_id,
         "target_week_iso": target_week_iso,
         "generated_sites": success_count,
         "errors": errors,
@@ -1045,3 +1546,15 @@ def test_auto_planning_now(
     }
 
 
+@router.get("/settings/auto-planning/runs", response_model=AutoPlanningRunsOut)
+def get_auto_planning_runs(
+    limit: int = Query(default=20, ge=1, le=200),
+    user: User = Depends(require_role("director")),
+    db: Session = Depends(get_db),
+):
+    """Historique des ריצות du directeur (durées, tentatives, progression par site) et
+    profondeur de file globale, pour dimensionner PLANNING_AUTO_PLANNING_PARALLELISM."""
+    return AutoPlanningRunsOut(
+        queue=AutoPlanningQueueOut(**auto_planning_queue_stats(db)),
+        runs=[AutoPlanningRunOut.model_validate(run) for run in auto_planning_run_history(db, int(user.id), limit)],
+    )
@@ -0,0 +1,361 @@
+"""File durable des ריצות תכנון אוטומטי (table auto_planning_runs).
+
+Le tick du leader met en file les directeurs dus (une ligne ouverte par directeur et semaine),
+puis réclame les lignes prêtes par UPDATE conditionnel (status='queued') : une ligne n'est
+exécutée que par un seul worker, sur SQLite comme sur Postgres. Pendant la ריצה, le worker
+écrit la progression par site et un heartbeat ; à la fin, la ligne passe succeeded / failed,
+ou revient en queued avec backoff exponentiel si l'échec est transitoire (slot occupé, job en
+erreur). Une ligne running dont le heartbeat est trop vieux (instance arrêtée en plein tick)
+est remise en file au tick suivant : la ריצה reprend après un redémarrage.
+
+PLANNING_AUTO_PLANNING_MAX_ATTEMPTS (défaut 3) : tentatives par ריצה planifiée.
+PLANNING_AUTO_PLANNING_RETRY_BASE_SECONDS (défaut 120) : premier délai de retry, doublé à chaque
+tentative, plafonné par PLANNING_AUTO_PLANNING_RETRY_MAX_SECONDS (défaut 3600).
+PLANNING_AUTO_PLANNING_RUN_STALE_SECONDS (défaut 900) : heartbeat au-delà duquel une ligne
+running est considérée abandonnée.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+from typing import Callable
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from ..models import AutoPlanningRun
+from .week_utils import _now_ms
+
+logger = logging.getLogger("ai_solver")
+
+RUN_QUEUED = "queued"
+RUN_RUNNING = "running"
+RUN_SUCCEEDED = "succeeded"
+RUN_FAILED = "failed"
+_RUN_OPEN_STATUSES = (RUN_QUEUED, RUN_RUNNING)
+
+# Un worker = un processus ; les threads du pool d'un tick partagent ce nom.
+AUTO_PLANNING_WORKER = f"{socket.gethostname()[:80]}:{os.getpid()}"
+
+
+def _env_int(name: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(float(os.getenv(name, str(default))))
+    except Exception:
+        value = default
+    return max(low, min(value, high))
+
+
+def _auto_planning_max_attempts() -> int:
+    return _env_int("PLANNING_AUTO_PLANNING_MAX_ATTEMPTS", 3, 1, 20)
+
+
+def _auto_planning_retry_delay_ms(attempts: int) -> int:
+    base = _env_int("PLANNING_AUTO_PLANNING_RETRY_BASE_SECONDS", 120, 1, 86400)
+    cap = _env_int("PLANNING_AUTO_PLANNING_RETRY_MAX_SECONDS", 3600, 1, 7 * 86400)
+    return int(min(cap, base * (2 ** max(0, int(attempts) - 1))) * 1000)
+
+
+def _auto_planning_run_stale_ms() -> int:
+    return _env_int("PLANNING_AUTO_PLANNING_RUN_STALE_SECONDS", 900, 60, 7 * 86400) * 1000
+
+
+def _open_run_for_week(db: Session, director_id: int, target_week_iso: str, source: str) -> AutoPlanningRun | None:
+    return (
+        db.query(AutoPlanningRun)
+        .filter(AutoPlanningRun.director_id == int(director_id))
+        .filter(AutoPlanningRun.target_week_iso == target_week_iso)
+        .filter(AutoPlanningRun.source == source)
+        .filter(AutoPlanningRun.status.in_(_RUN_OPEN_STATUSES))
+        .order_by(AutoPlanningRun.id.asc())
+        .first()
+    )
+
+
+def enqueue_auto_planning_run(
+    db: Session,
+    director_id: int,
+    target_week_iso: str,
+    options: dict,
+    *,
+    source: str = "scheduled",
+    now_ms: int | None = None,
+) -> AutoPlanningRun:
+    """Met en file une ריצה (idempotent : la ligne ouverte du même directeur / semaine est réutilisée)."""
+    existing = _open_run_for_week(db, director_id, target_week_iso, source)
+    if existing is not None:
+        return existing
+    now = int(now_ms if now_ms is not None else _now_ms())
+    run = AutoPlanningRun(
+        director_id=int(director_id),
+        target_week_iso=target_week_iso,
+        source=source,
+        status=RUN_QUEUED,
+        attempts=0,
+        max_attempts=_auto_planning_max_attempts(),
+        next_attempt_at=now,
+        options=options,
+        generated_sites=0,
+        created_at=now,
+    )
+    db.add(run)
+    db.commit()
+    logger.info(
+        "[AUTO-PLANNING][QUEUE] enqueued run_id=%s director_id=%s target_week=%s source=%s",
+        run.id,
+        director_id,
+        target_week_iso,
+        source,
+    )
+    return run
+
+
+def start_auto_planning_run(
+    db: Session,
+    director_id: int,
+    target_week_iso: str,
+    options: dict,
+    *,
+    source: str,
+    holder: str = AUTO_PLANNING_WORKER,
+) -> AutoPlanningRun:
+    """Ligne déjà running pour une ריצה synchrone (test-now) : historique sans passage par la file."""
+    now = _now_ms()
+    run = AutoPlanningRun(
+        director_id=int(director_id),
+        target_week_iso=target_week_iso,
+        source=source,
+        status=RUN_RUNNING,
+        attempts=1,
+        max_attempts=1,
+        next_attempt_at=now,
+        claimed_by=holder,
+        heartbeat_at=now,
+        options=options,
+        generated_sites=0,
+        created_at=now,
+        started_at=now,
+    )
+    db.add(run)
+    db.commit()
+    return run
+
+
+def requeue_stale_auto_planning_runs(db: Session, *, now_ms: int | None = None) -> int:
+    """Remet en file les lignes running sans heartbeat récent (worker arrêté) ; failed si épuisées."""
+    now = int(now_ms if now_ms is not None else _now_ms())
+    stale = (
+        db.query(AutoPlanningRun)
+        .filter(AutoPlanningRun.status == RUN_RUNNING)
+        .filter(func.coalesce(AutoPlanningRun.heartbeat_at, 0) < now - _auto_planning_run_stale_ms())
+        .all()
+    )
+    for run in stale:
+        exhausted = int(run.attempts or 0) >= int(run.max_attempts or 1)
+        logger.warning(
+            "[AUTO-PLANNING][QUEUE] stale run_id=%s director_id=%s claimed_by=%s attempts=%s/%s action=%s",
+            run.id,
+            run.director_id,
+            run.claimed_by,
+            run.attempts,
+            run.max_attempts,
+            "fail" if exhausted else "requeue",
+        )
+        run.claimed_by = None
+        run.last_error = "worker stopped before the run finished"
+        if exhausted:
+            run.status = RUN_FAILED
+            run.finished_at = now
+            run.duration_ms = now - int(run.started_at or now)
+        else:
+            run.status = RUN_QUEUED
+            run.next_attempt_at = now
+    if stale:
+        db.commit()
+    return len(stale)
+
+
+def claim_auto_planning_runs(
+    db: Session,
+    limit: int,
+    *,
+    holder: str = AUTO_PLANNING_WORKER,
+    now_ms: int | None = None,
+) -> list[AutoPlanningRun]:
+    """Réclame jusqu'à limit lignes prêtes, au plus une par directeur (slot par directeur = 1)."""
+    now = int(now_ms if now_ms is not None else _now_ms())
+    busy_directors = {
+        int(director_id)
+        for (director_id,) in db.query(AutoPlanningRun.director_id).filter(AutoPlanningRun.status == RUN_RUNNING).all()
+    }
+    candidates = (
+        db.query(AutoPlanningRun.id, AutoPlanningRun.director_id)
+        .filter(AutoPlanningRun.status == RUN_QUEUED)
+        .filter(AutoPlanningRun.next_attempt_at <= now)
+        .order_by(AutoPlanningRun.next_attempt_at.asc(), AutoPlanningRun.id.asc())
+        .all()
+    )
+    claimed_ids: list[int] = []
+    for run_id, director_id in candidates:
+        if len(claimed_ids) >= limit:
+            break
+        if int(director_id) in busy_directors:
+            continue
+        result = db.execute(
+            update(AutoPlanningRun)
+            .where(AutoPlanningRun.id == run_id)
+            .where(AutoPlanningRun.status == RUN_QUEUED)
+            .values(
+                status=RUN_RUNNING,
+                claimed_by=holder,
+                attempts=AutoPlanningRun.attempts + 1,
+                started_at=now,
+                heartbeat_at=now,
+                finished_at=None,
+                duration_ms=None,
+                progress=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if int(result.rowcount or 0) == 1:
+            claimed_ids.append(int(run_id))
+            busy_directors.add(int(director_id))
+    if not claimed_ids:
+        return []
+    db.expire_all()
+    return db.query(AutoPlanningRun).filter(AutoPlanningRun.id.in_(claimed_ids)).order_by(AutoPlanningRun.id.asc()).all()
+
+
+def heartbeat_auto_planning_run(
+    db: Session,
+    run_id: int,
+    *,
+    holder: str = AUTO_PLANNING_WORKER,
+    site_progress: dict | None = None,
+) -> bool:
+    """Heartbeat (et progression d'un site) ; False si la ligne a été reprise par un autre worker."""
+    run = db.get(AutoPlanningRun, int(run_id))
+    if run is None or run.status != RUN_RUNNING or run.claimed_by != holder:
+        return False
+    run.heartbeat_at = _now_ms()
+    if site_progress is not None:
+        progress = dict(run.progress or {})
+        sites = dict(progress.get("sites") or {})
+        sites[str(site_progress.get("site_id"))] = {k: v for k, v in site_progress.items() if k != "site_id"}
+        progress["sites"] = sites
+        progress["done_sites"] = len(sites)
+        if site_progress.get("total_sites") is not None:
+            progress["total_sites"] = int(site_progress["total_sites"])
+        # JSON réassigné (pas muté en place) : SQLAlchemy voit le changement.
+        run.progress = progress
+    db.commit()
+    return True
+
+
+def finish_auto_planning_run(
+    db: Session,
+    run_id: int,
+    *,
+    success_count: int,
+    errors: list[str],
+    job_id: str | None,
+    retryable: bool,
+    holder: str = AUTO_PLANNING_WORKER,
+    now_ms: int | None = None,
+) -> AutoPlanningRun | None:
+    """Termine la tentative : succeeded / failed, ou queued + backoff si retryable et tentatives restantes.
+
+    Sans commit : l'appelant commit avec la config du directeur (last_run_week_iso) pour qu'une
+    ligne terminée et sa semaine marquée traitée ne divergent jamais. Retourne None si la ligne
+    n'appartient plus à ce worker (remise en file entre-temps).
+    """
+    now = int(now_ms if now_ms is not None else _now_ms())
+    run = db.get(AutoPlanningRun, int(run_id))
+    if run is None or run.status != RUN_RUNNING or run.claimed_by != holder:
+        logger.warning("[AUTO-PLANNING][QUEUE] finish ignored run_id=%s reason=not_owner holder=%s", run_id, holder)
+        return None
+    run.generated_sites = int(success_count)
+    run.job_id = job_id
+    run.last_error = "\n".join(errors)[:1000] if errors else None
+    run.heartbeat_at = now
+    run.duration_ms = now - int(run.started_at or now)
+    if retryable and int(run.attempts or 0) < int(run.max_attempts or 1):
+        run.status = RUN_QUEUED
+        run.claimed_by = None
+        run.next_attempt_at = now + _auto_planning_retry_delay_ms(int(run.attempts or 1))
+    else:
+        run.status = RUN_FAILED if errors and success_count <= 0 else RUN_SUCCEEDED
+        run.finished_at = now
+    db.flush()
+    logger.info(
+        "[AUTO-PLANNING][QUEUE] finish run_id=%s director_id=%s status=%s attempts=%s/%s duration_ms=%s next_attempt_at=%s",
+        run.id,
+        run.director_id,
+        run.status,
+        run.attempts,
+        run.max_attempts,
+        run.duration_ms,
+        run.next_attempt_at if run.status == RUN_QUEUED else None,
+    )
+    return run
+
+
+def open_auto_planning_runs(db: Session) -> list[AutoPlanningRun]:
+    return db.query(AutoPlanningRun).filter(AutoPlanningRun.status.in_(_RUN_OPEN_STATUSES)).all()
+
+
+def auto_planning_queue_stats(db: Session, *, now_ms: int | None = None) -> dict:
+    """Profondeur de file globale (tous directeurs, sans identités) pour le dimensionnement."""
+    now = int(now_ms if now_ms is not None else _now_ms())
+    counts = dict(
+        db.query(AutoPlanningRun.status, func.count(AutoPlanningRun.id))
+        .filter(AutoPlanningRun.status.in_(_RUN_OPEN_STATUSES))
+        .group_by(AutoPlanningRun.status)
+        .all()
+    )
+    ready_count, oldest_ready = (
+        db.query(func.count(AutoPlanningRun.id), func.min(AutoPlanningRun.next_attempt_at))
+        .filter(AutoPlanningRun.status == RUN_QUEUED)
+        .filter(AutoPlanningRun.next_attempt_at <= now)
+        .one()
+    )
+    return {
+        "queued": int(counts.get(RUN_QUEUED, 0)),
+        "running": int(counts.get(RUN_RUNNING, 0)),
+        "ready": int(ready_count or 0),
+        "oldest_ready_wait_ms": max(0, now - int(oldest_ready)) if oldest_ready is not None else None,
+    }
+
+
+def auto_planning_run_history(db: Session, director_id: int, limit: int) -> list[AutoPlanningRun]:
+    return (
+        db.query(AutoPlanningRun)
+        .filter(AutoPlanningRun.director_id == int(director_id))
+        .order_by(AutoPlanningRun.id.desc())
+        .limit(int(limit))
+        .all()
+    )
+
+
+def site_progress_reporter(
+    session_factory: Callable[[], Session],
+    run_id: int,
+    *,
+    holder: str = AUTO_PLANNING_WORKER,
+) -> Callable[[dict | None], None]:
+    """Callback de progression d'une ריצה : session courte à part (la ריצה garde sa transaction)."""
+
+    def _report(site_progress: dict | None = None) -> None:
+        db = session_factory()
+        try:
+            heartbeat_auto_planning_run(db, run_id, holder=holder, site_progress=site_progress)
+        except Exception:
+            db.rollback()
+            logger.exception("[AUTO-PLANNING][QUEUE] progress write failed run_id=%s", run_id)
+        finally:
+            db.close()
+
+    return _report
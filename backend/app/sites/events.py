@@ -121,9 +121,8 @@ def _event_intersects_week(row: SiteEvent, week_dates: set[str]) -> bool:
 
 
 
-from .solver_bridge import (
-    _hm_to_minutes, _shift_start_minutes, _site_shift_names_ordered,
-)
+from .solver_bridge import _hm_to_minutes
+from ..shift_catalog import shift_catalog_for_config
 
 def _add_event_lock(
     out: dict[int, dict[str, list[str]]],
@@ -147,7 +146,8 @@ def _compute_site_event_availability_locks(
     event_rows: list[SiteEvent] | None = None,
 ) -> dict[int, dict[str, list[str]]]:
     """Créneaux indisponibles (אירועים) : jour + garde précédente + règle 8h."""
-    shifts = _site_shift_names_ordered(config)
+    catalog = shift_catalog_for_config(config)
+    shifts = list(catalog.names)
     if not shifts:
         return {}
     week_dates = set(_week_iso_dates(week_iso))
@@ -188,8 +188,8 @@ def _compute_site_event_availability_locks(
                         (
                             i
                             for i, sn in enumerate(shifts)
-                            if (_shift_start_minutes(config, sn) is not None)
-                            and (_shift_start_minutes(config, sn) or 0) >= start_min
+                            if (catalog.start_minutes(sn) is not None)
+                            and (catalog.start_minutes(sn) or 0) >= start_min
                         ),
                         -1,
                     )
@@ -202,7 +202,7 @@ def _compute_site_event_availability_locks(
                     _add_event_lock(out, wid, day_key, shifts[event_shift_idx - 1])
                 if end_min is not None:
                     for sn in shifts:
-                        s = _shift_start_minutes(config, sn)
+                        s = catalog.start_minutes(sn)
                         if s is None:
                             continue
                         gap = s - end_min
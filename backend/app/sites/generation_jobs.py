@@ -0,0 +1,246 @@
+"""Jobs de génération détachés de la requête HTTP.
+
+Un job tourne dans son propre thread et garde dans le registre son statut, sa progression, son
+résultat ou son erreur ; la requête qui l'a créé peut partir. On le suit par poll (GET) ou
+par abonnement SSE rejouable (GenerationEventLog avec stop_on_detach=False), on l'annule par
+DELETE. L'annulation est coopérative : le flag est vérifié entre les étapes (un solve CP-SAT
+en cours n'est pas interrompu, son résultat est simplement jeté).
+
+Les jobs terminés restent consultables PLANNING_GENERATION_JOB_TTL_SECONDS (défaut 900 s)
+puis sont purgés à la création / consultation suivante.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from fastapi import HTTPException
+
+from .generation_slots import _new_generation_id
+from .generation_streams import GenerationEventLog
+from .week_utils import _now_ms
+
+logger = logging.getLogger("ai_solver")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+JOB_CANCELLED = "cancelled"
+_JOB_FINAL_STATUSES = (JOB_DONE, JOB_ERROR, JOB_CANCELLED)
+
+
+def _generation_job_ttl_seconds() -> float:
+    try:
+        value = float(os.getenv("PLANNING_GENERATION_JOB_TTL_SECONDS", "900"))
+    except Exception:
+        value = 900.0
+    return max(0.0, min(value, 24 * 3600.0))
+
+
+class GenerationJobCancelled(Exception):
+    """Levée par le corps d'un job quand l'annulation a été demandée."""
+
+
+@dataclass
+class GenerationJob:
+    job_id: str
+    kind: str
+    director_id: int
+    site_id: int | None
+    log: GenerationEventLog
+    status: str = JOB_QUEUED
+    created_at_ms: int = field(default_factory=_now_ms)
+    started_at_ms: int | None = None
+    finished_at_ms: int | None = None
+    progress: dict = field(default_factory=dict)
+    result: Any = None
+    # detail de l'HTTPException (str ou dict, comme l'endpoint synchrone) ou message d'erreur
+    error: Any = None
+    error_status_code: int | None = None
+    _finished_mono: float | None = None
+    _done: threading.Event = field(default_factory=threading.Event)
+    _callbacks: list = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def cancel_event(self) -> threading.Event:
+        return self.log.stop_event
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _JOB_FINAL_STATUSES
+
+    def emit(self, item: dict) -> None:
+        """Publie un événement aux abonnés (jamais bloquant : un abonné lent ne freine pas le job)."""
+        try:
+            self.log.put(item, block=True, timeout=0.05)
+        except Exception:
+            # Déjà dans le tampon de rejeu : l'abonné le récupérera en se reconnectant.
+            pass
+
+    def report(self, phase: str, **details: Any) -> None:
+        self.progress = {"phase": phase, "updated_at_ms": _now_ms(), **details}
+        self.emit({"type": "progress", "job_id": self.job_id, **self.progress})
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise GenerationJobCancelled()
+
+    def cancel(self) -> bool:
+        if self.finished:
+            return False
+        self.cancel_event.set()
+        return True
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    async def wait_async(self) -> None:
+        """Attend la fin du job depuis la boucle asyncio, sans occuper de thread."""
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def _notify() -> None:
+            try:
+                loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+            except RuntimeError:  # boucle fermée
+                pass
+
+        with self._lock:
+            if self._done.is_set():
+                return
+            self._callbacks.append(_notify)
+        await done
+
+    def _finish(self, status: str) -> None:
+        with self._lock:
+            self.status = status
+            self.finished_at_ms = _now_ms()
+            self._finished_mono = time.monotonic()
+            callbacks, self._callbacks = self._callbacks, []
+            self._done.set()
+        for callback in callbacks:
+            callback()
+
+    def raise_for_status(self) -> Any:
+        """Résultat du job, ou HTTPException équivalente à celle qu'aurait levée l'endpoint synchrone."""
+        if self.status == JOB_DONE:
+            return self.result
+        if self.status == JOB_CANCELLED:
+            raise HTTPException(status_code=409, detail="Génération annulée")
+        raise HTTPException(status_code=self.error_status_code or 500, detail=self.error or "Génération échouée")
+
+    def snapshot(self, *, include_result: bool = True) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "site_id": self.site_id,
+            "status": self.status,
+            "created_at_ms": self.created_at_ms,
+            "started_at_ms": self.started_at_ms,
+            "finished_at_ms": self.finished_at_ms,
+            "progress": dict(self.progress),
+            "result": self.result if include_result and self.status == JOB_DONE else None,
+            "error": self.error,
+            "error_status_code": self.error_status_code,
+        }
+
+
+_GENERATION_JOBS_LOCK = threading.Lock()
+_GENERATION_JOBS: dict[str, GenerationJob] = {}
+
+
+def _purge_expired_generation_jobs(now: float) -> None:
+    ttl = _generation_job_ttl_seconds()
+    with _GENERATION_JOBS_LOCK:
+        for job_id in [
+            job_id for job_id, job in _GENERATION_JOBS.items()
+            if job._finished_mono is not None and now - job._finished_mono > ttl
+        ]:
+            _GENERATION_JOBS.pop(job_id, None)
+
+
+def _run_generation_job(job: GenerationJob, target: Callable[[GenerationJob], Any]) -> None:
+    job.started_at_ms = _now_ms()
+    job.status = JOB_RUNNING
+    job.emit({"type": "status", "status": "RUNNING", "job_id": job.job_id})
+    status = JOB_DONE
+    try:
+        job.check_cancelled()
+        result = target(job)
+        job.check_cancelled()
+        job.result = result
+        job.emit({"type": "result", "job_id": job.job_id, "result": result})
+    except GenerationJobCancelled:
+        status = JOB_CANCELLED
+    except HTTPException as exc:
+        status = JOB_ERROR
+        job.error = exc.detail
+        job.error_status_code = int(exc.status_code)
+    except Exception as exc:
+        logger.exception("[GENERATION][JOB] job=%s kind=%s failed", job.job_id, job.kind)
+        status = JOB_ERROR
+        job.error = str(exc)
+        job.error_status_code = 500
+    finally:
+        logger.info(
+            "[GENERATION][JOB] job=%s kind=%s director=%s site=%s status=%s",
+            job.job_id, job.kind, job.director_id, job.site_id, status,
+        )
+        job.emit({"type": "done", "job_id": job.job_id, "status": status, "error": job.error})
+        job.log.put(None)
+        job._finish(status)
+
+
+def submit_generation_job(
+    kind: str,
+    director_id: int,
+    site_id: int | None,
+    target: Callable[[GenerationJob], Any],
+    *,
+    maxsize: int = 64,
+) -> GenerationJob:
+    """Enregistre le job et démarre target(job) dans un thread dédié ; retourne immédiatement."""
+    _purge_expired_generation_jobs(time.monotonic())
+    job_id = _new_generation_id()
+    job = GenerationJob(
+        job_id=job_id,
+        kind=str(kind),
+        director_id=int(director_id),
+        site_id=int(site_id) if site_id is not None else None,
+        log=GenerationEventLog(
+            job_id,
+            director_id=int(director_id),
+            site_id=int(site_id) if site_id is not None else None,
+            maxsize=maxsize,
+            stop_on_detach=False,
+        ),
+    )
+    with _GENERATION_JOBS_LOCK:
+        _GENERATION_JOBS[job_id] = job
+    job.emit({"type": "status", "status": "QUEUED", "job_id": job_id})
+    threading.Thread(
+        target=_run_generation_job,
+        args=(job, target),
+        name=f"generation-job-{kind}",
+        daemon=True,
+    ).start()
+    return job
+
+
+def find_generation_job(job_id: str | None, director_id: int) -> GenerationJob | None:
+    if not job_id:
+        return None
+    _purge_expired_generation_jobs(time.monotonic())
+    with _GENERATION_JOBS_LOCK:
+        job = _GENERATION_JOBS.get(str(job_id))
+    if job is None or job.director_id != int(director_id):
+        return None
+    return job
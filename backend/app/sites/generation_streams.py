@@ -0,0 +1,332 @@
+"""Transport SSE des générations : pont thread → asyncio et journal d'événements rejouable.
+
+Chaque génération en flux écrit dans un GenerationEventLog (registre par generation_id) au lieu
+d'une file liée à la connexion HTTP. Les événements portent un id SSE "<generation_id>:<seq>"
+croissant et restent dans un tampon borné ; une reconnexion avec Last-Event-ID (ou
+?generation_id=...) se rattache à la génération en cours et ne rejoue que les événements
+manquants (précédés de la dernière keyframe sortie du tampon en mode delta, sans laquelle les
+deltas rejoués seraient indécodables). Quand le client part, le solveur continue pendant un délai de grâce
+(PLANNING_SSE_RESUME_GRACE_SECONDS) avant d'être arrêté si personne ne s'est rattaché.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Tuple, Union
+
+logger = logging.getLogger("ai_solver")
+
+# Élément du pont : événement brut, (id SSE, événement) ou None (fin de flux).
+SseItem = Union[dict, Tuple[str, dict], None]
+
+
+def _env_float(name: str, default: float, low: float, high: float) -> float:
+    try:
+        value = float(os.getenv(name, str(default)))
+    except Exception:
+        value = default
+    return max(low, min(value, high))
+
+
+def _resume_grace_seconds() -> float:
+    return _env_float("PLANNING_SSE_RESUME_GRACE_SECONDS", 30.0, 0.0, 600.0)
+
+
+def _resume_ttl_seconds() -> float:
+    return _env_float("PLANNING_SSE_RESUME_TTL_SECONDS", 120.0, 0.0, 3600.0)
+
+
+def _replay_buffer_size() -> int:
+    return int(_env_float("PLANNING_SSE_REPLAY_BUFFER", 512, 16, 10000))
+
+
+class _SseBridge:
+    """Pont thread producteur → boucle asyncio, sans thread par flux côté consommateur.
+
+    put() (thread producteur) garde la sémantique de queue.Queue.put (blocage, timeout,
+    queue.Full) : une place est prise par événement et rendue une fois l'événement écrit,
+    ce qui borne la mémoire (backpressure explicite). L'événement est remis à la boucle via
+    call_soon_threadsafe dans une asyncio.Queue ; None reste la sentinelle de fin.
+    """
+
+    def __init__(self, maxsize: int, loop: asyncio.AbstractEventLoop | None = None) -> None:
+        self._loop = loop or asyncio.get_running_loop()
+        self._items: "asyncio.Queue[SseItem]" = asyncio.Queue()
+        self._slots = threading.BoundedSemaphore(max(1, int(maxsize)))
+        self._closed = threading.Event()
+        # Événements rejoués à la reconnexion : hors quota, consommés en premier (FIFO).
+        self._unslotted = 0
+
+    def _acquire_slot(self, block: bool, timeout: float | None) -> bool:
+        if not block:
+            if self._slots.acquire(blocking=False):
+                return True
+            raise queue.Full
+        deadline = None if timeout is None else time.monotonic() + max(0.0, float(timeout))
+        while True:
+            wait = 0.1 if deadline is None else max(0.0, min(0.1, deadline - time.monotonic()))
+            if self._slots.acquire(timeout=wait):
+                return True
+            # Consommateur parti : ne jamais bloquer le producteur indéfiniment.
+            if self._closed.is_set():
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                raise queue.Full
+
+    def put(self, item: SseItem, block: bool = True, timeout: float | None = None) -> None:
+        if self._closed.is_set():
+            return
+        if item is not None and not self._acquire_slot(block, timeout):
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._items.put_nowait, item)
+        except RuntimeError:  # boucle fermée
+            self._closed.set()
+
+    def preload(self, items: list[SseItem]) -> None:
+        """Depuis la boucle : met en file des événements déjà produits (rejeu), sans quota."""
+        for item in items:
+            if item is not None:
+                self._unslotted += 1
+            self._items.put_nowait(item)
+
+    def end(self) -> None:
+        """Termine le flux consommateur (remplacé par une autre connexion), même fermé."""
+        self._closed.set()
+        try:
+            self._loop.call_soon_threadsafe(self._items.put_nowait, None)
+        except RuntimeError:
+            pass
+
+    async def get_batch(self) -> list[SseItem]:
+        """Attend un événement puis prend tous ceux déjà en file (écriture coalescée)."""
+        batch = [await self._items.get()]
+        while batch[-1] is not None and not self._items.empty():
+            batch.append(self._items.get_nowait())
+        return batch
+
+    def release(self, count: int) -> None:
+        replayed = min(count, self._unslotted)
+        self._unslotted -= replayed
+        for _ in range(count - replayed):
+            self._slots.release()
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+def _sse_chunk(item: SseItem) -> str:
+    if isinstance(item, tuple):
+        event_id, payload = item
+        return f"id: {event_id}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    return f"data: {json.dumps(item, ensure_ascii=False)}\n\n"
+
+
+async def _iter_sse_from_bridge(
+    bridge: _SseBridge,
+    *,
+    on_item: Callable[[dict], None] | None = None,
+) -> AsyncIterator[str]:
+    try:
+        done = False
+        while not done:
+            batch = await bridge.get_batch()
+            items = [item for item in batch if item is not None]
+            done = len(items) < len(batch)
+            try:
+                chunks: list[str] = []
+                for item in items:
+                    if on_item is not None:
+                        on_item(item[1] if isinstance(item, tuple) else item)
+                    chunks.append(_sse_chunk(item))
+                if chunks:
+                    yield "".join(chunks)
+            finally:
+                # Places rendues après l'écriture : un client lent freine le producteur.
+                bridge.release(len(items))
+    finally:
+        bridge.close()
+
+
+class GenerationEventLog:
+    """Journal borné des événements d'une génération, partagé entre connexions successives.
+
+    Côté producteur, put() remplace la file : l'événement est numéroté, gardé dans le tampon
+    puis transmis à la connexion attachée (avec sa backpressure) s'il y en a une.
+    """
+
+    def __init__(
+        self,
+        generation_id: str,
+        *,
+        director_id: int | None,
+        site_id: int | None,
+        maxsize: int,
+        stop_event: threading.Event | None = None,
+        release_slot: Callable[[], None] | None = None,
+        buffer_size: int | None = None,
+        stop_on_detach: bool = True,
+    ) -> None:
+        self.generation_id = str(generation_id)
+        self.director_id = director_id
+        self.site_id = site_id
+        self.maxsize = maxsize
+        self.stop_event = stop_event or threading.Event()
+        self._release_slot = release_slot
+        # Faux pour les jobs détachés : le départ du dernier abonné n'arrête pas le calcul.
+        self._stop_on_detach = stop_on_detach
+        self._lock = threading.Lock()
+        self._events: "deque[Tuple[int, Tuple[str, dict]]]" = deque(maxlen=buffer_size or _replay_buffer_size())
+        self._seq = 0
+        # Dernière keyframe (mode delta) évincée du tampon : référence des deltas encore rejouables.
+        self._pinned_keyframe: Tuple[int, Tuple[str, dict]] | None = None
+        self._subscriber: _SseBridge | None = None
+        self._detached_at: float | None = None
+        self.finished_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def put(self, item: dict | None, block: bool = True, timeout: float | None = None) -> None:
+        with self._lock:
+            if item is None:
+                if self.finished_at is None:
+                    self.finished_at = time.monotonic()
+                event = None
+            else:
+                self._seq += 1
+                event = (f"{self.generation_id}:{self._seq}", item)
+                if len(self._events) == self._events.maxlen and self._events[0][1][1].get("keyframe"):
+                    self._pinned_keyframe = self._events[0]
+                self._events.append((self._seq, event))
+            subscriber = self._subscriber
+        if subscriber is not None:
+            subscriber.put(event, block=block, timeout=timeout)
+
+    def attach(self, last_seq: int = 0) -> _SseBridge:
+        """Depuis la boucle : nouvelle connexion, rejoue les événements après last_seq."""
+        bridge = _SseBridge(self.maxsize)
+        with self._lock:
+            replay: list[SseItem] = [event for seq, event in self._events if seq > last_seq]
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            pinned = self._pinned_keyframe
+            if pinned is not None and pinned[0] > last_seq:
+                # Keyframe jamais reçue : la renvoyer avant les deltas qui s'y réfèrent.
+                replay.insert(0, pinned[1])
+            if last_seq and last_seq + 1 < oldest:
+                replay.insert(0, {
+                    "type": "status",
+                    "status": "INFO",
+                    "detail": f"{oldest - last_seq - 1} événements SSE perdus pendant la déconnexion.",
+                    "generation_id": self.generation_id,
+                    "missed_events": oldest - last_seq - 1,
+                })
+            if self.finished_at is not None:
+                replay.append(None)
+            previous, self._subscriber = self._subscriber, bridge
+            self._detached_at = None
+        bridge.preload(replay)
+        if previous is not None:
+            previous.end()
+        return bridge
+
+    def detach(self, bridge: _SseBridge) -> None:
+        with self._lock:
+            if self._subscriber is not bridge:
+                return
+            self._subscriber = None
+            detached_at = self._detached_at = time.monotonic()
+            finished = self.finished_at is not None
+        bridge.close()
+        if finished or not self._stop_on_detach:
+            return
+        grace = _resume_grace_seconds()
+        if grace <= 0:
+            self._expire(detached_at)
+            return
+        timer = threading.Timer(grace, self._expire, args=(detached_at,))
+        timer.daemon = True
+        timer.start()
+
+    def _expire(self, detached_at: float) -> None:
+        with self._lock:
+            if self._subscriber is not None or self._detached_at != detached_at:
+                return
+        logger.info("[SSE][RESUME] generation=%s not reattached, stopping", self.generation_id)
+        self.stop_event.set()
+        if self._release_slot is not None:
+            self._release_slot()
+
+    def expired(self, now: float) -> bool:
+        with self._lock:
+            if self.finished_at is not None:
+                return self._subscriber is None and now - self.finished_at > _resume_ttl_seconds()
+            return self.stop_event.is_set() and self._subscriber is None
+
+
+_GENERATION_LOGS_LOCK = threading.Lock()
+_GENERATION_LOGS: dict[str, GenerationEventLog] = {}
+
+
+def _register_generation_log(log: GenerationEventLog) -> None:
+    now = time.monotonic()
+    with _GENERATION_LOGS_LOCK:
+        for gid in [gid for gid, other in _GENERATION_LOGS.items() if other.expired(now)]:
+            _GENERATION_LOGS.pop(gid, None)
+        _GENERATION_LOGS[log.generation_id] = log
+
+
+def _find_generation_log(generation_id: str | None) -> GenerationEventLog | None:
+    if not generation_id:
+        return None
+    with _GENERATION_LOGS_LOCK:
+        log = _GENERATION_LOGS.get(str(generation_id))
+        if log is not None and log.expired(time.monotonic()):
+            _GENERATION_LOGS.pop(log.generation_id, None)
+            return None
+        return log
+
+
+def _parse_last_event_id(value: str | None) -> tuple[str | None, int]:
+    raw = str(value or "").strip()
+    generation_id, _, seq = raw.rpartition(":")
+    try:
+        return (generation_id or None), max(0, int(seq))
+    except ValueError:
+        return None, 0
+
+
+def _resumable_generation_log(request, director_id: int, site_id: int) -> tuple[GenerationEventLog, int] | None:
+    """Génération à rejoindre (Last-Event-ID / ?last_event_id / ?generation_id), du même directeur et site."""
+    generation_id, last_seq = _parse_last_event_id(
+        request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    )
+    generation_id = generation_id or (request.query_params.get("generation_id") or "").strip() or None
+    log = _find_generation_log(generation_id)
+    if log is None or log.director_id != int(director_id) or log.site_id != int(site_id):
+        return None
+    return log, last_seq
+
+
+async def stream_generation_log(
+    log: GenerationEventLog,
+    last_seq: int = 0,
+    *,
+    on_item: Callable[[dict], None] | None = None,
+) -> AsyncIterator[str]:
+    bridge = log.attach(last_seq)
+    if last_seq:
+        logger.info("[SSE][RESUME] generation=%s reattached after seq=%s", log.generation_id, last_seq)
+    try:
+        async for chunk in _iter_sse_from_bridge(bridge, on_item=on_item):
+            yield chunk
+    finally:
+        log.detach(bridge)
@@ -0,0 +1,194 @@
+"""Plafond global (max_shifts) d'un travailleur sur l'ensemble des sites liés.
+
+L'ancienne application copiait en profondeur chaque payload de site (alternatives comprises)
+puis recopiait chaque variante avant de la parcourir — plusieurs fois par candidat du flux
+lié, et sur chaque plan auto lié à chaque put_week_plan. Ici :
+- le roster (nom normalisé → identité par site, plafond par identité) est compilé une fois
+  (_compile_linked_cap_roster) et réutilisé par l'appelant ;
+- un passage en lecture par variante tient les compteurs globaux par identité et ne relève
+  que les cases à réécrire (dépassement, nom vide ou non normalisé) ;
+- seules ces cases sont réécrites, en copie sur écriture : un site / une variante sans
+  changement est rendu tel quel (même objet), les entrées ne sont jamais modifiées.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from ..models import SiteWorker
+from .linked_graph import _worker_identity_key
+from .pulls import (
+    _payload_has_variant, _payload_variant_pulls, _pull_extra_names_by_cell,
+)
+from .solver_bridge import _norm_name_local
+from .week_utils import _site_worker_visible_for_week
+
+logger = logging.getLogger("ai_solver")
+
+
+@dataclass(frozen=True)
+class _LinkedCapRoster:
+    site_ids: tuple[int, ...]
+    name_to_key_by_site: dict[int, dict[str, str]]
+    max_by_worker_key: dict[str, int]
+
+
+def _compile_linked_cap_roster(
+    linked_site_ids: list[int],
+    week_iso: str,
+    workers_by_site: dict[int, list[SiteWorker]],
+) -> _LinkedCapRoster:
+    name_to_key_by_site: dict[int, dict[str, str]] = {}
+    max_by_worker_key: dict[str, int] = {}
+    for sid in linked_site_ids:
+        for row in (workers_by_site.get(int(sid)) or []):
+            if bool(getattr(row, "pending_approval", False)) or not _site_worker_visible_for_week(row, week_iso):
+                continue
+            worker_key = _worker_identity_key(row)
+            if not worker_key:
+                continue
+            display_name = _norm_name_local(getattr(row, "name", ""))
+            if display_name:
+                name_to_key_by_site.setdefault(int(row.site_id), {})[display_name] = worker_key
+            max_shifts = int(getattr(row, "max_shifts", 5) or 5)
+            max_by_worker_key[worker_key] = min(max_by_worker_key.get(worker_key, max_shifts), max_shifts)
+    return _LinkedCapRoster(
+        site_ids=tuple(int(sid) for sid in linked_site_ids),
+        name_to_key_by_site=name_to_key_by_site,
+        max_by_worker_key=max_by_worker_key,
+    )
+
+
+def _variant_grid(payload: dict, variant_index: int) -> dict:
+    if variant_index < 0:
+        return payload["assignments"]
+    return payload["alternatives"][variant_index]
+
+
+def _scan_variant_cells(
+    roster: _LinkedCapRoster,
+    site_id: int,
+    grid: dict,
+    pulls: dict,
+    counts: dict[str, int],
+    variant_label: str,
+) -> list[tuple[str, str, int, list[str]]]:
+    """Compte les שיבוצים de la variante dans counts ; rend les cases à réécrire (day, shift, idx, kept)."""
+    pull_extras_by_cell = _pull_extra_names_by_cell(pulls) if pulls else {}
+    name_to_key = roster.name_to_key_by_site.get(site_id, {})
+    max_by_worker_key = roster.max_by_worker_key
+    rewrites: list[tuple[str, str, int, list[str]]] = []
+    for day_key, shifts_map in grid.items():
+        if not isinstance(shifts_map, dict):
+            continue
+        for shift_name, per_station in shifts_map.items():
+            if not isinstance(per_station, list):
+                continue
+            for station_idx, cell in enumerate(per_station):
+                if not isinstance(cell, list) or not cell:
+                    continue
+                pull_extra_names = pull_extras_by_cell.get((str(day_key), str(shift_name), station_idx), ())
+                kept: list[str] = []
+                changed = False
+                for raw_name in cell:
+                    normalized_name = _norm_name_local(raw_name)
+                    if not normalized_name:
+                        changed = True
+                        continue
+                    name = str(raw_name).strip()
+                    if name != raw_name:
+                        changed = True
+                    if normalized_name in pull_extra_names:
+                        kept.append(name)
+                        continue
+                    worker_key = name_to_key.get(normalized_name)
+                    max_allowed = max_by_worker_key.get(worker_key) if worker_key else None
+                    if max_allowed is not None:
+                        current = counts.get(worker_key, 0)
+                        if current >= max_allowed:
+                            logger.warning(
+                                "[PUT_WEEK_PLAN][GLOBAL_CAP] removed extra assignment worker=%r worker_key=%s site=%s variant=%s day=%s shift=%s global_count=%d max=%d",
+                                normalized_name,
+                                worker_key,
+                                site_id,
+                                variant_label,
+                                day_key,
+                                shift_name,
+                                current,
+                                max_allowed,
+                            )
+                            changed = True
+                            continue
+                        counts[worker_key] = current + 1
+                    kept.append(name)
+                if changed:
+                    rewrites.append((day_key, shift_name, station_idx, kept))
+    return rewrites
+
+
+def _rewrite_variant_cells(
+    payload: dict,
+    variant_index: int,
+    rewrites: list[tuple[str, str, int, list[str]]],
+) -> None:
+    """Réécrit les cases sur payload (déjà copié en surface) en ne copiant que les chemins touchés."""
+    grid = _variant_grid(payload, variant_index)
+    new_grid = dict(grid)
+    for day_key, shift_name, station_idx, kept in rewrites:
+        shifts_map = new_grid[day_key]
+        if shifts_map is grid[day_key]:
+            shifts_map = new_grid[day_key] = dict(shifts_map)
+        per_station = shifts_map[shift_name]
+        if per_station is grid[day_key][shift_name]:
+            per_station = shifts_map[shift_name] = list(per_station)
+        per_station[station_idx] = kept
+    if variant_index < 0:
+        payload["assignments"] = new_grid
+    else:
+        payload["alternatives"][variant_index] = new_grid
+
+
+def _apply_linked_global_caps(
+    roster: _LinkedCapRoster,
+    payloads_by_site: dict[str, dict],
+) -> dict[str, dict]:
+    """Plafonds globaux par variante (base puis alternatives, sites par id croissant).
+
+    Rend {site_id: payload} : payload d'entrée si rien n'a changé, sinon une copie de surface
+    dont seules les cases réécrites (et leurs conteneurs) sont neuves.
+    """
+    out: dict[str, dict] = {
+        str(site_id): payload if isinstance(payload, dict) else {}
+        for site_id, payload in payloads_by_site.items()
+    }
+    copied: set[str] = set()
+    site_order = sorted(out.keys(), key=lambda value: int(value))
+    max_alternative_count = max(
+        (len(payload["alternatives"]) if isinstance(payload.get("alternatives"), list) else 0 for payload in out.values()),
+        default=0,
+    )
+    for variant_index in [-1, *range(max_alternative_count)]:
+        counts: dict[str, int] = {}
+        variant_label = "base" if variant_index < 0 else f"alt:{variant_index + 1}"
+        for site_key in site_order:
+            payload = out[site_key]
+            if not _payload_has_variant(payload, variant_index):
+                continue
+            rewrites = _scan_variant_cells(
+                roster,
+                int(site_key),
+                _variant_grid(payload, variant_index),
+                _payload_variant_pulls(payload, variant_index),
+                counts,
+                variant_label,
+            )
+            if not rewrites:
+                continue
+            if site_key not in copied:
+                payload = out[site_key] = dict(payload)
+                if isinstance(payload.get("alternatives"), list):
+                    payload["alternatives"] = list(payload["alternatives"])
+                copied.add(site_key)
+            _rewrite_variant_cells(payload, variant_index, rewrites)
+    return out
@@ -0,0 +1,177 @@
+"""Cache du contexte de génération multi-sites, par (site racine, semaine).
+
+_build_multi_site_generation_context relisait sites, workers, זמינות hebdomadaire, plans
+sauvegardés et אירועים de tout le groupe, et recopiait chaque עמדה (rôles préfixés) à chaque
+génération liée, à chaque relance du flux lié et pour chaque groupe de l'auto-planning. La
+partie lue en base est maintenant construite une fois (instantanés détachés de la session) et
+gardée sous les versions de données des sites du groupe ; seules les surcharges de la requête
+(זמינות du site racine, jours exclus, שיבוצים fixés) sont appliquées par-dessus.
+
+Versions par site en base (Site.data_version) : tout Site / SiteWorker / SiteWeeklyAvailability
+/ SiteWeekPlan / SiteEvent flushé incrémente la version de son site dans la même transaction.
+La clé d'une entrée relit ces versions (une requête) : un commit d'un autre worker ou d'un autre
+hôte est vu dès qu'il est commité. Une session qui porte des changements non commités sur ces
+tables construit sans cache.
+PLANNING_LINKED_CONTEXT_TTL_SECONDS (défaut 300, 0 = cache coupé) borne l'âge d'une entrée
+(écritures hors ORM), PLANNING_LINKED_CONTEXT_MAX_ENTRIES (défaut 32) le nombre d'entrées (LRU).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from types import SimpleNamespace
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from ..models import Site, SiteEvent, SiteWeeklyAvailability, SiteWeekPlan, SiteWorker
+
+logger = logging.getLogger("ai_solver")
+
+_PENDING_SITES_KEY = "linked_context_sites"
+# site_id → (version en base avant la première écriture de la transaction, version après la
+# dernière) ; lu au commit par le cache du graphe multi-sites (linked_graph).
+SITE_VERSION_BUMPS_KEY = "site_data_version_bumps"
+_SITE_SCOPED_MODELS = (SiteWorker, SiteWeeklyAvailability, SiteWeekPlan, SiteEvent)
+
+
+def _env_float(name: str, default: float, low: float, high: float) -> float:
+    try:
+        value = float(os.getenv(name, str(default)))
+    except Exception:
+        value = default
+    return max(low, min(value, high))
+
+
+def _linked_context_ttl_seconds() -> float:
+    return _env_float("PLANNING_LINKED_CONTEXT_TTL_SECONDS", 300.0, 0.0, 24 * 3600.0)
+
+
+def _linked_context_max_entries() -> int:
+    return int(_env_float("PLANNING_LINKED_CONTEXT_MAX_ENTRIES", 32, 1, 1024))
+
+
+_LINKED_CONTEXT_LOCK = threading.Lock()
+# clé → (versions des sites, instant de construction, base) ; ordre = LRU.
+_CONTEXTS: "OrderedDict[Hashable, tuple[tuple, float, Any]]" = OrderedDict()
+
+
+def site_data_versions(db: Session, site_ids: list[int]) -> tuple[tuple[int, int], ...]:
+    """(site_id, data_version) lus en base ; -1 pour un site absent."""
+    ids = sorted({int(sid) for sid in site_ids})
+    if not ids:
+        return ()
+    found = {
+        int(sid): int(version or 0)
+        for sid, version in db.execute(select(Site.id, Site.data_version).where(Site.id.in_(ids))).all()
+    }
+    return tuple((sid, found.get(sid, -1)) for sid in ids)
+
+
+def detached_row(row: object) -> SimpleNamespace:
+    """Copie des colonnes d'une ligne ORM : lisible hors de la session qui l'a chargée.
+
+    Les colonnes JSON sont copiées : une modification en place de la ligne (puis flag_modified)
+    ne doit pas atteindre la base en cache.
+    """
+    return SimpleNamespace(**{
+        attr.key: deepcopy(value) if isinstance(value, (dict, list)) else value
+        for attr in inspect(type(row)).column_attrs
+        for value in (getattr(row, attr.key),)
+    })
+
+
+def _session_has_pending_site_changes(db: Session) -> bool:
+    if db.info.get(_PENDING_SITES_KEY):
+        return True
+    return any(isinstance(obj, (Site, *_SITE_SCOPED_MODELS)) for obj in (*db.new, *db.dirty, *db.deleted))
+
+
+def cached_linked_context(
+    db: Session,
+    key: Hashable,
+    site_ids: list[int],
+    build: Callable[[], Any],
+) -> Any:
+    """Base du groupe site_ids pour key : réutilisée tant qu'aucun de ces sites n'a changé.
+
+    La base rendue est partagée entre requêtes : les appelants la lisent sans la modifier.
+    """
+    ttl = _linked_context_ttl_seconds()
+    if ttl <= 0 or _session_has_pending_site_changes(db):
+        return build()
+    # Versions lues avant la construction : un commit pendant la construction les fait
+    # monter en base, l'entrée gardée sous les anciennes ne sera plus jamais servie.
+    versions = site_data_versions(db, site_ids)
+    now = time.monotonic()
+    with _LINKED_CONTEXT_LOCK:
+        hit = _CONTEXTS.get(key)
+        if hit is not None and hit[0] == versions and now - hit[1] <= ttl:
+            _CONTEXTS.move_to_end(key)
+            return hit[2]
+    base = build()
+    with _LINKED_CONTEXT_LOCK:
+        _CONTEXTS[key] = (versions, now, base)
+        _CONTEXTS.move_to_end(key)
+        while len(_CONTEXTS) > _linked_context_max_entries():
+            _CONTEXTS.popitem(last=False)
+    return base
+
+
+def invalidate_linked_context() -> None:
+    with _LINKED_CONTEXT_LOCK:
+        _CONTEXTS.clear()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_site_changes(session: Session, _flush_context) -> None:
+    touched: set[int] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Site):
+            attr = "id"
+        elif isinstance(obj, _SITE_SCOPED_MODELS):
+            attr = "site_id"
+        else:
+            continue
+        # Ancienne et nouvelle valeur : un worker déplacé change les deux sites.
+        state = inspect(obj)
+        values = state.attrs[attr].history.sum() or [state.dict.get(attr)]
+        touched.update(int(sid) for sid in values if sid is not None)
+    if touched:
+        session.info.setdefault(_PENDING_SITES_KEY, set()).update(touched)
+        _bump_site_data_versions(session, touched)
+
+
+def _bump_site_data_versions(session: Session, site_ids: set[int]) -> None:
+    """Site.data_version + 1 dans la transaction de l'écriture (Core : rien à re-flusher).
+
+    Relue juste après l'UPDATE, ligne verrouillée par la transaction : version d'avant = lue - 1,
+    exact même si un autre processus a écrit le même site juste avant.
+    """
+    ids = sorted(site_ids)
+    sites = Site.__table__
+    conn = session.connection()
+    conn.execute(update(sites).where(sites.c.id.in_(ids)).values(data_version=sites.c.data_version + 1))
+    bumps = session.info.setdefault(SITE_VERSION_BUMPS_KEY, {})
+    for sid, version in conn.execute(select(sites.c.id, sites.c.data_version).where(sites.c.id.in_(ids))).all():
+        sid, version = int(sid), int(version or 0)
+        bumps[sid] = (bumps[sid][0] if sid in bumps else version - 1, version)
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_site_changes(session: Session) -> None:
+    touched = session.info.pop(_PENDING_SITES_KEY, None)
+    if touched:
+        logger.debug("[LINKED_CONTEXT] site data versions bumped sites=%s", sorted(touched))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_site_changes(session: Session) -> None:
+    session.info.pop(_PENDING_SITES_KEY, None)
+    session.info.pop(SITE_VERSION_BUMPS_KEY, None)
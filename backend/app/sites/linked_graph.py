@@ -0,0 +1,351 @@
+"""Graphe des sites liés (même travailleur sur plusieurs sites), mis en cache par directeur.
+
+list_sites, put_week_plan (scope=auto), chaque génération liée et chaque auto-planning
+reconstruisaient le graphe en relisant tous les SiteWorker du directeur. Le cache garde un
+instantané d'identité du roster (site, clé d'identité, pending, removed_from, created_at) et
+les cartes de groupes calculées par semaine, sous un compteur de version.
+
+Invalidation write-through : les changements SiteWorker flushés (création, identité, pending,
+removed_from_week_iso, suppression) sont appliqués à l'instantané au commit de la session et
+incrémentent la version ; un Site créé / supprimé / (dés)archivé fait recharger le directeur.
+Entre processus : l'instantané garde les Site.data_version des sites du directeur (voir
+linked_context), relues à chaque lecture ; une version qui a bougé sans passer par ce
+processus fait recharger. Une session qui porte des changements de roster non commités lit
+la base directement. PLANNING_LINKED_GRAPH_TTL_SECONDS (défaut 300, 0 = cache coupé) borne
+l'âge d'un instantané (écritures hors ORM : scripts, SQL direct).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, load_only
+
+from ..models import Site, SiteWorker
+from .linked_context import SITE_VERSION_BUMPS_KEY
+from .solver_bridge import _norm_name_local
+from .week_utils import _site_worker_visible_for_week, _week_start_date
+
+logger = logging.getLogger("ai_solver")
+
+_PENDING_CHANGES_KEY = "linked_graph_changes"
+_IDENTITY_ATTRS = ("site_id", "user_id", "phone", "name", "pending_approval", "removed_from_week_iso", "created_at")
+
+
+def _linked_graph_ttl_seconds() -> float:
+    try:
+        value = float(os.getenv("PLANNING_LINKED_GRAPH_TTL_SECONDS", "300"))
+    except Exception:
+        value = 300.0
+    return max(0.0, min(value, 24 * 3600.0))
+
+
+def _worker_identity_key(row: SiteWorker) -> str:
+    if getattr(row, "user_id", None):
+        return f"user:{int(row.user_id)}"
+    # Keep identity stable across sites even when phone/name formatting differs.
+    phone_raw = str(getattr(row, "phone", "") or "")
+    phone = "".join(ch for ch in phone_raw if ch.isdigit() or ch == "+").strip()
+    if phone:
+        return f"phone:{phone}"
+    name_raw = _norm_name_local(getattr(row, "name", ""))
+    name = re.sub(r"\s+", " ", str(name_raw or "").strip()).lower()
+    return f"name:{name}"
+
+
+_WORKER_IDENTITY_LOAD = load_only(
+    SiteWorker.id,
+    SiteWorker.site_id,
+    SiteWorker.user_id,
+    SiteWorker.phone,
+    SiteWorker.name,
+    SiteWorker.pending_approval,
+    SiteWorker.removed_from_week_iso,
+    SiteWorker.created_at,
+)
+
+
+@dataclass(frozen=True)
+class _RosterEntry:
+    """Ce que le graphe lit d'un SiteWorker (mêmes noms d'attributs pour _site_worker_visible_for_week)."""
+
+    site_id: int
+    key: str
+    pending_approval: bool
+    removed_from_week_iso: str | None
+    created_at: int
+
+    @classmethod
+    def from_row(cls, row: SiteWorker | SimpleNamespace) -> "_RosterEntry":
+        return cls(
+            site_id=int(row.site_id),
+            key=_worker_identity_key(row),
+            pending_approval=bool(getattr(row, "pending_approval", False)),
+            removed_from_week_iso=getattr(row, "removed_from_week_iso", None),
+            created_at=int(getattr(row, "created_at", 0) or 0),
+        )
+
+
+@dataclass
+class _DirectorRoster:
+    director_id: int
+    site_ids: frozenset[int]
+    entries: dict[int, _RosterEntry]
+    # site_id → Site.data_version des sites vivants du directeur, à jour des commits locaux.
+    db_versions: dict[int, int] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.monotonic)
+    version: int = 0
+    graphs: dict[tuple[int, str], dict[int, list[int]]] = field(default_factory=dict)
+
+
+_LINKED_GRAPH_LOCK = threading.Lock()
+_ROSTERS: dict[int, _DirectorRoster] = {}
+# Incrémenté à chaque commit de changements de roster : un instantané lu pendant un commit
+# concurrent n'est pas mis en cache (il pourrait manquer ce commit).
+_ROSTER_EPOCH = 0
+
+
+def _cluster_map_from_entries(
+    site_ids: frozenset[int] | set[int],
+    entries: list[_RosterEntry],
+    graph_week_iso: str | None,
+) -> dict[int, list[int]]:
+    """Pour chaque site, liste triée des ids du même groupe (≥2) ; [] si isolé (union-find par identité)."""
+    sorted_site_ids = sorted(site_ids)
+    if not sorted_site_ids:
+        return {}
+    key_to_sites: dict[str, set[int]] = {}
+    for row in entries:
+        if bool(getattr(row, "pending_approval", False)) or not _site_worker_visible_for_week(row, graph_week_iso):
+            continue
+        if not row.key or row.site_id not in site_ids:
+            continue
+        key_to_sites.setdefault(row.key, set()).add(row.site_id)
+    parent = {sid: sid for sid in sorted_site_ids}
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a: int, b: int) -> None:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    for site_set in key_to_sites.values():
+        ids_sorted = sorted(site_set)
+        if len(ids_sorted) < 2:
+            continue
+        first = ids_sorted[0]
+        for sid in ids_sorted[1:]:
+            union(first, sid)
+
+    root_members: dict[int, list[int]] = {}
+    for sid in sorted_site_ids:
+        root_members.setdefault(find(sid), []).append(sid)
+    out: dict[int, list[int]] = {}
+    for members in root_members.values():
+        msorted = sorted(members)
+        for sid in msorted:
+            out[sid] = msorted if len(msorted) >= 2 else []
+    return out
+
+
+def _director_site_versions(db: Session, director_id: int) -> dict[int, int]:
+    return {
+        int(site_id): int(version or 0)
+        for site_id, version in db.execute(
+            select(Site.id, Site.data_version).where(Site.director_id == director_id, Site.deleted_at.is_(None))
+        ).all()
+    }
+
+
+def _load_director_roster(db: Session, director_id: int, db_versions: dict[int, int] | None = None) -> _DirectorRoster:
+    if db_versions is None:
+        db_versions = _director_site_versions(db, director_id)
+    site_ids = frozenset(db_versions)
+    rows = (
+        db.query(SiteWorker).options(_WORKER_IDENTITY_LOAD).filter(SiteWorker.site_id.in_(sorted(site_ids))).all()
+        if site_ids
+        else []
+    )
+    return _DirectorRoster(
+        director_id=int(director_id),
+        site_ids=site_ids,
+        entries={int(row.id): _RosterEntry.from_row(row) for row in rows},
+        db_versions=dict(db_versions),
+    )
+
+
+def _session_has_pending_roster_changes(db: Session) -> bool:
+    if db.info.get(_PENDING_CHANGES_KEY):
+        return True
+    return any(isinstance(obj, (SiteWorker, Site)) for obj in (*db.new, *db.dirty, *db.deleted))
+
+
+def linked_site_cluster_map(db: Session, director_id: int, graph_week_iso: str | None = None) -> dict[int, list[int]]:
+    """Carte des groupes multi-sites du directeur pour la semaine (None = effectif « maintenant »)."""
+    ttl = _linked_graph_ttl_seconds()
+    if ttl <= 0 or _session_has_pending_roster_changes(db):
+        roster = _load_director_roster(db, director_id)
+        return _cluster_map_from_entries(roster.site_ids, list(roster.entries.values()), graph_week_iso)
+    # Sans semaine, la visibilité dépend de la semaine courante : elle fait partie de la clé.
+    week_key = graph_week_iso or f"now:{_week_start_date(datetime.now()).date().isoformat()}"
+    db_versions = _director_site_versions(db, director_id)
+    with _LINKED_GRAPH_LOCK:
+        roster = _ROSTERS.get(int(director_id))
+        if roster is not None and time.monotonic() - roster.loaded_at > ttl:
+            roster = None
+        if roster is not None and roster.db_versions != db_versions:
+            # Écriture d'un autre processus (ou commit local pas encore vu) : on relit.
+            roster = None
+        if roster is not None:
+            cached = roster.graphs.get((roster.version, week_key))
+            if cached is not None:
+                return _copy_cluster_map(cached)
+        epoch = _ROSTER_EPOCH
+    if roster is None:
+        roster = _load_director_roster(db, director_id, db_versions)
+        with _LINKED_GRAPH_LOCK:
+            if _ROSTER_EPOCH == epoch:
+                _ROSTERS[int(director_id)] = roster
+    with _LINKED_GRAPH_LOCK:
+        version, site_ids, entries = roster.version, roster.site_ids, list(roster.entries.values())
+    graph = _cluster_map_from_entries(site_ids, entries, graph_week_iso)
+    with _LINKED_GRAPH_LOCK:
+        if roster.version == version:
+            roster.graphs[(version, week_key)] = graph
+    return _copy_cluster_map(graph)
+
+
+def _copy_cluster_map(graph: dict[int, list[int]]) -> dict[int, list[int]]:
+    return {site_id: list(members) for site_id, members in graph.items()}
+
+
+def connected_site_ids_for_root(
+    db: Session,
+    director_id: int,
+    root_site_id: int,
+    graph_week_iso: str | None = None,
+) -> list[int]:
+    return linked_site_cluster_map(db, director_id, graph_week_iso).get(int(root_site_id)) or [int(root_site_id)]
+
+
+def invalidate_linked_graph(director_id: int | None = None) -> None:
+    with _LINKED_GRAPH_LOCK:
+        if director_id is None:
+            _ROSTERS.clear()
+        else:
+            _ROSTERS.pop(int(director_id), None)
+
+
+# ---------------------------------------------------------------------------
+# Write-through : changements ORM → instantanés (au commit)
+# ---------------------------------------------------------------------------
+
+
+def _changed(obj: object, attrs: tuple[str, ...]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in attrs)
+
+
+def _entry_from_state(obj: SiteWorker, inserted: bool = False) -> _RosterEntry | None:
+    loaded = inspect(obj).dict
+    missing = [name for name in _IDENTITY_ATTRS if name not in loaded]
+    if not missing:
+        return _RosterEntry.from_row(obj)
+    if not inserted:
+        return None
+    # Ligne insérée : un attribut jamais assigné (sans défaut) a été écrit NULL.
+    return _RosterEntry.from_row(SimpleNamespace(**{name: loaded.get(name) for name in _IDENTITY_ATTRS}))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_roster_changes(session: Session, _flush_context) -> None:
+    changes: list[tuple] = []
+    for obj in session.new:
+        if isinstance(obj, SiteWorker):
+            changes.append(("upsert", obj.id, _entry_from_state(obj, inserted=True)))
+        elif isinstance(obj, Site):
+            changes.append(("director", obj.director_id))
+    for obj in session.dirty:
+        if isinstance(obj, SiteWorker) and _changed(obj, _IDENTITY_ATTRS):
+            changes.append(("upsert", obj.id, _entry_from_state(obj)))
+        elif isinstance(obj, Site) and _changed(obj, ("deleted_at", "director_id")):
+            changes.append(("director", obj.director_id))
+    for obj in session.deleted:
+        if isinstance(obj, SiteWorker):
+            changes.append(("delete", obj.id, None))
+        elif isinstance(obj, Site):
+            changes.append(("director", obj.director_id))
+    if changes:
+        session.info.setdefault(_PENDING_CHANGES_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_roster_changes(session: Session) -> None:
+    changes = session.info.pop(_PENDING_CHANGES_KEY, None) or []
+    bumps: dict[int, tuple[int, int]] = session.info.pop(SITE_VERSION_BUMPS_KEY, None) or {}
+    if not changes and not bumps:
+        return
+    global _ROSTER_EPOCH
+    updated: set[int] = set()
+    reload: set[int] = set()
+    with _LINKED_GRAPH_LOCK:
+        _ROSTER_EPOCH += 1
+        for roster in _ROSTERS.values():
+            for site_id, (before, after) in bumps.items():
+                if site_id not in roster.db_versions:
+                    continue
+                if roster.db_versions[site_id] == before:
+                    roster.db_versions[site_id] = after
+                else:
+                    # Un autre processus a écrit ce site entre-temps : instantané périmé.
+                    reload.add(roster.director_id)
+        for change in changes:
+            if change[0] == "director":
+                if change[1] is not None:
+                    reload.add(int(change[1]))
+                continue
+            op, worker_id, entry = change
+            if worker_id is None:
+                continue
+            for roster in _ROSTERS.values():
+                owns_entry = int(worker_id) in roster.entries
+                owns_site = entry is not None and entry.site_id in roster.site_ids
+                if op == "upsert" and entry is None and owns_entry:
+                    # Attributs d'identité non chargés : on ne devine pas, rechargement complet.
+                    reload.add(roster.director_id)
+                elif owns_site:
+                    roster.entries[int(worker_id)] = entry
+                    updated.add(roster.director_id)
+                elif owns_entry:
+                    roster.entries.pop(int(worker_id), None)
+                    updated.add(roster.director_id)
+        for director_id in reload:
+            _ROSTERS.pop(director_id, None)
+        for director_id in updated - reload:
+            roster = _ROSTERS[director_id]
+            roster.version += 1
+            roster.graphs.clear()
+    if updated or reload:
+        logger.info(
+            "[LINKED_GRAPH] roster changes applied updated=%s reloaded=%s",
+            sorted(updated - reload), sorted(reload),
+        )
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_roster_changes(session: Session) -> None:
+    session.info.pop(_PENDING_CHANGES_KEY, None)
+    session.info.pop(SITE_VERSION_BUMPS_KEY, None)
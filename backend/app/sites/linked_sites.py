@@ -16,6 +16,8 @@ from copy import deepcopy
 from contextlib import contextmanager
 import logging
 import secrets
+from dataclasses import dataclass
+from types import SimpleNamespace
 
 from ..deps import require_role, get_db
 from ..models import (
@@ -31,6 +33,8 @@ from ..schemas import (
     SiteEventOut, WorkerInviteLinkOut,
 )
 from ..ai_solver import solve_schedule, solve_schedule_stream
+from ..ai_solver_hierarchical import solve_schedule_hierarchical, use_hierarchical_solve
+from ..scheduling_spec import site_scheduling_spec
 from ..auth import create_worker_invite_token, ensure_director_code
 
 from .ownership import _director_site_or_404, _director_site_ownership_or_404
@@ -58,8 +62,6 @@ from .solver_bridge import (
     _norm_role_local,
 )
 from .pulls import (
-    _payload_has_variant, _payload_variant_assignments, _payload_variant_pulls,
-    _pull_extra_names_by_cell, _set_payload_variant_assignments,
     _enforce_role_requirements_on_site_plans, _pulls_count,
     _apply_auto_pulls_to_site_plans, _sanitize_pulls_map,
     _load_workers_by_site,
@@ -71,33 +73,14 @@ from .events import (
     _apply_site_event_shift_credits_to_solver_workers,
 )
 from .week_plans import _preferred_week_plan, _week_plan_rank, _save_site_week_plan
-
-router = APIRouter()
-
-def _worker_identity_key(row: SiteWorker) -> str:
-    if getattr(row, "user_id", None):
-        return f"user:{int(row.user_id)}"
-    # Keep identity stable across sites even when phone/name formatting differs.
-    phone_raw = str(getattr(row, "phone", "") or "")
-    phone = "".join(ch for ch in phone_raw if ch.isdigit() or ch == "+").strip()
-    if phone:
-        return f"phone:{phone}"
-    name_raw = _norm_name_local(getattr(row, "name", ""))
-    name = re.sub(r"\s+", " ", str(name_raw or "").strip()).lower()
-    return f"name:{name}"
-
-
-_WORKER_IDENTITY_LOAD = load_only(
-    SiteWorker.id,
-    SiteWorker.site_id,
-    SiteWorker.user_id,
-    SiteWorker.phone,
-    SiteWorker.name,
-    SiteWorker.pending_approval,
-    SiteWorker.removed_from_week_iso,
-    SiteWorker.created_at,
+from .linked_graph import (
+    _WORKER_IDENTITY_LOAD, _worker_identity_key,
+    connected_site_ids_for_root, linked_site_cluster_map,
 )
+from .linked_context import cached_linked_context, detached_row
+from .linked_caps import _LinkedCapRoster, _apply_linked_global_caps, _compile_linked_cap_roster
 
+router = APIRouter()
 
 def _director_worker_identity_rows(db: Session, director_id: int) -> list[SiteWorker]:
     """Workers du directeur (sites actifs) sans JSON answers/availability — pour les liens multi-sites."""
@@ -122,33 +105,7 @@ def _active_director_site_ids(db: Session, director_id: int) -> set[int]:
 
 def _connected_site_ids_for_root(db: Session, director_id: int, root_site_id: int, graph_week_iso: str | None = None) -> list[int]:
     """Composantes connexes par travailleur identique. Exclut pending et retraits (removed_from) pour la semaine du graphe (None = effectif « maintenant »)."""
-    rows = [
-        row
-        for row in _director_worker_identity_rows(db, director_id)
-        if not bool(getattr(row, "pending_approval", False)) and _site_worker_visible_for_week(row, graph_week_iso)
-    ]
-    site_to_keys: dict[int, set[str]] = {}
-    key_to_sites: dict[str, set[int]] = {}
-    for row in rows:
-        site_id = int(row.site_id)
-        key = _worker_identity_key(row)
-        if not key:
-            continue
-        site_to_keys.setdefault(site_id, set()).add(key)
-        key_to_sites.setdefault(key, set()).add(site_id)
-
-    visited: set[int] = set()
-    queue: list[int] = [int(root_site_id)]
-    while queue:
-        site_id = queue.pop(0)
-        if site_id in visited:
-            continue
-        visited.add(site_id)
-        for key in site_to_keys.get(site_id, set()):
-            for linked_site_id in key_to_sites.get(key, set()):
-                if linked_site_id not in visited:
-                    queue.append(linked_site_id)
-    return sorted(visited)
+    return connected_site_ids_for_root(db, director_id, root_site_id, graph_week_iso)
 
 
 def _linked_site_cluster_map_for_director(
@@ -156,57 +113,8 @@ def _linked_site_cluster_map_for_director(
     director_id: int,
     graph_week_iso: str | None = None,
 ) -> dict[int, list[int]]:
-    """Pour chaque site, liste triée des ids du même groupe multi-sites (≥2) ; [] si isolé."""
-    site_ids_set = _active_director_site_ids(db, director_id)
-    site_ids = sorted(site_ids_set)
-    if not site_ids:
-        return {}
-    rows = [
-        row
-        for row in _director_worker_identity_rows(db, director_id)
-        if not bool(getattr(row, "pending_approval", False)) and _site_worker_visible_for_week(row, graph_week_iso)
-    ]
-    key_to_sites: dict[str, set[int]] = {}
-    for row in rows:
-        key = _worker_identity_key(row)
-        if not key:
-            continue
-        key_to_sites.setdefault(key, set()).add(int(row.site_id))
-    parent = {sid: sid for sid in site_ids}
-
-    def find(x: int) -> int:
-        while parent[x] != x:
-            parent[x] = parent[parent[x]]
-            x = parent[x]
-        return x
-
-    def union(a: int, b: int) -> None:
-        ra, rb = find(a), find(b)
-        if ra != rb:
-            parent[rb] = ra
-
-    for site_set in key_to_sites.values():
-        ids_sorted = sorted(site_set)
-        if len(ids_sorted) < 2:
-            continue
-        first = ids_sorted[0]
-        for sid in ids_sorted[1:]:
-            union(first, sid)
-
-    root_members: dict[int, list[int]] = {}
-    for sid in site_ids:
-        r = find(sid)
-        root_members.setdefault(r, []).append(sid)
-    out: dict[int, list[int]] = {}
-    for _root, members in root_members.items():
-        msorted = sorted(members)
-        if len(msorted) < 2:
-            for sid in msorted:
-                out[sid] = []
-        else:
-            for sid in msorted:
-                out[sid] = msorted
-    return out
+    """Pour chaque site, liste triée des ids du même groupe multi-sites (≥2) ; [] si isolé (cache : linked_graph)."""
+    return linked_site_cluster_map(db, director_id, graph_week_iso)
 
 
 def _site_role_key(site_id: int, role_name: str | None) -> str:
@@ -286,25 +194,55 @@ def _prefix_roles_for_combined_station(station_cfg: dict, site_id: int) -> dict:
     return cloned
 
 
-def _build_multi_site_generation_context(
+@dataclass(frozen=True)
+class _MultiSiteBase:
+    """Partie du contexte multi-sites lue en base (partagée entre requêtes via linked_context : lecture seule).
+
+    rows / row_keys / row_prefs sont alignés ; combined_workers n'a ni זמינות ni préférences
+    (elles dépendent des surcharges de la requête) mais porte déjà max_shifts / site_limits
+    diminués des אירועים.
+    """
+
+    connected_site_ids: list[int]
+    sites_by_id: dict[int, SimpleNamespace]
+    workers_by_site: dict[int, list[SimpleNamespace]]
+    rows: list[SimpleNamespace]
+    row_keys: list[str]
+    row_prefs: list[tuple[dict | None, dict | None]]
+    weekly_overrides_by_site: dict[int, dict[str, dict[str, list[str]]]]
+    saved_assignments_by_site: dict[int, dict]
+    combined_config: dict
+    combined_workers: list[dict]
+    worker_keys: list[str]
+    identity_event_locks: dict[str, dict[str, set[str]]]
+    station_map: list[dict]
+    name_to_solver_by_site: dict[int, dict[str, str]]
+    display_name_by_solver_site: dict[tuple[str, int], str]
+
+
+def _load_multi_site_base(
     db: Session,
-    director_id: int,
     root_site_id: int,
     week_iso: str,
-    weekly_availability: dict[str, dict[str, list[str]]] | None = None,
-    exclude_days: list[str] | None = None,
-    fixed_assignments: dict[str, dict[str, list[list[str]]]] | None = None,
-) -> dict:
-    connected_site_ids = _connected_site_ids_for_root(db, director_id, root_site_id, week_iso)
+    connected_site_ids: list[int],
+) -> _MultiSiteBase:
     sites = db.query(Site).filter(Site.id.in_(connected_site_ids)).all() if connected_site_ids else []
-    sites_by_id = {int(s.id): s for s in sites}
-    workers_by_site = _load_workers_by_site(db, connected_site_ids) if connected_site_ids else {}
+    sites_by_id = {int(s.id): detached_row(s) for s in sites}
+    workers_by_site = {
+        int(sid): [detached_row(row) for row in site_rows]
+        for sid, site_rows in (_load_workers_by_site(db, connected_site_ids) if connected_site_ids else {}).items()
+    }
     rows = [
         row
         for sid in connected_site_ids
         for row in (workers_by_site.get(int(sid)) or [])
         if not bool(getattr(row, "pending_approval", False)) and _site_worker_visible_for_week(row, week_iso)
     ]
+    row_keys = [_worker_identity_key(row) for row in rows]
+    row_prefs = [
+        (_shift_kind_prefs_from_answers(row, week_iso), _shift_slot_prefs_from_answers(row, week_iso))
+        for row in rows
+    ]
     weekly_rows = (
         db.query(SiteWeeklyAvailability)
         .filter(SiteWeeklyAvailability.site_id.in_(connected_site_ids))
@@ -313,7 +251,7 @@ def _build_multi_site_generation_context(
         if connected_site_ids else []
     )
     weekly_overrides_by_site: dict[int, dict[str, dict[str, list[str]]]] = {
-        int(row.site_id): (row.availability or {})
+        int(row.site_id): deepcopy(row.availability or {})
         for row in weekly_rows
     }
     saved_plan_rows = (
@@ -329,73 +267,23 @@ def _build_multi_site_generation_context(
         saved_plan_rows_by_site.setdefault(int(row.site_id), []).append(row)
 
     worker_groups: dict[str, dict] = {}
-    current_site_overrides = weekly_availability or {}
-    for row in rows:
-        key = _worker_identity_key(row)
+    for row, key in zip(rows, row_keys):
         group = worker_groups.setdefault(key, {
             "solver_name": f"worker::{key}",
             "site_ids": set(),
             "site_display_names": {},
             "roles": set(),
             "max_shifts": [],
-            "availability": None,
-            "shift_kind_prefs": None,
-            "shift_slot_prefs": None,
+            "site_max_shifts": {},
         })
         site_id = int(row.site_id)
         group["site_ids"].add(site_id)
         group["site_display_names"][site_id] = row.name
         group["max_shifts"].append(int(row.max_shifts or 5))
+        # max_shifts du worker sur ce site : première occurrence
+        group["site_max_shifts"].setdefault(site_id, int(row.max_shifts or 5))
         for role_name in (row.roles or []):
             group["roles"].add(_site_role_key(site_id, str(role_name)))
-        # Soft prefs (ne touche pas multi-site / תפקידים) — première valeur non nulle
-        if group.get("shift_kind_prefs") is None:
-            prefs = _shift_kind_prefs_from_answers(row, week_iso)
-            if prefs is None and site_id == int(root_site_id):
-                root_ovr = current_site_overrides.get(row.name)
-                if isinstance(root_ovr, dict):
-                    prefs = _normalize_shift_kind_prefs(root_ovr.get("_shift_kind_prefs"))
-            if prefs is not None:
-                group["shift_kind_prefs"] = prefs
-        if group.get("shift_slot_prefs") is None:
-            slot_prefs = _shift_slot_prefs_from_answers(row, week_iso)
-            if slot_prefs is None and site_id == int(root_site_id):
-                root_ovr = current_site_overrides.get(row.name)
-                if isinstance(root_ovr, dict):
-                    slot_prefs = _normalize_shift_slot_prefs(root_ovr.get("_shift_slot_prefs"))
-            if slot_prefs is not None:
-                group["shift_slot_prefs"] = slot_prefs
-        site_weekly_overrides = weekly_overrides_by_site.get(site_id, {})
-        override = None
-        if site_id == int(root_site_id):
-            override = current_site_overrides.get(row.name)
-        if not isinstance(override, dict):
-            override = site_weekly_overrides.get(row.name)
-        # Fusionner les disponibilités par union des jours/quarts entre les sites:
-        # ne pas écraser la disponibilité déjà accumulée — prendre l'union pour que
-        # le worker logique soit disponible sur un créneau dès qu'il l'est sur l'un de ses sites.
-        if isinstance(override, dict):
-            new_avail = {
-                str(k): list(v)
-                for k, v in override.items()
-                if isinstance(v, list) and not str(k).startswith("_")
-            }
-        else:
-            new_avail = {day_key: [] for day_key in _WEEK_DAY_KEYS}
-        if new_avail is not None:
-            if group["availability"] is None:
-                group["availability"] = new_avail
-            else:
-                # Union : pour chaque jour, réunion des shifts disponibles
-                merged = dict(group["availability"])
-                for day_k, shifts_list in new_avail.items():
-                    if day_k in merged:
-                        existing = set(merged[day_k])
-                        existing.update(shifts_list)
-                        merged[day_k] = sorted(existing)
-                    else:
-                        merged[day_k] = list(shifts_list)
-                group["availability"] = merged
 
     combined_stations: list[dict] = []
     station_map: list[dict] = []
@@ -419,49 +307,14 @@ def _build_multi_site_generation_context(
             combined_stations.append(cloned)
             station_map.append({"site_id": site_id, "site_station_index": idx})
 
-    combined_config = {"stations": combined_stations}
-
     # Pour chaque site, construire la liste des indices de stations dans combined_stations
     site_station_indices: dict[int, list[int]] = {}
     for combined_idx, meta in enumerate(station_map):
         sid = int(meta["site_id"])
         site_station_indices.setdefault(sid, []).append(combined_idx)
 
-    combined_workers = []
-    for idx, (key, group) in enumerate(worker_groups.items()):
-        global_max = min(group["max_shifts"]) if group["max_shifts"] else 5
-        # site_limits: contrainte max_shifts par site pour ce worker multi-site
-        # Chaque entrée = (liste d'indices de stations du site, max_shifts pour ce site)
-        site_limits = []
-        for site_id in group["site_ids"]:
-            st_indices = site_station_indices.get(int(site_id), [])
-            # max_shifts du worker sur ce site spécifique
-            # On prend le max_shifts de la première (et unique) occurrence du worker sur ce site
-            site_row_max = 5
-            for row in rows:
-                if int(row.site_id) == int(site_id) and _worker_identity_key(row) == key:
-                    site_row_max = int(row.max_shifts or 5)
-                    break
-            if st_indices:
-                site_limits.append({"station_indices": st_indices, "max": site_row_max})
-        cw: dict = {
-            "id": idx + 1,
-            "name": group["solver_name"],
-            "max_shifts": global_max,
-            "roles": sorted(group["roles"]),
-            "availability": group["availability"] or {},
-            "site_limits": site_limits,
-        }
-        if isinstance(group.get("shift_kind_prefs"), dict):
-            cw["shift_kind_prefs"] = group["shift_kind_prefs"]
-        if isinstance(group.get("shift_slot_prefs"), dict):
-            cw["shift_slot_prefs"] = group["shift_slot_prefs"]
-        combined_workers.append(cw)
-
-    # אירועים : retirer les créneaux verrouillés (union multi-sites) de la זמינות du solveur
-    # et réduire max_shifts (chaque אירוע = 1 garde / שיבוץ).
+    # אירועים : créneaux verrouillés (union multi-sites) et gardes déjà comptées, par identité.
     identity_event_locks: dict[str, dict[str, set[str]]] = {}
-    identity_event_counts: dict[str, int] = {}
     identity_event_counts_by_site: dict[str, dict[int, int]] = {}
     all_event_rows = (
         db.query(SiteEvent).filter(SiteEvent.site_id.in_(connected_site_ids)).all()
@@ -484,10 +337,9 @@ def _build_multi_site_generation_context(
         site_counts = _count_site_event_assignments_by_worker_id(
             db, int(sid), week_iso, event_rows=event_rows,
         )
-        for row in rows:
+        for row, key in zip(rows, row_keys):
             if int(row.site_id) != int(sid):
                 continue
-            key = _worker_identity_key(row)
             wlocks = site_locks.get(int(row.id)) or {}
             if wlocks:
                 bucket = identity_event_locks.setdefault(key, {})
@@ -495,61 +347,35 @@ def _build_multi_site_generation_context(
                     bucket.setdefault(str(day_key), set()).update(str(s) for s in (shift_list or []))
             n = int(site_counts.get(int(row.id)) or 0)
             if n > 0:
-                identity_event_counts[key] = identity_event_counts.get(key, 0) + n
                 by_site = identity_event_counts_by_site.setdefault(key, {})
                 by_site[int(sid)] = by_site.get(int(sid), 0) + n
-    if identity_event_locks:
-        for cw in combined_workers:
-            nm = str(cw.get("name") or "")
-            key = nm[len("worker::") :] if nm.startswith("worker::") else nm
-            locks = identity_event_locks.get(key) or {}
-            if not locks:
-                continue
-            avail = dict(cw.get("availability") or {})
-            for day_key, locked_shifts in locks.items():
-                cur = list(avail.get(day_key) or [])
-                avail[day_key] = [sn for sn in cur if sn not in locked_shifts]
-            cw["availability"] = avail
-    if identity_event_counts:
-        # Rebuild site_id lookup from station_map indices already on each cw site_limits
-        for cw in combined_workers:
-            nm = str(cw.get("name") or "")
-            key = nm[len("worker::") :] if nm.startswith("worker::") else nm
-            total_events = int(identity_event_counts.get(key) or 0)
-            if total_events <= 0:
-                continue
-            try:
-                mx = int(cw.get("max_shifts") or 5)
-            except Exception:
-                mx = 5
-            cw["max_shifts"] = max(0, mx - total_events)
-            by_site = identity_event_counts_by_site.get(key) or {}
-            limits = cw.get("site_limits")
-            if isinstance(limits, list) and by_site:
-                # site_limits entries don't carry site_id — rebuild from group site_ids via station indices
-                for lim in limits:
-                    if not isinstance(lim, dict):
-                        continue
-                    st_indices = lim.get("station_indices") or []
-                    if not st_indices:
-                        continue
-                    # find site for first station index
-                    first_idx = int(st_indices[0]) if st_indices else -1
-                    sid_for_lim = None
-                    if 0 <= first_idx < len(station_map):
-                        sid_for_lim = int(station_map[first_idx].get("site_id"))
-                    if sid_for_lim is None:
-                        continue
-                    n_site = int(by_site.get(sid_for_lim) or 0)
-                    if n_site <= 0:
-                        continue
-                    try:
-                        lim_max = int(lim.get("max") or 5)
-                    except Exception:
-                        lim_max = 5
-                    lim["max"] = max(0, lim_max - n_site)
 
-    fixed_assignments_by_site: dict[int, dict[str, dict[str, list[list[str]]]]] = {}
+    combined_workers: list[dict] = []
+    worker_keys: list[str] = []
+    for idx, (key, group) in enumerate(worker_groups.items()):
+        events_by_site_for_key = identity_event_counts_by_site.get(key) or {}
+        global_max = min(group["max_shifts"]) if group["max_shifts"] else 5
+        # chaque אירוע = 1 garde / שיבוץ
+        global_max = max(0, global_max - sum(events_by_site_for_key.values()))
+        # site_limits: contrainte max_shifts par site pour ce worker multi-site
+        # Chaque entrée = (liste d'indices de stations du site, max_shifts pour ce site)
+        site_limits = []
+        for site_id in group["site_ids"]:
+            st_indices = site_station_indices.get(int(site_id), [])
+            if st_indices:
+                site_max = group["site_max_shifts"].get(int(site_id), 5)
+                site_max = max(0, site_max - int(events_by_site_for_key.get(int(site_id)) or 0))
+                site_limits.append({"station_indices": st_indices, "max": site_max})
+        combined_workers.append({
+            "id": idx + 1,
+            "name": group["solver_name"],
+            "max_shifts": global_max,
+            "roles": sorted(group["roles"]),
+            "site_limits": site_limits,
+        })
+        worker_keys.append(key)
+
+    saved_assignments_by_site: dict[int, dict] = {}
     for site_id in connected_site_ids:
         if int(site_id) == int(root_site_id):
             continue
@@ -557,58 +383,174 @@ def _build_multi_site_generation_context(
         preferred_data = preferred_row.data if preferred_row and isinstance(preferred_row.data, dict) else {}
         preferred_assignments = preferred_data.get("assignments")
         if isinstance(preferred_assignments, dict):
-            fixed_assignments_by_site[int(site_id)] = preferred_assignments
+            saved_assignments_by_site[int(site_id)] = deepcopy(preferred_assignments)
+
+    name_to_solver_by_site: dict[int, dict[str, str]] = {}
+    display_name_by_solver_site: dict[tuple[str, int], str] = {}
+    for group in worker_groups.values():
+        for site_id, display_name in group["site_display_names"].items():
+            name_to_solver_by_site.setdefault(int(site_id), {})[str(display_name)] = group["solver_name"]
+            display_name_by_solver_site[(group["solver_name"], int(site_id))] = str(display_name)
+
+    return _MultiSiteBase(
+        connected_site_ids=connected_site_ids,
+        sites_by_id=sites_by_id,
+        workers_by_site=workers_by_site,
+        rows=rows,
+        row_keys=row_keys,
+        row_prefs=row_prefs,
+        weekly_overrides_by_site=weekly_overrides_by_site,
+        saved_assignments_by_site=saved_assignments_by_site,
+        combined_config={"stations": combined_stations},
+        combined_workers=combined_workers,
+        worker_keys=worker_keys,
+        identity_event_locks=identity_event_locks,
+        station_map=station_map,
+        name_to_solver_by_site=name_to_solver_by_site,
+        display_name_by_solver_site=display_name_by_solver_site,
+    )
+
+
+def _request_worker_availability(
+    base: _MultiSiteBase,
+    root_site_id: int,
+    weekly_availability: dict[str, dict[str, list[str]]] | None,
+) -> tuple[dict[str, dict], dict[str, dict], dict[str, dict]]:
+    """זמינות et préférences par identité : surcharges du site racine (requête), sinon זמינות hebdo sauvegardée."""
+    availability_by_key: dict[str, dict] = {}
+    kind_prefs_by_key: dict[str, dict] = {}
+    slot_prefs_by_key: dict[str, dict] = {}
+    current_site_overrides = weekly_availability or {}
+    for row, key, (kind_prefs, slot_prefs) in zip(base.rows, base.row_keys, base.row_prefs):
+        site_id = int(row.site_id)
+        root_ovr = current_site_overrides.get(row.name) if site_id == int(root_site_id) else None
+        # Soft prefs (ne touche pas multi-site / תפקידים) — première valeur non nulle
+        if key not in kind_prefs_by_key:
+            prefs = kind_prefs
+            if prefs is None and isinstance(root_ovr, dict):
+                prefs = _normalize_shift_kind_prefs(root_ovr.get("_shift_kind_prefs"))
+            if isinstance(prefs, dict):
+                kind_prefs_by_key[key] = prefs
+        if key not in slot_prefs_by_key:
+            prefs = slot_prefs
+            if prefs is None and isinstance(root_ovr, dict):
+                prefs = _normalize_shift_slot_prefs(root_ovr.get("_shift_slot_prefs"))
+            if isinstance(prefs, dict):
+                slot_prefs_by_key[key] = prefs
+        override = root_ovr
+        if not isinstance(override, dict):
+            override = base.weekly_overrides_by_site.get(site_id, {}).get(row.name)
+        # Fusionner les disponibilités par union des jours/quarts entre les sites:
+        # ne pas écraser la disponibilité déjà accumulée — prendre l'union pour que
+        # le worker logique soit disponible sur un créneau dès qu'il l'est sur l'un de ses sites.
+        if isinstance(override, dict):
+            new_avail = {
+                str(k): list(v)
+                for k, v in override.items()
+                if isinstance(v, list) and not str(k).startswith("_")
+            }
+        else:
+            new_avail = {day_key: [] for day_key in _WEEK_DAY_KEYS}
+        merged = availability_by_key.get(key)
+        if merged is None:
+            availability_by_key[key] = new_avail
+            continue
+        # Union : pour chaque jour, réunion des shifts disponibles
+        for day_k, shifts_list in new_avail.items():
+            if day_k in merged:
+                merged[day_k] = sorted(set(merged[day_k]).union(shifts_list))
+            else:
+                merged[day_k] = list(shifts_list)
+    return availability_by_key, kind_prefs_by_key, slot_prefs_by_key
+
+
+def _build_multi_site_generation_context(
+    db: Session,
+    director_id: int,
+    root_site_id: int,
+    week_iso: str,
+    weekly_availability: dict[str, dict[str, list[str]]] | None = None,
+    exclude_days: list[str] | None = None,
+    fixed_assignments: dict[str, dict[str, list[list[str]]]] | None = None,
+) -> dict:
+    """Contexte du solveur combiné : base en cache (linked_context) + surcharges de la requête."""
+    connected_site_ids = _connected_site_ids_for_root(db, director_id, root_site_id, week_iso)
+    base: _MultiSiteBase = cached_linked_context(
+        db,
+        ("multi_site", int(director_id), int(root_site_id), str(week_iso)),
+        connected_site_ids,
+        lambda: _load_multi_site_base(db, root_site_id, week_iso, connected_site_ids),
+    )
+    availability_by_key, kind_prefs_by_key, slot_prefs_by_key = _request_worker_availability(
+        base, root_site_id, weekly_availability,
+    )
+
+    combined_workers: list[dict] = []
+    for key, base_worker in zip(base.worker_keys, base.combined_workers):
+        avail = availability_by_key.get(key) or {}
+        # אירועים : retirer les créneaux verrouillés de la זמינות du solveur
+        locks = base.identity_event_locks.get(key) or {}
+        if locks:
+            avail = dict(avail)
+            for day_key, locked_shifts in locks.items():
+                avail[day_key] = [sn for sn in (avail.get(day_key) or []) if sn not in locked_shifts]
+        cw: dict = {
+            "id": base_worker["id"],
+            "name": base_worker["name"],
+            "max_shifts": base_worker["max_shifts"],
+            "roles": base_worker["roles"],
+            "availability": avail,
+            "site_limits": base_worker["site_limits"],
+        }
+        if key in kind_prefs_by_key:
+            cw["shift_kind_prefs"] = kind_prefs_by_key[key]
+        if key in slot_prefs_by_key:
+            cw["shift_slot_prefs"] = slot_prefs_by_key[key]
+        combined_workers.append(cw)
+
+    fixed_assignments_by_site = dict(base.saved_assignments_by_site)
     if fixed_assignments:
         fixed_assignments_by_site[int(root_site_id)] = fixed_assignments
 
+    combined_stations = base.combined_config["stations"]
     combined_fixed: dict[str, dict[str, list[list[str]]]] | None = None
-    if fixed_assignments_by_site:
-        root_site = sites_by_id.get(int(root_site_id))
-        if root_site:
-            from ..ai_solver import build_capacities_from_config
-            root_days, root_shifts, _root_stations = build_capacities_from_config(root_site.config or {}, exclude_days)
-            name_to_solver_by_site: dict[int, dict[str, str]] = {}
-            for key, group in worker_groups.items():
-                for site_id, site_name in group["site_display_names"].items():
-                    name_to_solver_by_site.setdefault(int(site_id), {})[str(site_name)] = group["solver_name"]
-            combined_fixed = {day: {sh: [[] for _ in combined_stations] for sh in root_shifts} for day in root_days}
-            station_index_map_by_site: dict[int, dict[int, int]] = {}
-            for idx, meta in enumerate(station_map):
-                site_id = int(meta["site_id"])
-                station_index_map_by_site.setdefault(site_id, {})[int(meta["site_station_index"])] = idx
-            for site_id, site_fixed_assignments in fixed_assignments_by_site.items():
-                station_index_map = station_index_map_by_site.get(int(site_id), {})
-                name_to_solver = name_to_solver_by_site.get(int(site_id), {})
-                for day_key, shifts_map in (site_fixed_assignments or {}).items():
-                    if day_key not in combined_fixed or not isinstance(shifts_map, dict):
+    root_site = base.sites_by_id.get(int(root_site_id))
+    if fixed_assignments_by_site and root_site:
+        root_spec = site_scheduling_spec(root_site.config, exclude_days)
+        root_days, root_shifts = root_spec.days, root_spec.shifts
+        combined_fixed = {day: {sh: [[] for _ in combined_stations] for sh in root_shifts} for day in root_days}
+        station_index_map_by_site: dict[int, dict[int, int]] = {}
+        for idx, meta in enumerate(base.station_map):
+            site_id = int(meta["site_id"])
+            station_index_map_by_site.setdefault(site_id, {})[int(meta["site_station_index"])] = idx
+        for site_id, site_fixed_assignments in fixed_assignments_by_site.items():
+            station_index_map = station_index_map_by_site.get(int(site_id), {})
+            name_to_solver = base.name_to_solver_by_site.get(int(site_id), {})
+            for day_key, shifts_map in (site_fixed_assignments or {}).items():
+                if day_key not in combined_fixed or not isinstance(shifts_map, dict):
+                    continue
+                for shift_name, per_station in shifts_map.items():
+                    if shift_name not in combined_fixed[day_key] or not isinstance(per_station, list):
                         continue
-                    for shift_name, per_station in shifts_map.items():
-                        if shift_name not in combined_fixed[day_key] or not isinstance(per_station, list):
+                    for local_idx, cell in enumerate(per_station):
+                        combined_idx = station_index_map.get(local_idx)
+                        if combined_idx is None or not isinstance(cell, list):
                             continue
-                        for local_idx, cell in enumerate(per_station):
-                            combined_idx = station_index_map.get(local_idx)
-                            if combined_idx is None or not isinstance(cell, list):
-                                continue
-                            combined_fixed[day_key][shift_name][combined_idx] = [
-                                name_to_solver.get(str(name), str(name))
-                                for name in cell
-                                if str(name or "").strip()
-                            ]
-
-    display_name_by_solver_site: dict[tuple[str, int], str] = {}
-    for group in worker_groups.values():
-        for site_id, display_name in group["site_display_names"].items():
-            display_name_by_solver_site[(group["solver_name"], int(site_id))] = str(display_name)
+                        combined_fixed[day_key][shift_name][combined_idx] = [
+                            name_to_solver.get(str(name), str(name))
+                            for name in cell
+                            if str(name or "").strip()
+                        ]
 
     return {
-        "connected_site_ids": connected_site_ids,
-        "sites_by_id": sites_by_id,
-        "workers_by_site": workers_by_site,
-        "combined_config": combined_config,
+        "connected_site_ids": base.connected_site_ids,
+        "sites_by_id": base.sites_by_id,
+        "workers_by_site": base.workers_by_site,
+        "combined_config": base.combined_config,
         "combined_workers": combined_workers,
         "combined_fixed": combined_fixed,
-        "station_map": station_map,
-        "display_name_by_solver_site": display_name_by_solver_site,
+        "station_map": base.station_map,
+        "display_name_by_solver_site": base.display_name_by_solver_site,
         "exclude_days": exclude_days,
     }
 
@@ -630,20 +572,15 @@ def _split_multi_site_assignments(
         site = sites_by_id.get(site_id)
         if not site:
             continue
-        from ..ai_solver import build_capacities_from_config
-        days, shifts, stations = build_capacities_from_config(site.config or {}, exclude_days)
-        required_count = 0
-        for st in stations:
-            cap_map = (st.get("capacity") or {})
-            for day_key in days:
-                for shift_name in shifts:
-                    required_count += int((cap_map.get(day_key, {}) or {}).get(shift_name, 0) or 0)
+        spec = site_scheduling_spec(site.config, exclude_days)
+        days, shifts, stations = spec.capacities()
+        required_count = spec.required_total
         site_plans_local[str(site_id)] = {
             "site_id": site_id,
             "site_name": site.name,
             "days": days,
             "shifts": shifts,
-            "stations": [st.get("name") for st in stations],
+            "stations": list(spec.station_names),
             "assignments": {day: {shift: [[] for _ in stations] for shift in shifts} for day in days},
             "status": status,
             "objective": objective,
@@ -778,99 +715,21 @@ def _enforce_linked_global_caps_on_site_payloads(
     week_iso: str,
     payloads_by_site: dict[str, dict],
     workers_by_site: dict[int, list[SiteWorker]] | None = None,
+    cap_roster: _LinkedCapRoster | None = None,
 ) -> dict[str, dict]:
-    if len(linked_site_ids) <= 1 or not payloads_by_site:
-        return {str(site_id): deepcopy(payload) for site_id, payload in payloads_by_site.items()}
+    """Plafond max_shifts global par identité sur les sites liés (linked_caps).
 
-    loaded = workers_by_site if workers_by_site is not None else _load_workers_by_site(db, linked_site_ids)
-    rows = [
-        row
-        for sid in linked_site_ids
-        for row in (loaded.get(int(sid)) or [])
-        if not bool(getattr(row, "pending_approval", False)) and _site_worker_visible_for_week(row, week_iso)
-    ]
-    if not rows:
-        return {str(site_id): deepcopy(payload) for site_id, payload in payloads_by_site.items()}
-
-    normalized_payloads: dict[str, dict] = {
-        str(site_id): deepcopy(payload) if isinstance(payload, dict) else {}
-        for site_id, payload in payloads_by_site.items()
-    }
-    name_to_key_by_site: dict[int, dict[str, str]] = {}
-    max_by_worker_key: dict[str, int] = {}
-    for row in rows:
-        worker_key = _worker_identity_key(row)
-        if not worker_key:
-            continue
-        site_id_int = int(row.site_id)
-        display_name = _norm_name_local(getattr(row, "name", ""))
-        if display_name:
-            name_to_key_by_site.setdefault(site_id_int, {})[display_name] = worker_key
-        max_shifts = int(getattr(row, "max_shifts", 5) or 5)
-        max_by_worker_key[worker_key] = min(max_by_worker_key.get(worker_key, max_shifts), max_shifts)
-
-    if not max_by_worker_key:
-        return normalized_payloads
-
-    max_alternative_count = max(
-        (
-            len(payload.get("alternatives") or [])
-            if isinstance(payload.get("alternatives"), list) else 0
-        )
-        for payload in normalized_payloads.values()
-    ) if normalized_payloads else 0
-
-    for variant_index in [-1, *range(max_alternative_count)]:
-        global_counts: dict[str, int] = {}
-        variant_label = "base" if variant_index < 0 else f"alt:{variant_index + 1}"
-        for site_id_str in sorted(normalized_payloads.keys(), key=lambda value: int(value)):
-            payload = normalized_payloads[site_id_str]
-            if not _payload_has_variant(payload, variant_index):
-                continue
-            site_id_int = int(site_id_str)
-            assignments = _payload_variant_assignments(payload, variant_index)
-            pull_extras_by_cell = _pull_extra_names_by_cell(_payload_variant_pulls(payload, variant_index))
-            name_to_key = name_to_key_by_site.get(site_id_int, {})
-            for day_key, shifts_map in assignments.items():
-                if not isinstance(shifts_map, dict):
-                    continue
-                for shift_name, per_station in shifts_map.items():
-                    if not isinstance(per_station, list):
-                        continue
-                    for station_idx, cell in enumerate(per_station):
-                        if not isinstance(cell, list):
-                            continue
-                        pull_extra_names = pull_extras_by_cell.get((str(day_key), str(shift_name), station_idx), set())
-                        kept: list[str] = []
-                        for raw_name in cell:
-                            normalized_name = _norm_name_local(raw_name)
-                            if not normalized_name:
-                                continue
-                            if normalized_name in pull_extra_names:
-                                kept.append(str(raw_name).strip())
-                                continue
-                            worker_key = name_to_key.get(normalized_name)
-                            max_allowed = max_by_worker_key.get(worker_key) if worker_key else None
-                            if worker_key and max_allowed is not None and global_counts.get(worker_key, 0) >= max_allowed:
-                                logger.warning(
-                                    "[PUT_WEEK_PLAN][GLOBAL_CAP] removed extra assignment worker=%r worker_key=%s site=%s variant=%s day=%s shift=%s global_count=%d max=%d",
-                                    normalized_name,
-                                    worker_key,
-                                    site_id_str,
-                                    variant_label,
-                                    day_key,
-                                    shift_name,
-                                    global_counts.get(worker_key, 0),
-                                    max_allowed,
-                                )
-                                continue
-                            if worker_key and max_allowed is not None:
-                                global_counts[worker_key] = global_counts.get(worker_key, 0) + 1
-                            kept.append(str(raw_name).strip())
-                        cell[:] = kept
-            _set_payload_variant_assignments(payload, variant_index, assignments)
-
-    return normalized_payloads
+    Sans copie : un payload sans changement est rendu tel quel (même objet), les autres sont
+    réécrits en copie sur écriture ; payloads_by_site n'est jamais modifié.
+    """
+    if len(linked_site_ids) <= 1 or not payloads_by_site:
+        return dict(payloads_by_site)
+    if cap_roster is None:
+        loaded = workers_by_site if workers_by_site is not None else _load_workers_by_site(db, linked_site_ids)
+        cap_roster = _compile_linked_cap_roster(linked_site_ids, week_iso, loaded)
+    if not cap_roster.max_by_worker_key:
+        return dict(payloads_by_site)
+    return _apply_linked_global_caps(cap_roster, payloads_by_site)
 
 
 def _count_assignments_in_grid(assignments: dict | None) -> int:
@@ -906,6 +765,7 @@ def _enforce_linked_global_caps_on_site_plans(
     week_iso: str,
     site_plans: dict[str, dict],
     workers_by_site: dict[int, list[SiteWorker]] | None = None,
+    cap_roster: _LinkedCapRoster | None = None,
 ) -> dict[str, dict]:
     normalized_site_plans = _enforce_linked_global_caps_on_site_payloads(
         db,
@@ -913,8 +773,12 @@ def _enforce_linked_global_caps_on_site_plans(
         week_iso,
         site_plans,
         workers_by_site=workers_by_site,
+        cap_roster=cap_roster,
     )
-    for site_plan in normalized_site_plans.values():
+    input_plan_ids = {id(site_plan) for site_plan in site_plans.values()}
+    for site_key, site_plan in normalized_site_plans.items():
+        if isinstance(site_plan, dict) and id(site_plan) in input_plan_ids:
+            site_plan = normalized_site_plans[site_key] = dict(site_plan)
         _refresh_site_plan_assigned_count(site_plan)
     return normalized_site_plans
 
@@ -929,6 +793,8 @@ def _generate_multi_site_memory_plans(
     fixed_assignments: dict[str, dict[str, list[list[str]]]] | None = None,
     time_limit_seconds: int | None = 20,
     num_alternatives: int | None = 20,
+    stats_key: str | None = None,
+    solver_profile: str | None = None,
 ) -> dict:
     context = _build_multi_site_generation_context(
         db,
@@ -942,7 +808,9 @@ def _generate_multi_site_memory_plans(
 
     root_site = (context.get("sites_by_id") or {}).get(int(root_site_id))
     root_config = (root_site.config if root_site else None) or {}
-    result = solve_schedule(
+    # Très grand groupe : un CP-SAT par site, workers partagés coordonnés par quotas.
+    solve = solve_schedule_hierarchical if use_hierarchical_solve(context["combined_config"], exclude_days) else solve_schedule
+    result = solve(
         context["combined_config"],
         context["combined_workers"],
         time_limit_seconds=int(time_limit_seconds or 20),
@@ -950,6 +818,8 @@ def _generate_multi_site_memory_plans(
         num_alternatives=num_alternatives,
         fixed_assignments=context["combined_fixed"],
         exclude_days=exclude_days,
+        stats_key=stats_key,
+        solver_profile=solver_profile,
     )
 
     filled_base_site_plans = _split_multi_site_assignments(
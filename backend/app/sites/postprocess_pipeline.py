@@ -0,0 +1,88 @@
+"""Étage de post-traitement pipeliné (pool borné, résultats rendus dans l'ordre de soumission).
+
+Le producteur du flux lié transformait chaque candidat (split par site, rôles, plafonds globaux,
+משיכות, signature) sur son propre thread, pendant que CP-SAT attendait. Avec cet étage, le
+producteur soumet le candidat et continue de consommer le solveur ; un pool de
+PLANNING_LINKED_POSTPROCESS_WORKERS threads (défaut 2) transforme en parallèle et au plus
+PLANNING_LINKED_POSTPROCESS_IN_FLIGHT candidats (défaut 2 × workers) sont en vol : au-delà,
+push() attend le plus ancien (backpressure vers le solveur).
+"""
+
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Generic, Iterator, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def _env_int(name: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except Exception:
+        value = default
+    return max(low, min(value, high))
+
+
+def _postprocess_workers() -> int:
+    return _env_int("PLANNING_LINKED_POSTPROCESS_WORKERS", 2, 1, 8)
+
+
+def _postprocess_in_flight(workers: int) -> int:
+    return _env_int("PLANNING_LINKED_POSTPROCESS_IN_FLIGHT", 2 * workers, 1, 64)
+
+
+class OrderedPostprocessStage(Generic[T, R]):
+    """fn(item) exécuté dans le pool ; push()/drain() rendent (item, résultat) dans l'ordre d'entrée.
+
+    Une exception de fn est relevée pendant l'itération, après les résultats des items précédents.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[T], R],
+        *,
+        workers: int | None = None,
+        max_in_flight: int | None = None,
+        name: str = "postprocess",
+    ) -> None:
+        self._fn = fn
+        workers = workers or _postprocess_workers()
+        self._max_in_flight = max_in_flight or _postprocess_in_flight(workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._pending: "deque[Tuple[T, Future]]" = deque()
+
+    def __enter__(self) -> "OrderedPostprocessStage[T, R]":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _iter_ready(self, block_until: int) -> Iterator[Tuple[T, R]]:
+        while self._pending and (self._pending[0][1].done() or len(self._pending) > block_until):
+            item, future = self._pending.popleft()
+            yield item, future.result()
+
+    def push(self, item: T) -> Iterator[Tuple[T, R]]:
+        """Soumet item ; itère les résultats prêts en tête (n'attend que si l'étage est plein).
+
+        À consommer dans la foulée : c'est l'itération qui applique la borne d'items en vol.
+        """
+        self._pending.append((item, self._pool.submit(self._fn, item)))
+        return self._iter_ready(self._max_in_flight - 1)
+
+    def drain(self) -> Iterator[Tuple[T, R]]:
+        """Attend les items en vol (fin d'une tentative du solveur)."""
+        return self._iter_ready(0)
+
+    def discard(self) -> None:
+        """Abandonne les items en vol (objectif atteint / client parti)."""
+        while self._pending:
+            self._pending.popleft()[1].cancel()
+
+    def close(self) -> None:
+        self.discard()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -14,6 +14,8 @@ import time
 from datetime import datetime, timedelta
 from copy import deepcopy
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import logging
 import secrets
 
@@ -31,6 +33,7 @@ from ..schemas import (
     SiteEventOut, WorkerInviteLinkOut,
 )
 from ..ai_solver import solve_schedule, solve_schedule_stream
+from ..ai_solver_model import PullsModelSpec
 from ..auth import create_worker_invite_token, ensure_director_code
 
 from .ownership import _director_site_or_404, _director_site_ownership_or_404
@@ -54,9 +57,10 @@ logger = logging.getLogger("ai_solver")
 from .solver_bridge import (
     _norm_name_local, _norm_role_local, _hours_of, _hours_from_config,
     _parse_hours_range, _to_minutes, _from_minutes,
-    _is_morning_shift_name, _is_noon_shift_name, _is_night_shift_name,
     _site_shift_names_ordered, _shift_order_index,
 )
+from ..scheduling_spec import site_scheduling_spec
+from ..shift_catalog import shift_catalog_for_config, shift_kind_from_name
 
 def _split_range_for_pulls(start: str, end: str, max_each_minutes: int = 4 * 60) -> tuple[dict, dict]:
     s = _to_minutes(start)
@@ -79,13 +83,7 @@ _PULLS_KIND_ORDER = {"morning": 0, "noon": 1, "night": 2}
 
 
 def _shift_pull_kind(shift_name: str) -> str | None:
-    if _is_morning_shift_name(shift_name):
-        return "morning"
-    if _is_noon_shift_name(shift_name):
-        return "noon"
-    if _is_night_shift_name(shift_name):
-        return "night"
-    return None
+    return shift_kind_from_name(shift_name)
 
 
 def _normalize_pulls_prefer(raw: object | None) -> tuple[str, ...] | None:
@@ -155,14 +153,14 @@ def _count_split_day_same_worker_patterns(site_config: dict | None, assignments:
       worker A in the morning, worker B at noon, worker A at night.
     If noon also contains A (for example after a pull), the pattern is not counted.
     """
-    from ..ai_solver import build_capacities_from_config
-
     if not isinstance(assignments, dict):
         return 0
-    days, shifts, _stations = build_capacities_from_config(site_config or {})
-    morning_shifts = [shift_name for shift_name in shifts if _is_morning_shift_name(shift_name)]
-    noon_shifts = [shift_name for shift_name in shifts if _is_noon_shift_name(shift_name)]
-    night_shifts = [shift_name for shift_name in shifts if _is_night_shift_name(shift_name)]
+    spec = site_scheduling_spec(site_config)
+    days, shifts = spec.days, spec.shifts
+    catalog = shift_catalog_for_config(site_config)
+    morning_shifts = [shift_name for shift_name in shifts if catalog.is_morning(shift_name)]
+    noon_shifts = [shift_name for shift_name in shifts if catalog.is_noon(shift_name)]
+    night_shifts = [shift_name for shift_name in shifts if catalog.is_night(shift_name)]
     if not morning_shifts or not noon_shifts or not night_shifts:
         return 0
 
@@ -199,35 +197,137 @@ def _count_split_day_same_worker_patterns(site_config: dict | None, assignments:
     return total
 
 
-def _apply_auto_pulls_to_payload(
+@dataclass(frozen=True)
+class _PullTarget:
+    station_idx: int
+    day_idx: int
+    shift_idx: int
+    required: int
+    prev_coord: tuple[int, int]
+    next_coord: tuple[int, int]
+    priority: tuple[int, int, str]
+    crosses_day_boundary: int
+    role_names: tuple[str, ...]
+
+
+@dataclass
+class _PullSiteContext:
+    """Partie « site » du moteur de משיכות, compilée une fois pour toutes les alternatives.
+
+    Cases cibles (priorité de kind, rôles requis, voisines), rôles des workers et coupures
+    horaires ; seul le tri par « même worker autour » dépend du plan et reste par candidat.
+    """
+
+    days: list[str]
+    shifts: list[str]
+    station_cfgs: list
+    targets: tuple[_PullTarget, ...]
+    prev_coords: dict[tuple[int, int], tuple[int, int] | None]
+    next_coords: dict[tuple[int, int], tuple[int, int] | None]
+    name_to_roles: dict[str, set[str]]
+    _ranges: dict[tuple[int, int, int], tuple[dict, dict]] = field(default_factory=dict)
+
+    def worker_has_role(self, worker_name: str, role_name: str) -> bool:
+        return _norm_role_local(role_name) in self.name_to_roles.get(_norm_name_local(worker_name), set())
+
+    def split_ranges(self, target: _PullTarget) -> tuple[dict, dict]:
+        key = (target.station_idx, target.day_idx, target.shift_idx)
+        cached = self._ranges.get(key)
+        if cached is None:
+            station_cfg = (
+                self.station_cfgs[target.station_idx]
+                if target.station_idx < len(self.station_cfgs) and isinstance(self.station_cfgs[target.station_idx], dict)
+                else {}
+            )
+            shift_name, day_key = self.shifts[target.shift_idx], self.days[target.day_idx]
+            hours = _hours_from_config(station_cfg, shift_name, day_key) or _hours_of(shift_name) or "00:00-00:00"
+            parsed = _parse_hours_range(hours)
+            shift_start, shift_end = parsed if parsed else ("00:00", "00:00")
+            cached = self._ranges[key] = _split_range_for_pulls(shift_start, shift_end)
+        return cached
+
+
+def _compile_pull_context(
     site: Site,
     rows: list[SiteWorker],
-    payload: dict,
-    pulls_limit: int | None = None,
     pulls_prefer: object | None = None,
-) -> dict:
-    from ..ai_solver import build_capacities_from_config
-
-    assignments = payload.get("assignments")
-    if not isinstance(assignments, dict):
-        return payload
-
+) -> _PullSiteContext:
     site_cfg = site.config or {}
     station_cfgs = (site_cfg.get("stations") or []) if isinstance(site_cfg, dict) else []
-    days, shifts, stations = build_capacities_from_config(site_cfg)
-    name_to_roles = {
-        _norm_name_local(r.name): {_norm_role_local(x) for x in (r.roles or [])}
-        for r in rows
-    }
-    pulls: dict[str, dict] = {}
-    normalized_pulls_limit = int(pulls_limit) if pulls_limit is not None else None
+    spec = site_scheduling_spec(site_cfg)
+    days, shifts, stations = spec.capacities()
     prefer_kinds = _normalize_pulls_prefer(pulls_prefer)
 
-    def worker_has_role(worker_name: str, role_name: str) -> bool:
-        return _norm_role_local(role_name) in name_to_roles.get(_norm_name_local(worker_name), set())
+    n_days, n_shifts = len(days), len(shifts)
+    prev_coords: dict[tuple[int, int], tuple[int, int] | None] = {}
+    next_coords: dict[tuple[int, int], tuple[int, int] | None] = {}
+    for day_idx in range(n_days):
+        for shift_idx in range(n_shifts):
+            if shift_idx > 0:
+                prev_coords[(day_idx, shift_idx)] = (day_idx, shift_idx - 1)
+            else:
+                prev_coords[(day_idx, shift_idx)] = (day_idx - 1, n_shifts - 1) if day_idx > 0 else None
+            if shift_idx < n_shifts - 1:
+                next_coords[(day_idx, shift_idx)] = (day_idx, shift_idx + 1)
+            else:
+                next_coords[(day_idx, shift_idx)] = (day_idx + 1, 0) if day_idx < n_days - 1 else None
+
+    targets: list[_PullTarget] = []
+    for station_idx in range(len(stations)):
+        for day_idx in range(n_days):
+            for shift_idx, shift_name in enumerate(shifts):
+                required = spec.required(station_idx, day_idx, shift_idx)
+                prev_coord = prev_coords[(day_idx, shift_idx)]
+                next_coord = next_coords[(day_idx, shift_idx)]
+                if required <= 0 or not prev_coord or not next_coord:
+                    continue
+                req_roles = spec.required_roles(station_idx, day_idx, shift_idx) or {}
+                targets.append(_PullTarget(
+                    station_idx=station_idx,
+                    day_idx=day_idx,
+                    shift_idx=shift_idx,
+                    required=required,
+                    prev_coord=prev_coord,
+                    next_coord=next_coord,
+                    priority=_pull_target_shift_priority(shift_name, prefer_kinds),
+                    crosses_day_boundary=int(prev_coord[0] != day_idx or next_coord[0] != day_idx),
+                    role_names=tuple(str(x) for x in req_roles.keys() if str(x).strip()) if req_roles else (),
+                ))
+    return _PullSiteContext(
+        days=days,
+        shifts=shifts,
+        station_cfgs=station_cfgs,
+        targets=tuple(targets),
+        prev_coords=prev_coords,
+        next_coords=next_coords,
+        name_to_roles={
+            _norm_name_local(r.name): {_norm_role_local(x) for x in (r.roles or [])}
+            for r in rows
+        },
+    )
+
+
+def _apply_pulls_with_context(
+    ctx: _PullSiteContext,
+    assignments: dict,
+    pulls_limit: int | None = None,
+    pull_cells: list | None = None,
+) -> tuple[dict, dict]:
+    """Matérialise les משיכות d'un plan ; retourne (assignments, pulls) sans modifier l'entrée.
+
+    Copie sur écriture : seuls le jour et la garde d'une case modifiée sont recopiés, les autres
+    listes restent partagées avec le plan d'entrée (plus de deepcopy par alternative).
+    """
+    days, shifts = ctx.days, ctx.shifts
+    prev_coords, next_coords = ctx.prev_coords, ctx.next_coords
+    grid = dict(assignments)
+    copied_days: set[str] = set()
+    copied_slots: set[tuple[str, str]] = set()
+    pulls: dict[str, dict] = {}
+    normalized_pulls_limit = int(pulls_limit) if pulls_limit is not None else None
 
     def get_cell_names(day_key: str, shift_name: str, station_idx: int) -> list[str]:
-        per_shift = (assignments.get(day_key) or {}).get(shift_name) or []
+        per_shift = (grid.get(day_key) or {}).get(shift_name) or []
         if not isinstance(per_shift, list) or station_idx >= len(per_shift):
             return []
         raw = per_shift[station_idx]
@@ -236,161 +336,105 @@ def _apply_auto_pulls_to_payload(
         return [nm for x in raw if (nm := _norm_name_local(x))]
 
     def set_cell_names(day_key: str, shift_name: str, station_idx: int, names: list[str]) -> None:
-        assignments.setdefault(day_key, {})
-        per_shift = assignments[day_key].setdefault(shift_name, [])
+        if day_key not in copied_days:
+            grid[day_key] = dict(grid.get(day_key) or {})
+            copied_days.add(day_key)
+        if (day_key, shift_name) not in copied_slots:
+            grid[day_key][shift_name] = list(grid[day_key].get(shift_name) or [])
+            copied_slots.add((day_key, shift_name))
+        per_shift = grid[day_key][shift_name]
         while len(per_shift) <= station_idx:
             per_shift.append([])
         per_shift[station_idx] = names
 
-    def pulled_names_for(day_key: str, shift_name: str) -> set[str]:
-        out: set[str] = set()
-        prefix = f"{day_key}|{shift_name}|"
-        for key, entry in pulls.items():
-            if not str(key).startswith(prefix):
-                continue
-            before_name = _norm_name_local(((entry or {}).get("before") or {}).get("name"))
-            after_name = _norm_name_local(((entry or {}).get("after") or {}).get("name"))
-            if before_name:
-                out.add(before_name)
-            if after_name:
-                out.add(after_name)
-        return out
-
-    def prev_of(day_idx: int, shift_idx: int) -> tuple[int, int] | None:
-        if day_idx == 0 and shift_idx == 0:
-            return None
-        if shift_idx == 0:
-            return (day_idx - 1, len(shifts) - 1)
-        return (day_idx, shift_idx - 1)
-
-    def next_of(day_idx: int, shift_idx: int) -> tuple[int, int] | None:
-        if day_idx == len(days) - 1 and shift_idx == len(shifts) - 1:
-            return None
-        if shift_idx == len(shifts) - 1:
-            return (day_idx + 1, 0)
-        return (day_idx, shift_idx + 1)
-
-    def guard_occurrence_used_by_pull(day_idx: int, shift_idx: int, station_idx: int, worker_name: str) -> bool:
-        worker_norm = _norm_name_local(worker_name)
-        if not worker_norm:
-            return False
-        for pull_key, entry in pulls.items():
-            parts = str(pull_key or "").split("|")
-            if len(parts) < 4:
-                continue
-            pull_day_key = parts[0]
-            pull_shift_name = parts[1]
-            try:
-                pull_station_idx = int(parts[2])
-            except Exception:
-                continue
-            if pull_station_idx != station_idx:
-                continue
-            try:
-                pull_day_idx = days.index(pull_day_key)
-                pull_shift_idx = shifts.index(pull_shift_name)
-            except ValueError:
-                continue
-            pull_prev = prev_of(pull_day_idx, pull_shift_idx)
-            pull_next = next_of(pull_day_idx, pull_shift_idx)
-            entry_map = entry if isinstance(entry, dict) else {}
-            before_name = _norm_name_local(((entry_map.get("before") or {}) if isinstance(entry_map.get("before"), dict) else {}).get("name"))
-            after_name = _norm_name_local(((entry_map.get("after") or {}) if isinstance(entry_map.get("after"), dict) else {}).get("name"))
-            if before_name == worker_norm and pull_prev == (day_idx, shift_idx):
-                return True
-            if after_name == worker_norm and pull_next == (day_idx, shift_idx):
-                return True
-        return False
-
-    def _has_same_worker_around_middle(day_idx: int, shift_idx: int, station_idx: int) -> bool:
-        prev_coord = prev_of(day_idx, shift_idx)
-        next_coord = next_of(day_idx, shift_idx)
-        if not prev_coord or not next_coord:
-            return False
-        prev_names = set(get_cell_names(days[prev_coord[0]], shifts[prev_coord[1]], station_idx))
-        next_names = set(get_cell_names(days[next_coord[0]], shifts[next_coord[1]], station_idx))
+    # Index des משיכות déjà posées (remplacent les scans de clés "day|shift|station|slot") :
+    # nombre par case, noms prêtés par garde (toutes stations) et occurrences de garde prêtées.
+    pull_count_by_cell: dict[tuple[int, int, int], int] = {}
+    pulled_names_by_slot: dict[tuple[int, int], set[str]] = {}
+    lent_occurrences: set[tuple[int, int, int, str]] = set()
+
+    def pulled_names_for(coord: tuple[int, int] | None) -> set[str]:
+        return pulled_names_by_slot.get(coord, set()) if coord else set()
+
+    def record_pull(target: _PullTarget, before_name: str, after_name: str) -> None:
+        cell = (target.day_idx, target.shift_idx, target.station_idx)
+        pull_count_by_cell[cell] = pull_count_by_cell.get(cell, 0) + 1
+        pulled_names_by_slot.setdefault((target.day_idx, target.shift_idx), set()).update((before_name, after_name))
+        lent_occurrences.add((*target.prev_coord, target.station_idx, before_name))
+        lent_occurrences.add((*target.next_coord, target.station_idx, after_name))
+
+    def _has_same_worker_around_middle(target: _PullTarget) -> bool:
+        prev_coord, next_coord = target.prev_coord, target.next_coord
+        prev_names = set(get_cell_names(days[prev_coord[0]], shifts[prev_coord[1]], target.station_idx))
+        next_names = set(get_cell_names(days[next_coord[0]], shifts[next_coord[1]], target.station_idx))
         return bool(prev_names.intersection(next_names))
 
-    target_cells: list[tuple[int, tuple[int, int, str], int, int, str]] = []
-    for station_idx, station in enumerate(stations):
-        station_cfg = station_cfgs[station_idx] if station_idx < len(station_cfgs) and isinstance(station_cfgs[station_idx], dict) else {}
-        cap_map = station.get("capacity") or {}
-        for day_idx, day_key in enumerate(days):
-            for shift_idx, shift_name in enumerate(shifts):
-                required = int((cap_map.get(day_key, {}) or {}).get(shift_name, 0) or 0)
-                prev_coord = prev_of(day_idx, shift_idx)
-                next_coord = next_of(day_idx, shift_idx)
-                if required <= 0 or not prev_coord or not next_coord:
-                    continue
-                pull_priority = _pull_target_shift_priority(shift_name, prefer_kinds)
-                if _has_same_worker_around_middle(day_idx, shift_idx, station_idx):
-                    pull_priority = (-1, *pull_priority[1:])
-                crosses_day_boundary = int(prev_coord[0] != day_idx or next_coord[0] != day_idx)
-                target_cells.append((crosses_day_boundary, pull_priority, station_idx, day_idx, shift_name))
+    solver_cells: set[tuple[str, str, int]] = set()
+    for cell in pull_cells or []:
+        try:
+            solver_cells.add((str(cell[0]), str(cell[1]), int(cell[2])))
+        except Exception:
+            continue
 
-    target_cells.sort(key=lambda item: (item[0], item[1], item[3], item[2]))
+    def _sort_key(target: _PullTarget) -> tuple:
+        priority = target.priority
+        if _has_same_worker_around_middle(target):
+            priority = (-1, *priority[1:])
+        from_solver = int((days[target.day_idx], shifts[target.shift_idx], target.station_idx) not in solver_cells)
+        return (from_solver, target.crosses_day_boundary, priority, target.day_idx, target.station_idx)
 
-    for _, _, station_idx, day_idx, shift_name in target_cells:
+    for target in sorted(ctx.targets, key=_sort_key):
         if normalized_pulls_limit is not None and len(pulls) >= normalized_pulls_limit:
             break
-        station = stations[station_idx]
-        station_cfg = station_cfgs[station_idx] if station_idx < len(station_cfgs) and isinstance(station_cfgs[station_idx], dict) else {}
-        cap_map = station.get("capacity") or {}
-        cap_roles = station.get("capacity_roles") or {}
-        day_key = days[day_idx]
-        shift_idx = shifts.index(shift_name)
-        required = int((cap_map.get(day_key, {}) or {}).get(shift_name, 0) or 0)
-        prev_coord = prev_of(day_idx, shift_idx)
-        next_coord = next_of(day_idx, shift_idx)
-        if required <= 0 or not prev_coord or not next_coord:
-            continue
+        station_idx, day_idx, shift_idx = target.station_idx, target.day_idx, target.shift_idx
+        day_key, shift_name = days[day_idx], shifts[shift_idx]
+        required = target.required
+        prev_coord, next_coord = target.prev_coord, target.next_coord
+        prev_day, prev_shift = days[prev_coord[0]], shifts[prev_coord[1]]
+        next_day, next_shift = days[next_coord[0]], shifts[next_coord[1]]
 
         while True:
             if normalized_pulls_limit is not None and len(pulls) >= normalized_pulls_limit:
                 break
-            cell_prefix = f"{day_key}|{shift_name}|{station_idx}|"
-            existing_pull_keys = [k for k in pulls if str(k).startswith(cell_prefix)]
+            existing_pulls = pull_count_by_cell.get((day_idx, shift_idx, station_idx), 0)
             current_names = get_cell_names(day_key, shift_name, station_idx)
-            assigned_places = max(0, len(current_names) - len(existing_pull_keys))
+            assigned_places = max(0, len(current_names) - existing_pulls)
             if required - assigned_places < 1:
                 break
 
-            prev_day, prev_shift = days[prev_coord[0]], shifts[prev_coord[1]]
-            next_day, next_shift = days[next_coord[0]], shifts[next_coord[1]]
-            prev_prev = prev_of(prev_coord[0], prev_coord[1])
-            next_next = next_of(next_coord[0], next_coord[1])
-            prev_names = [nm for nm in get_cell_names(prev_day, prev_shift, station_idx) if nm not in pulled_names_for(prev_day, prev_shift)]
-            next_names = [nm for nm in get_cell_names(next_day, next_shift, station_idx) if nm not in pulled_names_for(next_day, next_shift)]
+            pulled_prev = pulled_names_for(prev_coord)
+            pulled_next = pulled_names_for(next_coord)
+            prev_names = [nm for nm in get_cell_names(prev_day, prev_shift, station_idx) if nm not in pulled_prev]
+            next_names = [nm for nm in get_cell_names(next_day, next_shift, station_idx) if nm not in pulled_next]
             used_in_cell = set(current_names)
-            pulled_before_prev = pulled_names_for(days[prev_prev[0]], shifts[prev_prev[1]]) if prev_prev else set()
-            pulled_after_next = pulled_names_for(days[next_next[0]], shifts[next_next[1]]) if next_next else set()
+            pulled_before_prev = pulled_names_for(prev_coords[prev_coord])
+            pulled_after_next = pulled_names_for(next_coords[next_coord])
 
             before_candidates = [
                 nm for nm in prev_names
                 if nm not in used_in_cell
                 and nm not in pulled_before_prev
-                and not guard_occurrence_used_by_pull(prev_coord[0], prev_coord[1], station_idx, nm)
+                and (*prev_coord, station_idx, nm) not in lent_occurrences
             ]
             after_candidates = [
                 nm for nm in next_names
                 if nm not in used_in_cell
                 and nm not in pulled_after_next
-                and not guard_occurrence_used_by_pull(next_coord[0], next_coord[1], station_idx, nm)
+                and (*next_coord, station_idx, nm) not in lent_occurrences
             ]
-            both_sides = {nm for nm in before_candidates if nm in set(after_candidates)}
+            both_sides = set(before_candidates).intersection(after_candidates)
             before_candidates = [nm for nm in before_candidates if nm not in both_sides]
             after_candidates = [nm for nm in after_candidates if nm not in both_sides]
             if not before_candidates or not after_candidates:
                 break
 
-            req_roles = (cap_roles.get(day_key, {}) or {}).get(shift_name, {}) or {}
             role_name = None
             before_options = before_candidates
             after_options = after_candidates
-            if req_roles:
-                for rn in [str(x) for x in req_roles.keys() if str(x).strip()]:
-                    b = [nm for nm in before_candidates if worker_has_role(nm, rn)]
-                    a = [nm for nm in after_candidates if worker_has_role(nm, rn)]
+            if target.role_names:
+                for rn in target.role_names:
+                    b = [nm for nm in before_candidates if ctx.worker_has_role(nm, rn)]
+                    a = [nm for nm in after_candidates if ctx.worker_has_role(nm, rn)]
                     if not b or not a:
                         continue
                     if len(b) == 1 and len(a) == 1 and b[0] == a[0]:
@@ -409,12 +453,7 @@ def _apply_auto_pulls_to_payload(
             if not before_name or not after_name:
                 break
 
-            hours = _hours_from_config(station_cfg, shift_name, day_key) or _hours_of(shift_name) or "00:00-00:00"
-            parsed = _parse_hours_range(hours)
-            shift_start, shift_end = parsed if parsed else ("00:00", "00:00")
-            before_range, after_range = _split_range_for_pulls(shift_start, shift_end)
-
-            new_pull_count = len(existing_pull_keys) + 1
+            new_pull_count = existing_pulls + 1
             next_names = list(current_names)
             if before_name not in next_names:
                 next_names.append(before_name)
@@ -423,19 +462,89 @@ def _apply_auto_pulls_to_payload(
             if len(next_names) > required + new_pull_count:
                 break
 
-            slot_idx = required + len(existing_pull_keys)
+            before_range, after_range = ctx.split_ranges(target)
+            slot_idx = required + existing_pulls
             pulls[f"{day_key}|{shift_name}|{station_idx}|{slot_idx}"] = {
                 "before": {"name": before_name, "start": before_range["start"], "end": before_range["end"]},
                 "after": {"name": after_name, "start": after_range["start"], "end": after_range["end"]},
                 "roleName": role_name,
             }
+            record_pull(target, before_name, after_name)
             set_cell_names(day_key, shift_name, station_idx, next_names)
 
-    payload["assignments"] = assignments
-    payload["pulls"] = _sanitize_pulls_map(pulls)
+    return grid, _sanitize_pulls_map(pulls)
+
+
+def _apply_auto_pulls_to_payload(
+    site: Site,
+    rows: list[SiteWorker],
+    payload: dict,
+    pulls_limit: int | None = None,
+    pulls_prefer: object | None = None,
+    pull_cells: list | None = None,
+) -> dict:
+    """Matérialise les משיכות sur les trous du plan (au plus pulls_limit).
+
+    pull_cells : cases [day, shift, station_index] retenues par CP-SAT (PullsModelSpec), tentées
+    en premier ; les autres cases suivent l'ordre heuristique habituel.
+    """
+    assignments = payload.get("assignments")
+    if not isinstance(assignments, dict):
+        return payload
+    ctx = _compile_pull_context(site, rows, pulls_prefer)
+    payload["assignments"], payload["pulls"] = _apply_pulls_with_context(ctx, assignments, pulls_limit, pull_cells)
     return payload
 
 
+def _pulls_batch_workers() -> int:
+    try:
+        value = int(os.getenv("PLANNING_PULLS_BATCH_WORKERS", "1"))
+    except Exception:
+        value = 1
+    return max(1, min(value, 8))
+
+
+def _pulls_batch_parallel_min() -> int:
+    try:
+        value = int(os.getenv("PLANNING_PULLS_BATCH_PARALLEL_MIN", "16"))
+    except Exception:
+        value = 16
+    return max(2, min(value, 10000))
+
+
+def _apply_auto_pulls_to_alternatives(
+    site: Site,
+    rows: list[SiteWorker],
+    candidates: list[dict],
+    pulls_limit: int | None = None,
+    pulls_prefer: object | None = None,
+    pull_cells_by_candidate: list[list | None] | None = None,
+) -> list[tuple[dict, dict]]:
+    """Version lot de _apply_auto_pulls_to_payload : contexte compilé une fois, [(assignments, pulls)] dans l'ordre.
+
+    Avec PLANNING_PULLS_BATCH_WORKERS > 1 (défaut 1 : le moteur est du Python pur, les threads
+    ne paient que sans GIL) et au moins PLANNING_PULLS_BATCH_PARALLEL_MIN candidats (défaut 16),
+    les plans sont répartis sur un pool de threads ; le contexte est en lecture seule.
+    """
+    if not candidates:
+        return []
+    ctx = _compile_pull_context(site, rows, pulls_prefer)
+    cells = list(pull_cells_by_candidate or [])
+    cells.extend([None] * (len(candidates) - len(cells)))
+
+    def _one(idx: int) -> tuple[dict, dict]:
+        candidate = candidates[idx]
+        if not isinstance(candidate, dict):
+            return {}, {}
+        return _apply_pulls_with_context(ctx, candidate, pulls_limit, cells[idx])
+
+    workers = _pulls_batch_workers()
+    if workers <= 1 or len(candidates) < _pulls_batch_parallel_min():
+        return [_one(idx) for idx in range(len(candidates))]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pulls-batch") as pool:
+        return list(pool.map(_one, range(len(candidates))))
+
+
 def _enforce_role_requirements_on_assignments(
     site_config: dict | None,
     assignments_value: dict | None,
@@ -448,10 +557,8 @@ def _enforce_role_requirements_on_assignments(
     """
     if not isinstance(assignments_value, dict):
         return {}
-    from ..ai_solver import build_capacities_from_config
-
-    days, shifts, stations = build_capacities_from_config(site_config or {})
-    if not stations:
+    spec = site_scheduling_spec(site_config)
+    if not spec.stations:
         return assignments_value
 
     worker_roles_by_name: dict[str, set[str]] = {}
@@ -466,14 +573,12 @@ def _enforce_role_requirements_on_assignments(
                 role_set.add(norm_role)
 
     out = deepcopy(assignments_value)
-    for station_idx, st in enumerate(stations):
-        cap_roles = (st.get("capacity_roles") or {}) if isinstance(st, dict) else {}
-        for day_key in days:
-            for shift_name in shifts:
-                role_map_raw = ((cap_roles.get(day_key, {}) or {}).get(shift_name, {}) or {})
+    for station_idx in range(len(spec.stations)):
+        for day_idx, day_key in enumerate(spec.days):
+            for shift_idx, shift_name in enumerate(spec.shifts):
                 required_roles = {
                     _norm_role_local(role_name)
-                    for role_name, cnt in (role_map_raw.items() if isinstance(role_map_raw, dict) else [])
+                    for role_name, cnt in spec.required_roles(station_idx, day_idx, shift_idx).items()
                     if int(cnt or 0) > 0 and _norm_role_local(role_name)
                 }
                 if not required_roles:
@@ -605,35 +710,24 @@ def _apply_auto_pulls_to_site_plans(
             continue
         effective_site_limit = pulls_limits_by_site.get(site_id) if pulls_limits_by_site is not None else pulls_limit
 
-        base_payload = _apply_auto_pulls_to_payload(
+        alternatives = [alt if isinstance(alt, dict) else {} for alt in (site_plan.get("alternatives") or [])]
+        results = _apply_auto_pulls_to_alternatives(
             site,
             site_rows,
-            {"assignments": deepcopy(site_plan.get("assignments") or {}), "pulls": {}},
+            [site_plan.get("assignments") or {}, *alternatives],
             pulls_limit=effective_site_limit,
             pulls_prefer=pulls_prefer,
         )
-        site_plan["assignments"] = base_payload.get("assignments") or {}
-        site_plan["pulls"] = base_payload.get("pulls") or {}
+        (base_assignments, base_pulls), alt_results = results[0], results[1:]
+        site_plan["assignments"] = base_assignments
+        site_plan["pulls"] = base_pulls
         site_plan["assigned_count"] = max(
             0,
             int(site_plan.get("assigned_count") or 0) - len(site_plan["pulls"]),
         )
-
-        next_alternatives: list[dict] = []
-        alternative_pulls: list[dict] = []
-        for alt_assignments in (site_plan.get("alternatives") or []):
-            alt_payload = _apply_auto_pulls_to_payload(
-                site,
-                site_rows,
-                {"assignments": deepcopy(alt_assignments or {}), "pulls": {}},
-                pulls_limit=effective_site_limit,
-                pulls_prefer=pulls_prefer,
-            )
-            next_alternatives.append(alt_payload.get("assignments") or {})
-            alternative_pulls.append(alt_payload.get("pulls") or {})
-        if next_alternatives:
-            site_plan["alternatives"] = next_alternatives
-            site_plan["alternative_pulls"] = alternative_pulls
+        if alt_results:
+            site_plan["alternatives"] = [alt_assignments for alt_assignments, _ in alt_results]
+            site_plan["alternative_pulls"] = [alt_pulls for _, alt_pulls in alt_results]
     return site_plans
 
 
@@ -759,6 +853,30 @@ def _site_pulls_limit_matches(
     return _matches_pulls_limit(pulls, default_pulls_limit)
 
 
+def _pulls_model_spec(pulls_limit: int | None) -> PullsModelSpec:
+    """Plafond de משיכות d'un site, passé à CP-SAT pour que la base le respecte par construction."""
+    return PullsModelSpec(limit=int(pulls_limit) if pulls_limit is not None else None)
+
+
+def _linked_pulls_model_spec(
+    station_map: list[dict],
+    pulls_limit: int | None = None,
+    pulls_limits_by_site: dict[int, int | None] | None = None,
+) -> PullsModelSpec:
+    """Plafonds par site du modèle combiné (mêmes règles que _site_pulls_limit_matches)."""
+    stations_by_site: dict[int, list[int]] = {}
+    for combined_idx, meta in enumerate(station_map or []):
+        stations_by_site.setdefault(int(meta.get("site_id")), []).append(combined_idx)
+    station_limits: list[tuple[tuple[int, ...], int | None]] = []
+    for site_id, indices in stations_by_site.items():
+        if pulls_limits_by_site is not None:
+            limit = pulls_limits_by_site.get(site_id) if site_id in pulls_limits_by_site else 0
+        else:
+            limit = pulls_limit
+        station_limits.append((tuple(indices), int(limit) if limit is not None else None))
+    return PullsModelSpec(limit=pulls_limit, station_limits=tuple(station_limits))
+
+
 def _planning_limit_error_detail_for_request(
     pulls_limit: int | None = None,
     pulls_limits_by_site: dict[int, int | None] | None = None,
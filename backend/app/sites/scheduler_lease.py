@@ -0,0 +1,251 @@
+"""Élection de leader du scheduler תכנון אוטומטי par bail en base.
+
+Chaque instance (worker uvicorn, hôte) démarre la boucle du scheduler, mais seule celle qui
+tient le bail `scheduler_leases[auto-planning]` exécute les ticks. Prise et renouvellement
+passent par un seul UPDATE conditionnel (titulaire identique ou bail expiré) : atomique sur
+SQLite comme sur Postgres, sans verrou de ligne explicite. Le leader renouvelle pendant ses
+attentes et pendant un tick (thread de renouvellement), libère le bail à l'arrêt ; les
+autres instances retentent à chaque expiration possible.
+
+Un tick est clôturé par le bail : renewing() expose un LeaseFence que le tick consulte avant
+chaque dispatch et chaque commit ; s'il est levé (renouvellement refusé, ou aucun
+renouvellement réussi depuis presque un TTL), le tick s'arrête sans rien écrire de plus.
+
+PLANNING_SCHEDULER_LEASE_TTL_SECONDS (défaut 90) : durée du bail.
+PLANNING_SCHEDULER_WAKE_POLL_SECONDS (défaut 15) : pas d'attente du leader entre deux
+vérifications du réveil en base (put_auto_planning_config d'une autre instance).
+Dans la même instance, le réveil est immédiat (événement local).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import SchedulerLease
+from .generation_slots import _new_generation_id
+from .week_utils import _now_ms
+
+logger = logging.getLogger("ai_solver")
+
+AUTO_PLANNING_LEASE = "auto-planning"
+
+_SCHEDULER_WAKE = threading.Event()
+
+
+def _env_float(name: str, default: float, low: float, high: float) -> float:
+    try:
+        value = float(os.getenv(name, str(default)))
+    except Exception:
+        value = default
+    return max(low, min(value, high))
+
+
+def _scheduler_lease_ttl_seconds() -> float:
+    return _env_float("PLANNING_SCHEDULER_LEASE_TTL_SECONDS", 90.0, 10.0, 3600.0)
+
+
+def _scheduler_wake_poll_seconds() -> float:
+    return _env_float("PLANNING_SCHEDULER_WAKE_POLL_SECONDS", 15.0, 1.0, 3600.0)
+
+
+def wake_auto_planning_scheduler(db: Session) -> None:
+    """Demande au leader de recalculer son prochain réveil (après le commit de la config).
+
+    Marque le bail en base pour un leader d'une autre instance et réveille la boucle locale.
+    """
+    db.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == AUTO_PLANNING_LEASE)
+        .values(wake_at=_now_ms())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    _SCHEDULER_WAKE.set()
+
+
+class SchedulerLeaseLost(RuntimeError):
+    """Levée quand le bail du scheduler est perdu pendant un tick."""
+
+
+class LeaseFence:
+    """Drapeau « bail perdu » d'un tick, alimenté par le thread de renouvellement."""
+
+    def __init__(self, ttl_seconds: float) -> None:
+        # Marge : le bail peut avoir été pris juste avant le tick, et les horloges diffèrent.
+        self._validity = max(1.0, 0.9 * float(ttl_seconds))
+        self._valid_until = time.monotonic() + self._validity
+        self._lost = threading.Event()
+
+    def renewed(self) -> None:
+        self._valid_until = time.monotonic() + self._validity
+
+    def mark_lost(self) -> None:
+        self._lost.set()
+
+    @property
+    def lost(self) -> bool:
+        return self._lost.is_set() or time.monotonic() > self._valid_until
+
+    def check(self) -> None:
+        if self.lost:
+            raise SchedulerLeaseLost("scheduler lease lost")
+
+
+class SchedulerLeaseKeeper:
+    """Bail d'une instance : prise / renouvellement, attente réveillable, libération."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        name: str = AUTO_PLANNING_LEASE,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.name = name
+        self.ttl_seconds = float(ttl_seconds or _scheduler_lease_ttl_seconds())
+        self.holder = f"{socket.gethostname()[:80]}:{os.getpid()}:{_new_generation_id()}"
+        self.is_leader = False
+        self._seen_wake_at: int | None = None
+
+    def try_acquire(self, db: Session, *, now_ms: int | None = None) -> bool:
+        """Prend ou renouvelle le bail ; False si une autre instance le tient encore."""
+        now = int(now_ms if now_ms is not None else _now_ms())
+        expires_at = now + int(self.ttl_seconds * 1000)
+        result = db.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == self.name)
+            .where((SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now))
+            .values(holder=self.holder, expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        acquired = int(result.rowcount or 0) == 1
+        if not acquired and db.get(SchedulerLease, self.name) is None:
+            db.add(SchedulerLease(name=self.name, holder=self.holder, expires_at=expires_at, acquired_at=now, wake_at=0))
+            try:
+                db.commit()
+                acquired = True
+            except IntegrityError:
+                # Une autre instance a créé la ligne en même temps : elle est leader.
+                db.rollback()
+        else:
+            db.commit()
+        if acquired and not self.is_leader:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name)
+                .where(SchedulerLease.holder == self.holder)
+                .values(acquired_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            logger.info("[AUTO-PLANNING][LEASE] acquired name=%s holder=%s", self.name, self.holder)
+        elif not acquired and self.is_leader:
+            logger.warning("[AUTO-PLANNING][LEASE] lost name=%s holder=%s", self.name, self.holder)
+        self.is_leader = acquired
+        return acquired
+
+    def release(self, db: Session) -> None:
+        if not self.is_leader:
+            return
+        db.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == self.name)
+            .where(SchedulerLease.holder == self.holder)
+            .values(expires_at=0)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        self.is_leader = False
+        logger.info("[AUTO-PLANNING][LEASE] released name=%s holder=%s", self.name, self.holder)
+
+    def _try_renew(self) -> bool | None:
+        """True / False selon la base ; None si le renouvellement a échoué (base injoignable)."""
+        db = self.session_factory()
+        try:
+            return self.try_acquire(db)
+        except Exception:
+            logger.exception("[AUTO-PLANNING][LEASE] renew failed name=%s holder=%s", self.name, self.holder)
+            return None
+        finally:
+            db.close()
+
+    def _renew(self) -> bool:
+        renewed = self._try_renew()
+        return self.is_leader if renewed is None else renewed
+
+    def _wake_requested_in_db(self) -> bool:
+        db = self.session_factory()
+        try:
+            row = db.get(SchedulerLease, self.name)
+            wake_at = int(row.wake_at or 0) if row is not None else 0
+        finally:
+            db.close()
+        previous, self._seen_wake_at = self._seen_wake_at, wake_at
+        return previous is not None and wake_at != previous
+
+    @contextmanager
+    def renewing(self) -> Iterator[LeaseFence]:
+        """Renouvelle le bail en arrière-plan (tiers du TTL) tant que le bloc tourne (tick long).
+
+        Le LeaseFence produit passe à « perdu » dès qu'un renouvellement est refusé ; un échec
+        de base seul le laisse expirer de lui-même, faute de renouvellement réussi.
+        """
+        stop = threading.Event()
+        fence = LeaseFence(self.ttl_seconds)
+
+        def _loop() -> None:
+            while not stop.wait(self.ttl_seconds / 3.0):
+                renewed = self._try_renew()
+                if renewed:
+                    fence.renewed()
+                elif renewed is False:
+                    fence.mark_lost()
+                    logger.warning("[AUTO-PLANNING][LEASE] lost during tick name=%s holder=%s", self.name, self.holder)
+                    return
+
+        thread = threading.Thread(target=_loop, name="auto-planning-lease", daemon=True)
+        thread.start()
+        try:
+            yield fence
+        finally:
+            stop.set()
+            thread.join(timeout=5)
+
+    def sleep(self, stop_event: threading.Event, seconds: float) -> bool:
+        """Attend seconds, ou moins si réveil (local ou en base) ; True si l'arrêt est demandé.
+
+        Le leader renouvelle son bail à chaque pas ; une instance suiveuse attend au plus un TTL
+        avant de retenter la prise.
+        """
+        if not self.is_leader:
+            seconds = min(seconds, self.ttl_seconds)
+        remaining = max(0.0, float(seconds))
+        step = min(_scheduler_wake_poll_seconds(), self.ttl_seconds / 3.0)
+        while remaining > 0 and not stop_event.is_set():
+            chunk = min(step, remaining)
+            if _SCHEDULER_WAKE.wait(chunk):
+                _SCHEDULER_WAKE.clear()
+                logger.info("[AUTO-PLANNING][LEASE] woken by config change (local)")
+                break
+            remaining -= chunk
+            if self.is_leader and remaining > 0:
+                if not self._renew():
+                    break
+                try:
+                    if self._wake_requested_in_db():
+                        logger.info("[AUTO-PLANNING][LEASE] woken by config change (db)")
+                        break
+                except Exception:
+                    logger.exception("[AUTO-PLANNING][LEASE] wake check failed name=%s", self.name)
+        return stop_event.is_set()
@@ -20,6 +20,7 @@ from ..schemas import (
     SiteEventUpdate, SiteEventOut, WorkerInviteLinkOut, NextWeekSavedPlanStatus,
 )
 from ..auth import create_worker_invite_token, ensure_director_code
+from ..scheduling_spec import forget_site_scheduling_spec
 from passlib.context import CryptContext
 
 from .ownership import _director_site_or_404, _director_site_ownership_or_404
@@ -378,6 +379,9 @@ def update_site(site_id: int, payload: SiteUpdate, user: User = Depends(require_
             raise
         except Exception:
             pass
+        # La spec compilée de l'ancienne config ne sert plus (les autres sites partageant
+        # exactement le même contenu la recompileront au besoin).
+        forget_site_scheduling_spec(site.config)
         site.config = payload.config
     db.commit()
     db.refresh(site)
@@ -32,6 +32,10 @@ from ..schemas import (
 )
 from ..ai_solver import solve_schedule, solve_schedule_stream
 from ..auth import create_worker_invite_token, ensure_director_code
+from ..shift_catalog import (
+    SHIFT_KINDS, shift_catalog_for_config, shift_kind_from_name,
+    _hours_of, _hours_from_config, _parse_hours_range, _to_minutes,
+)
 
 from .ownership import _director_site_or_404, _director_site_ownership_or_404
 from .week_utils import (
@@ -51,6 +55,8 @@ from .generation_slots import (
 
 logger = logging.getLogger("ai_solver")
 
+_SHIFT_KIND_ORDER = {kind: i for i, kind in enumerate(SHIFT_KINDS)}
+
 def _count_assignments_per_worker(
     assignments: dict | None,
 ) -> dict[str, int]:
@@ -385,39 +391,11 @@ def _build_solver_workers(
 
 
 def _shift_order_index(shift_name: str) -> int:
-    if _is_morning_shift_name(shift_name):
-        return 0
-    if _is_noon_shift_name(shift_name):
-        return 1
-    if _is_night_shift_name(shift_name):
-        return 2
-    return 3
+    return _SHIFT_KIND_ORDER.get(shift_kind_from_name(shift_name), len(_SHIFT_KIND_ORDER))
 
 
 def _site_shift_names_ordered(config: dict | None) -> list[str]:
-    names: list[str] = []
-    seen: set[str] = set()
-    for st in ((config or {}).get("stations") or []):
-        if not isinstance(st, dict):
-            continue
-        for sh in (st.get("shifts") or []):
-            if not isinstance(sh, dict):
-                continue
-            nm = str(sh.get("name") or "").strip()
-            if nm and nm not in seen:
-                seen.add(nm)
-                names.append(nm)
-        for day_cfg in (st.get("dayOverrides") or {}).values():
-            if not isinstance(day_cfg, dict):
-                continue
-            for sh in (day_cfg.get("shifts") or []):
-                if not isinstance(sh, dict):
-                    continue
-                nm = str(sh.get("name") or "").strip()
-                if nm and nm not in seen:
-                    seen.add(nm)
-                    names.append(nm)
-    return sorted(names, key=_shift_order_index)
+    return list(shift_catalog_for_config(config).names)
 
 
 def _hm_to_minutes(value: str | None) -> int | None:
@@ -432,16 +410,7 @@ def _hm_to_minutes(value: str | None) -> int | None:
 
 
 def _shift_start_minutes(config: dict | None, shift_name: str) -> int | None:
-    for st in ((config or {}).get("stations") or []):
-        if not isinstance(st, dict):
-            continue
-        hours = _hours_from_config(st, shift_name, "sun") or _hours_of(shift_name)
-        parsed = _parse_hours_range(hours)
-        if parsed:
-            return _to_minutes(parsed[0])
-    hours = _hours_of(shift_name)
-    parsed = _parse_hours_range(hours)
-    return _to_minutes(parsed[0]) if parsed else None
+    return shift_catalog_for_config(config).start_minutes(shift_name)
 
 
 def _build_worker_snapshots(rows: list[SiteWorker]) -> list[dict]:
@@ -466,79 +435,20 @@ def _norm_role_local(value: str | None) -> str:
     return _norm_name_local(value).replace('"', "'")
 
 
-def _hours_of(shift_name: str) -> str | None:
-    s = str(shift_name or "")
-    m = re.search(r"(\d{1,2})\s*[-:–]\s*(\d{1,2})", s)
-    if m:
-        return f"{m.group(1).zfill(2)}-{m.group(2).zfill(2)}"
-    if re.search(r"בוקר", s, re.I):
-        return "06-14"
-    if re.search(r"צהר(יים|י)ם?", s, re.I):
-        return "14-22"
-    if re.search(r"לילה|night", s, re.I):
-        return "22-06"
-    return None
-
-
-def _hours_from_config(station_cfg: dict | None, shift_name: str, day_key: str) -> str | None:
-    station_cfg = station_cfg or {}
-
-    def fmt(start: str | None, end: str | None) -> str | None:
-        if not start or not end:
-            return None
-        return f"{start}-{end}"
-
-    if station_cfg.get("perDayCustom") and isinstance(station_cfg.get("dayOverrides"), dict):
-        day_cfg = (station_cfg.get("dayOverrides") or {}).get(day_key) or {}
-        if day_cfg and day_cfg.get("active") is not False:
-            shift_cfg = next((x for x in (day_cfg.get("shifts") or []) if isinstance(x, dict) and x.get("name") == shift_name), None)
-            out = fmt(shift_cfg.get("start") if isinstance(shift_cfg, dict) else None, shift_cfg.get("end") if isinstance(shift_cfg, dict) else None)
-            if out:
-                return out
-
-    shift_cfg = next((x for x in (station_cfg.get("shifts") or []) if isinstance(x, dict) and x.get("name") == shift_name), None)
-    return fmt(shift_cfg.get("start") if isinstance(shift_cfg, dict) else None, shift_cfg.get("end") if isinstance(shift_cfg, dict) else None)
-
-
-def _parse_hours_range(range_text: str | None) -> tuple[str, str] | None:
-    text = str(range_text or "").strip()
-    m = re.match(r"^\s*(\d{1,2}):?(\d{2})?\s*[-–]\s*(\d{1,2}):?(\d{2})?\s*$", text)
-    if not m:
-        return None
-    return (f"{int(m.group(1)):02d}:{int(m.group(2) or '0'):02d}", f"{int(m.group(3)):02d}:{int(m.group(4) or '0'):02d}")
-
-
-def _to_minutes(hhmm: str) -> int | None:
-    m = re.match(r"^(\d{1,2}):(\d{2})$", str(hhmm or "").strip())
-    if not m:
-        return None
-    hh = int(m.group(1))
-    mm = int(m.group(2))
-    if hh < 0 or hh > 23 or mm < 0 or mm > 59:
-        return None
-    return hh * 60 + mm
-
-
 def _from_minutes(value: int) -> str:
     value = int(value) % (24 * 60)
     return f"{value // 60:02d}:{value % 60:02d}"
 
 
 def _is_morning_shift_name(shift_name: str) -> bool:
-    s = str(shift_name or "").strip()
-    low = s.lower()
-    return ("בוקר" in s) or low.startswith("06") or ("06-14" in low)
+    return shift_kind_from_name(shift_name) == "morning"
 
 
 def _is_noon_shift_name(shift_name: str) -> bool:
-    s = str(shift_name or "").strip()
-    low = s.lower()
-    return ("צהר" in s) or low.startswith("14") or ("14-22" in low)
+    return shift_kind_from_name(shift_name) == "noon"
 
 
 def _is_night_shift_name(shift_name: str) -> bool:
-    s = str(shift_name or "").strip()
-    low = s.lower()
-    return ("לילה" in s) or ("night" in low) or low.startswith("22") or ("22-06" in low)
+    return shift_kind_from_name(shift_name) == "night"
 
 
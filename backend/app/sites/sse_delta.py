@@ -0,0 +1,131 @@
+"""Encodage delta des חלופות sur le flux SSE (mode opt-in stream_encoding="delta").
+
+Une חלופה ne diffère en général du plan de base que de quelques cases. En mode delta :
+  - "base" et une חלופה sur N (PLANNING_SSE_KEYFRAME_INTERVAL, défaut 10) partent en entier
+    avec "keyframe": true et deviennent la référence ;
+  - les autres חלופות partent en "encoding": "delta" contre la dernière keyframe ("ref" = index
+    de la keyframe, 0 pour le base) :
+      changes : [[day, shift, station_index, names], ...] (cases modifiées de assignments)
+      set     : {clé: valeur} des autres champs modifiés / ajoutés
+      unset   : [clé, ...] des champs disparus
+    Pour le flux lié, le delta est par site : site_plans = {site_id: {changes, set, unset}}.
+Le client reconstruit : keyframe de référence + changes + set − unset.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any
+
+
+# Champs d'enveloppe toujours envoyés tels quels (jamais diffés).
+_ENVELOPE_KEYS = ("type", "index", "generation_id", "generated_at_ms", "source", "linked_sites")
+
+
+def _sse_keyframe_interval() -> int:
+    try:
+        value = int(os.getenv("PLANNING_SSE_KEYFRAME_INTERVAL", "10"))
+    except Exception:
+        value = 10
+    return max(1, min(value, 1000))
+
+
+def _assignments_changes(ref: Any, cur: Any) -> list[list[Any]]:
+    ref_map = ref if isinstance(ref, dict) else {}
+    cur_map = cur if isinstance(cur, dict) else {}
+    changes: list[list[Any]] = []
+    for day_key in list(dict.fromkeys([*ref_map.keys(), *cur_map.keys()])):
+        ref_day = ref_map.get(day_key) if isinstance(ref_map.get(day_key), dict) else {}
+        cur_day = cur_map.get(day_key) if isinstance(cur_map.get(day_key), dict) else {}
+        for shift_name in list(dict.fromkeys([*ref_day.keys(), *cur_day.keys()])):
+            ref_cells = ref_day.get(shift_name) if isinstance(ref_day.get(shift_name), list) else []
+            cur_cells = cur_day.get(shift_name) if isinstance(cur_day.get(shift_name), list) else []
+            for t in range(max(len(ref_cells), len(cur_cells))):
+                before = ref_cells[t] if t < len(ref_cells) else []
+                after = cur_cells[t] if t < len(cur_cells) else []
+                if before != after:
+                    changes.append([day_key, shift_name, t, after])
+    return changes
+
+
+def _plan_delta(ref: dict, cur: dict, *, skip: tuple[str, ...] = ()) -> dict:
+    ignored = {"assignments", *skip}
+    return {
+        "changes": _assignments_changes(ref.get("assignments"), cur.get("assignments")),
+        "set": {k: v for k, v in cur.items() if k not in ignored and ref.get(k, ...) != v},
+        "unset": [k for k in ref if k not in ignored and k not in cur],
+    }
+
+
+class SseDeltaEncoder:
+    """Transforme les événements base / alternative d'un flux en keyframes + deltas."""
+
+    def __init__(self, keyframe_interval: int | None = None) -> None:
+        self.keyframe_interval = keyframe_interval or _sse_keyframe_interval()
+        self._ref: dict | None = None
+        self._ref_index = 0
+        self._since_keyframe = 0
+
+    def _keyframe(self, item: dict) -> dict:
+        self._ref = item
+        self._ref_index = int(item.get("index") or 0) if item.get("type") == "alternative" else 0
+        self._since_keyframe = 0
+        return {**item, "encoding": "full", "keyframe": True}
+
+    def encode(self, item: dict) -> dict:
+        item_type = item.get("type")
+        if item_type == "base":
+            return self._keyframe(item)
+        if item_type != "alternative":
+            return item
+        if self._ref is None or self._since_keyframe + 1 >= self.keyframe_interval:
+            return self._keyframe(item)
+        self._since_keyframe += 1
+        out = {k: item[k] for k in _ENVELOPE_KEYS if k in item}
+        out["encoding"] = "delta"
+        out["ref"] = self._ref_index
+        if isinstance(item.get("site_plans"), dict):
+            ref_plans = self._ref.get("site_plans") if isinstance(self._ref.get("site_plans"), dict) else {}
+            out["site_plans"] = {
+                site_key: _plan_delta(ref_plans.get(site_key) or {}, plan if isinstance(plan, dict) else {})
+                for site_key, plan in item["site_plans"].items()
+            }
+            rest = _plan_delta(self._ref, item, skip=(*_ENVELOPE_KEYS, "site_plans"))
+            out["set"], out["unset"] = rest["set"], rest["unset"]
+            return out
+        out.update(_plan_delta(self._ref, item, skip=_ENVELOPE_KEYS))
+        return out
+
+
+def apply_sse_delta(ref: dict, delta: dict) -> dict:
+    """Reconstruit l'événement complet à partir de sa keyframe (implémentation de référence du décodage client)."""
+    if delta.get("encoding") != "delta":
+        return delta
+
+    def _apply(ref_plan: dict, plan_delta: dict) -> dict:
+        out = {k: v for k, v in ref_plan.items() if k not in set(plan_delta.get("unset") or [])}
+        assignments = {
+            day_key: {sh: [list(cell) for cell in cells] for sh, cells in (day_map or {}).items()}
+            for day_key, day_map in (ref_plan.get("assignments") or {}).items()
+        }
+        for day_key, shift_name, t, names in plan_delta.get("changes") or []:
+            cells = assignments.setdefault(day_key, {}).setdefault(shift_name, [])
+            while len(cells) <= t:
+                cells.append([])
+            cells[t] = list(names)
+        if assignments or "assignments" in ref_plan:
+            out["assignments"] = assignments
+        out.update(plan_delta.get("set") or {})
+        return out
+
+    full = _apply({k: v for k, v in ref.items() if k not in ("encoding", "keyframe", "site_plans")}, delta)
+    if isinstance(delta.get("site_plans"), dict):
+        ref_plans = ref.get("site_plans") or {}
+        full["site_plans"] = {
+            site_key: _apply(ref_plans.get(site_key) or {}, plan_delta)
+            for site_key, plan_delta in delta["site_plans"].items()
+        }
+    for key in _ENVELOPE_KEYS:
+        if key in delta:
+            full[key] = delta[key]
+    return full
@@ -3,9 +3,10 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, Response
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
-from datetime import datetime
+from datetime import datetime, timedelta
 from copy import deepcopy
 import json
+import os
 import re
 import logging
 
@@ -58,6 +59,72 @@ def _save_site_week_plan(db: Session, site_id: int, week_iso: str, scope: str, d
         db.add(row)
 
 
+def _warm_start_enabled() -> bool:
+    raw = str(os.getenv("PLANNING_WARM_START", "1") or "1").strip().lower()
+    return raw not in {"0", "false", "no", "off"}
+
+
+def _warm_start_hint_assignments(db: Session, site_id: int, week_iso: str) -> dict | None:
+    """Plan de départ pour le solveur (AddHint) : brouillon director de la semaine cible,
+    sinon plan publié (shared) de la semaine précédente. None si rien d'exploitable."""
+    if not _warm_start_enabled():
+        return None
+    try:
+        prev_week_iso = (datetime.fromisoformat(week_iso) - timedelta(days=7)).date().isoformat()
+    except (TypeError, ValueError):
+        return None
+    candidates = (
+        db.query(SiteWeekPlan)
+        .filter(SiteWeekPlan.site_id == int(site_id))
+        .filter(
+            ((SiteWeekPlan.week_iso == week_iso) & (SiteWeekPlan.scope == "director"))
+            | ((SiteWeekPlan.week_iso == prev_week_iso) & (SiteWeekPlan.scope == "shared"))
+        )
+        .all()
+    )
+    candidates.sort(key=lambda row: 0 if row.week_iso == week_iso else 1)
+    for row in candidates:
+        data = row.data if isinstance(row.data, dict) else {}
+        assignments = data.get("assignments")
+        if isinstance(assignments, dict) and any(
+            nm
+            for shifts_map in assignments.values() if isinstance(shifts_map, dict)
+            for per_station in shifts_map.values() if isinstance(per_station, list)
+            for cell in per_station if isinstance(cell, list)
+            for nm in cell
+        ):
+            logger.info(
+                "[WARM-START] site=%s week=%s hint from week=%s scope=%s",
+                site_id,
+                week_iso,
+                row.week_iso,
+                row.scope,
+            )
+            return assignments
+    return None
+
+
+def _previous_week_saved_plan(db: Session, site_id: int, week_iso: str) -> dict | None:
+    """Plan sauvegardé (shared, sinon director) de la semaine précédant week_iso :
+    {"assignments", "pulls"} pour la frontière samedi → dimanche d'une génération."""
+    try:
+        prev_week_iso = (datetime.fromisoformat(week_iso) - timedelta(days=7)).date().isoformat()
+    except (TypeError, ValueError):
+        return None
+    rows = (
+        db.query(SiteWeekPlan)
+        .filter(SiteWeekPlan.site_id == int(site_id))
+        .filter(SiteWeekPlan.week_iso == prev_week_iso)
+        .filter(SiteWeekPlan.scope.in_(("shared", "director")))
+        .all()
+    )
+    row = _pick_week_plan_row_for_resolve(rows, None, prev_week_iso)
+    if row is None:
+        return None
+    data = row.data if isinstance(row.data, dict) else {}
+    return {"assignments": data.get("assignments") or {}, "pulls": data.get("pulls") or {}}
+
+
 def _as_json_object(value: object) -> dict | None:
     if isinstance(value, dict):
         return value
@@ -402,8 +469,9 @@ def put_week_plan(
                 .filter(SiteWeekPlan.scope == "auto")
                 .all()
             )
+            # Lecture seule : le plafonnement ne copie que les plans qu'il modifie.
             payloads_by_site: dict[str, dict] = {
-                str(int(existing_row.site_id)): deepcopy(existing_row.data) if isinstance(existing_row.data, dict) else {}
+                str(int(existing_row.site_id)): existing_row.data if isinstance(existing_row.data, dict) else {}
                 for existing_row in existing_auto_rows
             }
             payloads_by_site[str(site_id)] = data
@@ -417,7 +485,7 @@ def put_week_plan(
             linked_auto_payloads_to_save = {
                 site_id_key: site_payload
                 for site_id_key, site_payload in normalized_payloads.items()
-                if int(site_id_key) != int(site_id)
+                if int(site_id_key) != int(site_id) and site_payload is not payloads_by_site.get(site_id_key)
             }
     if row:
         row.data = data or {}
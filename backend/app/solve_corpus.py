@@ -0,0 +1,247 @@
+"""Corpus de cas de résolution anonymisés (capture opt-in + helpers de rejeu).
+
+Activé par ``PLANNING_SOLVE_CORPUS_DIR`` et ``PLANNING_SOLVE_CORPUS_SALT`` (secret, gardé hors du
+corpus : sans sel, un sha256 de nom se renverse par dictionnaire, donc rien n'est enregistré) : chaque appel à solve_schedule / solve_schedule_stream
+écrit un fichier JSON (config, travailleurs aux noms hachés, affectations fixes, paramètres,
+statistiques du modèle construit), complété par l'issue du solve de base (statut, objectif, temps,
+couverture) pour que le rejeu puisse s'y comparer. Rejeu : scripts/replay_solve_corpus.py ; tuning des profils :
+scripts/tune_solver_profiles.py.
+"""
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from .scheduling_spec import site_scheduling_spec
+
+
+logger = logging.getLogger("ai_solver")
+
+SOLVE_CORPUS_VERSION = 1
+_SOLVE_CORPUS_LOCK = threading.Lock()
+
+
+def _solve_corpus_dir() -> str | None:
+    raw = str(os.getenv("PLANNING_SOLVE_CORPUS_DIR", "") or "").strip()
+    return raw or None
+
+
+def _solve_corpus_salt() -> str | None:
+    raw = str(os.getenv("PLANNING_SOLVE_CORPUS_SALT", "") or "").strip()
+    return raw or None
+
+
+def _solve_corpus_max_cases() -> int:
+    try:
+        value = int(os.getenv("PLANNING_SOLVE_CORPUS_MAX_CASES", "500") or "500")
+    except Exception:
+        value = 500
+    return max(1, value)
+
+
+def _anonymize_name(name: str, salt: str) -> str:
+    digest = hashlib.sha256(f"{salt}|{name}".encode("utf-8")).hexdigest()
+    return f"w_{digest[:12]}"
+
+
+def anonymize_solve_inputs(
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    fixed_assignments: Dict[str, Dict[str, List[List[str]]]] | None,
+    *,
+    salt: str | None = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Dict[str, List[List[str]]]] | None]:
+    """Copies des entrées avec les noms de travailleurs hachés (workers, allowedWorkers, fixes).
+
+    Le hachage est stable pour un même sel : les références croisées restent cohérentes.
+    Sans sel (argument ni PLANNING_SOLVE_CORPUS_SALT) : ValueError, les noms seraient réversibles.
+    """
+    salt = salt if salt is not None else _solve_corpus_salt()
+    if not salt:
+        raise ValueError("PLANNING_SOLVE_CORPUS_SALT is required to anonymize solve inputs")
+
+    def anon(value: Any) -> str:
+        name = str(value or "").strip()
+        return _anonymize_name(name, salt) if name else ""
+
+    out_config = deepcopy(config or {})
+    for st in (out_config.get("stations") or []):
+        if isinstance(st, dict) and isinstance(st.get("allowedWorkers"), list):
+            st["allowedWorkers"] = [anon(nm) for nm in st["allowedWorkers"]]
+    out_workers: List[Dict[str, Any]] = []
+    for w in workers or []:
+        cw = deepcopy(w)
+        cw["name"] = anon(w.get("name"))
+        for key in ("phone", "email"):
+            cw.pop(key, None)
+        out_workers.append(cw)
+    out_fixed = None
+    if isinstance(fixed_assignments, dict):
+        out_fixed = {
+            day_key: {
+                shift_name: [[anon(nm) for nm in (cell or [])] for cell in (per_station or [])]
+                for shift_name, per_station in (shifts_map or {}).items()
+            }
+            for day_key, shifts_map in fixed_assignments.items()
+        }
+    return out_config, out_workers, out_fixed
+
+
+def record_solve_case(
+    kind: str,
+    built: Any,
+    config: Dict[str, Any],
+    workers: List[Dict[str, Any]],
+    params: Dict[str, Any],
+) -> str | None:
+    """Écrit le cas dans le corpus si PLANNING_SOLVE_CORPUS_DIR est défini. Ne lève jamais."""
+    corpus_dir = _solve_corpus_dir()
+    if not corpus_dir:
+        return None
+    if not _solve_corpus_salt():
+        logger.warning("[SOLVE-CORPUS] PLANNING_SOLVE_CORPUS_SALT not set, solve case not recorded kind=%s", kind)
+        return None
+    try:
+        fixed = params.get("fixed_assignments")
+        anon_config, anon_workers, anon_fixed = anonymize_solve_inputs(config, workers, fixed)
+        proto = built.model.Proto()
+        record = {
+            "version": SOLVE_CORPUS_VERSION,
+            "kind": kind,
+            "recorded_at": int(time.time() * 1000),
+            "config": anon_config,
+            "workers": anon_workers,
+            "params": {**params, "fixed_assignments": anon_fixed},
+            "model": {
+                "num_vars": len(proto.variables),
+                "num_constraints": len(proto.constraints),
+                "num_workers": len(built.W),
+                "num_days": len(built.D),
+                "num_shifts": len(built.S),
+                "num_stations": len(built.T),
+            },
+        }
+        with _SOLVE_CORPUS_LOCK:
+            os.makedirs(corpus_dir, exist_ok=True)
+            existing = [n for n in os.listdir(corpus_dir) if n.endswith(".json")]
+            if len(existing) >= _solve_corpus_max_cases():
+                return None
+            path = os.path.join(corpus_dir, f"{record['recorded_at']}-{kind}-{uuid.uuid4().hex[:8]}.json")
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump(record, fh, ensure_ascii=False)
+        logger.info("[SOLVE-CORPUS] recorded kind=%s path=%s vars=%s", kind, path, record["model"]["num_vars"])
+        return path
+    except Exception:
+        logger.exception("[SOLVE-CORPUS] failed to record solve case kind=%s", kind)
+        return None
+
+
+def record_solve_outcome(
+    path: str | None,
+    config: Dict[str, Any],
+    solved: Dict[str, Any] | None,
+    *,
+    build_seconds: float,
+    assignments: Dict[str, Dict[str, List[List[str]]]] | None = None,
+    exclude_days: List[str] | None = None,
+) -> None:
+    """Ajoute l'issue du solve de base au cas écrit par record_solve_case. Ne lève jamais.
+
+    solved: {"status", "objective", "best_bound", "solve_seconds"} relevés juste après le solve de base.
+    """
+    if not path or not solved:
+        return
+    try:
+        outcome = {
+            "status": solved.get("status"),
+            "objective": solved.get("objective"),
+            "best_bound": solved.get("best_bound"),
+            "build_seconds": round(float(build_seconds), 4),
+            "solve_seconds": round(float(solved.get("solve_seconds") or 0.0), 4),
+            "coverage": round(plan_coverage(config, assignments, exclude_days), 4) if assignments is not None else None,
+        }
+        with _SOLVE_CORPUS_LOCK:
+            with open(path, "r", encoding="utf-8") as fh:
+                record = json.load(fh)
+            record["outcome"] = outcome
+            # Réécriture atomique : un rejeu concurrent ne lit jamais un cas tronqué.
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(record, fh, ensure_ascii=False)
+            os.replace(tmp_path, path)
+    except Exception:
+        logger.exception("[SOLVE-CORPUS] failed to record solve outcome path=%s", path)
+
+
+def load_corpus_cases(corpus_dir: str) -> List[Tuple[str, Dict[str, Any]]]:
+    cases: List[Tuple[str, Dict[str, Any]]] = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(corpus_dir, name), "r", encoding="utf-8") as fh:
+            case = json.load(fh)
+        if isinstance(case, dict) and isinstance(case.get("config"), dict) and isinstance(case.get("workers"), list):
+            cases.append((name, case))
+    return cases
+
+
+def plan_coverage(
+    config: Dict[str, Any],
+    assignments: Dict[str, Dict[str, List[List[str]]]] | None,
+    exclude_days: List[str] | None = None,
+) -> float:
+    """Part des places requises effectivement remplies (1.0 si rien n'est requis)."""
+    spec = site_scheduling_spec(config, exclude_days)
+    required = 0
+    assigned = 0
+    for t in range(len(spec.stations)):
+        for d, day_key in enumerate(spec.days):
+            for s, shift_name in enumerate(spec.shifts):
+                need = spec.required(t, d, s)
+                if need <= 0:
+                    continue
+                required += need
+                cell = (((assignments or {}).get(day_key) or {}).get(shift_name) or [])
+                names = cell[t] if t < len(cell) else []
+                assigned += min(need, len([nm for nm in names if str(nm or "").strip()]))
+    return 1.0 if required == 0 else assigned / required
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus courant, en Mo."""
+    import resource
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB ; macOS: octets
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def find_regressions(
+    report: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    metrics: Tuple[str, ...] = ("build_seconds", "solve_seconds", "peak_rss_mb"),
+) -> List[str]:
+    """Compare deux rapports (clé -> mesures) : temps / mémoire au-delà de tolerance, couverture en baisse."""
+    issues: List[str] = []
+    for key, cur in report.items():
+        prev = baseline.get(key)
+        if not isinstance(prev, dict):
+            continue
+        for metric in metrics:
+            before, after = float(prev.get(metric) or 0.0), float(cur.get(metric) or 0.0)
+            # Ignorer le bruit sur les mesures minuscules.
+            if before > 0.05 and after > before * (1.0 + tolerance):
+                issues.append(f"{key}: {metric} {before} -> {after}")
+        if prev.get("coverage") is not None and cur.get("coverage") is not None:
+            if float(cur["coverage"]) < float(prev["coverage"]) - 1e-6:
+                issues.append(f"{key}: coverage {prev['coverage']} -> {cur['coverage']}")
+    return issues
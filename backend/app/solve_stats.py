@@ -0,0 +1,303 @@
+"""Statistiques de résolution CP-SAT par site + prédiction du budget de temps.
+
+Chaque résolution (solve_schedule / solve_schedule_stream) peut enregistrer un échantillon
+sous une clé stable (``site:<id>`` ou ``linked:<root_id>``) : taille du modèle, temps jusqu'à
+la première solution, temps jusqu'à l'optimum, gap relatif au timeout et débit d'alternatives.
+``predict_time_budget`` en déduit un budget adapté au site au lieu d'une constante fixe.
+
+Stockage en mémoire (historique borné par clé). Optionnellement persisté en JSON via
+``PLANNING_SOLVE_STATS_PATH`` pour survivre aux redémarrages.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, List
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from ortools.sat.python import cp_model
+
+
+logger = logging.getLogger("ai_solver")
+
+_SOLVE_STATS_LOCK = threading.Lock()
+_SOLVE_STATS: Dict[str, Deque["SolveStatsSample"]] = {}
+_SOLVE_STATS_LOADED = False
+
+# Au-delà de ce gap relatif au timeout, plus de temps aurait probablement amélioré le plan.
+# En deçà, le besoin retenu est l'instant de la dernière amélioration, pas la limite : sinon
+# chaque timeout « presque optimal » réclame toute la limite et le budget monte à chaque run.
+_GAP_WORTH_MORE_TIME = 0.10
+
+
+def _env_int(name: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(os.getenv(name, str(default)) or default)
+    except Exception:
+        value = default
+    return max(low, min(value, high))
+
+
+def _solve_stats_history_size() -> int:
+    return _env_int("PLANNING_SOLVE_STATS_HISTORY", 30, 1, 500)
+
+
+def _solve_stats_min_samples() -> int:
+    return _env_int("PLANNING_SOLVE_STATS_MIN_SAMPLES", 3, 1, 100)
+
+
+def _solve_stats_path() -> str | None:
+    raw = str(os.getenv("PLANNING_SOLVE_STATS_PATH", "") or "").strip()
+    return raw or None
+
+
+@dataclass(frozen=True)
+class SolveStatsSample:
+    num_workers: int
+    num_vars: int
+    num_constraints: int
+    time_limit_seconds: float
+    status: str
+    first_solution_seconds: float | None
+    optimal_seconds: float | None
+    gap_at_timeout: float | None
+    alternatives: int
+    alternatives_seconds: float
+    recorded_at: int
+    # Instant de la dernière solution améliorante (absent des échantillons plus anciens).
+    last_improvement_seconds: float | None = None
+
+    @property
+    def alternatives_per_second(self) -> float:
+        if self.alternatives <= 0 or self.alternatives_seconds <= 0:
+            return 0.0
+        return float(self.alternatives) / float(self.alternatives_seconds)
+
+
+def solve_stats_key(site_id: int | None, *, linked: bool = False) -> str | None:
+    if site_id is None:
+        return None
+    return f"{'linked' if linked else 'site'}:{int(site_id)}"
+
+
+def _load_persisted_locked() -> None:
+    global _SOLVE_STATS_LOADED
+    if _SOLVE_STATS_LOADED:
+        return
+    _SOLVE_STATS_LOADED = True
+    path = _solve_stats_path()
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            raw = json.load(fh)
+    except Exception:
+        logger.warning("[SOLVE-STATS] unreadable stats file path=%s", path)
+        return
+    if not isinstance(raw, dict):
+        return
+    history = _solve_stats_history_size()
+    for key, items in raw.items():
+        if not isinstance(items, list):
+            continue
+        bucket: Deque[SolveStatsSample] = deque(maxlen=history)
+        for item in items:
+            try:
+                bucket.append(SolveStatsSample(**item))
+            except Exception:
+                continue
+        if bucket:
+            _SOLVE_STATS[str(key)] = bucket
+
+
+def _persist_locked() -> None:
+    path = _solve_stats_path()
+    if not path:
+        return
+    data = {key: [asdict(s) for s in bucket] for key, bucket in _SOLVE_STATS.items()}
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, path)
+    except Exception:
+        logger.warning("[SOLVE-STATS] failed to persist stats path=%s", path)
+
+
+def record_solve_stats(key: str | None, sample: SolveStatsSample) -> None:
+    if not key:
+        return
+    with _SOLVE_STATS_LOCK:
+        _load_persisted_locked()
+        bucket = _SOLVE_STATS.get(key)
+        if bucket is None or bucket.maxlen != _solve_stats_history_size():
+            bucket = deque(bucket or (), maxlen=_solve_stats_history_size())
+            _SOLVE_STATS[key] = bucket
+        bucket.append(sample)
+        _persist_locked()
+    logger.info(
+        "[SOLVE-STATS] recorded key=%s status=%s workers=%s vars=%s first=%.2fs optimal=%s gap=%s alts=%s alts_per_s=%.2f",
+        key,
+        sample.status,
+        sample.num_workers,
+        sample.num_vars,
+        sample.first_solution_seconds or 0.0,
+        None if sample.optimal_seconds is None else round(sample.optimal_seconds, 2),
+        None if sample.gap_at_timeout is None else round(sample.gap_at_timeout, 4),
+        sample.alternatives,
+        sample.alternatives_per_second,
+    )
+
+
+def solve_stats_for(key: str | None) -> List[SolveStatsSample]:
+    if not key:
+        return []
+    with _SOLVE_STATS_LOCK:
+        _load_persisted_locked()
+        return list(_SOLVE_STATS.get(key) or ())
+
+
+def clear_solve_stats() -> None:
+    """Vide le store en mémoire (tests / rechargement)."""
+    global _SOLVE_STATS_LOADED
+    with _SOLVE_STATS_LOCK:
+        _SOLVE_STATS.clear()
+        _SOLVE_STATS_LOADED = False
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, int(math.ceil(q * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def predict_time_budget(
+    key: str | None,
+    *,
+    num_alternatives: int,
+    min_seconds: int,
+    max_seconds: int,
+    num_workers: int | None = None,
+) -> int | None:
+    """Budget (secondes) prédit à partir de l'historique du site, ou None si pas assez d'échantillons.
+
+    - base : p90 du temps jusqu'à l'optimum ; pour les timeouts, l'instant de la dernière
+      amélioration (la limite pour les anciens échantillons), ou la limite x1.5 si le gap
+      restait important — plus de temps aurait aidé ;
+    - alternatives : num_alternatives / débit médian observé.
+    """
+    samples = solve_stats_for(key)
+    if num_workers is not None and num_workers > 0:
+        # Garder les échantillons de taille comparable (roster x0.5 .. x2).
+        samples = [s for s in samples if 0.5 * num_workers <= max(1, s.num_workers) <= 2.0 * num_workers]
+    samples = [s for s in samples if s.first_solution_seconds is not None]
+    if len(samples) < _solve_stats_min_samples():
+        return None
+    base_needs: List[float] = []
+    for s in samples:
+        if s.optimal_seconds is not None:
+            base_needs.append(float(s.optimal_seconds))
+        elif s.gap_at_timeout is not None and s.gap_at_timeout > _GAP_WORTH_MORE_TIME:
+            base_needs.append(float(s.time_limit_seconds) * 1.5)
+        elif s.last_improvement_seconds is not None:
+            base_needs.append(min(float(s.last_improvement_seconds), float(s.time_limit_seconds)))
+        else:
+            base_needs.append(float(s.time_limit_seconds))
+    base = 1.25 * _percentile(base_needs, 0.9) + 1.0
+    rates = [s.alternatives_per_second for s in samples if s.alternatives_per_second > 0]
+    alt_seconds = 0.0
+    if rates and num_alternatives > 0:
+        alt_seconds = float(num_alternatives) / _percentile(rates, 0.5)
+    predicted = int(math.ceil(base + alt_seconds))
+    return max(int(min_seconds), min(predicted, int(max_seconds)))
+
+
+class _SolutionTimer(cp_model.CpSolverSolutionCallback):
+    """Instants de la première solution et de la dernière (CP-SAT ne rappelle que sur
+    une solution améliorante quand un objectif est posé)."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.first_solution_seconds: float | None = None
+        self.last_improvement_seconds: float | None = None
+
+    def on_solution_callback(self) -> None:
+        now = float(self.WallTime())
+        if self.first_solution_seconds is None:
+            self.first_solution_seconds = now
+        self.last_improvement_seconds = now
+
+
+class SolveStatsTracker:
+    """Collecte un échantillon autour d'une résolution : base solve puis phase d'alternatives."""
+
+    def __init__(self, key: str | None, model: cp_model.CpModel, num_workers: int, time_limit_seconds: float) -> None:
+        self.key = key
+        self.num_workers = int(num_workers)
+        self.time_limit_seconds = float(time_limit_seconds)
+        self.callback: _SolutionTimer | None = _SolutionTimer() if key else None
+        self.num_vars = 0
+        self.num_constraints = 0
+        if key:
+            # Taille mesurée avant les nogoods ajoutés par la phase d'alternatives.
+            try:
+                proto = model.Proto()
+                self.num_vars = len(proto.variables)
+                self.num_constraints = len(proto.constraints)
+            except Exception:
+                pass
+        self._status = "UNKNOWN"
+        self._optimal_seconds: float | None = None
+        self._gap: float | None = None
+        self._alternatives_started: float | None = None
+        self._done = False
+
+    def solve(self, solver: cp_model.CpSolver, model: cp_model.CpModel) -> Any:
+        """Base solve ; le callback de première solution n'est branché que si on enregistre."""
+        if self.callback is None:
+            return solver.Solve(model)
+        status = solver.Solve(model, self.callback)
+        self._base_solved(solver, status)
+        return status
+
+    def _base_solved(self, solver: cp_model.CpSolver, status: Any) -> None:
+        self._status = solver.StatusName(status)
+        if status == cp_model.OPTIMAL:
+            self._optimal_seconds = float(solver.WallTime())
+        elif status == cp_model.FEASIBLE:
+            obj = float(solver.ObjectiveValue())
+            bound = float(solver.BestObjectiveBound())
+            self._gap = abs(bound - obj) / max(1.0, abs(bound))
+        self._alternatives_started = time.monotonic()
+
+    def finish(self, alternatives: int) -> None:
+        if not self.key or self._done:
+            return
+        self._done = True
+        elapsed = 0.0
+        if self._alternatives_started is not None:
+            elapsed = max(0.0, time.monotonic() - self._alternatives_started)
+        record_solve_stats(
+            self.key,
+            SolveStatsSample(
+                num_workers=self.num_workers,
+                num_vars=self.num_vars,
+                num_constraints=self.num_constraints,
+                time_limit_seconds=self.time_limit_seconds,
+                status=self._status,
+                first_solution_seconds=self.callback.first_solution_seconds if self.callback else None,
+                optimal_seconds=self._optimal_seconds,
+                gap_at_timeout=self._gap,
+                alternatives=max(0, int(alternatives)),
+                alternatives_seconds=elapsed,
+                recorded_at=int(time.time() * 1000),
+                last_improvement_seconds=self.callback.last_improvement_seconds if self.callback else None,
+            ),
+        )
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark du moteur de משיכות (_apply_auto_pulls_to_payload) sur un gros site synthétique.
+
+Le plan de départ remplit chaque case de la semaine puis ouvre des trous (--hole-ratio) :
+beaucoup de cases deviennent candidates à une משיכה, sans limite (--pulls-limit pour en fixer une).
+Mesure le temps de matérialisation (meilleur / médiane sur --repeat passes) et le nombre de משיכות,
+puis le lot _apply_auto_pulls_to_alternatives sur --alternatives copies du plan (batch_seconds).
+
+Usage (depuis backend/) :
+  python load/bench_pulls.py --stations 30 --output load/pulls_bench.json
+  python load/bench_pulls.py --stations 30 --baseline load/pulls_bench.json   # code 2 si régression
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from copy import deepcopy
+from types import SimpleNamespace
+from typing import Any
+
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.scheduling_spec import site_scheduling_spec  # noqa: E402
+from app.sites.pulls import _apply_auto_pulls_to_alternatives, _apply_auto_pulls_to_payload  # noqa: E402
+from tests.scenario_generator import generate_scenario  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark du moteur de משיכות.")
+    parser.add_argument("--stations", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=150)
+    parser.add_argument("--hole-ratio", type=float, default=0.5)
+    parser.add_argument("--pulls-limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--alternatives", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Baseline JSON à écrire (défaut: stdout)")
+    parser.add_argument("--baseline", default=None, help="Baseline précédente à comparer")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    return parser.parse_args()
+
+
+def build_case(num_stations: int, num_workers: int, hole_ratio: float, seed: int) -> tuple[Any, list[Any], dict]:
+    scenario = generate_scenario(num_workers, num_stations, seed=seed, role_caps=False, events_ratio=0.0)
+    rng = random.Random(seed)
+    site = SimpleNamespace(id=1, name="bench", config=scenario.config)
+    rows = [SimpleNamespace(name=w["name"], roles=list(w.get("roles") or [])) for w in scenario.workers]
+    names = [row.name for row in rows]
+    spec = site_scheduling_spec(scenario.config)
+    days, shifts, stations = spec.capacities()
+    assignments: dict[str, dict[str, list[list[str]]]] = {}
+    cursor = 0
+    for day_idx, day_key in enumerate(days):
+        for shift_idx, shift_name in enumerate(shifts):
+            per_station: list[list[str]] = []
+            for station_idx in range(len(stations)):
+                required = spec.required(station_idx, day_idx, shift_idx)
+                cell = [names[(cursor + k) % len(names)] for k in range(required)]
+                cursor += required
+                if cell and rng.random() < hole_ratio:
+                    cell.pop(rng.randrange(len(cell)))
+                per_station.append(cell)
+            assignments.setdefault(day_key, {})[shift_name] = per_station
+    return site, rows, assignments
+
+
+def bench(args: argparse.Namespace) -> dict[str, Any]:
+    site, rows, assignments = build_case(args.stations, args.workers, args.hole_ratio, args.seed)
+    timings: list[float] = []
+    pulls_count = 0
+    for _ in range(max(1, int(args.repeat))):
+        payload = {"assignments": deepcopy(assignments), "pulls": {}}
+        started = time.perf_counter()
+        payload = _apply_auto_pulls_to_payload(site, rows, payload, pulls_limit=args.pulls_limit)
+        timings.append(time.perf_counter() - started)
+        pulls_count = len(payload.get("pulls") or {})
+    batch_seconds = 0.0
+    if args.alternatives > 0:
+        started = time.perf_counter()
+        _apply_auto_pulls_to_alternatives(site, rows, [assignments] * args.alternatives, pulls_limit=args.pulls_limit)
+        batch_seconds = time.perf_counter() - started
+    return {
+        "stations": args.stations,
+        "workers": args.workers,
+        "hole_ratio": args.hole_ratio,
+        "pulls": pulls_count,
+        "best_seconds": round(min(timings), 4),
+        "median_seconds": round(statistics.median(timings), 4),
+        "alternatives": args.alternatives,
+        "batch_seconds": round(batch_seconds, 4),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    result = bench(args)
+    key = f"s{args.stations}_w{args.workers}"
+    print(f"{key}: {result}", file=sys.stderr)
+    text = json.dumps({"results": {key: result}}, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            prev = ((json.load(fh) or {}).get("results") or {}).get(key) or {}
+        before, after = float(prev.get("median_seconds") or 0.0), result["median_seconds"]
+        if before > 0.005 and after > before * (1.0 + float(args.max_regression)):
+            print(f"REGRESSION {key}: median_seconds {before} -> {after}", file=sys.stderr)
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark du solveur sur des scénarios synthétiques (10 → 1000 travailleurs).
+
+Pour chaque taille de BENCH_SIZE_GRID (un processus neuf par taille) :
+  - build_seconds  : build_cp_sat_schedule_model
+  - solve_seconds  : jusqu'au plan de base (solve_schedule_stream, hors construction)
+  - phases         : alternatives produites / secondes / débit par phase (HOLE, SWAP-INTRA, RESOLVE, BONUS)
+  - model          : variables / contraintes
+  - peak_rss_mb    : pic de mémoire résidente
+  - hierarchical   : avec --hierarchical, sur les tailles multi-sites, couverture et temps de
+                     solve_schedule_hierarchical face au plan de base monolithique (même limite)
+
+Usage (depuis backend/) :
+  python load/bench_solver.py --output load/solver_bench.json
+  python load/bench_solver.py --sizes 10,50,100 --baseline load/solver_bench.json   # code 2 si régression
+  python load/bench_solver.py --sizes 200 --hierarchical
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.ai_solver import solve_schedule_stream  # noqa: E402
+from app.ai_solver_hierarchical import solve_schedule_hierarchical  # noqa: E402
+from app.ai_solver_model import build_cp_sat_schedule_model  # noqa: E402
+from app.solve_corpus import find_regressions, peak_rss_mb  # noqa: E402
+from tests.scenario_generator import BENCH_SIZE_GRID, generate_scenario  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark CP-SAT sur scénarios synthétiques.")
+    parser.add_argument("--sizes", default=None, help="Tailles (travailleurs) à garder, ex: 10,50,100")
+    parser.add_argument("--time-limit", type=int, default=10)
+    parser.add_argument("--num-alternatives", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Baseline JSON à écrire (défaut: stdout)")
+    parser.add_argument("--baseline", default=None, help="Baseline précédente à comparer")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--hierarchical", action="store_true", help="Comparer la résolution hiérarchique (multi-sites)")
+    return parser.parse_args()
+
+
+def _assigned(assignments: dict | None) -> int:
+    return sum(len(cell or []) for shifts_map in (assignments or {}).values() for per_station in shifts_map.values() for cell in per_station)
+
+
+def bench_size(
+    num_workers: int,
+    num_stations: int,
+    linked_sites: int,
+    seed: int,
+    time_limit: int,
+    num_alternatives: int,
+    hierarchical: bool = False,
+) -> dict[str, Any]:
+    os.environ.pop("PLANNING_SOLVE_CORPUS_DIR", None)
+    scenario = generate_scenario(num_workers, num_stations, seed=seed, linked_sites=linked_sites)
+
+    started = time.perf_counter()
+    built = build_cp_sat_schedule_model(scenario.config, scenario.workers, fixed_assignments=scenario.fixed_assignments)
+    build_seconds = time.perf_counter() - started
+    proto = built.model.Proto()
+    del built
+
+    phases: dict[str, dict[str, float]] = {}
+    started = time.perf_counter()
+    last = started
+    base_at: float | None = None
+    base_assigned = 0
+    for item in solve_schedule_stream(
+        scenario.config,
+        scenario.workers,
+        time_limit_seconds=time_limit,
+        num_alternatives=num_alternatives,
+        fixed_assignments=scenario.fixed_assignments,
+        random_seed=seed,
+    ):
+        now = time.perf_counter()
+        if item.get("type") == "base":
+            base_at = now
+            base_assigned = _assigned(item.get("assignments"))
+        elif item.get("type") == "alternative":
+            phase = phases.setdefault(str(item.get("source") or "?"), {"alternatives": 0, "seconds": 0.0})
+            phase["alternatives"] += 1
+            phase["seconds"] += now - last
+        last = now
+    finished = time.perf_counter()
+    for phase in phases.values():
+        phase["seconds"] = round(phase["seconds"], 4)
+        phase["alternatives_per_second"] = round(phase["alternatives"] / phase["seconds"], 3) if phase["seconds"] > 0 else 0.0
+    report: dict[str, Any] = {
+        "workers": num_workers,
+        "stations": num_stations,
+        "linked_sites": linked_sites,
+        "model": {"num_vars": len(proto.variables), "num_constraints": len(proto.constraints)},
+        "build_seconds": round(build_seconds, 4),
+        "solve_seconds": round(max(0.0, (base_at or finished) - started - build_seconds), 4),
+        "total_seconds": round(finished - started, 4),
+        "phases": phases,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if hierarchical and linked_sites > 1:
+        started = time.perf_counter()
+        result = solve_schedule_hierarchical(
+            scenario.config,
+            scenario.workers,
+            time_limit_seconds=time_limit,
+            num_alternatives=num_alternatives,
+            fixed_assignments=scenario.fixed_assignments,
+        )
+        assigned = _assigned(result.get("assignments"))
+        report["hierarchical"] = {
+            "status": str(result.get("status")),
+            "seconds": round(time.perf_counter() - started, 4),
+            "assigned": assigned,
+            "monolithic_assigned": base_assigned,
+            "coverage_ratio": round(assigned / base_assigned, 3) if base_assigned else None,
+            "fallback": (result.get("hierarchical") or {}).get("fallback"),
+        }
+    return report
+
+
+def main() -> int:
+    args = parse_args()
+    wanted = {int(x) for x in str(args.sizes or "").split(",") if x.strip().isdigit()}
+    grid = [g for g in BENCH_SIZE_GRID if not wanted or g[0] in wanted]
+    results: dict[str, dict] = {}
+    for num_workers, num_stations, linked_sites in grid:
+        key = f"w{num_workers}_s{num_stations}_l{linked_sites}"
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results[key] = pool.submit(
+                bench_size, num_workers, num_stations, linked_sites, args.seed, args.time_limit, args.num_alternatives,
+                args.hierarchical,
+            ).result()
+        print(f"{key}: {results[key]}", file=sys.stderr)
+    text = json.dumps(
+        {
+            "params": {"time_limit": args.time_limit, "num_alternatives": args.num_alternatives, "seed": args.seed},
+            "results": results,
+        },
+        ensure_ascii=False,
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = (json.load(fh) or {}).get("results") or {}
+        issues = find_regressions(results, baseline, float(args.max_regression))
+        for issue in issues:
+            print(f"REGRESSION {issue}", file=sys.stderr)
+        if issues:
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Rejoue le corpus de résolutions enregistré (PLANNING_SOLVE_CORPUS_DIR) contre le code courant.
+
+Pour chaque cas (processus isolé, pour un pic mémoire propre au cas) :
+- build_seconds : construction du modèle CP-SAT,
+- solve_seconds : jusqu'au plan de base (hors construction),
+- coverage : part des places requises remplies dans le plan de base,
+- alternatives_per_second : débit de la phase d'alternatives (solve_schedule_stream),
+- peak_rss_mb : pic de mémoire résidente du processus,
+- recorded : issue enregistrée avec le cas (statut, objectif, temps, couverture), si présente.
+
+Avec --baseline, compare à un rapport précédent et sort en erreur (code 2) si un cas régresse
+au-delà de --max-regression. Avec --against-recorded, compare chaque cas à son issue enregistrée :
+statut dégradé, couverture en baisse ou objectif (maximisé) inférieur au-delà de --max-regression.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.ai_solver import solve_schedule_stream  # noqa: E402
+from app.ai_solver_model import build_cp_sat_schedule_model  # noqa: E402
+from app.solve_corpus import find_regressions, load_corpus_cases, peak_rss_mb, plan_coverage  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Rejouer le corpus de résolutions CP-SAT.")
+    parser.add_argument("corpus", help="Répertoire du corpus (fichiers *.json)")
+    parser.add_argument("--time-limit", type=int, default=None, help="Forcer la limite par résolution (défaut: celle enregistrée)")
+    parser.add_argument("--num-alternatives", type=int, default=None, help="Forcer le nombre d'alternatives (défaut: celui enregistré)")
+    parser.add_argument("--output", default=None, help="Rapport JSON (défaut: stdout)")
+    parser.add_argument("--baseline", default=None, help="Rapport précédent à comparer")
+    parser.add_argument("--against-recorded", action="store_true", help="Comparer à l'issue enregistrée avec chaque cas")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Régression relative tolérée (0.25 = +25%%)")
+    parser.add_argument("--no-isolate", action="store_true", help="Tout rejouer dans le processus courant")
+    return parser.parse_args()
+
+
+def replay_case(case: dict[str, Any], time_limit: int | None, num_alternatives: int | None) -> dict[str, Any]:
+    os.environ.pop("PLANNING_SOLVE_CORPUS_DIR", None)
+    params = case.get("params") or {}
+    eff_time = int(time_limit if time_limit is not None else (params.get("time_limit_seconds") or 10))
+    eff_alts = int(num_alternatives if num_alternatives is not None else (params.get("num_alternatives") or 0))
+    max_nights = int(params.get("max_nights_per_worker") or 3)
+    fixed = params.get("fixed_assignments") or None
+    exclude_days = params.get("exclude_days") or None
+
+    started = time.perf_counter()
+    build_cp_sat_schedule_model(
+        case["config"],
+        case["workers"],
+        max_nights_per_worker=max_nights,
+        fixed_assignments=fixed,
+        exclude_days=exclude_days,
+    )
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    base_at: float | None = None
+    base_assignments: dict = {}
+    alternatives = 0
+    status = "OK"
+    objective: float | None = None
+    for item in solve_schedule_stream(
+        case["config"],
+        case["workers"],
+        time_limit_seconds=eff_time,
+        max_nights_per_worker=max_nights,
+        num_alternatives=eff_alts,
+        fixed_assignments=fixed,
+        exclude_days=exclude_days,
+        random_seed=params.get("random_seed"),
+        solver_profile=params.get("solver_profile"),
+    ):
+        item_type = item.get("type")
+        if item_type == "base":
+            base_at = time.perf_counter()
+            base_assignments = item.get("assignments") or {}
+            status = str(item.get("status") or status)
+            objective = item.get("objective")
+        elif item_type == "alternative":
+            alternatives += 1
+        elif item_type == "status":
+            status = str(item.get("status"))
+    finished = time.perf_counter()
+    solve_seconds = ((base_at or finished) - started) - build_seconds
+    alt_window = finished - base_at if base_at is not None else 0.0
+    return {
+        "status": status,
+        "objective": objective,
+        "workers": len(case["workers"]),
+        "build_seconds": round(build_seconds, 4),
+        "solve_seconds": round(max(0.0, solve_seconds), 4),
+        "coverage": round(plan_coverage(case["config"], base_assignments, exclude_days), 4),
+        "alternatives": alternatives,
+        "alternatives_per_second": round(alternatives / alt_window, 3) if alt_window > 0 else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "recorded": case.get("outcome"),
+    }
+
+
+_SOLVED_STATUSES = ("OPTIMAL", "FEASIBLE")
+
+
+def _recorded_regressions(report: dict[str, dict], tolerance: float) -> list[str]:
+    issues: list[str] = []
+    for name, cur in report.items():
+        recorded = cur.get("recorded")
+        if not isinstance(recorded, dict):
+            continue
+        if recorded.get("status") in _SOLVED_STATUSES and cur.get("status") not in _SOLVED_STATUSES:
+            issues.append(f"{name}: status {recorded.get('status')} -> {cur.get('status')}")
+            continue
+        if recorded.get("coverage") is not None and float(cur.get("coverage") or 0.0) < float(recorded["coverage"]) - 1e-6:
+            issues.append(f"{name}: coverage {recorded['coverage']} -> {cur.get('coverage')}")
+        before, after = recorded.get("objective"), cur.get("objective")
+        if before is not None and after is not None and float(after) < float(before) - tolerance * abs(float(before)):
+            issues.append(f"{name}: objective {before} -> {after}")
+    return issues
+
+
+def main() -> int:
+    args = parse_args()
+    cases = load_corpus_cases(args.corpus)
+    if not cases:
+        print(f"Corpus vide: {args.corpus}", file=sys.stderr)
+        return 1
+    report: dict[str, dict] = {}
+    if args.no_isolate:
+        for name, case in cases:
+            report[name] = replay_case(case, args.time_limit, args.num_alternatives)
+            print(f"{name}: {report[name]}", file=sys.stderr)
+    else:
+        # Un processus neuf par cas : ru_maxrss reflète le pic du cas seul.
+        for name, case in cases:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                report[name] = pool.submit(replay_case, case, args.time_limit, args.num_alternatives).result()
+            print(f"{name}: {report[name]}", file=sys.stderr)
+    text = json.dumps({"cases": report}, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    issues: list[str] = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = (json.load(fh) or {}).get("cases") or {}
+        issues += find_regressions(report, baseline, float(args.max_regression))
+    if args.against_recorded:
+        issues += _recorded_regressions(report, float(args.max_regression))
+    for issue in issues:
+        print(f"REGRESSION {issue}", file=sys.stderr)
+    return 2 if issues else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
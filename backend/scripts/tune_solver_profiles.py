@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Harnais de tuning hors-ligne des profils CP-SAT.
+
+Rejoue un corpus de cas de résolution (un fichier JSON par cas : ``config``, ``workers``,
+``params``) avec chaque profil (fast-preview / balanced / thorough) et choisit le meilleur
+profil par tranche de taille (nombre de travailleurs) :
+  1. couverture moyenne la plus haute,
+  2. puis objectif moyen le plus haut,
+  3. puis temps de résolution moyen le plus bas.
+
+Le résultat (JSON) peut être branché en production via PLANNING_SOLVER_PROFILE_TUNING.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.ai_solver import solve_schedule  # noqa: E402
+from app.ai_solver_utils import SOLVER_PROFILES, solver_size_bucket  # noqa: E402
+from app.solve_corpus import load_corpus_cases, plan_coverage  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Choisir le meilleur profil CP-SAT par tranche de taille.")
+    parser.add_argument("corpus", help="Répertoire du corpus (fichiers *.json)")
+    parser.add_argument("--time-limit", type=int, default=20, help="Limite par résolution (secondes)")
+    parser.add_argument("--profiles", default=",".join(SOLVER_PROFILES), help="Profils à comparer (séparés par des virgules)")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie (défaut: stdout)")
+    return parser.parse_args()
+
+
+def run_case(case: dict[str, Any], profile: str, time_limit: int) -> dict[str, Any]:
+    params = case.get("params") or {}
+    started = time.perf_counter()
+    result = solve_schedule(
+        case["config"],
+        case["workers"],
+        time_limit_seconds=time_limit,
+        max_nights_per_worker=int(params.get("max_nights_per_worker") or 3),
+        num_alternatives=0,
+        fixed_assignments=params.get("fixed_assignments") or None,
+        exclude_days=params.get("exclude_days") or None,
+        solver_profile=profile,
+    )
+    return {
+        "seconds": time.perf_counter() - started,
+        "coverage": plan_coverage(case["config"], result.get("assignments") or {}, params.get("exclude_days") or None),
+        "objective": float(result.get("objective") or 0.0),
+        "status": result.get("status"),
+    }
+
+
+def pick_best_profiles(runs: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """runs: [{bucket, profile, seconds, coverage, objective}] -> {bucket: {profile, ...moyennes}}."""
+    agg: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    for run in runs:
+        agg.setdefault((run["bucket"], run["profile"]), []).append(run)
+    best: dict[str, dict[str, Any]] = {}
+    for (bucket, profile), items in agg.items():
+        n = len(items)
+        summary = {
+            "profile": profile,
+            "cases": n,
+            "coverage": sum(r["coverage"] for r in items) / n,
+            "objective": sum(r["objective"] for r in items) / n,
+            "seconds": sum(r["seconds"] for r in items) / n,
+        }
+        rank = (round(summary["coverage"], 4), round(summary["objective"], 1), -summary["seconds"])
+        current = best.get(bucket)
+        if current is None or rank > current["_rank"]:
+            best[bucket] = {**summary, "_rank": rank}
+    return {bucket: {k: v for k, v in entry.items() if k != "_rank"} for bucket, entry in sorted(best.items())}
+
+
+def main() -> int:
+    args = parse_args()
+    # Ne pas ré-enregistrer les cas rejoués dans le corpus.
+    os.environ.pop("PLANNING_SOLVE_CORPUS_DIR", None)
+    profiles = [p.strip() for p in str(args.profiles or "").split(",") if p.strip() in SOLVER_PROFILES]
+    if not profiles:
+        print("Aucun profil valide.", file=sys.stderr)
+        return 1
+    cases = load_corpus_cases(args.corpus)
+    if not cases:
+        print(f"Corpus vide: {args.corpus}", file=sys.stderr)
+        return 1
+    runs: list[dict[str, Any]] = []
+    for name, case in cases:
+        bucket = solver_size_bucket(len(case["workers"]))
+        for profile in profiles:
+            run = run_case(case, profile, int(args.time_limit))
+            run.update({"case": name, "bucket": bucket, "profile": profile})
+            runs.append(run)
+            print(
+                f"{name:40s} bucket={bucket:3s} profile={profile:13s} "
+                f"coverage={run['coverage']:.3f} objective={run['objective']:.0f} seconds={run['seconds']:.2f}",
+                file=sys.stderr,
+            )
+    output = {"time_limit": int(args.time_limit), "buckets": pick_best_profiles(runs), "runs": runs}
+    text = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
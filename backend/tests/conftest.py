@@ -10,6 +10,8 @@ from app.database import Base
 import app.deps as deps
 import app.auth as auth_mod
 from app.models import User, UserRole
+from app.sites.linked_context import invalidate_linked_context
+from app.sites.linked_graph import invalidate_linked_graph
 
 
 @pytest.fixture(scope="session")
@@ -38,6 +40,9 @@ def db_session(test_engine):
         with test_engine.begin() as conn:
             for table in reversed(Base.metadata.sorted_tables):
                 conn.execute(table.delete())
+        # Suppression hors ORM : les ids sont réutilisés, les caches multi-sites doivent repartir à vide.
+        invalidate_linked_graph()
+        invalidate_linked_context()
 
 
 @pytest.fixture()
@@ -0,0 +1,187 @@
+"""Générateur de scénarios synthétiques (gros sites / clusters liés) pour le solveur.
+
+Déterministe pour un même ``seed``. Produit les mêmes structures que l'app passe au solveur :
+config de stations (perDayCustom + dayOverrides, rôles), travailleurs (disponibilités, rôles,
+préférences, site_limits pour les clusters liés) et verrous d'אירועים déjà appliqués
+(créneaux retirés de la disponibilité + max_shifts réduit, comme events.py).
+
+Utilisé par les tests de fumée et par load/bench_solver.py.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from typing import Any
+
+
+DAY_KEYS = ("sun", "mon", "tue", "wed", "thu", "fri", "sat")
+DEFAULT_SHIFTS = ("06-14", "14-22", "22-06")
+DEFAULT_ROLES = ("אחמ\"ש", "מאבטח חמוש")
+
+
+@dataclass
+class Scenario:
+    config: dict[str, Any]
+    workers: list[dict[str, Any]]
+    fixed_assignments: dict[str, dict[str, list[list[str]]]] | None = None
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+def _station(
+    rng: random.Random,
+    idx: int,
+    *,
+    shifts: tuple[str, ...],
+    per_day_overrides: bool,
+    role_caps: bool,
+    site_id: int | None,
+    site_station_index: int,
+) -> dict[str, Any]:
+    required = rng.choice((1, 1, 2, 2, 3))
+    st: dict[str, Any] = {
+        "name": f"עמדה {idx + 1}",
+        "perDayCustom": False,
+        "uniformRoles": True,
+        "workers": required,
+        "days": {d: True for d in DAY_KEYS},
+        "shifts": [{"name": name, "enabled": True} for name in shifts],
+        "roles": [],
+    }
+    if role_caps and required >= 2:
+        st["roles"] = [{"name": rng.choice(DEFAULT_ROLES), "count": 1, "enabled": True}]
+    if per_day_overrides and rng.random() < 0.4:
+        # Week-end allégé : vendredi sans nuit, samedi fermé sur certaines עמדות.
+        st["perDayCustom"] = True
+        st["dayOverrides"] = {
+            "fri": {"active": True, "shifts": [{"name": name, "enabled": True} for name in shifts[:-1]]},
+            "sat": {"active": rng.random() < 0.5},
+        }
+    if site_id is not None:
+        st["siteId"] = site_id
+        st["siteName"] = f"אתר {site_id}"
+        st["siteStationIndex"] = site_station_index
+    return st
+
+
+def generate_scenario(
+    num_workers: int,
+    num_stations: int,
+    *,
+    seed: int = 0,
+    shifts: tuple[str, ...] = DEFAULT_SHIFTS,
+    per_day_overrides: bool = True,
+    role_caps: bool = True,
+    linked_sites: int = 1,
+    shared_workers_ratio: float = 0.2,
+    events_ratio: float = 0.1,
+    prefs_ratio: float = 0.3,
+    availability_ratio: float = 0.6,
+    fixed_ratio: float = 0.0,
+) -> Scenario:
+    """Scénario N travailleurs × M stations.
+
+    linked_sites > 1 : stations réparties entre sites (siteId / siteStationIndex), chaque
+    travailleur rattaché à un site (allowedWorkers) et une part ``shared_workers_ratio``
+    partagée entre deux sites avec site_limits, comme le contexte multi-sites.
+    """
+    rng = random.Random(seed)
+    num_sites = max(1, int(linked_sites))
+    linked = num_sites > 1
+    stations = [
+        _station(
+            rng,
+            t,
+            shifts=shifts,
+            per_day_overrides=per_day_overrides,
+            role_caps=role_caps,
+            site_id=(t % num_sites) + 1 if linked else None,
+            site_station_index=t // num_sites,
+        )
+        for t in range(max(1, int(num_stations)))
+    ]
+    station_indices_by_site: dict[int, list[int]] = {}
+    for t, st in enumerate(stations):
+        station_indices_by_site.setdefault(int(st.get("siteId") or 1), []).append(t)
+
+    workers: list[dict[str, Any]] = []
+    events = 0
+    for i in range(max(1, int(num_workers))):
+        name = f"עובד {i + 1:04d}"
+        availability = {
+            d: [sh for sh in shifts if rng.random() < availability_ratio]
+            for d in DAY_KEYS
+        }
+        w: dict[str, Any] = {
+            "id": i + 1,
+            "name": name,
+            "max_shifts": rng.choice((3, 4, 5, 5, 6)),
+            "roles": [rng.choice(DEFAULT_ROLES)] if role_caps and rng.random() < 0.3 else [],
+            "availability": availability,
+        }
+        if rng.random() < prefs_ratio:
+            w["shift_kind_prefs"] = {"morning": rng.randint(0, 3), "night": rng.randint(0, 2)}
+            w["shift_slot_prefs"] = {rng.choice(DAY_KEYS): [rng.choice(shifts)]}
+        if events_ratio > 0 and rng.random() < events_ratio:
+            # אירוע : créneau verrouillé retiré de la זמינות + une garde consommée.
+            day = rng.choice(DAY_KEYS)
+            w["availability"][day] = []
+            w["max_shifts"] = max(0, int(w["max_shifts"]) - 1)
+            events += 1
+        if linked:
+            home = (i % num_sites) + 1
+            site_ids = [home]
+            if rng.random() < shared_workers_ratio:
+                site_ids.append((home % num_sites) + 1)
+            w["site_limits"] = [
+                {"station_indices": station_indices_by_site.get(sid, []), "max": int(w["max_shifts"])}
+                for sid in site_ids
+            ]
+            w["_site_ids"] = site_ids
+        workers.append(w)
+
+    if linked:
+        for t, st in enumerate(stations):
+            sid = int(st["siteId"])
+            st["allowedWorkers"] = [w["name"] for w in workers if sid in w["_site_ids"]]
+        for w in workers:
+            w.pop("_site_ids", None)
+
+    fixed: dict[str, dict[str, list[list[str]]]] | None = None
+    if fixed_ratio > 0:
+        fixed = {}
+        for w in workers:
+            if rng.random() >= fixed_ratio:
+                continue
+            options = [(d, sh) for d, shs in w["availability"].items() for sh in shs]
+            if not options:
+                continue
+            d, sh = rng.choice(options)
+            t = rng.randrange(len(stations))
+            cell_row = fixed.setdefault(d, {}).setdefault(sh, [[] for _ in stations])
+            if not cell_row[t]:
+                cell_row[t].append(w["name"])
+
+    return Scenario(
+        config={"stations": stations},
+        workers=workers,
+        fixed_assignments=fixed,
+        meta={
+            "seed": seed,
+            "workers": len(workers),
+            "stations": len(stations),
+            "linked_sites": num_sites,
+            "events": events,
+        },
+    )
+
+
+# Grille de tailles du benchmark (travailleurs, stations, sites liés).
+BENCH_SIZE_GRID: tuple[tuple[int, int, int], ...] = (
+    (10, 2, 1),
+    (50, 6, 1),
+    (100, 12, 2),
+    (250, 25, 3),
+    (500, 40, 4),
+    (1000, 60, 6),
+)
@@ -14,7 +14,10 @@ from app.ai_solver import (
     order_shifts,
     sanitize_plan,
     solve_schedule,
+    solve_schedule_weeks,
 )
+from app.ai_solver_model import PullsModelSpec, build_cp_sat_schedule_model
+from app.shift_catalog import shift_catalog_for_config
 from tests.ai_solver_fixtures import (
     assignments_signature,
     count_assigned_names,
@@ -60,6 +63,27 @@ def test_build_capacities_uniform_station_single_shift():
     assert st0["capacity"]["sun"]["06-14"] == 2
 
 
+def test_build_capacities_orders_shifts_like_catalog():
+    config = {
+        "stations": [
+            {
+                "name": "Poste A",
+                "workers": 1,
+                "days": {"sun": True},
+                "shifts": [
+                    {"name": "ערב", "enabled": True, "start": "14:00", "end": "22:00"},
+                    {"name": "יום", "enabled": True, "start": "06:00", "end": "14:00"},
+                    {"name": "אחר", "enabled": True, "start": "22:00", "end": "06:00"},
+                ],
+                "roles": [],
+            }
+        ]
+    }
+    _, shifts, _ = build_capacities_from_config(config)
+    assert shifts == list(shift_catalog_for_config(config).names) == ["יום", "ערב", "אחר"]
+    assert order_shifts(["אחר", "ערב", "יום"], config) == ["יום", "ערב", "אחר"]
+
+
 def test_build_capacities_exclude_days_zeroes_requirements():
     config = {
         "stations": [
@@ -416,3 +440,138 @@ def test_solve_schedule_fixed_preserved_in_base_plan():
     assert ("sun", "06-14", 0, "Alice") in assignments_signature(result["assignments"])
     # Note: certaines heuristiques d'alternatives (SWAP) peuvent encore déplacer un figé ;
     # hors scope du builder CP-SAT commun — à traiter séparément si besoin.
+
+
+def test_solver_profiles_apply_gap_and_parallelism(monkeypatch):
+    from app.ai_solver_utils import SOLVER_PROFILES, configure_cp_sat_solver
+
+    monkeypatch.setenv("PLANNING_SOLVER_NUM_WORKERS", "2")
+    solver = configure_cp_sat_solver(cp_model.CpSolver(), 7, SOLVER_PROFILES["fast-preview"])
+    assert solver.parameters.max_time_in_seconds == 7
+    assert solver.parameters.linearization_level == 0
+    # Gap relatif nul : seul le gap absolu (< poids d'un créneau) peut arrêter la recherche.
+    assert solver.parameters.relative_gap_limit == 0.0
+    assert solver.parameters.absolute_gap_limit == pytest.approx(1e4)
+    assert solver.parameters.num_search_workers == 1
+
+
+def test_solver_num_workers_not_capped_at_four(monkeypatch):
+    import os
+
+    from app.ai_solver_utils import _solver_num_search_workers
+
+    monkeypatch.setenv("PLANNING_SOLVER_NUM_WORKERS", "64")
+    assert _solver_num_search_workers() == min(64, os.cpu_count() or 1)
+
+
+def test_resolve_solver_profile_uses_tuning_file_by_size(tmp_path, monkeypatch):
+    import json
+    import os
+
+    from app.ai_solver_utils import resolve_solver_profile
+
+    tuning = tmp_path / "tuning.json"
+    tuning.write_text(json.dumps({"buckets": {"xs": {"profile": "fast-preview"}, "m": {"profile": "thorough"}}}))
+    monkeypatch.setenv("PLANNING_SOLVER_PROFILE_TUNING", str(tuning))
+    monkeypatch.delenv("PLANNING_SOLVER_PROFILE", raising=False)
+    assert resolve_solver_profile(None, 5).name == "fast-preview"
+    assert resolve_solver_profile(None, 100).name == "thorough"
+    assert resolve_solver_profile("balanced", 5).name == "balanced"
+    assert resolve_solver_profile(None, 1000) is None
+
+    # Fichier réécrit : le cache (chemin, mtime) le relit.
+    tuning.write_text(json.dumps({"buckets": {"xs": {"profile": "balanced"}}}))
+    os.utime(tuning, ns=(tuning.stat().st_atime_ns, tuning.stat().st_mtime_ns + 1_000_000))
+    assert resolve_solver_profile(None, 5).name == "balanced"
+
+
+def test_solve_schedule_accepts_solver_profile():
+    config = minimal_station_config(workers=1)
+    result = solve_schedule(config, [worker("Alice")], time_limit_seconds=5, num_alternatives=0, solver_profile="thorough")
+    assert result["assignments"]["sun"]["06-14"][0] == ["Alice"]
+
+
+def test_solve_schedule_weeks_respects_saturday_night_to_sunday_boundary():
+    config = minimal_station_config(
+        workers=1,
+        days={"sun": True, "sat": True},
+        shift_names=["06-14", "22-06"],
+    )
+    full = {"sun": ["06-14", "22-06"], "sat": ["06-14", "22-06"]}
+    workers = [
+        worker("Alice", worker_id=1, max_shifts=1, availability={"sat": ["22-06"], "sun": ["06-14"]}),
+        worker("Bob", worker_id=2, availability=full),
+        worker("Carol", worker_id=3, availability=full),
+    ]
+    results = list(
+        solve_schedule_weeks(
+            config,
+            [
+                {"week_iso": "2026-01-04", "workers": workers},
+                {"week_iso": "2026-01-11", "workers": workers},
+            ],
+            time_limit_seconds=5,
+        )
+    )
+
+    assert [r["week_iso"] for r in results] == ["2026-01-04", "2026-01-11"]
+    first, second = results
+    assert all(r["status"] in ("OPTIMAL", "FEASIBLE") for r in results)
+    sat_night = {nm for cell in first["assignments"]["sat"]["22-06"] for nm in cell}
+    sun_morning = {nm for cell in second["assignments"]["sun"]["06-14"] for nm in cell}
+    assert sat_night
+    assert not (sat_night & sun_morning)
+
+
+def test_solve_schedule_weeks_chains_on_saved_and_sent_plans():
+    config = minimal_station_config(
+        workers=1,
+        days={"sun": True, "sat": True},
+        shift_names=["06-14", "22-06"],
+    )
+    full = {"sun": ["06-14", "22-06"], "sat": ["06-14", "22-06"]}
+    workers = [worker("Alice", worker_id=1, availability=full), worker("Bob", worker_id=2, availability=full)]
+    weeks = [{"week_iso": "2026-01-04", "workers": workers}, {"week_iso": "2026-01-11", "workers": workers}]
+    # Plan déjà sauvegardé de la semaine d'avant : Alice (et Bob, garde d'une משיכה) samedi nuit.
+    saved = {
+        "assignments": {"sat": {"22-06": [["Alice"]]}},
+        "pulls": {"sat|22-06|0|1": {"before": {"name": "Bob"}, "after": {"name": "Bob"}}},
+    }
+    gen = solve_schedule_weeks(config, weeks, time_limit_seconds=5, initial_prev=saved)
+    first = next(gen)
+    assert first["assignments"]["sun"]["06-14"][0] == []
+
+    # Plan émis différent du résultat brut : c'est lui qui pose la frontière suivante.
+    emitted_night = "Bob" if first["assignments"]["sat"]["22-06"][0] == ["Alice"] else "Alice"
+    second = gen.send({"assignments": {"sat": {"22-06": [[emitted_night]]}}, "pulls": {}})
+    assert emitted_night not in second["assignments"]["sun"]["06-14"][0]
+    assert second["assignments"]["sun"]["06-14"][0]
+
+
+def test_solve_schedule_models_pulls_within_limit():
+    config = minimal_station_config(shift_names=["06-14", "14-22", "22-06"])
+    workers = [
+        worker("Alice", worker_id=1, availability={"sun": ["06-14"]}),
+        worker("Bob", worker_id=2, availability={"sun": ["22-06"]}),
+    ]
+    with_pull = solve_schedule(config, workers, time_limit_seconds=5, num_alternatives=1, pulls=PullsModelSpec(limit=1))
+    assert with_pull["pull_cells"] == [["sun", "14-22", 0]]
+    assert with_pull["assignments"]["sun"]["14-22"][0] == []
+
+    no_pull = solve_schedule(config, workers, time_limit_seconds=5, num_alternatives=1, pulls=PullsModelSpec(limit=0))
+    assert no_pull["pull_cells"] == []
+
+
+def test_pull_requires_distinct_available_workers_around_cell():
+    config = minimal_station_config(shift_names=["06-14", "14-22", "22-06"])
+    # Alice seule autour de 14-22 : même worker avant et après → pas de משיכה.
+    workers = [
+        worker("Alice", worker_id=1, availability={"sun": ["06-14", "22-06"]}),
+        worker("Bob", worker_id=2, availability={"mon": ["06-14"]}),
+    ]
+    res = solve_schedule(config, workers, time_limit_seconds=5, num_alternatives=1, pulls=PullsModelSpec(limit=1))
+    assert res["pull_cells"] == []
+
+    # Personne de disponible avant la case : aucune variable de משיכה n'est créée.
+    built = build_cp_sat_schedule_model(config, [workers[1]], pulls=PullsModelSpec(limit=1))
+    assert built.pulls == {}
@@ -0,0 +1,121 @@
+import app.ai_solver_hierarchical as hierarchical_mod
+from app.ai_solver import solve_schedule
+from app.ai_solver_hierarchical import solve_schedule_hierarchical, use_hierarchical_solve
+from app.scheduling_spec import site_scheduling_spec
+from tests.scenario_generator import generate_scenario
+
+
+def _count(assignments: dict) -> int:
+    return sum(len(c) for m in assignments.values() for p in m.values() for c in p)
+
+
+def _cells_of(assignments: dict, name: str) -> list[tuple[str, str, int]]:
+    return [
+        (day_key, sh_name, t)
+        for day_key, shifts_map in assignments.items()
+        for sh_name, per_station in shifts_map.items()
+        for t, cell in enumerate(per_station)
+        if name in cell
+    ]
+
+
+def test_hierarchical_threshold(monkeypatch):
+    scenario = generate_scenario(30, 6, seed=1, linked_sites=2)
+
+    monkeypatch.setenv("PLANNING_LINKED_HIERARCHICAL_MIN_STATIONS", "6")
+    assert use_hierarchical_solve(scenario.config)
+    monkeypatch.setenv("PLANNING_LINKED_HIERARCHICAL_MIN_STATIONS", "7")
+    assert not use_hierarchical_solve(scenario.config)
+    monkeypatch.setenv("PLANNING_LINKED_HIERARCHICAL_MIN_STATIONS", "0")
+    assert not use_hierarchical_solve(scenario.config)
+    # Un seul site : jamais hiérarchique.
+    monkeypatch.setenv("PLANNING_LINKED_HIERARCHICAL_MIN_STATIONS", "1")
+    assert not use_hierarchical_solve(generate_scenario(10, 4, seed=1).config)
+
+
+def test_hierarchical_solve_respects_shared_worker_caps():
+    scenario = generate_scenario(40, 8, seed=2, linked_sites=3, shared_workers_ratio=0.5, events_ratio=0.0)
+    spec = site_scheduling_spec(scenario.config)
+
+    result = solve_schedule_hierarchical(scenario.config, scenario.workers, time_limit_seconds=4, num_alternatives=2)
+
+    assert result["status"] == "FEASIBLE"
+    assert result["hierarchical"]["sites"] == 3
+    assert result["hierarchical"]["shared_workers"] > 0
+    assert result["days"] == list(spec.days) and result["shifts"] == list(spec.shifts)
+    assert 0 < _count(result["assignments"]) <= spec.required_total
+    last_shift, first_shift = spec.shifts[-1], spec.shifts[0]
+    for w in scenario.workers:
+        cells = _cells_of(result["assignments"], w["name"])
+        slots = [(day_key, sh_name) for day_key, sh_name, _ in cells]
+        # Aucun conflit entre sites : une case par créneau, jamais la garde du lendemain matin
+        # après la dernière garde de la veille, max_shifts et site_limits globaux respectés.
+        assert len(slots) == len(set(slots))
+        assert len(cells) <= w["max_shifts"]
+        for d in range(len(spec.days) - 1):
+            assert not ((spec.days[d], last_shift) in slots and (spec.days[d + 1], first_shift) in slots)
+        for limit in w["site_limits"]:
+            assert sum(1 for _, _, t in cells if t in limit["station_indices"]) <= limit["max"]
+
+
+def test_hierarchical_coverage_close_to_monolithic():
+    scenario = generate_scenario(60, 12, seed=3, linked_sites=3, shared_workers_ratio=0.4, events_ratio=0.0)
+
+    hierarchical = solve_schedule_hierarchical(scenario.config, scenario.workers, time_limit_seconds=6, num_alternatives=2)
+    monolithic = solve_schedule(scenario.config, scenario.workers, time_limit_seconds=6, num_alternatives=2)
+
+    assert hierarchical["status"] == "FEASIBLE" and "fallback" not in hierarchical["hierarchical"]
+    assert _count(hierarchical["assignments"]) >= 0.9 * _count(monolithic["assignments"])
+
+
+def test_unsolved_site_falls_back_to_monolithic_or_reports_failure(monkeypatch):
+    scenario = generate_scenario(40, 8, seed=2, linked_sites=3, shared_workers_ratio=0.5, events_ratio=0.0)
+    real_solve_site = hierarchical_mod._HierarchicalSolve._solve_site
+
+    def first_site_unknown(self, problem, time_limit, num_alternatives):
+        if problem.site_id == min(self.problems):
+            return {"status": "UNKNOWN", "assignments": {}}
+        return real_solve_site(self, problem, time_limit, num_alternatives)
+
+    monkeypatch.setattr(hierarchical_mod._HierarchicalSolve, "_solve_site", first_site_unknown)
+    result = solve_schedule_hierarchical(scenario.config, scenario.workers, time_limit_seconds=6, num_alternatives=0)
+    # Jamais un plan fusionné avec un site entier vide : le modèle combiné prend le relais.
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
+    assert result["hierarchical"]["fallback"] == "monolithic" and result["hierarchical"]["unsolved_sites"] == [1]
+
+    monkeypatch.setattr(hierarchical_mod, "solve_schedule", lambda *a, **k: {"status": "INFEASIBLE", "assignments": {}})
+    result = solve_schedule_hierarchical(scenario.config, scenario.workers, time_limit_seconds=4, num_alternatives=0)
+    assert result["status"] == "INFEASIBLE" and result["hierarchical"]["fallback"] == "failed"
+    assert _count(result["assignments"]) == 0 and result["alternatives"] == []
+
+
+def test_hierarchical_stream_reports_progress_and_stops_between_batches(monkeypatch):
+    import threading
+    import time
+
+    from app.ai_solver_hierarchical import solve_schedule_hierarchical_stream
+
+    scenario = generate_scenario(40, 8, seed=2, linked_sites=3, shared_workers_ratio=0.5, events_ratio=0.0)
+    calls = []
+
+    def slow_unknown(self, problem, time_limit, num_alternatives):
+        calls.append(problem.site_id)
+        time.sleep(0.3)
+        return {"status": "UNKNOWN", "assignments": {}}
+
+    monkeypatch.setenv("PLANNING_LINKED_HIERARCHICAL_WORKERS", "1")
+    monkeypatch.setattr(hierarchical_mod._HierarchicalSolve, "_solve_site", slow_unknown)
+    stop_event = threading.Event()
+    events = []
+    for item in solve_schedule_hierarchical_stream(
+        scenario.config, scenario.workers, time_limit_seconds=20, num_alternatives=0, stop_event=stop_event,
+    ):
+        events.append(item)
+        if item.get("progress"):
+            stop_event.set()
+
+    progress = [e["progress"] for e in events if e.get("progress")]
+    assert progress and progress[0]["batch_sites"] == [1] and progress[0]["total_sites"] == 3
+    # Arrêt au lot suivant : ni tous les sites, ni tours, ni repli monolithique.
+    assert len(calls) < 3
+    assert events[-1] == {"type": "done"} and not any(e["type"] == "base" for e in events)
@@ -0,0 +1,71 @@
+from app.ai_solver_repair import repair_schedule
+from tests.ai_solver_fixtures import minimal_station_config, worker
+
+
+WEEK = {d: True for d in ("sun", "mon", "tue", "wed", "thu")}
+
+
+def _plan(names_by_day: dict[str, str]) -> dict:
+    return {day: {"06-14": [[nm] if nm else []]} for day, nm in names_by_day.items()}
+
+
+def _workers(removed: str | None = None):
+    all_days = {d: ["06-14"] for d in WEEK}
+    ws = [
+        worker("Alice", worker_id=1, availability=all_days),
+        worker("Bob", worker_id=2, availability=all_days),
+        worker("Carol", worker_id=3, availability=all_days),
+        worker("Dan", worker_id=4, max_shifts=1, availability=all_days),
+    ]
+    return [w for w in ws if w["name"] != removed]
+
+
+def test_repair_replaces_removed_worker_only_in_neighbourhood():
+    config = minimal_station_config(workers=1, days=WEEK)
+    current = _plan({"sun": "Alice", "mon": "Bob", "tue": "Carol", "wed": "Alice", "thu": "Bob"})
+
+    result = repair_schedule(config, _workers(removed="Carol"), current, radius_days=1)
+
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
+    assert not result["full_week"]
+    assert result["assignments"]["tue"]["06-14"][0] == ["Dan"]
+    # Cases hors voisinage (tue ± 1) inchangées.
+    assert result["assignments"]["sun"]["06-14"][0] == ["Alice"]
+    assert result["assignments"]["thu"]["06-14"][0] == ["Bob"]
+    assert ("tue", "06-14", 0) in result["changed_cells"]
+    assert all(day in ("mon", "tue", "wed") for day, _, _ in result["changed_cells"])
+
+
+def test_repair_keeps_unlocked_cells_when_nothing_better():
+    config = minimal_station_config(workers=1, days=WEEK)
+    current = _plan({"sun": "Alice", "mon": "Bob", "tue": "Carol", "wed": "Alice", "thu": "Bob"})
+
+    result = repair_schedule(config, _workers(), current, unlocked_cells=[("mon", "06-14", 0)])
+
+    assert result["assignments"] == current
+    assert result["changed_cells"] == []
+
+
+def test_repair_without_changes_returns_current_plan():
+    config = minimal_station_config(workers=1, days=WEEK)
+    current = _plan({"sun": "Alice", "mon": "", "tue": "Carol", "wed": "", "thu": "Bob"})
+
+    result = repair_schedule(config, _workers(), current)
+
+    assert result["status"] == "NOOP"
+    assert result["assignments"] == current
+
+
+def test_repair_leaves_excluded_days_untouched():
+    config = minimal_station_config(workers=1, days=WEEK)
+    current = _plan({"sun": "Alice", "mon": "Bob", "tue": "Carol", "wed": "Alice", "thu": "Bob"})
+
+    result = repair_schedule(
+        config, _workers(), current, unlocked_cells=[("wed", "06-14", 0)], exclude_days=["sun", "mon"],
+    )
+
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
+    assert not result["full_week"]
+    assert result["assignments"]["sun"]["06-14"][0] == ["Alice"]
+    assert result["assignments"]["mon"]["06-14"][0] == ["Bob"]
+    assert all(day in ("tue", "wed", "thu") for day, _, _ in result["changed_cells"])
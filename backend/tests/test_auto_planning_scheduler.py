@@ -1,7 +1,13 @@
+import threading
 from datetime import datetime, timedelta
 
-from app.models import DirectorAutoPlanningConfig
-from app.sites import compute_auto_planning_scheduler_sleep_seconds
+import app.sites.auto_planning as auto_planning
+from app.models import AutoPlanningRun, DirectorAutoPlanningConfig
+from app.sites import _next_week_iso, compute_auto_planning_scheduler_sleep_seconds, process_auto_planning_tick
+from app.sites.auto_planning_queue import enqueue_auto_planning_run
+from app.sites.generation_slots import _generation_busy_detail
+from app.sites.scheduler_lease import LeaseFence
+from tests.test_site_workers_count import auth_headers, login_director
 
 
 def _ms(dt: datetime) -> int:
@@ -60,3 +66,148 @@ def test_scheduler_sleep_until_next_slot(db_session):
         now=now,
     )
     assert sleep == 3600
+
+
+def test_tick_runs_due_directors_in_parallel_with_own_sessions(db_session, monkeypatch):
+    for director_id in (1, 2):
+        # Dimanche 00:00 : créneau de la semaine courante toujours passé.
+        db_session.add(DirectorAutoPlanningConfig(director_id=director_id, enabled=True, day_of_week=0, hour=0, minute=0))
+    db_session.commit()
+
+    both_running = threading.Barrier(2, timeout=10)
+    sessions = {}
+
+    def fake_run(db, director_id, target_week_iso, source, job=None, **options):
+        sessions[director_id] = db
+        both_running.wait()
+        if director_id == 2:
+            raise RuntimeError("solver exploded")
+        return 3, []
+
+    monkeypatch.setenv("PLANNING_AUTO_PLANNING_PARALLELISM", "2")
+    monkeypatch.setattr(auto_planning, "_run_auto_planning_for_director", fake_run)
+    process_auto_planning_tick(db_session)
+
+    assert set(sessions) == {1, 2}
+    assert sessions[1] is not sessions[2] and db_session not in sessions.values()
+    db_session.expire_all()
+    rows = {row.director_id: row for row in db_session.query(DirectorAutoPlanningConfig).all()}
+    runs = {run.director_id: run for run in db_session.query(AutoPlanningRun).all()}
+    assert rows[1].last_run_week_iso and rows[1].last_error is None
+    assert runs[1].status == "succeeded" and runs[1].generated_sites == 3 and runs[1].duration_ms is not None
+    # Échec du job isolé : noté sur son directeur et remis en file avec backoff, semaine pas encore close.
+    assert rows[2].last_run_week_iso is None
+    assert "solver exploded" in (rows[2].last_error or "")
+    assert runs[2].status == "queued" and runs[2].attempts == 1 and runs[2].target_week_iso == rows[1].last_run_week_iso
+
+
+def test_tick_retries_with_backoff_then_records_progress(db_session, monkeypatch):
+    db_session.add(DirectorAutoPlanningConfig(director_id=1, enabled=True, day_of_week=0, hour=0, minute=0))
+    db_session.commit()
+    calls = []
+
+    def fake_run(db, director_id, target_week_iso, source, job=None, site_progress=None, **options):
+        calls.append(options)
+        if len(calls) == 1:
+            return 0, [_generation_busy_detail(director_id)]
+        site_progress({"site_id": 7, "site_name": "A", "status": "generated", "assigned": 5, "required": 6, "duration_ms": 12, "total_sites": 1})
+        return 1, []
+
+    monkeypatch.setenv("PLANNING_AUTO_PLANNING_MAX_ATTEMPTS", "3")
+    monkeypatch.setattr(auto_planning, "_run_auto_planning_for_director", fake_run)
+    process_auto_planning_tick(db_session)
+
+    db_session.expire_all()
+    run = db_session.query(AutoPlanningRun).one()
+    assert run.status == "queued" and run.attempts == 1 and run.next_attempt_at > _ms(datetime.now())
+    # En backoff : pas de tick immédiat, réveil au next_attempt_at ; un tick anticipé ne relance rien.
+    assert compute_auto_planning_scheduler_sleep_seconds(db_session, idle_recheck_seconds=3600) > 60
+    process_auto_planning_tick(db_session)
+    assert len(calls) == 1
+
+    run.next_attempt_at = 0
+    db_session.commit()
+    assert compute_auto_planning_scheduler_sleep_seconds(db_session, idle_recheck_seconds=3600) == 0
+    process_auto_planning_tick(db_session)
+
+    db_session.expire_all()
+    run = db_session.query(AutoPlanningRun).one()
+    config = db_session.query(DirectorAutoPlanningConfig).one()
+    assert len(calls) == 2 and calls[1] == calls[0]
+    assert run.status == "succeeded" and run.attempts == 2 and run.last_error is None
+    assert run.progress["sites"]["7"]["assigned"] == 5 and run.progress["done_sites"] == 1
+    assert config.last_run_week_iso == run.target_week_iso and config.last_error is None
+
+
+def test_tick_stops_dispatching_and_recording_once_lease_is_lost(db_session, monkeypatch):
+    for director_id in (1, 2):
+        db_session.add(DirectorAutoPlanningConfig(director_id=director_id, enabled=True, day_of_week=0, hour=0, minute=0))
+    db_session.commit()
+    fence = LeaseFence(60.0)
+    fence.mark_lost()
+    process_auto_planning_tick(db_session, lease_fence=fence)
+    assert db_session.query(AutoPlanningRun).count() == 0
+
+    calls = []
+
+    def fake_run(db, director_id, target_week_iso, source, job=None, lease_fence=None, **options):
+        calls.append(director_id)
+        # Bail perdu pendant la ריצה du premier directeur.
+        lease_fence.mark_lost()
+        return 1, []
+
+    fence = LeaseFence(60.0)
+    monkeypatch.setenv("PLANNING_AUTO_PLANNING_PARALLELISM", "1")
+    monkeypatch.setattr(auto_planning, "_run_auto_planning_for_director", fake_run)
+    process_auto_planning_tick(db_session, lease_fence=fence)
+
+    db_session.expire_all()
+    assert len(calls) == 1
+    runs = {run.director_id: run for run in db_session.query(AutoPlanningRun).all()}
+    # Rien d'enregistré : la ligne reste running (reprise par le nouveau leader), l'autre en file.
+    assert runs[calls[0]].status == "running"
+    assert {run.status for run in runs.values()} == {"running", "queued"}
+    assert all(row.last_run_week_iso is None for row in db_session.query(DirectorAutoPlanningConfig).all())
+
+
+def test_stale_running_run_is_resumed_after_restart(db_session, monkeypatch):
+    db_session.add(DirectorAutoPlanningConfig(director_id=1, enabled=True, day_of_week=0, hour=0, minute=0))
+    db_session.commit()
+    # Ligne laissée running par une instance arrêtée en plein tick.
+    run = enqueue_auto_planning_run(db_session, 1, _next_week_iso(datetime.now()), {"auto_pulls_enabled": False})
+    run.status, run.attempts, run.claimed_by, run.heartbeat_at = "running", 1, "dead-host:1", 1
+    db_session.commit()
+
+    monkeypatch.setattr(auto_planning, "_run_auto_planning_for_director", lambda db, *a, **k: (2, []))
+    process_auto_planning_tick(db_session)
+
+    db_session.expire_all()
+    runs = db_session.query(AutoPlanningRun).all()
+    assert len(runs) == 1 and runs[0].status == "succeeded" and runs[0].attempts == 2
+
+
+def test_runs_endpoint_reports_queue_and_history(client, db_session, create_director):
+    director = create_director(email="director.runs@example.com", full_name="Director Runs")
+    token = login_director(client, email="director.runs@example.com", password="password123").json()["access_token"]
+    enqueue_auto_planning_run(db_session, director.id, "2026-10-25", {}, now_ms=0)
+    enqueue_auto_planning_run(db_session, director.id, "2026-10-25", {}, now_ms=0)
+
+    resp = client.get("/director/sites/settings/auto-planning/runs", headers=auth_headers(token))
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["queue"]["queued"] == 1 and body["queue"]["ready"] == 1 and body["queue"]["oldest_ready_wait_ms"] > 0
+    assert [r["status"] for r in body["runs"]] == ["queued"]
+
+
+def test_scheduler_sleeps_until_queued_row_is_claimable(db_session):
+    now = datetime(2026, 6, 21, 12, 0, 0)
+    run = enqueue_auto_planning_run(db_session, 1, "2026-06-28", {}, now_ms=_ms(now))
+    run.next_attempt_at = _ms(now + timedelta(seconds=45))
+    db_session.commit()
+
+    # Ligne pas encore réclamable : dormir jusqu'à son next_attempt_at, pas de tick à vide.
+    assert compute_auto_planning_scheduler_sleep_seconds(db_session, idle_recheck_seconds=3600, now=now) == 45
+    later = now + timedelta(seconds=44, milliseconds=500)
+    assert compute_auto_planning_scheduler_sleep_seconds(db_session, idle_recheck_seconds=3600, now=later) == 1
+    due = now + timedelta(seconds=45)
+    assert compute_auto_planning_scheduler_sleep_seconds(db_session, idle_recheck_seconds=3600, now=due) == 0
@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
+from copy import deepcopy
 from types import SimpleNamespace
 
-from app.sites.pulls import _apply_auto_pulls_to_payload, _noon_pulls_count
+from app.sites.pulls import _apply_auto_pulls_to_alternatives, _apply_auto_pulls_to_payload, _noon_pulls_count
 
 
 def _site_config_three_shifts(days: list[str] | None = None) -> dict:
@@ -242,3 +243,46 @@ def test_do_not_hold_when_zero_holes_even_with_fewer_pulls():
     site = SimpleNamespace(config=_site_config_three_shifts(["sun"]))
     full = {"sun": {"בוקר": [["A"]], "צהריים": [["B"]], "לילה": [["C"]]}}
     assert _should_hold_plan_until_pull_target(site, full, "2026-08-16", {}, 2) is False
+
+
+def test_guard_occurrence_lent_to_a_single_pull():
+    """Une garde ne prête qu'une fois : Dana (sun לילה) comble sun צהריים, pas aussi mon בוקר."""
+    site = SimpleNamespace(config=_site_config_three_shifts(["sun", "mon"]))
+    assignments = {
+        "sun": {"בוקר": [["Avi"]], "צהריים": [[]], "לילה": [["Dana"]]},
+        "mon": {"בוקר": [[]], "צהריים": [["Eli"]], "לילה": [["Gil"]]},
+    }
+    payload = _apply_auto_pulls_to_payload(
+        site,
+        _workers("Avi", "Dana", "Eli", "Gil"),
+        {"assignments": assignments, "pulls": {}},
+    )
+    pulls = payload.get("pulls") or {}
+    assert set(pulls) == {"sun|צהריים|0|1"}, pulls
+    assert pulls["sun|צהריים|0|1"]["before"]["name"] == "Avi"
+    assert pulls["sun|צהריים|0|1"]["after"]["name"] == "Dana"
+
+
+def test_batch_pulls_match_single_calls_without_mutating_inputs(monkeypatch):
+    site = SimpleNamespace(config=_site_config_three_shifts(["sun", "mon"]))
+    rows = _workers("Avi", "Dana", "Eli", "Gil")
+    candidates = [
+        {
+            "sun": {"בוקר": [["Avi"]], "צהריים": [[]], "לילה": [["Dana"]]},
+            "mon": {"בוקר": [[]], "צהריים": [["Eli"]], "לילה": [["Gil"]]},
+        },
+        {
+            "sun": {"בוקר": [["Gil"]], "צהריים": [["Avi"]], "לילה": [["Eli"]]},
+            "mon": {"בוקר": [["Dana"]], "צהריים": [[]], "לילה": [["Avi"]]},
+        },
+    ] * 3
+    snapshot = deepcopy(candidates)
+    expected = []
+    for candidate in candidates:
+        single = _apply_auto_pulls_to_payload(site, rows, {"assignments": deepcopy(candidate), "pulls": {}})
+        expected.append((single["assignments"], single["pulls"]))
+
+    monkeypatch.setenv("PLANNING_PULLS_BATCH_WORKERS", "2")
+    monkeypatch.setenv("PLANNING_PULLS_BATCH_PARALLEL_MIN", "2")
+    assert _apply_auto_pulls_to_alternatives(site, rows, candidates) == expected
+    assert candidates == snapshot
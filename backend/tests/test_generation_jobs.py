@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from fastapi import HTTPException
+
+from app.sites.generation_jobs import submit_generation_job
+
+
+def _headers(client, create_director, email: str):
+    create_director(email=email, full_name="Director Jobs")
+    token = client.post("/auth/login", json={"email": email, "password": "password123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_generation_job_lifecycle_result_error_and_cancel():
+    done = submit_generation_job("test", 1, None, lambda job: {"ok": True})
+    assert done.wait(5)
+    assert done.snapshot()["status"] == "done"
+    assert done.raise_for_status() == {"ok": True}
+
+    def _limit_error(job):
+        raise HTTPException(status_code=422, detail="לא נמצא תכנון עם מגבלות המשיכות שנבחרו")
+
+    failed = submit_generation_job("test", 1, None, _limit_error)
+    assert failed.wait(5)
+    assert failed.status == "error" and failed.error_status_code == 422
+    with pytest.raises(HTTPException) as exc_info:
+        failed.raise_for_status()
+    assert exc_info.value.status_code == 422
+
+    def _until_cancelled(job):
+        while True:
+            job.check_cancelled()
+            time.sleep(0.01)
+
+    cancelled = submit_generation_job("test", 1, None, _until_cancelled)
+    assert cancelled.cancel()
+    assert cancelled.wait(5)
+    assert cancelled.status == "cancelled"
+    assert not cancelled.cancel()
+
+
+def test_ai_jobs_api_poll_and_owner_scoping(client, create_director):
+    headers = _headers(client, create_director, "director.jobs@example.com")
+    site_id = client.post("/director/sites/", json={"name": "Jobs Site", "config": {}}, headers=headers).json()["id"]
+
+    created = client.post(f"/director/sites/{site_id}/ai-jobs", json={}, headers=headers)
+    assert created.status_code == 202, created.text
+    job_id = created.json()["job_id"]
+
+    deadline = time.monotonic() + 5
+    polled = client.get(f"/director/sites/ai-jobs/{job_id}", headers=headers).json()
+    while polled["status"] not in ("done", "error") and time.monotonic() < deadline:
+        time.sleep(0.02)
+        polled = client.get(f"/director/sites/ai-jobs/{job_id}", headers=headers).json()
+    assert polled["status"] == "done"
+    assert polled["result"]["status"] == "NO_WORKERS"
+
+    other = _headers(client, create_director, "director.jobs.other@example.com")
+    assert client.get(f"/director/sites/ai-jobs/{job_id}", headers=other).status_code == 404
+    assert client.delete(f"/director/sites/ai-jobs/{job_id}", headers=other).status_code == 404
@@ -0,0 +1,64 @@
+from sqlalchemy import insert, update
+
+from app.models import Site, SiteWeeklyAvailability, SiteWorker
+from app.sites.linked_sites import _build_multi_site_generation_context
+
+WEEK = "2026-01-04"
+STATION = {"name": "Gate", "workers": 1, "shifts": [{"name": "06-14", "enabled": True, "workers": 1}]}
+
+
+def _linked_sites(db, director_id: int) -> tuple[Site, Site]:
+    sites = []
+    for name in ("North", "South"):
+        site = Site(name=name, director_id=director_id, config={"stations": [dict(STATION)]})
+        db.add(site)
+        db.flush()
+        db.add(SiteWorker(site_id=site.id, name="Avi", phone="0501111111", max_shifts=5, roles=[], availability={}, answers={}))
+        sites.append(site)
+    db.commit()
+    return sites[0], sites[1]
+
+
+def test_linked_context_is_reused_with_request_overrides_on_top(db_session, create_director):
+    director = create_director(email="linked.context@example.com", full_name="Linked Context")
+    north, south = _linked_sites(db_session, director.id)
+
+    first = _build_multi_site_generation_context(db_session, director.id, north.id, WEEK)
+    [worker] = first["combined_workers"]
+    assert worker["availability"]["sun"] == []
+
+    override = {"Avi": {"sun": ["06-14"], "_shift_kind_prefs": {"morning": "prefer"}}}
+    second = _build_multi_site_generation_context(db_session, director.id, north.id, WEEK, weekly_availability=override)
+    assert second["combined_config"] is first["combined_config"]
+    assert second["sites_by_id"] is first["sites_by_id"]
+    assert second["combined_workers"][0]["availability"]["sun"] == ["06-14"]
+    # La surcharge de la requête ne fuit pas dans la base partagée.
+    third = _build_multi_site_generation_context(db_session, director.id, north.id, WEEK)
+    assert third["combined_workers"][0]["availability"]["sun"] == []
+
+    # Un commit sur un site du groupe invalide la base.
+    db_session.add(SiteWeeklyAvailability(site_id=south.id, week_iso=WEEK, availability={"Avi": {"mon": ["06-14"]}}))
+    db_session.commit()
+    rebuilt = _build_multi_site_generation_context(db_session, director.id, north.id, WEEK)
+    assert rebuilt["combined_config"] is not first["combined_config"]
+    assert rebuilt["combined_workers"][0]["availability"]["mon"] == ["06-14"]
+
+
+def _foreign_write(db, site_id: int, table, **values) -> None:
+    """Écriture d'un autre processus : même transaction que le bump de version, sans événement ORM local."""
+    conn = db.connection()
+    conn.execute(insert(table).values(site_id=site_id, **values))
+    conn.execute(update(Site.__table__).where(Site.__table__.c.id == site_id).values(data_version=Site.__table__.c.data_version + 1))
+    db.commit()
+
+
+def test_linked_context_sees_commits_from_other_processes(db_session, create_director):
+    director = create_director(email="linked.context.remote@example.com", full_name="Linked Remote")
+    north, south = _linked_sites(db_session, director.id)
+    first = _build_multi_site_generation_context(db_session, director.id, north.id, WEEK)
+    assert _build_multi_site_generation_context(db_session, director.id, north.id, WEEK)["combined_config"] is first["combined_config"]
+
+    _foreign_write(db_session, south.id, SiteWeeklyAvailability.__table__, week_iso=WEEK, availability={"Avi": {"tue": ["06-14"]}})
+    rebuilt = _build_multi_site_generation_context(db_session, director.id, north.id, WEEK)
+    assert rebuilt["combined_config"] is not first["combined_config"]
+    assert rebuilt["combined_workers"][0]["availability"]["tue"] == ["06-14"]
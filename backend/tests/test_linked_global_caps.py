@@ -1,5 +1,9 @@
+from copy import deepcopy
+from types import SimpleNamespace
+
 from app.models import Site, SiteWorker
 from app.sites import _enforce_linked_global_caps_on_site_plans
+from app.sites.linked_sites import _enforce_linked_global_caps_on_site_payloads
 
 
 def _build_assignments(count: int) -> dict:
@@ -84,3 +88,25 @@ def test_linked_global_caps_trim_final_multi_site_payloads_and_refresh_counts(db
     assert base_total == 5
     assert alt_total == 5
     assert sum(int(site_plan.get("assigned_count") or 0) for site_plan in normalized.values()) == 5
+
+
+def test_linked_global_caps_copy_only_changed_payloads():
+    workers_by_site = {
+        site_id: [SimpleNamespace(site_id=site_id, name="test1", phone="0509990000", user_id=None, max_shifts=2, pending_approval=False, removed_from_week_iso=None)]
+        for site_id in (1, 2, 3)
+    }
+    payloads = {
+        "1": {"assignments": _build_assignments(2), "alternatives": [_build_assignments(1)]},
+        "2": {"assignments": _build_assignments(1), "alternatives": [_build_assignments(1)]},
+        "3": {"assignments": {}, "alternatives": [{}]},
+    }
+    before = deepcopy(payloads)
+
+    normalized = _enforce_linked_global_caps_on_site_payloads(None, [1, 2, 3], "2026-05-10", payloads, workers_by_site=workers_by_site)
+
+    assert payloads == before
+    assert normalized["1"] is payloads["1"] and normalized["3"] is payloads["3"]
+    assert normalized["2"] is not payloads["2"]
+    assert _count_assignments(normalized["2"]["assignments"]) == 0
+    # Variante non touchée : partagée avec l'entrée.
+    assert normalized["2"]["alternatives"][0] is payloads["2"]["alternatives"][0]
@@ -0,0 +1,71 @@
+from sqlalchemy import insert, update
+
+from app.models import Site, SiteWorker
+from app.sites import linked_graph
+from app.sites.linked_graph import connected_site_ids_for_root, linked_site_cluster_map
+
+
+def _site(db, director_id: int, name: str) -> Site:
+    site = Site(name=name, director_id=director_id, config={})
+    db.add(site)
+    db.commit()
+    return site
+
+
+def _worker(db, site: Site, name: str, phone: str) -> SiteWorker:
+    row = SiteWorker(site_id=site.id, name=name, phone=phone, max_shifts=5, roles=[], availability={}, answers={})
+    db.add(row)
+    db.commit()
+    return row
+
+
+def test_cluster_graph_is_cached_and_updated_on_commit(db_session, create_director):
+    director = create_director(email="director.graph@example.com", full_name="Director Graph")
+    north, south, east = (_site(db_session, director.id, name) for name in ("North", "South", "East"))
+    _worker(db_session, north, "Avi", "0501111111")
+    shared = _worker(db_session, south, "Avi", "0501111111")
+    _worker(db_session, east, "Dana", "0502222222")
+
+    assert linked_site_cluster_map(db_session, director.id) == {north.id: [north.id, south.id], south.id: [north.id, south.id], east.id: []}
+    roster = linked_graph._ROSTERS[director.id]
+    assert linked_site_cluster_map(db_session, director.id)[east.id] == []
+    assert roster.version == 0
+
+    # Nouveau lien East ↔ North : mis à jour au commit, sans recharger le roster.
+    _worker(db_session, east, "Avi", "0501111111")
+    assert linked_graph._ROSTERS[director.id] is roster and roster.version == 1
+    assert connected_site_ids_for_root(db_session, director.id, east.id) == [north.id, south.id, east.id]
+
+    # Retrait de la semaine : South sort du groupe à partir de cette semaine-là.
+    shared.removed_from_week_iso = "2026-01-04"
+    db_session.commit()
+    assert connected_site_ids_for_root(db_session, director.id, south.id, "2026-01-04") == [south.id]
+    assert connected_site_ids_for_root(db_session, director.id, south.id, "2025-12-28") == [north.id, south.id, east.id]
+
+    db_session.delete(shared)
+    db_session.commit()
+    assert connected_site_ids_for_root(db_session, director.id, south.id, "2025-12-28") == [south.id]
+
+
+def test_cluster_graph_reloads_after_write_from_other_process(db_session, create_director):
+    director = create_director(email="director.graph.remote@example.com", full_name="Director Remote")
+    north, east = (_site(db_session, director.id, name) for name in ("North", "East"))
+    _worker(db_session, north, "Avi", "0501111111")
+    assert linked_site_cluster_map(db_session, director.id)[east.id] == []
+    roster = linked_graph._ROSTERS[director.id]
+
+    # Autre processus : ligne écrite et version du site incrémentée, aucun événement ORM ici.
+    sites = Site.__table__
+    conn = db_session.connection()
+    conn.execute(insert(SiteWorker.__table__).values(site_id=east.id, name="Avi", phone="0501111111"))
+    conn.execute(update(sites).where(sites.c.id == east.id).values(data_version=sites.c.data_version + 1))
+    db_session.commit()
+
+    assert linked_site_cluster_map(db_session, director.id)[east.id] == [north.id, east.id]
+    assert linked_graph._ROSTERS[director.id] is not roster
+
+    # Écriture locale : appliquée en write-through, versions suivies sans recharger.
+    roster = linked_graph._ROSTERS[director.id]
+    _worker(db_session, east, "Dana", "0502222222")
+    assert linked_site_cluster_map(db_session, director.id)[east.id] == [north.id, east.id]
+    assert linked_graph._ROSTERS[director.id] is roster
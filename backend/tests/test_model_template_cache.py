@@ -0,0 +1,62 @@
+from copy import deepcopy
+
+from ortools.sat.python import cp_model
+
+from app import ai_solver_model
+from app.ai_solver_model import (
+    build_cp_sat_schedule_model,
+    build_cp_sat_schedule_model_cached,
+    clear_model_template_cache,
+)
+from tests.scenario_generator import generate_scenario
+
+
+def _optimum(built) -> float:
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = 20
+    solver.parameters.num_search_workers = 1
+    status = solver.Solve(built.model)
+    assert status == cp_model.OPTIMAL
+    return solver.ObjectiveValue()
+
+
+def test_cached_model_matches_fresh_build_with_deltas(monkeypatch):
+    monkeypatch.setenv("PLANNING_MODEL_TEMPLATE_CACHE_SIZE", "4")
+    clear_model_template_cache()
+    sc = generate_scenario(6, 2, seed=3, per_day_overrides=True, role_caps=True)
+    build_cp_sat_schedule_model_cached(sc.config, sc.workers)
+    assert len(ai_solver_model._MODEL_TEMPLATES) == 1
+
+    # Même structure, deltas par requête : זמינות modifiée, case fixée, jours exclus.
+    workers = deepcopy(sc.workers)
+    workers[0]["availability"]["sun"] = []
+    workers[1]["availability"]["mon"] = ["06-14", "14-22", "22-06"]
+    day_key = "mon"
+    fixed = {day_key: {"06-14": [[workers[1]["name"]], []]}}
+    exclude = ["sat"]
+
+    cached = build_cp_sat_schedule_model_cached(sc.config, workers, fixed_assignments=fixed, exclude_days=exclude)
+    fresh = build_cp_sat_schedule_model(sc.config, workers, fixed_assignments=fixed, exclude_days=exclude)
+    assert len(ai_solver_model._MODEL_TEMPLATES) == 1
+    assert cached.pre_assign == fresh.pre_assign
+    assert cached.stations == fresh.stations
+    assert _optimum(cached) == _optimum(fresh)
+
+
+def test_template_cache_key_ignores_availability_only(monkeypatch):
+    monkeypatch.setenv("PLANNING_MODEL_TEMPLATE_CACHE_SIZE", "1")
+    clear_model_template_cache()
+    sc = generate_scenario(4, 1, seed=1)
+    build_cp_sat_schedule_model_cached(sc.config, sc.workers)
+    first_key = next(iter(ai_solver_model._MODEL_TEMPLATES))
+
+    workers = deepcopy(sc.workers)
+    workers[0]["max_shifts"] = int(workers[0]["max_shifts"]) + 1
+    build_cp_sat_schedule_model_cached(sc.config, workers)
+    assert list(ai_solver_model._MODEL_TEMPLATES) != [first_key]
+    assert len(ai_solver_model._MODEL_TEMPLATES) == 1
+
+    monkeypatch.setenv("PLANNING_MODEL_TEMPLATE_CACHE_SIZE", "0")
+    clear_model_template_cache()
+    build_cp_sat_schedule_model_cached(sc.config, sc.workers)
+    assert not ai_solver_model._MODEL_TEMPLATES
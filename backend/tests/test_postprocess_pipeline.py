@@ -0,0 +1,47 @@
+import threading
+import time
+
+import pytest
+
+from app.sites.postprocess_pipeline import OrderedPostprocessStage
+
+
+def test_ordered_stage_keeps_submission_order_and_bounds_in_flight():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow_square(i):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        # Les premiers items finissent en dernier : l'ordre de sortie ne doit pas en dépendre.
+        time.sleep(0.02 * (5 - i % 5))
+        with lock:
+            running -= 1
+        return i * i
+
+    out = []
+    with OrderedPostprocessStage(slow_square, workers=3, max_in_flight=4) as stage:
+        for i in range(10):
+            out.extend(stage.push(i))
+            assert len(stage._pending) <= 3
+        out.extend(stage.drain())
+    assert out == [(i, i * i) for i in range(10)]
+    assert 1 < peak <= 3
+
+
+def test_ordered_stage_raises_at_failing_item():
+    def check(i):
+        if i == 2:
+            raise ValueError("bad candidate")
+        return i
+
+    out = []
+    with OrderedPostprocessStage(check, workers=2, max_in_flight=2) as stage:
+        with pytest.raises(ValueError):
+            for i in range(5):
+                out.extend(stage.push(i))
+            out.extend(stage.drain())
+    assert out == [(0, 0), (1, 1)]
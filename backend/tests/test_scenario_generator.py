@@ -0,0 +1,41 @@
+"""Fumée : le générateur de scénarios produit des entrées valides pour le solveur."""
+
+from app.ai_solver import build_capacities_from_config, solve_schedule
+from app.ai_solver_model import build_cp_sat_schedule_model
+from tests.ai_solver_fixtures import count_assigned_names
+from tests.scenario_generator import generate_scenario
+
+
+def test_generator_is_deterministic_for_seed():
+    a = generate_scenario(30, 4, seed=7)
+    b = generate_scenario(30, 4, seed=7)
+    assert a.config == b.config
+    assert a.workers == b.workers
+
+
+def test_generator_covers_overrides_roles_events_and_prefs():
+    scenario = generate_scenario(60, 10, seed=3, events_ratio=0.5, prefs_ratio=0.5)
+    stations = scenario.config["stations"]
+    assert any(st.get("perDayCustom") for st in stations)
+    assert any(st.get("roles") for st in stations)
+    assert scenario.meta["events"] > 0
+    assert any("shift_kind_prefs" in w for w in scenario.workers)
+    days, shifts, caps = build_capacities_from_config(scenario.config)
+    assert len(caps) == 10 and days and shifts
+
+
+def test_generator_linked_cluster_has_site_limits_and_allowed_workers():
+    scenario = generate_scenario(40, 6, seed=2, linked_sites=3, shared_workers_ratio=0.5)
+    stations = scenario.config["stations"]
+    assert {st["siteId"] for st in stations} == {1, 2, 3}
+    assert all(st["allowedWorkers"] for st in stations)
+    assert any(len(w["site_limits"]) == 2 for w in scenario.workers)
+    built = build_cp_sat_schedule_model(scenario.config, scenario.workers)
+    assert len(built.T) == 6
+
+
+def test_small_generated_scenario_solves():
+    scenario = generate_scenario(12, 2, seed=1, per_day_overrides=False, role_caps=False)
+    result = solve_schedule(scenario.config, scenario.workers, time_limit_seconds=5, num_alternatives=0)
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
+    assert count_assigned_names(result["assignments"]) > 0
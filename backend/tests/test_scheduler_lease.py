@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models import SchedulerLease
+from app.sites.scheduler_lease import AUTO_PLANNING_LEASE, SchedulerLeaseKeeper, SchedulerLeaseLost, _SCHEDULER_WAKE
+from tests.test_site_workers_count import auth_headers, login_director
+
+
+def _keepers(db_session, ttl: float = 60.0):
+    factory = sessionmaker(bind=db_session.get_bind(), autoflush=False, autocommit=False)
+    return SchedulerLeaseKeeper(factory, ttl_seconds=ttl), SchedulerLeaseKeeper(factory, ttl_seconds=ttl)
+
+
+def test_single_leader_until_lease_expires(db_session):
+    first, second = _keepers(db_session)
+    now = 1_000_000
+
+    assert first.try_acquire(db_session, now_ms=now)
+    assert not second.try_acquire(db_session, now_ms=now + 1000)
+    # Renouvellement par le titulaire.
+    assert first.try_acquire(db_session, now_ms=now + 30_000)
+    assert not second.try_acquire(db_session, now_ms=now + 60_000)
+
+    # Leader silencieux au-delà du TTL : l'autre instance prend le relais.
+    assert second.try_acquire(db_session, now_ms=now + 91_000)
+    assert not first.try_acquire(db_session, now_ms=now + 92_000)
+    assert not first.is_leader and second.is_leader
+    assert db_session.get(SchedulerLease, AUTO_PLANNING_LEASE).holder == second.holder
+
+
+def test_released_lease_is_taken_immediately(db_session):
+    first, second = _keepers(db_session)
+
+    assert first.try_acquire(db_session)
+    assert not second.try_acquire(db_session)
+    first.release(db_session)
+    assert second.try_acquire(db_session)
+
+
+def test_put_config_wakes_sleeping_scheduler(client, db_session, create_director):
+    create_director(email="director.lease@example.com", full_name="Director Lease")
+    token = login_director(client, email="director.lease@example.com", password="password123").json()["access_token"]
+    leader, _ = _keepers(db_session)
+    assert leader.try_acquire(db_session)
+    _SCHEDULER_WAKE.clear()
+
+    woke_after: list[float] = []
+
+    def _sleeper() -> None:
+        started = time.monotonic()
+        leader.sleep(threading.Event(), 30)
+        woke_after.append(time.monotonic() - started)
+
+    thread = threading.Thread(target=_sleeper)
+    thread.start()
+    resp = client.put(
+        "/director/sites/settings/auto-planning",
+        json={"enabled": True, "day_of_week": 0, "hour": 9, "minute": 0},
+        headers=auth_headers(token),
+    )
+    assert resp.status_code == 200, resp.text
+    thread.join(timeout=10)
+
+    assert woke_after and woke_after[0] < 10
+    db_session.expire_all()
+    assert db_session.get(SchedulerLease, AUTO_PLANNING_LEASE).wake_at > 0
+
+
+def test_renewing_fence_reports_lease_taken_over(db_session):
+    first, second = _keepers(db_session, ttl=0.6)
+    assert first.try_acquire(db_session)
+
+    with first.renewing() as fence:
+        time.sleep(1.0)
+        # Renouvellements réussis : le bail tient au-delà de son TTL initial.
+        assert not fence.lost
+        lease = db_session.get(SchedulerLease, AUTO_PLANNING_LEASE)
+        lease.expires_at = 0
+        db_session.commit()
+        assert second.try_acquire(db_session)
+        time.sleep(0.5)
+        assert fence.lost
+        with pytest.raises(SchedulerLeaseLost):
+            fence.check()
@@ -0,0 +1,28 @@
+import pytest
+
+from app.ai_solver_utils import build_capacities_from_config
+from app.scheduling_spec import forget_site_scheduling_spec, site_scheduling_spec
+from tests.scenario_generator import generate_scenario
+
+
+def test_spec_matches_build_capacities_and_is_memoized():
+    sc = generate_scenario(5, 2, seed=7, per_day_overrides=True, role_caps=True)
+    spec = site_scheduling_spec(sc.config, ["sat"])
+    days, shifts, stations = build_capacities_from_config(sc.config, ["sat"])
+
+    assert list(spec.days) == days and list(spec.shifts) == shifts
+    assert spec.station_names == tuple(st["name"] for st in stations)
+    for t, st in enumerate(stations):
+        for d, day_key in enumerate(days):
+            for s, sh in enumerate(shifts):
+                assert spec.required(t, d, s) == int((st["capacity"].get(day_key) or {}).get(sh, 0))
+                assert dict(spec.required_roles(t, d, s)) == ((st["capacity_roles"].get(day_key) or {}).get(sh) or {})
+    assert spec.required_total == sum(c for per in spec.capacity for row in per for c in row)
+
+    assert site_scheduling_spec(dict(sc.config), ["sat"]) is spec
+    assert site_scheduling_spec(sc.config) is not spec
+    with pytest.raises(TypeError):
+        spec.stations[0]["name"] = "x"
+
+    forget_site_scheduling_spec(sc.config)
+    assert site_scheduling_spec(sc.config, ["sat"]) is not spec
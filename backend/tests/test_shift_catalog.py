@@ -0,0 +1,41 @@
+from app.shift_catalog import build_shift_catalog, shift_catalog_for_config, shift_kind_from_name
+
+
+def _config():
+    return {
+        "stations": [
+            {
+                "name": "A",
+                "perDayCustom": True,
+                "shifts": [
+                    {"name": "לילה", "start": "22:00", "end": "06:00"},
+                    {"name": "ערב", "start": "15:30", "end": "23:00"},
+                    {"name": "06-14"},
+                ],
+                "dayOverrides": {"fri": {"shifts": [{"name": "כוננות", "start": "07:00", "end": "19:00"}]}},
+            }
+        ]
+    }
+
+
+def test_shift_kinds_from_name_and_start_fallback():
+    assert shift_kind_from_name("06-14") == "morning"
+    assert shift_kind_from_name("צהריים") == "noon"
+    assert shift_kind_from_name("22-06") == "night"
+    assert shift_kind_from_name("ערב") is None
+
+    catalog = build_shift_catalog(_config())
+    assert catalog.kind("ערב") == "noon"
+    assert catalog.kind("כוננות") == "morning"
+    assert catalog.start_minutes("ערב") == 15 * 60 + 30
+    assert catalog.start_minutes("06-14") == 6 * 60
+
+
+def test_shift_catalog_order_adjacency_and_cache():
+    catalog = shift_catalog_for_config(_config())
+    assert catalog.names == ("06-14", "כוננות", "ערב", "לילה")
+    assert catalog.info("לילה").order_index == 3
+    assert catalog.next_shift("06-14") == ("כוננות", False)
+    assert catalog.next_shift("לילה") == ("06-14", True)
+    assert catalog.next_shift("unknown") == (None, False)
+    assert shift_catalog_for_config(_config()) is catalog
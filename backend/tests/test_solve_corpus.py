@@ -0,0 +1,80 @@
+"""Capture anonymisée du corpus de résolutions."""
+
+import json
+
+import pytest
+
+from app.ai_solver import solve_schedule
+from app.solve_corpus import anonymize_solve_inputs, find_regressions, load_corpus_cases, plan_coverage, record_solve_case
+from tests.ai_solver_fixtures import minimal_station_config, worker
+
+
+def test_anonymize_hashes_names_consistently():
+    config = minimal_station_config(workers=1)
+    config["stations"][0]["allowedWorkers"] = ["Alice"]
+    workers = [worker("Alice", phone="0500000000"), worker("Bob", worker_id=2)]
+    fixed = {"sun": {"06-14": [["Alice"]]}}
+
+    anon_config, anon_workers, anon_fixed = anonymize_solve_inputs(config, workers, fixed, salt="s")
+
+    alice = anon_workers[0]["name"]
+    assert alice.startswith("w_") and alice != "Alice"
+    assert anon_config["stations"][0]["allowedWorkers"] == [alice]
+    assert anon_fixed == {"sun": {"06-14": [[alice]]}}
+    assert "phone" not in anon_workers[0]
+    # Entrées d'origine intactes
+    assert workers[0]["name"] == "Alice"
+    assert config["stations"][0]["allowedWorkers"] == ["Alice"]
+
+
+def test_solve_schedule_records_case_when_corpus_dir_set(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLANNING_SOLVE_CORPUS_DIR", str(tmp_path))
+    monkeypatch.setenv("PLANNING_SOLVE_CORPUS_SALT", "test-salt")
+    config = minimal_station_config(workers=1)
+    result = solve_schedule(config, [worker("Alice")], time_limit_seconds=5, num_alternatives=0)
+
+    cases = load_corpus_cases(str(tmp_path))
+    assert len(cases) == 1
+    _, case = cases[0]
+    assert case["kind"] == "schedule"
+    assert case["model"]["num_vars"] > 0
+    assert "Alice" not in json.dumps(case)
+    assert plan_coverage(config, result["assignments"]) == 1.0
+    outcome = case["outcome"]
+    assert outcome["status"] == result["status"]
+    assert outcome["objective"] == result["objective"]
+    assert outcome["coverage"] == 1.0
+    assert outcome["solve_seconds"] >= 0.0 and outcome["build_seconds"] >= 0.0
+
+
+def test_record_solve_case_refuses_unsalted_corpus(tmp_path, monkeypatch):
+    from app.ai_solver_model import build_cp_sat_schedule_model
+
+    monkeypatch.setenv("PLANNING_SOLVE_CORPUS_DIR", str(tmp_path))
+    monkeypatch.delenv("PLANNING_SOLVE_CORPUS_SALT", raising=False)
+    config = minimal_station_config(workers=1)
+    built = build_cp_sat_schedule_model(config, [worker("Alice")])
+
+    assert record_solve_case("schedule", built, config, [worker("Alice")], {}) is None
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(ValueError):
+        anonymize_solve_inputs(config, [worker("Alice")], None)
+
+
+def test_record_solve_case_is_noop_without_corpus_dir(monkeypatch):
+    from app.ai_solver_model import build_cp_sat_schedule_model
+
+    monkeypatch.delenv("PLANNING_SOLVE_CORPUS_DIR", raising=False)
+    config = minimal_station_config(workers=1)
+    built = build_cp_sat_schedule_model(config, [worker("Alice")])
+    assert record_solve_case("schedule", built, config, [worker("Alice")], {}) is None
+
+
+def test_find_regressions_flags_slowdowns_and_coverage_drops():
+    baseline = {"a": {"solve_seconds": 1.0, "build_seconds": 0.01, "coverage": 1.0}}
+    report = {"a": {"solve_seconds": 1.5, "build_seconds": 0.04, "coverage": 0.9}}
+
+    issues = find_regressions(report, baseline, 0.25)
+
+    assert issues == ["a: solve_seconds 1.0 -> 1.5", "a: coverage 1.0 -> 0.9"]
+    assert find_regressions({"a": {"solve_seconds": 1.1}}, baseline, 0.25) == []
@@ -0,0 +1,111 @@
+"""Store de statistiques de résolution + budget adaptatif."""
+
+import pytest
+
+from app.ai_solver import solve_schedule
+from app.sites.auto_planning import _clamp_generation_budget
+from app.solve_stats import (
+    SolveStatsSample,
+    clear_solve_stats,
+    predict_time_budget,
+    record_solve_stats,
+    solve_stats_for,
+    solve_stats_key,
+)
+from tests.ai_solver_fixtures import minimal_station_config, worker
+
+
+@pytest.fixture(autouse=True)
+def _fresh_stats(monkeypatch):
+    monkeypatch.delenv("PLANNING_SOLVE_STATS_PATH", raising=False)
+    clear_solve_stats()
+    yield
+    clear_solve_stats()
+
+
+def _sample(**overrides) -> SolveStatsSample:
+    values = dict(
+        num_workers=10,
+        num_vars=500,
+        num_constraints=800,
+        time_limit_seconds=25.0,
+        status="OPTIMAL",
+        first_solution_seconds=0.2,
+        optimal_seconds=1.5,
+        gap_at_timeout=None,
+        alternatives=0,
+        alternatives_seconds=0.0,
+        recorded_at=0,
+    )
+    values.update(overrides)
+    return SolveStatsSample(**values)
+
+
+def test_predict_returns_none_without_enough_history():
+    key = solve_stats_key(1)
+    record_solve_stats(key, _sample())
+    assert predict_time_budget(key, num_alternatives=1, min_seconds=6, max_seconds=120) is None
+
+
+def test_predict_shrinks_budget_for_fast_optimal_site():
+    key = solve_stats_key(2)
+    for _ in range(3):
+        record_solve_stats(key, _sample())
+    assert predict_time_budget(key, num_alternatives=0, min_seconds=6, max_seconds=120) == 6
+    assert _clamp_generation_budget(25, 1, linked=False, stats_key=key) == (6, 1)
+
+
+def test_predict_grows_budget_when_timeouts_leave_a_gap():
+    key = solve_stats_key(3, linked=True)
+    for _ in range(3):
+        record_solve_stats(key, _sample(status="FEASIBLE", optimal_seconds=None, gap_at_timeout=0.2, time_limit_seconds=20.0))
+    predicted = predict_time_budget(key, num_alternatives=0, min_seconds=10, max_seconds=120)
+    assert predicted is not None and predicted > 20
+
+
+def test_predict_uses_last_improvement_for_near_optimal_timeouts():
+    key = solve_stats_key(7)
+    for gap in (0.01, 0.05, 0.0):
+        record_solve_stats(
+            key,
+            _sample(status="FEASIBLE", optimal_seconds=None, gap_at_timeout=gap, time_limit_seconds=20.0, last_improvement_seconds=3.0),
+        )
+    # 1.25*3+1 → 5s, loin des 20s de la limite : pas d'effet cliquet d'un run à l'autre.
+    assert predict_time_budget(key, num_alternatives=0, min_seconds=1, max_seconds=120) == 5
+
+
+def test_predict_adds_alternatives_time_from_throughput():
+    key = solve_stats_key(4)
+    for _ in range(3):
+        record_solve_stats(key, _sample(alternatives=10, alternatives_seconds=5.0))
+    # base ≈ 1.25*1.5+1 → 3s ; 40 alternatives à 2/s → 20s
+    assert predict_time_budget(key, num_alternatives=40, min_seconds=1, max_seconds=120) == 23
+
+
+def test_predict_ignores_samples_of_different_size():
+    key = solve_stats_key(5)
+    for _ in range(3):
+        record_solve_stats(key, _sample(num_workers=200))
+    assert predict_time_budget(key, num_alternatives=0, min_seconds=6, max_seconds=120, num_workers=10) is None
+
+
+def test_solve_schedule_records_stats_when_key_given():
+    config = minimal_station_config(workers=1)
+    workers = [worker("Alice", worker_id=1), worker("Bob", worker_id=2)]
+    key = solve_stats_key(42)
+    solve_schedule(config, workers, time_limit_seconds=5, num_alternatives=1, stats_key=key)
+    samples = solve_stats_for(key)
+    assert len(samples) == 1
+    assert samples[0].num_workers == 2
+    assert samples[0].num_vars > 0
+    assert samples[0].first_solution_seconds is not None
+    assert samples[0].last_improvement_seconds is not None
+
+
+def test_stats_persist_to_json_file(tmp_path, monkeypatch):
+    path = tmp_path / "solve_stats.json"
+    monkeypatch.setenv("PLANNING_SOLVE_STATS_PATH", str(path))
+    key = solve_stats_key(6)
+    record_solve_stats(key, _sample())
+    clear_solve_stats()
+    assert len(solve_stats_for(key)) == 1
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import queue
+import threading
+
+from app.sites.generation_streams import (
+    GenerationEventLog,
+    _SseBridge,
+    _iter_sse_from_bridge,
+    _parse_last_event_id,
+    stream_generation_log,
+)
+
+
+def test_sse_bridge_coalesces_queued_events_and_applies_backpressure():
+    async def run():
+        bridge = _SseBridge(maxsize=3)
+        full = threading.Event()
+
+        def producer():
+            for i in range(3):
+                bridge.put({"i": i})
+            try:
+                bridge.put({"i": 99}, timeout=0.05)
+            except queue.Full:
+                full.set()
+            bridge.put(None)
+
+        t = threading.Thread(target=producer)
+        t.start()
+        await asyncio.to_thread(t.join)
+        chunks = [chunk async for chunk in _iter_sse_from_bridge(bridge)]
+        return chunks, full.is_set()
+
+    chunks, hit_backpressure = asyncio.run(run())
+    assert hit_backpressure
+    assert len(chunks) == 1
+    events = [json.loads(part[len("data: "):]) for part in chunks[0].split("\n\n") if part]
+    assert events == [{"i": 0}, {"i": 1}, {"i": 2}]
+
+
+def test_sse_bridge_unblocks_producer_when_consumer_leaves():
+    async def run():
+        bridge = _SseBridge(maxsize=1)
+        bridge.put({"i": 0})
+        stream = _iter_sse_from_bridge(bridge)
+        await stream.__anext__()
+        await stream.aclose()
+        done = threading.Event()
+
+        def producer():
+            bridge.put({"i": 1})
+            bridge.put({"i": 2})
+            done.set()
+
+        t = threading.Thread(target=producer)
+        t.start()
+        await asyncio.to_thread(t.join, 2)
+        return done.is_set()
+
+    assert asyncio.run(run())
+
+
+def test_generation_log_replays_only_missing_events_on_reattach(monkeypatch):
+    monkeypatch.setenv("PLANNING_SSE_RESUME_GRACE_SECONDS", "30")
+
+    async def run():
+        log = GenerationEventLog("g1", director_id=1, site_id=2, maxsize=8)
+        for i in range(3):
+            log.put({"i": i})
+        first = stream_generation_log(log)
+        chunk = await first.__anext__()
+        await first.aclose()
+        assert not log.stop_event.is_set()
+
+        log.put({"i": 3})
+        log.put(None)
+        _, last_seq = _parse_last_event_id("g1:2")
+        return chunk, [c async for c in stream_generation_log(log, last_seq)]
+
+    chunk, resumed = asyncio.run(run())
+    assert chunk.count("id: g1:") == 3
+    events = [json.loads(line[len("data: "):]) for c in resumed for line in c.splitlines() if line.startswith("data: ")]
+    assert events == [{"i": 2}, {"i": 3}]
+    assert "id: g1:3" in resumed[0] and "id: g1:4" in resumed[0]
+
+
+def test_generation_log_stops_solver_when_not_reattached(monkeypatch):
+    monkeypatch.setenv("PLANNING_SSE_RESUME_GRACE_SECONDS", "0")
+    released = []
+
+    async def run():
+        log = GenerationEventLog("g2", director_id=1, site_id=2, maxsize=8, release_slot=lambda: released.append(1))
+        log.put({"i": 0})
+        stream = stream_generation_log(log)
+        await stream.__anext__()
+        await stream.aclose()
+        return log
+
+    log = asyncio.run(run())
+    assert log.stop_event.is_set() and released == [1]
+
+
+def test_generation_log_resends_evicted_keyframe_before_deltas():
+    async def run():
+        log = GenerationEventLog("g3", director_id=1, site_id=2, maxsize=8, buffer_size=3)
+        log.put({"type": "base", "keyframe": True})
+        for i in range(1, 5):
+            log.put({"type": "alternative", "index": i, "encoding": "delta", "ref": 0})
+        log.put(None)
+        return [c async for c in stream_generation_log(log, 1)], [c async for c in stream_generation_log(log, 0)]
+
+    after_keyframe, fresh = asyncio.run(run())
+
+    def events(chunks):
+        return [json.loads(line[len("data: "):]) for c in chunks for line in c.splitlines() if line.startswith("data: ")]
+
+    # Keyframe déjà reçue (seq 1) : seulement l'avis d'événements perdus puis les deltas restants.
+    assert [e.get("type") for e in events(after_keyframe)] == ["status", "alternative", "alternative", "alternative"]
+    replayed = events(fresh)
+    assert replayed[0] == {"type": "base", "keyframe": True}
+    assert [e.get("index") for e in replayed[1:]] == [2, 3, 4]
+    assert "id: g3:1\n" in fresh[0]
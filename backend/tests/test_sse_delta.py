@@ -0,0 +1,48 @@
+import json
+from copy import deepcopy
+
+from app.sites.sse_delta import SseDeltaEncoder, apply_sse_delta
+
+
+def _grid(n_days=7, n_stations=12):
+    days = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"][:n_days]
+    return {
+        d: {sh: [[f"w{d}{sh}{t}"] for t in range(n_stations)] for sh in ("06-14", "14-22", "22-06")}
+        for d in days
+    }
+
+
+def test_delta_alternatives_roundtrip_with_keyframes():
+    enc = SseDeltaEncoder(keyframe_interval=3)
+    base = {"type": "base", "assignments": _grid(), "pulls": {}, "status": "STREAMING"}
+    sent = [enc.encode(base)]
+    alternatives = []
+    for i in range(1, 6):
+        alt = {"type": "alternative", "index": i, "assignments": _grid(), "pulls": {"k": i}}
+        alt["assignments"]["mon"]["06-14"][i] = ["swap"]
+        alternatives.append(alt)
+        sent.append(enc.encode(alt))
+
+    assert sent[0]["keyframe"] and [e["encoding"] for e in sent[1:]] == ["delta", "delta", "full", "delta", "delta"]
+    ref = None
+    for event, original in zip(sent, [base, *alternatives]):
+        if event.get("keyframe"):
+            ref = event
+            continue
+        decoded = apply_sse_delta(ref, event)
+        assert decoded["assignments"] == original["assignments"]
+        assert decoded["pulls"] == original["pulls"]
+        assert "status" not in decoded
+    assert len(json.dumps(sent[1])) * 10 < len(json.dumps(alternatives[0]))
+
+
+def test_delta_linked_site_plans_roundtrip():
+    enc = SseDeltaEncoder(keyframe_interval=10)
+    plans = {"1": {"assignments": _grid(2, 2), "pulls": {}}, "2": {"assignments": _grid(2, 1), "pulls": {}}}
+    base = enc.encode({"type": "base", "site_plans": plans, "linked_sites": [1, 2]})
+    changed = deepcopy(plans)
+    changed["2"]["assignments"]["sun"]["22-06"][0] = []
+    delta = enc.encode({"type": "alternative", "index": 1, "site_plans": changed, "linked_sites": [1, 2]})
+    assert delta["site_plans"]["1"]["changes"] == []
+    assert delta["site_plans"]["2"]["changes"] == [["sun", "22-06", 0, []]]
+    assert apply_sse_delta(base, delta)["site_plans"] == changed
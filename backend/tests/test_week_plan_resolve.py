@@ -1,7 +1,10 @@
 from types import SimpleNamespace
 
+from app.models import Site, SiteWeekPlan
 from app.sites.week_plans import (
     _pick_week_plan_row_for_resolve,
+    _previous_week_saved_plan,
+    _warm_start_hint_assignments,
     _week_plan_resolve_scope_order,
     _shape_week_plan_get_payload,
 )
@@ -89,3 +92,42 @@ def test_shape_week_plan_get_payload_base_keeps_assignments_omits_alts():
     assert full is not None
     assert full["alternatives"] == data["alternatives"]
     assert full["workers"] == data["workers"]
+
+
+def test_warm_start_hint_prefers_target_week_draft_then_previous_shared(db_session, create_director, monkeypatch):
+    director = create_director(email="warm.start@example.com", full_name="Warm Start")
+    site = Site(name="Warm", director_id=director.id, config={})
+    db_session.add(site)
+    db_session.flush()
+    shared_prev = {"sun": {"06-14": [["Alice"]]}}
+    draft = {"sun": {"06-14": [["Bob"]]}}
+    db_session.add(SiteWeekPlan(site_id=site.id, week_iso="2026-08-02", scope="shared", data={"assignments": shared_prev}, updated_at=1))
+    db_session.commit()
+
+    assert _warm_start_hint_assignments(db_session, site.id, "2026-08-09") == shared_prev
+
+    db_session.add(SiteWeekPlan(site_id=site.id, week_iso="2026-08-09", scope="director", data={"assignments": draft}, updated_at=2))
+    db_session.commit()
+    assert _warm_start_hint_assignments(db_session, site.id, "2026-08-09") == draft
+
+    monkeypatch.setenv("PLANNING_WARM_START", "0")
+    assert _warm_start_hint_assignments(db_session, site.id, "2026-08-09") is None
+
+
+
+def test_previous_week_saved_plan_ignores_auto_drafts(db_session, create_director):
+    director = create_director(email="prev.week@example.com", full_name="Prev Week")
+    site = Site(name="Prev", director_id=director.id, config={})
+    db_session.add(site)
+    db_session.flush()
+    db_session.add(SiteWeekPlan(site_id=site.id, week_iso="2026-08-02", scope="auto", data={"assignments": {"sat": {}}}, updated_at=1))
+    db_session.commit()
+    assert _previous_week_saved_plan(db_session, site.id, "2026-08-09") is None
+
+    saved = {"sat": {"22-06": [["Alice"]]}}
+    pulls = {"sat|14-22|0|1": {"before": {"name": "Bob"}, "after": {"name": "Carol"}}}
+    db_session.add(
+        SiteWeekPlan(site_id=site.id, week_iso="2026-08-02", scope="director", data={"assignments": saved, "pulls": pulls}, updated_at=2)
+    )
+    db_session.commit()
+    assert _previous_week_saved_plan(db_session, site.id, "2026-08-09") == {"assignments": saved, "pulls": pulls}